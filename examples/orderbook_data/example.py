@@ -22,7 +22,7 @@ class TestClass(unittest.TestCase):
         qlib.init(
             provider_uri=provider_uri,
             mem_cache_size_limit=1024**3 * 2,
-            mem_cache_type="sizeof",
+            mem_cache_limit_type="bytes",
             kernels=1,
             expression_provider={"class": "LocalExpressionProvider", "kwargs": {"time2idx": False}},
             feature_provider={
@@ -49,9 +49,10 @@ def init(default_conf="client", **kwargs):
         return
 
     clear_mem_cache = kwargs.pop("clear_mem_cache", True)
-    if clear_mem_cache:
-        H.clear()
     C.set(default_conf, **kwargs)
+    if clear_mem_cache:
+        # the memory cache is created again with the limits in the config
+        H.reset()
     get_module_logger.setLevel(C.logging_level)
 
     # mount nfs
@@ -19,7 +19,7 @@ from qlib.backtest.position import BasePosition
 
 from ..config import C
 from ..constant import REG_CN, REG_TW
-from ..data.data import D
+from ..data.data import D, LocalDatasetProvider
 from ..log import get_module_logger
 from .decision import Order, OrderDir, OrderHelper
 from .high_performance_ds import BaseQuote, NumpyQuote
@@ -202,13 +202,16 @@ class Exchange:
         # get stock data from qlib
         if len(self.codes) == 0:
             self.codes = D.instruments()
+        # If all the fields are raw features saved in the panels, the quote will be loaded from the panels at once.
+        # It is faster than the dataset cache, so the dataset cache is skipped.
+        disk_cache = not LocalDatasetProvider.support_panel(self.all_fields, self.freq, self.end_time)
         self.quote_df = D.features(
             self.codes,
             self.all_fields,
             self.start_time,
             self.end_time,
             freq=self.freq,
-            disk_cache=True,
+            disk_cache=disk_cache,
         )
         self.quote_df.columns = self.all_fields
 
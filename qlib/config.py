@@ -137,6 +137,8 @@ _default_config = {
     "instrument_provider": "LocalInstrumentProvider",
     "feature_provider": "LocalFeatureProvider",
     "pit_provider": "LocalPITProvider",
+    # the panel provider is optional, set it to "LocalPanelProvider" to load the raw features from the panels
+    "panel_provider": None,
     "expression_provider": "LocalExpressionProvider",
     "dataset_provider": "LocalDatasetProvider",
     "provider": "LocalProvider",
@@ -165,15 +167,50 @@ _default_config = {
     "maxtasksperchild": None,
     # If joblib_backend is None, use loky
     "joblib_backend": "multiprocessing",
+    # The number of threads reading the features of the upcoming instruments in `DatasetProvider.dataset_processor`
+    # while the instruments before them are calculated, 0 to disable it.
+    # It overlaps the reading and the calculation, which is helpful for the slow storages (e.g. NFS with cold cache).
+    "io_prefetch_workers": 0,
+    # Compile the fields of a dataset into a DAG in `LocalExpressionProvider.expressions`, so that the sub-expressions
+    # shared by the fields are calculated only once for each instrument.
+    "compile_expressions": True,
+    # Calculate the expressions of all the instruments at once in `LocalDatasetProvider.dataset` (see
+    # `DatasetProvider.panel_processor`) instead of instrument by instrument. The expression cache is not used.
+    "panel_evaluation": False,
+    # The max number of the parsed fields kept by `ExpressionProvider.get_expression_instance`, 0 for no limit.
+    "expression_instance_cache_size": 10000,
+    # The max number of the PIT fields of the instruments kept parsed by `LocalPITProvider`, 0 for no limit.
+    "pit_cache_size": 1000,
+    # The dtype of the float data of the operators and the datasets (see `qlib.data.base.get_compute_dtype`).
+    # None keeps the dtypes of the operators (e.g. float64 for the rolling operators) with float32 datasets;
+    # "float32" halves the memory of the intermediate data, the rolling kernels still accumulate in float64;
+    # "float64" calculates and returns everything in float64.
+    "compute_dtype": None,
     "default_disk_cache": 1,  # 0:skip/1:use
+    # The memory cache `H` (see `qlib.data.cache.MemCache`), the units are created again by `qlib.init`.
+    # "length": the number of the items; "sizeof": `sys.getsizeof` of the items;
+    # "bytes": the bytes of the items with the numpy/pandas data, e.g. `mem_cache_size_limit=2 * 1024**3` for 2GB.
     "mem_cache_size_limit": 500,
     "mem_cache_limit_type": "length",
+    # the seconds before the items of `H` expire, 0 for never
+    "mem_cache_ttl": 0,
     # memory cache expire second, only in used 'DatasetURICache' and 'client D.calendar'
     # default 1 hour
     "mem_cache_expire": 60 * 60,
     # cache dir name
     "dataset_cache_dir_name": "dataset_cache",
     "features_cache_dir_name": "features_cache",
+    # the directory of the checkpoints of `D.features_incremental` in the data directory
+    "incremental_state_dir_name": "incremental_states",
+    # The cost-based cache of the sub-expressions (see `qlib.data.cache.SubExpressionCache`). The expensive
+    # sub-expressions used at least `min_uses` times for each instrument and costing at least `min_cost` seconds per
+    # row are cached on the disk, whose total size is limited to `size_limit` bytes, 0 to disable it.
+    "subexpression_cache_size_limit": 0,
+    "subexpression_cache_min_uses": 2,
+    "subexpression_cache_min_cost": 5e-7,
+    "subexpression_cache_dir_name": "subexpression_cache",
+    # Record the time, rows and cache hits of each operator (see `qlib.data.profiler`)
+    "profile_expressions": False,
     # redis
     # in order to use cache
     "redis_host": "127.0.0.1",
@@ -3,6 +3,7 @@
 import numpy as np
 import pandas as pd
 from datetime import datetime
+from typing import Tuple
 
 from qlib.data.cache import H
 from qlib.data.data import Cal
@@ -28,9 +29,8 @@ def get_calendar_day(freq="1min", future=False):
         array of date.
     """
     flag = f"{freq}_future_{future}_day"
-    if flag in H["c"]:
-        _calendar = H["c"][flag]
-    else:
+    _calendar = H["c"].get(flag)
+    if _calendar is None:
         _calendar = np.array(list(map(lambda x: x.date(), Cal.load_calendar(freq, future))))
         H["c"][flag] = _calendar
     return _calendar
@@ -38,15 +38,95 @@ def get_calendar_day(freq="1min", future=False):
 
 def get_calendar_minute(freq="day", future=False):
     """Load High-Freq Calendar Minute Using Memcache"""
-    flag = f"{freq}_future_{future}_day"
-    if flag in H["c"]:
-        _calendar = H["c"][flag]
-    else:
+    flag = f"{freq}_future_{future}_minute"
+    _calendar = H["c"].get(flag)
+    if _calendar is None:
         _calendar = np.array(list(map(lambda x: x.minute // 30, Cal.load_calendar(freq, future))))
         H["c"][flag] = _calendar
     return _calendar
 
 
+def get_calendar_day_boundaries(freq="1min", future=False) -> np.ndarray:
+    """
+    Load the boundaries of the days in the High-Freq Calendar Using Memcache.
+
+    Returns
+    -------
+    np.ndarray
+        the calendar indexes of the first bars of the days followed by the length of the calendar, so the bars of the
+        i-th day are [boundaries[i], boundaries[i + 1]).
+    """
+    flag = f"{freq}_future_{future}_day_boundaries"
+    boundaries = H["c"].get(flag)
+    if boundaries is None:
+        _calendar = get_calendar_day(freq=freq, future=future)
+        changes = np.flatnonzero(_calendar[1:] != _calendar[:-1]) + 1
+        boundaries = np.concatenate([[0], changes, [len(_calendar)]]).astype(np.int64)
+        H["c"][flag] = boundaries
+    return boundaries
+
+
+def get_day_offsets(index: pd.Index, freq="1min") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Locate the days of the data indexed by the calendar indexes.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        the positions of the first bars of the days in the data, and the time of day of each bar (i.e. the index of the
+        bar in the calendar of its day, e.g. 0 for 9:30 and 120 for 13:00 in the 1min calendar of the CN market).
+    """
+    boundaries = get_calendar_day_boundaries(freq=freq)
+    index = np.asarray(index, dtype=np.int64)
+    days = np.searchsorted(boundaries, index, side="right") - 1
+    starts = np.flatnonzero(np.concatenate([[True], days[1:] != days[:-1]])) if len(index) > 0 else days
+    return starts, index - boundaries[days]
+
+
+def _repeat_days(day_values: np.ndarray, starts: np.ndarray, n: int) -> np.ndarray:
+    """broadcast the values of the days to their bars"""
+    return np.repeat(day_values, np.diff(np.append(starts, n)))
+
+
+def _day_cumsum(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """the cumsum reset at the first bars of the days, the NaN are skipped like `pd.Series.cumsum`"""
+    nan = np.isnan(values)
+    filled = np.where(nan, 0.0, values).astype(np.float64)
+    if len(filled) == 0:
+        return filled
+    # the days are laid out as the rows of a padded grid and summed separately, so the rounding errors of a day don't
+    # carry over to the next days
+    lengths = np.diff(np.append(starts, len(filled)))
+    rows = np.repeat(np.arange(len(starts)), lengths)
+    cols = np.arange(len(filled)) - np.repeat(starts, lengths)
+    grid = np.zeros((len(starts), lengths.max()))
+    grid[rows, cols] = filled
+    res = np.cumsum(grid, axis=1)[rows, cols]
+    res[nan] = np.nan
+    return res
+
+
+def _day_first(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """the first value which is not NaN of each day"""
+    n = len(values)
+    if n == 0:
+        return values.astype(np.float64)
+    valid_idx = np.where(np.isnan(values), n, np.arange(n))
+    first = np.minimum.accumulate(valid_idx[::-1])[::-1][starts]
+    ends = np.append(starts[1:], n)
+    return np.where(first < ends, values[np.minimum(first, n - 1)], np.nan)
+
+
+def _day_last(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """the last value which is not NaN of each day"""
+    n = len(values)
+    if n == 0:
+        return values.astype(np.float64)
+    valid_idx = np.where(np.isnan(values), -1, np.arange(n))
+    last = np.maximum.accumulate(valid_idx)[np.append(starts[1:], n) - 1]
+    return np.where(last >= starts, values[np.maximum(last, 0)], np.nan)
+
+
 class DayCumsum(ElemOperator):
     """DayCumsum Operator during start time and end time.
 
@@ -68,6 +148,7 @@ class DayCumsum(ElemOperator):
     feature:
         a series of that each value equals the cumsum value during start time and end time.
         Otherwise, the value is zero.
+        The cumsum of each day starts from its first bar loaded, so the days can be partially loaded.
     """
 
     def __init__(self, feature, start: str = "9:30", end: str = "14:59", data_granularity: int = 1):
@@ -85,18 +166,14 @@ class DayCumsum(ElemOperator):
         self.end_id = time_to_day_index(self.end) // self.data_granularity
         assert 240 % self.data_granularity == 0
 
-    def period_cusum(self, df):
-        df = df.copy()
-        assert len(df) == 240 // self.data_granularity
-        df.iloc[0 : self.start_id] = 0
-        df = df.cumsum()
-        df.iloc[self.end_id + 1 : 240 // self.data_granularity] = 0
-        return df
-
     def _load_internal(self, instrument, start_index, end_index, freq):
-        _calendar = get_calendar_day(freq=freq)
         series = self.feature.load(instrument, start_index, end_index, freq)
-        return series.groupby(_calendar[series.index], group_keys=False).transform(self.period_cusum)
+        starts, time_index = get_day_offsets(series.index, freq)
+        values = series.values.astype(np.float64)
+        values[time_index < self.start_id] = 0
+        values = _day_cumsum(values, starts)
+        values[time_index > self.end_id] = 0
+        return pd.Series(values, index=series.index)
 
 
 class DayLast(ElemOperator):
@@ -114,9 +191,64 @@ class DayLast(ElemOperator):
     """
 
     def _load_internal(self, instrument, start_index, end_index, freq):
-        _calendar = get_calendar_day(freq=freq)
         series = self.feature.load(instrument, start_index, end_index, freq)
-        return series.groupby(_calendar[series.index], group_keys=False).transform("last")
+        starts, _ = get_day_offsets(series.index, freq)
+        values = _day_last(series.values.astype(np.float64), starts)
+        return pd.Series(_repeat_days(values, starts, len(series)), index=series.index)
+
+
+class DayFirst(ElemOperator):
+    """DayFirst Operator
+
+    Parameters
+    ----------
+    feature : Expression
+        feature instance
+
+    Returns
+    ----------
+    feature:
+        a series of that each value equals the first value of its day, e.g. `$close / DayFirst($open) - 1` is the
+        return since the open of the day
+    """
+
+    def _load_internal(self, instrument, start_index, end_index, freq):
+        series = self.feature.load(instrument, start_index, end_index, freq)
+        starts, _ = get_day_offsets(series.index, freq)
+        values = _day_first(series.values.astype(np.float64), starts)
+        return pd.Series(_repeat_days(values, starts, len(series)), index=series.index)
+
+
+class SessionVWAP(PairOperator):
+    """SessionVWAP Operator
+
+    Parameters
+    ----------
+    feature_left : Expression
+        feature instance, price
+    feature_right : Expression
+        feature instance, volume
+
+    Returns
+    ----------
+    feature:
+        a series of that each value equals the volume weighted average price from the first bar of its day to the
+        bar, the bars whose price or volume is NaN are skipped
+    """
+
+    def _load_internal(self, instrument, start_index, end_index, freq):
+        series_price = self.feature_left.load(instrument, start_index, end_index, freq)
+        series_volume = self.feature_right.load(instrument, start_index, end_index, freq)
+        series_amount = series_price * series_volume
+        volume = series_volume.reindex(series_amount.index).values.astype(np.float64)
+        amount = series_amount.values.astype(np.float64)
+        valid = ~np.isnan(amount) & ~np.isnan(volume)
+        starts, _ = get_day_offsets(series_amount.index, freq)
+        cum_amount = _day_cumsum(np.where(valid, amount, 0.0), starts)
+        cum_volume = _day_cumsum(np.where(valid, volume, 0.0), starts)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = np.where(cum_volume != 0, cum_amount / cum_volume, np.nan)
+        return pd.Series(values, index=series_amount.index)
 
 
 class FFillNan(ElemOperator):
@@ -177,6 +309,27 @@ class Date(ElemOperator):
         return pd.Series(_calendar[series.index], index=series.index)
 
 
+class TimeOfDay(ElemOperator):
+    """TimeOfDay Operator
+
+    Parameters
+    ----------
+    feature : Expression
+        feature instance
+
+    Returns
+    ----------
+    feature:
+        a series of that each value is the index of the bar in the calendar of its day corresponding to
+        feature.index, e.g. 0 for 9:30 and 120 for 13:00 in the 1min calendar of the CN market
+    """
+
+    def _load_internal(self, instrument, start_index, end_index, freq):
+        series = self.feature.load(instrument, start_index, end_index, freq)
+        _, time_index = get_day_offsets(series.index, freq)
+        return pd.Series(time_index, index=series.index)
+
+
 class Select(PairOperator):
     """Select Operator
 
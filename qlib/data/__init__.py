@@ -10,12 +10,14 @@ from .data import (
     CalendarProvider,
     InstrumentProvider,
     FeatureProvider,
+    PanelProvider,
     ExpressionProvider,
     DatasetProvider,
     LocalCalendarProvider,
     LocalInstrumentProvider,
     LocalFeatureProvider,
     LocalPITProvider,
+    LocalPanelProvider,
     LocalExpressionProvider,
     LocalDatasetProvider,
     ClientCalendarProvider,
@@ -42,12 +44,14 @@ __all__ = [
     "CalendarProvider",
     "InstrumentProvider",
     "FeatureProvider",
+    "PanelProvider",
     "ExpressionProvider",
     "DatasetProvider",
     "LocalCalendarProvider",
     "LocalInstrumentProvider",
     "LocalFeatureProvider",
     "LocalPITProvider",
+    "LocalPanelProvider",
     "LocalExpressionProvider",
     "LocalDatasetProvider",
     "ClientCalendarProvider",
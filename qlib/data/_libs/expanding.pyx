@@ -7,6 +7,8 @@ import numpy as np
 from libc.math cimport sqrt, isnan, NAN
 from libcpp.vector cimport vector
 
+from .rolling import rolling_rank, rolling_quantile, rolling_mad, rolling_wma, rolling_idxmax, rolling_idxmin
+
 
 cdef class Expanding:
     """1-D array expanding"""
@@ -150,3 +152,49 @@ def expanding_rsquare(np.ndarray a):
 def expanding_resi(np.ndarray a):
     cdef Resi r = Resi()
     return expanding(r, a)
+
+
+# the order statistics and the extrema of the expanding windows are the rolling ones with the whole array as window
+def expanding_rank(np.ndarray a):
+    return rolling_rank(a, len(a))
+
+def expanding_quantile(np.ndarray a, double qscore):
+    return rolling_quantile(a, len(a), qscore)
+
+def expanding_mad(np.ndarray a):
+    return rolling_mad(a, len(a))
+
+def expanding_wma(np.ndarray a):
+    return rolling_wma(a, len(a))
+
+def expanding_idxmax(np.ndarray a):
+    return rolling_idxmax(a, len(a))
+
+def expanding_idxmin(np.ndarray a):
+    return rolling_idxmin(a, len(a))
+
+def expanding_ema(np.ndarray a):
+    """the exponentially weighted mean of the expanding window
+
+    The decay `1 - 2 / (1 + L)` depends on the length L of the window, so all the weights change at each step and
+    the weighted sum is recalculated with Horner's method. The weights of the NaNs are kept in the normalization
+    (same as `np.nansum(w * x)`).
+    """
+    cdef const double[:] x = np.ascontiguousarray(a, dtype=np.float64)
+    cdef Py_ssize_t i, j, n, N = x.shape[0]
+    cdef np.ndarray[double, ndim=1] ret = np.empty(N)
+    cdef double alpha, w, vsum, wsum
+    for i in range(N):
+        alpha = 1 - 2.0 / (i + 2)
+        w = 1
+        vsum = 0
+        wsum = 0
+        n = 0
+        for j in range(i, -1, -1):
+            if not isnan(x[j]):
+                vsum += w * x[j]
+                n += 1
+            wsum += w
+            w *= alpha
+        ret[i] = vsum / wsum if n > 0 else NAN
+    return ret
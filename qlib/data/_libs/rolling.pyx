@@ -4,12 +4,17 @@ cimport cython
 cimport numpy as np
 import numpy as np
 
-from libc.math cimport sqrt, isnan, NAN
+from libc.math cimport sqrt, fabs, isnan, NAN
 from libcpp.deque cimport deque
+from libcpp.vector cimport vector
 
 
 cdef class Rolling:
-    """1-D array rolling"""
+    """1-D array rolling
+
+    `update` takes the next value and returns the result of the window ending at it, so the instances are also used
+    as the states of the incremental evaluation (see `qlib.data.incremental`).
+    """
     cdef int window
     cdef deque[double] barv
     cdef int na_count
@@ -20,9 +25,20 @@ cdef class Rolling:
         for i in range(window):
             self.barv.push_back(NAN)
 
-    cdef double update(self, double val):
+    cpdef double update(self, double val):
         pass
 
+    def __reduce__(self):
+        # the state only depends on the values in the window
+        return _restore_rolling, (type(self), self.window, [val for val in self.barv])
+
+
+def _restore_rolling(cls, int window, values):
+    cdef Rolling r = cls(window)
+    for val in values:
+        r.update(val)
+    return r
+
 
 cdef class Mean(Rolling):
     """1-D array rolling mean"""
@@ -31,7 +47,7 @@ cdef class Mean(Rolling):
         super(Mean, self).__init__(window)
         self.vsum = 0
         
-    cdef double update(self, double val):
+    cpdef double update(self, double val):
         self.barv.push_back(val)
         if not isnan(self.barv.front()):
             self.vsum -= self.barv.front()
@@ -61,7 +77,7 @@ cdef class Slope(Rolling):
         self.y_sum  = 0
         self.xy_sum = 0
 
-    cdef double update(self, double val):
+    cpdef double update(self, double val):
         self.barv.push_back(val)
         self.xy_sum = self.xy_sum - self.y_sum
         self.x2_sum = self.x2_sum + self.i_sum - 2*self.x_sum
@@ -103,7 +119,7 @@ cdef class Resi(Rolling):
         self.y_sum  = 0
         self.xy_sum = 0
 
-    cdef double update(self, double val):
+    cpdef double update(self, double val):
         self.barv.push_back(val)
         self.xy_sum = self.xy_sum - self.y_sum
         self.x2_sum = self.x2_sum + self.i_sum - 2*self.x_sum
@@ -151,7 +167,7 @@ cdef class Rsquare(Rolling):
         self.y2_sum = 0
         self.xy_sum = 0
 
-    cdef double update(self, double val):
+    cpdef double update(self, double val):
         self.barv.push_back(val)
         self.xy_sum = self.xy_sum - self.y_sum
         self.x2_sum = self.x2_sum + self.i_sum - 2*self.x_sum
@@ -205,3 +221,202 @@ def rolling_rsquare(np.ndarray a, int window):
 def rolling_resi(np.ndarray a, int window):
     cdef Resi r = Resi(window)
     return rolling(r, a)
+
+
+# The kernels below replace `rolling(...).apply(python_func)` and follow the same semantics:
+# the windows are truncated at the beginning of the array (i.e. `min_periods=1`)
+# and the result is NaN when there is no valid value in the window.
+
+cdef np.ndarray _as_double(np.ndarray a):
+    return np.ascontiguousarray(a, dtype=np.float64)
+
+
+cdef inline Py_ssize_t bisect_left(vector[double]& v, double val):
+    cdef Py_ssize_t lo = 0, hi = v.size(), mid
+    while lo < hi:
+        mid = (lo + hi) >> 1
+        if v[mid] < val:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+cdef inline Py_ssize_t bisect_right(vector[double]& v, double val):
+    cdef Py_ssize_t lo = 0, hi = v.size(), mid
+    while lo < hi:
+        mid = (lo + hi) >> 1
+        if val < v[mid]:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+cdef class SortedWindow:
+    """the valid values of a 1-D array rolling window kept in order
+
+    The values are kept in a contiguous sorted array: inserting and removing one value is a binary search and a
+    memmove, which is faster than an order-statistic tree for the window sizes of the factors.
+    """
+    cdef int window
+    cdef int index
+    cdef const double[:] a
+    cdef vector[double] values
+
+    def __init__(self, const double[:] a, int window):
+        self.a = a
+        self.window = window
+        self.index = -1
+
+    cdef void step(self):
+        """move the window to the next element of the array"""
+        cdef double val
+        self.index += 1
+        if self.index >= self.window:
+            val = self.a[self.index - self.window]
+            if not isnan(val):
+                self.values.erase(self.values.begin() + bisect_left(self.values, val))
+        val = self.a[self.index]
+        if not isnan(val):
+            self.values.insert(self.values.begin() + bisect_left(self.values, val), val)
+
+
+def rolling_rank(np.ndarray a, int window):
+    """the percentile of the last value in the window (same as `rolling.rank(pct=True)`)"""
+    cdef const double[:] x = _as_double(a)
+    cdef Py_ssize_t i, N = x.shape[0]
+    cdef np.ndarray[double, ndim=1] ret = np.empty(N)
+    cdef SortedWindow w = SortedWindow(x, window)
+    for i in range(N):
+        w.step()
+        if isnan(x[i]):
+            ret[i] = NAN
+        else:
+            # the average rank of the ties
+            ret[i] = (bisect_left(w.values, x[i]) + bisect_right(w.values, x[i]) + 1) / 2.0 / w.values.size()
+    return ret
+
+
+def rolling_quantile(np.ndarray a, int window, double qscore):
+    """the quantile of the window with linear interpolation (same as `rolling.quantile`)"""
+    cdef const double[:] x = _as_double(a)
+    cdef Py_ssize_t i, idx, N = x.shape[0]
+    cdef np.ndarray[double, ndim=1] ret = np.empty(N)
+    cdef SortedWindow w = SortedWindow(x, window)
+    cdef double pos, low
+    for i in range(N):
+        w.step()
+        if w.values.size() == 0:
+            ret[i] = NAN
+            continue
+        pos = qscore * (w.values.size() - 1)
+        idx = <Py_ssize_t>pos
+        low = w.values[idx]
+        if pos == idx:
+            ret[i] = low
+        else:
+            ret[i] = low + (w.values[idx + 1] - low) * (pos - idx)
+    return ret
+
+
+def rolling_mad(np.ndarray a, int window):
+    """the mean absolute deviation of the valid values in the window"""
+    cdef const double[:] x = _as_double(a)
+    cdef Py_ssize_t i, j, start, n, N = x.shape[0]
+    cdef np.ndarray[double, ndim=1] ret = np.empty(N)
+    cdef double vsum, mean, dsum
+    for i in range(N):
+        start = i - window + 1 if i >= window else 0
+        vsum = 0
+        n = 0
+        for j in range(start, i + 1):
+            if not isnan(x[j]):
+                vsum += x[j]
+                n += 1
+        if n == 0:
+            ret[i] = NAN
+            continue
+        mean = vsum / n
+        dsum = 0
+        for j in range(start, i + 1):
+            if not isnan(x[j]):
+                dsum += fabs(x[j] - mean)
+        ret[i] = dsum / n
+    return ret
+
+
+def rolling_wma(np.ndarray a, int window):
+    """the linearly weighted mean of the window
+
+    The weights of the window of length L are 1..L normalized by L(L+1)/2 and the weighted sum of the valid values
+    is divided by their count (same as `np.nanmean(w * x)`).
+    """
+    cdef const double[:] x = _as_double(a)
+    cdef Py_ssize_t i, L, n = 0, N = x.shape[0]
+    cdef np.ndarray[double, ndim=1] ret = np.empty(N)
+    cdef double val, wsum = 0, vsum = 0
+    for i in range(N):
+        if i >= window:
+            # all the weights decrease by 1 and the first value goes out of the window
+            L = window
+            wsum -= vsum
+            val = x[i - window]
+            if not isnan(val):
+                vsum -= val
+                n -= 1
+        else:
+            L = i + 1
+        val = x[i]
+        if not isnan(val):
+            wsum += L * val
+            vsum += val
+            n += 1
+        if n == 0:
+            wsum = vsum = 0
+            ret[i] = NAN
+        else:
+            ret[i] = wsum / (L * (L + 1) / 2.0) / n
+    return ret
+
+
+cdef np.ndarray[double, ndim=1] rolling_idx(np.ndarray a, int window, bint is_max):
+    # The candidates of the extremum are kept in a monotonic deque, the earliest one being in the front.
+    # `np.argmax` returns the position of the first NaN if there is any.
+    cdef const double[:] x = _as_double(a)
+    cdef Py_ssize_t i, start, N = x.shape[0]
+    cdef np.ndarray[double, ndim=1] ret = np.empty(N)
+    cdef deque[Py_ssize_t] candidates, nans
+    cdef double val
+    for i in range(N):
+        start = i - window + 1 if i >= window else 0
+        while not candidates.empty() and candidates.front() < start:
+            candidates.pop_front()
+        while not nans.empty() and nans.front() < start:
+            nans.pop_front()
+        val = x[i]
+        if isnan(val):
+            nans.push_back(i)
+        else:
+            while not candidates.empty() and (
+                x[candidates.back()] < val if is_max else x[candidates.back()] > val
+            ):
+                candidates.pop_back()
+            candidates.push_back(i)
+        if candidates.empty():
+            ret[i] = NAN
+        elif not nans.empty():
+            ret[i] = nans.front() - start + 1
+        else:
+            ret[i] = candidates.front() - start + 1
+    return ret
+
+
+def rolling_idxmax(np.ndarray a, int window):
+    """the 1-based position of the maximum in the window"""
+    return rolling_idx(a, window, True)
+
+
+def rolling_idxmin(np.ndarray a, int window):
+    """the 1-based position of the minimum in the window"""
+    return rolling_idx(a, window, False)
@@ -6,10 +6,105 @@ from __future__ import division
 from __future__ import print_function
 
 import abc
+import time
+from typing import Optional, Union
+
+import numpy as np
 import pandas as pd
 from ..log import get_module_logger
 
 
+class IndexGapError(ValueError):
+    """The index of the data has gaps, so it can not be represented by `IndexedArray`"""
+
+
+class IndexedArray:
+    """The numpy-native data of an expression for one instrument
+
+    `values[i]` is the value at the calendar index `start_index + i`, which is the same as a pd.Series with the
+    contiguous index `[start_index, start_index + len(values))`. The operators calculated by
+    `qlib.data.compiler.ExpressionDAG` pass it to each other instead of pd.Series, so the data is aligned by the offsets
+    of the indexes instead of joining the indexes, and no pd.Series is created for the intermediate results.
+    """
+
+    __slots__ = ("start_index", "values")
+
+    def __init__(self, start_index: int, values: np.ndarray):
+        self.start_index = int(start_index)
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def end_index(self) -> int:
+        return self.start_index + len(self.values) - 1
+
+    @classmethod
+    def from_series(cls, series: pd.Series) -> "IndexedArray":
+        index = series.index
+        if len(index) == 0:
+            return cls(0, series.values)
+        if isinstance(index, pd.RangeIndex):
+            contiguous = index.step == 1
+        else:
+            contiguous = index.dtype.kind in "iu" and bool(np.all(np.diff(index.values) == 1))
+        if not contiguous:
+            raise IndexGapError(f"the index of {series.name} is not contiguous: {index}")
+        return cls(index[0], series.values)
+
+    def to_series(self) -> pd.Series:
+        return pd.Series(self.values, index=pd.RangeIndex(self.start_index, self.start_index + len(self.values)))
+
+    def slice(self, start_index: int, end_index: int) -> "IndexedArray":
+        """the data in [start_index, end_index], which is the same as `series.loc[start_index:end_index]`"""
+        lft = max(start_index - self.start_index, 0)
+        rght = max(end_index - self.start_index + 1, lft)
+        if lft == 0 and rght >= len(self.values):
+            return self
+        return IndexedArray(self.start_index + lft, self.values[lft:rght])
+
+
+def get_compute_dtype() -> Optional[np.dtype]:
+    """the dtype of the float data calculated by the operators, which is set by `C.compute_dtype`
+
+    - None: the operators return the float data in the dtypes of their calculations (e.g. the rolling operators
+      return float64), and the datasets are float32;
+    - "float32": the float data of the operators and the datasets are float32. The rolling kernels still accumulate
+      in float64 (see `qlib.data._libs.rolling`), only their results are rounded to float32;
+    - "float64": the features, the float data of the operators and the datasets are float64.
+    """
+    from ..config import C  # pylint: disable=C0415
+
+    dtype = C.get("compute_dtype", None)
+    if dtype is None:
+        return None
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.float64):
+        raise ValueError(f"C.compute_dtype should be None, float32 or float64, got {dtype}")
+    return dtype
+
+
+def get_dataset_dtype() -> np.dtype:
+    """the dtype of the datasets (e.g. `D.features`), which is float32 unless `C.compute_dtype` is float64"""
+    dtype = get_compute_dtype()
+    return np.dtype(np.float32) if dtype is None else dtype
+
+
+def cast_float(
+    data: Union[np.ndarray, pd.Series, IndexedArray], dtype: Optional[np.dtype]
+) -> Union[np.ndarray, pd.Series, IndexedArray]:
+    """cast the float data to `dtype`, the data of the other dtypes (e.g. bool) are returned as they are"""
+    if dtype is None:
+        return data
+    if isinstance(data, IndexedArray):
+        values = cast_float(data.values, dtype)
+        return data if values is data.values else IndexedArray(data.start_index, values)
+    if data.dtype.kind != "f" or data.dtype == dtype:
+        return data
+    return data.astype(dtype)
+
+
 class Expression(abc.ABC):
     """
     Expression base class
@@ -182,15 +277,39 @@ class Expression(abc.ABC):
             feature series: The index of the series is the calendar index
         """
         from .cache import H  # pylint: disable=C0415
+        from .profiler import PROFILER  # pylint: disable=C0415
 
         # cache
         cache_key = str(self), instrument, start_index, end_index, *args
-        if cache_key in H["f"]:
-            return H["f"][cache_key]
+        series = H["f"].get(cache_key)
+        if series is not None:
+            if PROFILER.enabled:
+                PROFILER.count(self, "mem_hits")
+            return series
         if start_index is not None and end_index is not None and start_index > end_index:
             raise ValueError("Invalid index range: {} {}".format(start_index, end_index))
+        if PROFILER.enabled:
+            series = PROFILER.measure(self, self._calculate, instrument, start_index, end_index, *args, mem_misses=1)
+        else:
+            series = self._calculate(instrument, start_index, end_index, *args)
+        series.name = str(self)
+        H["f"][cache_key] = series
+        return series
+
+    def _calculate(self, instrument, start_index, end_index, *args) -> pd.Series:
+        """calculate the data by `_load_internal` in the dtype of `get_compute_dtype`, the expensive sub-expressions
+        are profiled and cached on the disk (see `qlib.data.cache.SubExpressionCache`)"""
+        from .cache import SE  # pylint: disable=C0415
+
+        dtype = get_compute_dtype()
+        profiled = SE.is_candidate(self, *args)
+        if profiled:
+            data = SE.fetch(self, instrument, start_index, end_index, *args)
+            if data is not None:
+                return cast_float(data, dtype).to_series()
+            start = time.perf_counter()
         try:
-            series = self._load_internal(instrument, start_index, end_index, *args)
+            series = cast_float(self._load_internal(instrument, start_index, end_index, *args), dtype)
         except Exception as e:
             get_module_logger("data").debug(
                 f"Loading data error: instrument={instrument}, expression={str(self)}, "
@@ -198,10 +317,14 @@ class Expression(abc.ABC):
                 f"error info: {str(e)}"
             )
             raise
-        series.name = str(self)
-        H["f"][cache_key] = series
+        if profiled:
+            SE.record(self, instrument, start_index, end_index, *args, series, time.perf_counter() - start)
         return series
 
+    def load_array(self, instrument, start_index, end_index, *args) -> IndexedArray:
+        """load feature as `IndexedArray`, see `load` for the parameters"""
+        return IndexedArray.from_series(self.load(instrument, start_index, end_index, *args))
+
     @abc.abstractmethod
     def _load_internal(self, instrument, start_index, end_index, *args) -> pd.Series:
         raise NotImplementedError("This function must be implemented in your newly defined feature")
@@ -273,9 +396,55 @@ class PFeature(Feature):
         return PITD.period_feature(instrument, str(self), start_index, end_index, cur_time, period)
 
 
+class ExpressionState:
+    """The state of an operator in the incremental evaluation (see `qlib.data.incremental`)
+
+    It is created by `ExpressionOps.init_state` with the history of the sub-expressions, and `step` takes their
+    values in the next bar and returns the value of the operator in that bar.
+    """
+
+    def step(self, *values):
+        raise NotImplementedError("Subclass of ExpressionState must implement `step` method")
+
+
 class ExpressionOps(Expression):
     """Operator Expression
 
     This kind of feature will use operator for feature
     construction on the fly.
     """
+
+    def _load_panel_internal(self, instruments, start_index, end_index, *args) -> pd.DataFrame:
+        """Calculate the operator for several instruments at once.
+
+        It is used by the panel mode of `qlib.data.compiler.ExpressionDAG`, in which the sub-expressions return the
+        panels (pd.DataFrame with the calendar index and the instrument columns) instead of pd.Series. The operators
+        implemented with the column-wise methods of pandas reuse `_load_internal` directly, and the others should
+        override this method.
+        """
+        return self._load_internal(instruments, start_index, end_index, *args)
+
+    def _load_array_internal(self, instrument, start_index, end_index, *args) -> IndexedArray:
+        """Calculate the operator with the numpy-native data (see `IndexedArray`).
+
+        It is used by `qlib.data.compiler.ExpressionDAG`, in which the sub-expressions are loaded by `load_array`.
+        The default implementation converts the pd.Series calculated by `_load_internal`, and the operators which
+        spend most of their time on creating and aligning pd.Series override it to calculate the numpy arrays
+        directly.
+        """
+        return IndexedArray.from_series(self._load_internal(instrument, start_index, end_index, *args))
+
+    def init_state(self, *history) -> ExpressionState:
+        """Initialize the state of the operator for the incremental evaluation (see `qlib.data.incremental`).
+
+        Parameters
+        ----------
+        history : np.ndarray
+            the values of each sub-expression (in the order of their attributes) in the bars ending at the bar before
+            the next one, which cover the window of the operator at least. The values of the bars which are not in
+            the index of the sub-expression (e.g. before the first bar of the instrument) are not included.
+
+        Raises NotImplementedError if the operator can't be calculated incrementally, e.g. the result depends on the
+        start of the range.
+        """
+        raise NotImplementedError(f"{type(self).__name__} doesn't support the incremental evaluation")
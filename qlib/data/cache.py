@@ -10,6 +10,7 @@ import sys
 import stat
 import time
 import pickle
+import threading
 import traceback
 import redis_lock
 import contextlib
@@ -17,7 +18,7 @@ import abc
 from pathlib import Path
 import numpy as np
 import pandas as pd
-from typing import Union, Iterable
+from typing import Union, Iterable, Optional
 from collections import OrderedDict
 
 from ..config import C
@@ -25,14 +26,15 @@ from ..utils import (
     hash_args,
     get_redis_connection,
     read_bin,
-    parse_field,
     remove_fields_space,
     normalize_cache_fields,
     normalize_cache_instruments,
 )
 
 from ..log import get_module_logger
-from .base import Feature
+from .base import Expression, ExpressionOps, Feature, IndexedArray, IndexGapError, PFeature
+from .compiler import is_compilable
+from .profiler import PROFILER
 from .ops import Operators  # pylint: disable=W0611  # noqa: F401
 
 
@@ -41,36 +43,69 @@ class QlibCacheException(RuntimeError):
 
 
 class MemCacheUnit(abc.ABC):
-    """Memory Cache Unit."""
+    """Memory Cache Unit.
+
+    A thread-safe LRU cache. The least recently used items are evicted when the total size of the items exceeds
+    `size_limit` (no limit if it is 0), the items expire `expire` seconds after they are set (never if it is 0).
+    The lookups are counted by `__contains__`, `get` and the missing keys of `__getitem__` (see `stats`).
+
+    .. note:: An item may be evicted or expire between `key in cache` and `cache[key]` (e.g. by another thread),
+        use `get` to look up the items atomically.
+    """
+
+    STATS_KEYS = ("hits", "misses", "evictions", "expirations")
 
     def __init__(self, *args, **kwargs):
         self.size_limit = kwargs.pop("size_limit", 0)
+        self.expire = kwargs.pop("expire", 0)
         self._size = 0
         self.od = OrderedDict()
+        # key -> (the size of the value, the time when it is set)
+        self._meta = {}
+        self._lock = threading.RLock()
+        self._stats = dict.fromkeys(self.STATS_KEYS, 0)
 
-    def __setitem__(self, key, value):
-        # TODO: thread safe?__setitem__ failure might cause inconsistent size?
-
-        # precalculate the size after od.__setitem__
-        self._adjust_size(key, value)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
 
-        self.od.__setitem__(key, value)
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
 
-        # move the key to end,make it latest
-        self.od.move_to_end(key)
-
-        if self.limited:
-            # pop the oldest items beyond size limit
-            while self._size > self.size_limit:
-                self.popitem(last=False)
+    def __setitem__(self, key, value):
+        # the size is calculated once when the value is set
+        size = self._get_value_size(value)
+        with self._lock:
+            if key in self.od:
+                self._size -= self._meta[key][0]
+            self.od.__setitem__(key, value)
+            self._meta[key] = size, time.time()
+            self._size += size
+
+            # move the key to end,make it latest
+            self.od.move_to_end(key)
+
+            if self.limited:
+                # pop the oldest items beyond size limit, the item just set is kept even if it exceeds the limit
+                while self._size > self.size_limit and len(self.od) > 1:
+                    self.popitem(last=False)
+                    self._stats["evictions"] += 1
 
     def __getitem__(self, key):
-        v = self.od.__getitem__(key)
-        self.od.move_to_end(key)
-        return v
+        with self._lock:
+            if key not in self.od or self._pop_expired(key):
+                self._stats["misses"] += 1
+                raise KeyError(key)
+            self.od.move_to_end(key)
+            return self.od[key]
 
     def __contains__(self, key):
-        return key in self.od
+        with self._lock:
+            found = key in self.od and not self._pop_expired(key)
+            self._stats["hits" if found else "misses"] += 1
+            return found
 
     def __len__(self):
         return self.od.__len__()
@@ -78,6 +113,16 @@ class MemCacheUnit(abc.ABC):
     def __repr__(self):
         return f"{self.__class__.__name__}<size_limit:{self.size_limit if self.limited else 'no limit'} total_size:{self._size}>\n{self.od.__repr__()}"
 
+    def get(self, key, default=None):
+        """get the value of `key` (or `default` if it is missing) atomically"""
+        with self._lock:
+            if key not in self.od or self._pop_expired(key):
+                self._stats["misses"] += 1
+                return default
+            self._stats["hits"] += 1
+            self.od.move_to_end(key)
+            return self.od[key]
+
     def set_limit_size(self, limit):
         self.size_limit = limit
 
@@ -90,27 +135,54 @@ class MemCacheUnit(abc.ABC):
     def total_size(self):
         return self._size
 
+    def stats(self) -> dict:
+        """
+        Get the statistics of the cache.
+
+        Returns
+        -------
+        dict
+            the counts of the hits, misses, evictions and expirations since the last `reset_stats`, the hit rate,
+            the number of the items, their total size and the size limit.
+        """
+        with self._lock:
+            stats = self._stats.copy()
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / lookups if lookups > 0 else np.nan
+            stats.update(items=len(self.od), total_size=self._size, size_limit=self.size_limit)
+            return stats
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = dict.fromkeys(self.STATS_KEYS, 0)
+
     def clear(self):
-        self._size = 0
-        self.od.clear()
+        with self._lock:
+            self._size = 0
+            self.od.clear()
+            self._meta.clear()
 
     def popitem(self, last=True):
-        k, v = self.od.popitem(last=last)
-        self._size -= self._get_value_size(v)
+        with self._lock:
+            k, v = self.od.popitem(last=last)
+            self._size -= self._meta.pop(k)[0]
 
-        return k, v
+            return k, v
 
     def pop(self, key):
-        v = self.od.pop(key)
-        self._size -= self._get_value_size(v)
-
-        return v
+        with self._lock:
+            v = self.od.pop(key)
+            self._size -= self._meta.pop(key)[0]
 
-    def _adjust_size(self, key, value):
-        if key in self.od:
-            self._size -= self._get_value_size(self.od[key])
+            return v
 
-        self._size += self._get_value_size(value)
+    def _pop_expired(self, key) -> bool:
+        """pop the item of `key` if it expires"""
+        if self.expire > 0 and time.time() - self._meta[key][1] > self.expire:
+            self.pop(key)
+            self._stats["expirations"] += 1
+            return True
+        return False
 
     @abc.abstractmethod
     def _get_value_size(self, value):
@@ -118,25 +190,57 @@ class MemCacheUnit(abc.ABC):
 
 
 class MemCacheLengthUnit(MemCacheUnit):
-    def __init__(self, size_limit=0):
-        super().__init__(size_limit=size_limit)
+    def __init__(self, size_limit=0, expire=0):
+        super().__init__(size_limit=size_limit, expire=expire)
 
     def _get_value_size(self, value):
         return 1
 
 
 class MemCacheSizeofUnit(MemCacheUnit):
-    def __init__(self, size_limit=0):
-        super().__init__(size_limit=size_limit)
+    def __init__(self, size_limit=0, expire=0):
+        super().__init__(size_limit=size_limit, expire=expire)
 
     def _get_value_size(self, value):
         return sys.getsizeof(value)
 
 
+def get_nbytes(value) -> int:
+    """
+    Get the bytes of the memory used by `value`.
+
+    Unlike `sys.getsizeof`, the data buffers of the numpy arrays and the pandas objects (including their indexes) are
+    counted, and the items of the tuples, lists and dicts are counted recursively.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    elif isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    elif isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return value.nbytes + sum(map(get_nbytes, value.ravel()))
+        return value.nbytes
+    elif isinstance(value, IndexedArray):
+        return get_nbytes(value.values) + sys.getsizeof(value.start_index)
+    elif isinstance(value, (tuple, list, set, frozenset)):
+        return sys.getsizeof(value) + sum(map(get_nbytes, value))
+    elif isinstance(value, dict):
+        return sys.getsizeof(value) + sum(get_nbytes(k) + get_nbytes(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class MemCacheBytesUnit(MemCacheUnit):
+    def __init__(self, size_limit=0, expire=0):
+        super().__init__(size_limit=size_limit, expire=expire)
+
+    def _get_value_size(self, value):
+        return get_nbytes(value)
+
+
 class MemCache:
     """Memory cache."""
 
-    def __init__(self, mem_cache_size_limit=None, limit_type="length"):
+    def __init__(self, mem_cache_size_limit=None, limit_type=None, expire=None):
         """
 
         Parameters
@@ -144,22 +248,31 @@ class MemCache:
         mem_cache_size_limit:
             cache max size.
         limit_type:
-            length or sizeof; length(call fun: len), size(call fun: sys.getsizeof).
+            length, sizeof or bytes; length(call fun: len), size(call fun: sys.getsizeof),
+            bytes(call fun: get_nbytes, the data of numpy and pandas are counted).
+        expire:
+            the seconds before the items expire, 0 for never.
         """
+        self.reset(mem_cache_size_limit, limit_type, expire)
 
+    def reset(self, mem_cache_size_limit=None, limit_type=None, expire=None):
+        """create the cache units again, the arguments default to the ones in `C`"""
         size_limit = C.mem_cache_size_limit if mem_cache_size_limit is None else mem_cache_size_limit
         limit_type = C.mem_cache_limit_type if limit_type is None else limit_type
+        expire = C.get("mem_cache_ttl", 0) if expire is None else expire
 
         if limit_type == "length":
             klass = MemCacheLengthUnit
         elif limit_type == "sizeof":
             klass = MemCacheSizeofUnit
+        elif limit_type == "bytes":
+            klass = MemCacheBytesUnit
         else:
-            raise ValueError(f"limit_type must be length or sizeof, your limit_type is {limit_type}")
+            raise ValueError(f"limit_type must be length, sizeof or bytes, your limit_type is {limit_type}")
 
-        self.__calendar_mem_cache = klass(size_limit)
-        self.__instrument_mem_cache = klass(size_limit)
-        self.__feature_mem_cache = klass(size_limit)
+        self.__calendar_mem_cache = klass(size_limit, expire)
+        self.__instrument_mem_cache = klass(size_limit, expire)
+        self.__feature_mem_cache = klass(size_limit, expire)
 
     def __getitem__(self, key):
         if key == "c":
@@ -176,6 +289,10 @@ class MemCache:
         self.__instrument_mem_cache.clear()
         self.__feature_mem_cache.clear()
 
+    def stats(self) -> pd.DataFrame:
+        """the statistics of the cache units (see `MemCacheUnit.stats`), one row for each unit"""
+        return pd.DataFrame.from_dict({key: self[key].stats() for key in ["c", "i", "f"]}, orient="index")
+
 
 class MemCacheExpire:
     CACHE_EXPIRE = C.mem_cache_expire
@@ -325,6 +442,67 @@ class BaseProviderCache:
         cache_dir.mkdir(parents=True, exist_ok=True)
         return cache_dir
 
+    @staticmethod
+    def _get_leaf_features(expression, instrument=None, leaves: Optional[set] = None) -> set:
+        """get the (instrument, field) of the leaf features of the expression
+
+        The instrument is None if the feature is loaded for the instrument of the expression.
+        """
+        if leaves is None:
+            leaves = set()
+        if isinstance(expression, PFeature):
+            # the point-in-time data is not versioned
+            return leaves
+        if isinstance(expression, Feature):
+            leaves.add((instrument, str(expression)))
+            return leaves
+        if isinstance(getattr(expression, "instrument", None), str):
+            # the operators like `ChangeInstrument` load the features of another instrument
+            instrument = expression.instrument
+        for child in vars(expression).values():
+            if isinstance(child, Expression):
+                BaseProviderCache._get_leaf_features(child, instrument, leaves)
+        return leaves
+
+    @staticmethod
+    def get_data_version(instruments, fields, freq) -> Optional[str]:
+        """Get the version of the data used by the fields of the instruments.
+
+        It is the hash of the versions of all the leaf features (see `FeatureProvider.feature_version`), so it is
+        changed if any of the features is rewritten by the dump scripts. The caches save the version of the data when
+        they are generated and are regenerated if the version is changed.
+
+        Returns
+        -------
+        Optional[str]
+            the version; None if the versions of the features are unknown.
+        """
+        from .data import Inst, ExpressionD, FeatureD  # pylint: disable=C0415
+
+        if Inst.get_inst_type(instruments) == Inst.CONF:
+            instruments = Inst.list_instruments(instruments, freq=freq, as_list=True)
+        leaves = set()
+        for field in fields:
+            BaseProviderCache._get_leaf_features(ExpressionD.get_expression_instance(field), leaves=leaves)
+        features = set()
+        for instrument in instruments:
+            for inst, feature in leaves:
+                features.add((instrument if inst is None else inst, feature))
+        versions = sorted((inst, feature, FeatureD.feature_version(inst, feature, freq)) for inst, feature in features)
+        if all(version is None for _, _, version in versions):
+            return None
+        return hash_args(versions)
+
+    @staticmethod
+    def check_data_version(cache_path: Union[str, Path], data_version: Optional[str]) -> bool:
+        """check if the cache is generated from the data with `data_version`"""
+        try:
+            with Path(cache_path).with_suffix(".meta").open("rb") as f:
+                d = pickle.load(f)
+        except Exception:
+            return False
+        return d["info"].get("data_version") == data_version
+
 
 class ExpressionCache(BaseProviderCache):
     """Expression cache mechanism base class.
@@ -344,6 +522,14 @@ class ExpressionCache(BaseProviderCache):
         except NotImplementedError:
             return self.provider.expression(instrument, field, start_time, end_time, freq)
 
+    def expressions(self, instrument, fields, start_time=None, end_time=None, freq="day"):
+        """Get the data of several expressions.
+
+        .. note:: Each field is loaded by `expression` so that the cache is used; the compiled DAG of the provider
+            would skip it.
+        """
+        return {field: self.expression(instrument, field, start_time, end_time, freq) for field in fields}
+
     def _uri(self, instrument, field, start_time, end_time, freq):
         """Get expression cache file uri.
 
@@ -514,7 +700,16 @@ class DiskExpressionCache(ExpressionCache):
 
         _, _, start_index, end_index = Cal.locate_index(start_time, end_time, freq, future=False)
 
-        if self.check_cache_exists(cache_path, suffix_list=[".meta"]):
+        cache_exists = self.check_cache_exists(cache_path, suffix_list=[".meta"])
+        if cache_exists:
+            data_version = self.get_data_version([instrument], [field], freq)
+            if not self.check_data_version(cache_path, data_version):
+                # the data has been rewritten after generating the cache
+                self.logger.info(f"The expression cache {cache_path} is outdated. It will be regenerated")
+                cache_exists = False
+        if PROFILER.enabled:
+            PROFILER.count(self.provider.get_expression_instance(field), "disk_hits" if cache_exists else "disk_misses")
+        if cache_exists:
             """
             In most cases, we do not need reader_lock.
             Because updating data is a small probability event compare to reading data.
@@ -539,10 +734,12 @@ class DiskExpressionCache(ExpressionCache):
             field = remove_fields_space(field)
             # cache unavailable, generate the cache
             _instrument_dir.mkdir(parents=True, exist_ok=True)
-            if not isinstance(eval(parse_field(field)), Feature):
+            if not isinstance(self.provider.get_expression_instance(field), Feature):
                 # When the expression is not a raw feature
                 # generate expression cache if the feature is not a Feature
                 # instance
+                # NOTE: the version is got before calculating, so the cache is outdated if the data is changed meanwhile
+                data_version = self.get_data_version([instrument], [field], freq)
                 series = self.provider.expression(instrument, field, _calendar[0], _calendar[-1], freq)
                 if not series.empty:
                     # This expression is empty, we don't generate any cache for it.
@@ -554,6 +751,7 @@ class DiskExpressionCache(ExpressionCache):
                             field=field,
                             freq=freq,
                             last_update=str(_calendar[-1]),
+                            data_version=data_version,
                         )
                     return series.loc[start_index:end_index]
                 else:
@@ -562,12 +760,20 @@ class DiskExpressionCache(ExpressionCache):
                 # If the expression is a raw feature(such as $close, $open)
                 return self.provider.expression(instrument, field, start_time, end_time, freq)
 
-    def gen_expression_cache(self, expression_data, cache_path, instrument, field, freq, last_update):
+    def gen_expression_cache(
+        self, expression_data, cache_path, instrument, field, freq, last_update, data_version: Optional[str] = None
+    ):
         """use bin file to save like feature-data."""
         # Make sure the cache runs right when the directory is deleted
         # while running
         meta = {
-            "info": {"instrument": instrument, "field": field, "freq": freq, "last_update": last_update},
+            "info": {
+                "instrument": instrument,
+                "field": field,
+                "freq": freq,
+                "last_update": last_update,
+                "data_version": data_version,
+            },
             "meta": {"last_visit": time.time(), "visits": 1},
         }
         self.logger.debug(f"generating expression cache: {meta}")
@@ -638,11 +844,237 @@ class DiskExpressionCache(ExpressionCache):
                     f.write(data)
                 # update meta file
                 d["info"]["last_update"] = str(new_calendar[-1])
+                # the appended data is calculated from the latest data
+                d["info"]["data_version"] = self.get_data_version([instrument], [field], freq)
                 with meta_path.open("wb") as f:
                     pickle.dump(d, f, protocol=C.dump_protocol_version)
         return 0
 
 
+class _SubExpressionProfile:
+    """the statistics of a sub-expression calculated in the process"""
+
+    __slots__ = ("uses", "rows", "seconds", "instruments")
+
+    def __init__(self):
+        self.uses = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.instruments = set()
+
+
+class SubExpressionCache:
+    """Cost-based disk cache of the sub-expressions.
+
+    `DiskExpressionCache` caches every field no matter how cheap it is. This cache profiles the sub-expressions when
+    they are calculated by `Expression.load` or `qlib.data.compiler.ExpressionDAG` (the time spent on calculating them
+    with their sub-expressions, the rows calculated and how many times their data are used), and only caches the data
+    of the expensive and frequently used ones, e.g. `Corr($close, Log($volume+1), 10)` shared by several fields. The
+    cheap operators like `$close/Ref($close, 1)` are calculated as before.
+
+    - A sub-expression is admitted if its data are used `C.subexpression_cache_min_uses` times for each instrument on
+      average and it costs `C.subexpression_cache_min_cost` seconds per row at least.
+    - Only the sub-expressions which can be calculated in any range covering the range required (see
+      `qlib.data.compiler.is_compilable`) are cached, so the data in the cache are the same as calculating them again.
+    - The data of each instrument are cached in the range calculated, and the caches are evicted by their benefits
+      (the time of calculating them saved by the visits per byte) when their total size in the data directory of a
+      freq exceeds `C.subexpression_cache_size_limit` bytes.
+
+    The profiles are kept in the memory of each process.
+    """
+
+    def __init__(self):
+        self.logger = get_module_logger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        # (field, freq) -> _SubExpressionProfile
+        self._profiles = {}
+        # the cache directory -> the estimated total size of its caches
+        self._sizes = {}
+
+    @property
+    def enabled(self) -> bool:
+        return C.subexpression_cache_size_limit > 0
+
+    def is_candidate(self, expression: Expression, *args) -> bool:
+        """whether the data of the expression can be cached, `args` are the same as `Expression.load`"""
+        # the point-in-time data are loaded with other arguments than freq
+        if not self.enabled or len(args) != 1 or not isinstance(expression, ExpressionOps):
+            return False
+        return is_compilable(expression)
+
+    @staticmethod
+    def get_cache_dir(freq: str) -> Path:
+        return Path(C.dpm.get_data_uri(freq)).joinpath(C.subexpression_cache_dir_name)
+
+    def _cache_path(self, instrument: str, field: str, freq: str) -> Path:
+        instrument = instrument.lower()
+        return self.get_cache_dir(freq).joinpath(instrument, hash_args(instrument, field, freq))
+
+    def fetch(
+        self, expression: Expression, instrument, start_index, end_index, freq, exact: bool = True
+    ) -> Optional[IndexedArray]:
+        """the data of the expression in [start_index, end_index], None if they are not in the cache
+
+        The windows of the first (last) rows of the data are truncated by the range calculated. If `exact`, the data
+        are fetched only if they are the same as calculating the expression in the range, otherwise the data in any
+        range covering the range are fetched, e.g. for `qlib.data.compiler.ExpressionDAG`, whose fields don't depend on
+        the first (last) rows of their sub-expressions.
+        """
+        data = self._fetch(expression, instrument, start_index, end_index, freq, exact)
+        if PROFILER.enabled:
+            PROFILER.count(expression, "disk_misses" if data is None else "disk_hits")
+        return data
+
+    def _fetch(self, expression: Expression, instrument, start_index, end_index, freq, exact: bool):
+        field = str(expression)
+        cache_path = self._cache_path(instrument, field, freq)
+        if not cache_path.exists():
+            return None
+        try:
+            with cache_path.open("rb") as f:
+                d = pickle.load(f)
+        except Exception:
+            self.logger.warning(f"reading {cache_path} error: {traceback.format_exc()}")
+            return None
+        info = d["info"]
+        if info["start_index"] > start_index or info["end_index"] < end_index:
+            return None
+        if exact:
+            lft_etd, rght_etd = expression.get_extended_window_size()
+            if lft_etd > 0 and info["start_index"] != start_index:
+                return None
+            if rght_etd > 0 and info["end_index"] != end_index:
+                return None
+        if info["data_version"] != BaseProviderCache.get_data_version([instrument], [field], freq):
+            # the data has been rewritten after generating the cache
+            return None
+        CacheUtils.visit(cache_path)
+        return d["data"].slice(start_index, end_index)
+
+    def record(
+        self,
+        expression: Expression,
+        instrument,
+        start_index,
+        end_index,
+        freq,
+        data: Union[IndexedArray, pd.Series],
+        seconds: float,
+        uses: int = 1,
+    ):
+        """profile the expression calculated in [start_index, end_index], and cache its data if it is admitted
+
+        Parameters
+        ----------
+        data : Union[IndexedArray, pd.Series]
+            the data calculated.
+        seconds : float
+            the time spent on calculating the expression and its sub-expressions.
+        uses : int
+            how many times the data are used, e.g. the number of the consumers of the node in `ExpressionDAG`.
+        """
+        field = str(expression)
+        with self._lock:
+            profile = self._profiles.get((field, freq))
+            if profile is None:
+                profile = self._profiles[(field, freq)] = _SubExpressionProfile()
+            profile.uses += uses
+            profile.rows += len(data)
+            profile.seconds += seconds
+            profile.instruments.add(instrument)
+            admitted = self._is_admitted(profile)
+        if not admitted or len(data) == 0:
+            return
+        if isinstance(data, pd.Series):
+            try:
+                data = IndexedArray.from_series(data)
+            except IndexGapError:
+                return
+        try:
+            self._store(instrument, field, start_index, end_index, freq, data.slice(start_index, end_index), seconds)
+        except Exception:
+            self.logger.warning(f"caching {field} of {instrument} error: {traceback.format_exc()}")
+
+    @staticmethod
+    def _is_admitted(profile: _SubExpressionProfile) -> bool:
+        return (
+            profile.uses >= C.subexpression_cache_min_uses * len(profile.instruments)
+            and profile.seconds >= C.subexpression_cache_min_cost * profile.rows
+        )
+
+    def is_admitted(self, expression: Expression, freq: str) -> bool:
+        """whether the expression is admitted into the cache by its profile"""
+        profile = self._profiles.get((str(expression), freq))
+        return profile is not None and self._is_admitted(profile)
+
+    def _store(self, instrument, field, start_index, end_index, freq, data: IndexedArray, seconds: float):
+        cache_path = self._cache_path(instrument, field, freq)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        info = {
+            "instrument": instrument,
+            "field": field,
+            "freq": freq,
+            "start_index": start_index,
+            "end_index": end_index,
+            "seconds": seconds,
+            "data_version": BaseProviderCache.get_data_version([instrument], [field], freq),
+        }
+        old_size = cache_path.stat().st_size if cache_path.exists() else 0
+        # the files are replaced at once, so the readers never see the partial data
+        for path, d in [
+            (cache_path.with_suffix(".meta"), {"info": info, "meta": {"last_visit": time.time(), "visits": 0}}),
+            (cache_path, {"info": info, "data": data}),
+        ]:
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with tmp_path.open("wb") as f:
+                pickle.dump(d, f, protocol=C.dump_protocol_version)
+            os.replace(tmp_path, path)
+
+        cache_dir = self.get_cache_dir(freq)
+        with self._lock:
+            if cache_dir not in self._sizes:
+                self._sizes[cache_dir] = sum(size for _, size, _, _ in self._scan(cache_dir))
+            else:
+                self._sizes[cache_dir] += cache_path.stat().st_size - old_size
+            if self._sizes[cache_dir] > C.subexpression_cache_size_limit:
+                self._sizes[cache_dir] = self._evict(cache_dir, C.subexpression_cache_size_limit)
+
+    @staticmethod
+    def _scan(cache_dir: Path) -> list:
+        """the (path, size, benefit, last visit) of the caches in the directory"""
+        res = []
+        for meta_path in cache_dir.glob("*/*.meta"):
+            cache_path = meta_path.with_suffix("")
+            try:
+                size = cache_path.stat().st_size
+                with meta_path.open("rb") as f:
+                    d = pickle.load(f)
+            except Exception:
+                # the cache is being written or removed by other processes
+                continue
+            benefit = d["info"]["seconds"] * (d["meta"]["visits"] + 1) / max(size, 1)
+            res.append((cache_path, size, benefit, float(d["meta"]["last_visit"])))
+        return res
+
+    def _evict(self, cache_dir: Path, size_limit: int) -> int:
+        """remove the caches with the least benefits until their total size is within the limit, return the size"""
+        caches = sorted(self._scan(cache_dir), key=lambda c: (c[2], c[3]))
+        total_size = sum(size for _, size, _, _ in caches)
+        for cache_path, size, _, _ in caches:
+            if total_size <= size_limit:
+                break
+            self.logger.debug(f"evicting the sub-expression cache {cache_path}")
+            BaseProviderCache.clear_cache(cache_path)
+            total_size -= size
+        return total_size
+
+    def clear(self):
+        """clear the profiles"""
+        with self._lock:
+            self._profiles.clear()
+            self._sizes.clear()
+
+
 class DiskDatasetCache(DatasetCache):
     """Prepared cache mechanism for server."""
 
@@ -722,7 +1154,11 @@ class DiskDatasetCache(DatasetCache):
         gen_flag = False
 
         if self.check_cache_exists(cache_path):
-            if disk_cache == 1:
+            if not self.check_data_version(cache_path, self.get_data_version(instruments, fields, freq)):
+                # the data has been rewritten after generating the cache
+                self.logger.info(f"The dataset cache {cache_path} is outdated. It will be regenerated")
+                gen_flag = True
+            elif disk_cache == 1:
                 # use cache
                 with CacheUtils.reader_lock(self.r, f"{str(C.dpm.get_data_uri(freq))}:dataset-{_cache_uri}"):
                     CacheUtils.visit(cache_path)
@@ -773,7 +1209,9 @@ class DiskDatasetCache(DatasetCache):
         )
         cache_path = self.get_cache_dir(freq).joinpath(_cache_uri)
 
-        if self.check_cache_exists(cache_path):
+        if self.check_cache_exists(cache_path) and self.check_data_version(
+            cache_path, self.get_data_version(instruments, fields, freq)
+        ):
             self.logger.debug(f"The cache dataset has already existed {cache_path}. Return the uri directly")
             with CacheUtils.reader_lock(self.r, f"{str(C.dpm.get_data_uri(freq))}:dataset-{_cache_uri}"):
                 CacheUtils.visit(cache_path)
@@ -902,6 +1340,7 @@ class DiskDatasetCache(DatasetCache):
         # while running
         self.clear_cache(cache_path)
 
+        data_version = self.get_data_version(instruments, fields, freq)
         features = self.provider.dataset(
             instruments, fields, _calendar[0], _calendar[-1], freq, inst_processors=inst_processors
         )
@@ -930,6 +1369,7 @@ class DiskDatasetCache(DatasetCache):
                 "freq": freq,
                 "last_update": str(_calendar[-1]),  # The last_update to store the cache
                 "inst_processors": inst_processors,  # The last_update to store the cache
+                "data_version": data_version,
             },
             "meta": {"last_visit": time.time(), "visits": 1},
         }
@@ -1055,6 +1495,8 @@ class DiskDatasetCache(DatasetCache):
 
                 # update meta file
                 d["info"]["last_update"] = str(new_calendar[-1])
+                # the appended data is calculated from the latest data
+                d["info"]["data_version"] = self.get_data_version(instruments, fields, freq)
                 with meta_path.open("wb") as f:
                     pickle.dump(d, f, protocol=C.dump_protocol_version)
                 return 0
@@ -1196,3 +1638,5 @@ class MemoryCalendarCache(CalendarCache):
 
 
 H = MemCache()
+# the cost-based cache of the sub-expressions
+SE = SubExpressionCache()
@@ -0,0 +1,561 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Compile the expressions of several fields into one DAG of operators.
+
+The fields of a dataset share a lot of sub-expressions (e.g. `Mean($close, 20)` and `Ref($close, 1)` in Alpha158).
+`Expression.load` only reuses the results with exactly the same cache key (which contains the range extended by the
+root expression), so the shared sub-expressions are usually calculated once for each field. The `ExpressionDAG` keeps
+a single node for each sub-expression, calculates it once for each instrument in the union of the ranges required by
+its consumers, and frees its data as soon as all of its consumers have been calculated.
+"""
+
+import copy
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from . import ops
+from .base import Expression, ExpressionOps, Feature, IndexedArray, IndexGapError, cast_float, get_compute_dtype
+
+
+def is_window_op(expression) -> bool:
+    """whether the values of the expression only depend on the data in its window
+
+    Such an expression can be calculated in any range covering the range required, and it gets the same values as
+    being calculated in the required range. The expressions like `EMA` or `Mean($close, 0)` (expanding) depend on
+    the start of the range, the cross-sectional operators depend on the other instruments and the operators defined
+    out of `qlib.data.ops` are unknown, so they are not compiled.
+    """
+    if type(expression) is Feature:  # pylint: disable=C0123
+        return True
+    if not isinstance(expression, ExpressionOps) or type(expression).__module__ != ops.__name__:
+        return False
+    if isinstance(expression, (ops.EMA, ops.TResample, ops.CSOperator)):
+        return False
+    if isinstance(expression, (ops.Rolling, ops.PairRolling)):
+        return expression.N != 0 and not 0 < expression.N < 1
+    return True
+
+
+def is_compilable(expression) -> bool:
+    """whether the expression and all its sub-expressions are window operators"""
+    if not is_window_op(expression):
+        return False
+    return all(is_compilable(child) for child in vars(expression).values() if isinstance(child, Expression))
+
+
+def _child_instrument(expression, instrument: Optional[str]) -> Optional[str]:
+    # the operators like `ChangeInstrument` calculate the sub-expressions of another instrument
+    if isinstance(getattr(expression, "instrument", None), str):
+        return expression.instrument
+    return instrument
+
+
+class _Precomputed(Expression):
+    """The data of a calculated node, which takes the place of the node when calculating its consumers"""
+
+    def __init__(self, name: str, data: Union[pd.Series, IndexedArray]):
+        self.name = name
+        self.data = data
+
+    def __str__(self):
+        return self.name
+
+    def load(self, instrument, start_index, end_index, *args):
+        return self._load_internal(instrument, start_index, end_index, *args)
+
+    def _load_internal(self, instrument, start_index, end_index, *args):
+        # the node may be calculated in a larger range than the consumer
+        if isinstance(self.data, IndexedArray):
+            return self.data.slice(start_index, end_index).to_series()
+        series = self.data
+        if not series.empty and (series.index[0] < start_index or series.index[-1] > end_index):
+            series = series.loc[start_index:end_index]
+        return series
+
+    def load_array(self, instrument, start_index, end_index, *args):
+        if isinstance(self.data, IndexedArray):
+            return self.data.slice(start_index, end_index)
+        return IndexedArray.from_series(self._load_internal(instrument, start_index, end_index, *args))
+
+    def get_longest_back_rolling(self):
+        return 0
+
+    def get_extended_window_size(self):
+        return 0, 0
+
+
+def _substitute(expression: Expression, children: dict) -> Expression:
+    """copy the expression, and replace its sub-expressions with their data"""
+    expression = copy.copy(expression)
+    for name, data in children.items():
+        setattr(expression, name, _Precomputed(str(getattr(expression, name)), data))
+    return expression
+
+
+def innermost_cross_sections(expression: Expression) -> Dict[str, ops.CSOperator]:
+    """the cross-sectional operators in the expression whose sub-expressions have no cross-sectional operators"""
+    res = {}
+
+    def _visit(expression) -> bool:
+        # whether the expression contains cross-sectional operators
+        found = False
+        for child in vars(expression).values():
+            if isinstance(child, Expression):
+                found = _visit(child) or found
+        if isinstance(expression, ops.CSOperator):
+            if not found:
+                res[str(expression)] = expression
+            return True
+        return found
+
+    _visit(expression)
+    return res
+
+
+def contains_cross_sectional_data(expression: Expression) -> bool:
+    """whether the expression contains the data of the cross-sectional operators (see `CrossSectionalData`)"""
+    if isinstance(expression, CrossSectionalData):
+        return True
+    return any(
+        contains_cross_sectional_data(child) for child in vars(expression).values() if isinstance(child, Expression)
+    )
+
+
+def replace_expressions(expression: Expression, replacements: Dict[str, Expression]) -> Expression:
+    """copy the expression, and replace its sub-expressions with the expressions of the same keys `str(expression)`"""
+    key = str(expression)
+    if key in replacements:
+        return replacements[key]
+    children = {name: child for name, child in vars(expression).items() if isinstance(child, Expression)}
+    new_children = {name: replace_expressions(child, replacements) for name, child in children.items()}
+    if all(new_children[name] is child for name, child in children.items()):
+        return expression
+    expression = copy.copy(expression)
+    for name, child in new_children.items():
+        setattr(expression, name, child)
+    return expression
+
+
+class CrossSectionalData(Expression):
+    """The data of a cross-sectional operator calculated for all the instruments, which takes the place of the
+    operator in its consumers (see `DatasetProvider.cross_sectional_processor`)
+
+    Parameters
+    ----------
+    name : str
+        the name of the data, which must be unique for the instruments and the range calculated, because the data are
+        saved in the expression cache by it.
+    data : Dict[str, pd.Series]
+        the data of each instrument with the calendar index.
+    """
+
+    def __init__(self, name: str, data: Dict[str, pd.Series]):
+        self.name = name
+        self.data = data
+
+    def __str__(self):
+        return self.name
+
+    def _load_internal(self, instrument, start_index, end_index, *args):
+        series = self.data.get(instrument)
+        if series is None:
+            return pd.Series(dtype=np.float32)
+        return series.loc[start_index:end_index]
+
+    def get_longest_back_rolling(self):
+        return 0
+
+    def get_extended_window_size(self):
+        return 0, 0
+
+
+def _node_instruments(node, instruments: List[str]) -> List[str]:
+    return instruments if node.instrument is None else [node.instrument]
+
+
+def _union_spans(spans_list: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """the union of the spans, and whether the union of each instrument has gaps"""
+    starts = np.stack([spans[:, 0] for spans in spans_list])
+    ends = np.stack([spans[:, 1] for spans in spans_list])
+    empty = starts > ends
+    starts = np.where(empty, np.iinfo(np.int64).max, starts)
+    ends = np.where(empty, np.iinfo(np.int64).min, ends)
+    order = np.argsort(starts, axis=0)
+    starts, ends, empty = (np.take_along_axis(arr, order, axis=0) for arr in (starts, ends, empty))
+    covered = np.maximum.accumulate(ends, axis=0)
+    gapped = np.any((starts[1:] > covered[:-1] + 1) & ~empty[1:], axis=0)
+    spans = np.stack([starts[0], covered[-1]], axis=1)
+    # the empty spans are [start, start - 1]
+    spans[empty.all(axis=0)] = [0, -1]
+    return spans, gapped
+
+
+class PanelData:
+    """The panel of an expression for several instruments
+
+    Parameters
+    ----------
+    frame : pd.DataFrame
+        the values with the calendar index and the instrument columns, which are NaN out of the spans.
+    spans : np.ndarray
+        the [first, last] calendar index of each instrument (first > last if it is empty), which is the same as the
+        index of the pd.Series of the instrument.
+    gapped : np.ndarray
+        whether the index of the pd.Series of each instrument has gaps, which is not supported by the panel mode.
+    """
+
+    def __init__(self, frame: pd.DataFrame, spans: np.ndarray, gapped: np.ndarray):
+        self.frame = frame
+        self.spans = spans
+        self.gapped = gapped
+
+
+class _Node:
+    def __init__(
+        self, expression: Expression, instrument: Optional[str], start_index: int, end_index: int, compiled=True
+    ):
+        self.expression = expression
+        # whether the expression is compiled or loaded by `Expression.load` as a field
+        self.compiled = compiled
+        # the instrument changed by the operators like `ChangeInstrument`, None for the instrument calculated
+        self.instrument = instrument
+        self.start_index = start_index
+        self.end_index = end_index
+        self.children = []
+        self.n_consumers = 0
+
+
+class ExpressionDAG:
+    """The DAG of the expressions of several fields in the range [start_index, end_index] of the calendar.
+
+    - Each field is loaded in its range extended by `get_extended_window_size`, which is the same as
+      `LocalExpressionProvider.expression`.
+    - The sub-expressions are deduplicated by their normalized keys `(str(expression), instrument)`. Each node is
+      calculated in the union of the ranges of its consumers, and its consumers get the data sliced to their own
+      ranges, so the values are the same as calculating the fields one by one.
+    - The fields which are not compilable (see `is_compilable`) are loaded by `Expression.load` as before.
+
+    Parameters
+    ----------
+    expressions : List[Expression]
+        the expressions of the fields.
+    start_index : int
+        the start index of the calendar.
+    end_index : int
+        the end index of the calendar.
+    """
+
+    def __init__(self, expressions: List[Expression], start_index: int, end_index: int):
+        self.nodes: Dict[tuple, _Node] = {}
+        # the nodes in topological order, i.e. the children are before their consumers
+        self.order: List[tuple] = []
+        self.roots: List[tuple] = []
+        for expression in expressions:
+            lft_etd, rght_etd = expression.get_extended_window_size()
+            query_start, query_end = max(0, start_index - lft_etd), end_index + rght_etd
+            if is_compilable(expression):
+                key = self._add(expression, None)
+                node = self.nodes[key]
+                node.start_index = min(node.start_index, query_start)
+                node.end_index = max(node.end_index, query_end)
+            else:
+                # the expression is loaded in the range of the field
+                key = (str(expression), None, query_start, query_end)
+                if key not in self.nodes:
+                    self.nodes[key] = _Node(expression, None, query_start, query_end, compiled=False)
+                    self.order.append(key)
+            self.nodes[key].n_consumers += 1
+            self.roots.append(key)
+
+        # the consumers are before their children in the reversed order
+        for key in reversed(self.order):
+            node = self.nodes[key]
+            for child_key in node.children:
+                child = self.nodes[child_key]
+                child.start_index = min(child.start_index, node.start_index)
+                child.end_index = max(child.end_index, node.end_index)
+
+    def _add(self, expression: Expression, instrument: Optional[str]) -> tuple:
+        key = (str(expression), instrument)
+        if key in self.nodes:
+            return key
+        node = self.nodes[key] = _Node(expression, instrument, float("inf"), float("-inf"))
+        for child in vars(expression).values():
+            if isinstance(child, Expression):
+                child_key = self._add(child, _child_instrument(expression, instrument))
+                if child_key not in node.children:
+                    node.children.append(child_key)
+                    self.nodes[child_key].n_consumers += 1
+        self.order.append(key)
+        return key
+
+    def leaves(self) -> List[Tuple[Expression, int, int]]:
+        """the expressions loaded from the data by `Expression.load` for the instrument calculated and their ranges
+
+        The compiled nodes of features and the fields not compiled are included.
+        """
+        return [
+            (node.expression, node.start_index, node.end_index)
+            for node in map(self.nodes.get, self.order)
+            if node.instrument is None and not node.children
+        ]
+
+    def _evaluate(
+        self,
+        load: Callable[[_Node], Any],
+        calculate: Callable[[_Node, dict], Any],
+        fetch: Optional[Callable[[_Node], Any]] = None,
+        record: Optional[Callable[[_Node, Any, float], None]] = None,
+    ) -> list:
+        """calculate the nodes in topological order, and free their data after all their consumers are calculated
+
+        `fetch(node)` gets the data of the node from the cache or None, and the sub-expressions of the nodes fetched
+        are not calculated unless the other nodes use them. `record(node, data, self_seconds, seconds)` is called
+        after calculating the node with the time spent on calculating it, without and with its sub-expressions.
+        """
+        data = {}
+        # the consumers are before their children in the reversed order
+        required = set(self.roots)
+        for key in reversed(self.order):
+            node = self.nodes[key]
+            if key not in required:
+                continue
+            if fetch is not None and node.children:
+                cached = fetch(node)
+                if cached is not None:
+                    data[key] = cached
+                    continue
+            required.update(node.children)
+
+        seconds = {}
+        n_consumers = {key: node.n_consumers for key, node in self.nodes.items()}
+        for key in self.order:
+            if key in data or key not in required:
+                continue
+            node = self.nodes[key]
+            start = time.perf_counter()
+            if node.children:
+                child_instrument = _child_instrument(node.expression, node.instrument)
+                children = {
+                    name: data[(str(child), child_instrument)]
+                    for name, child in vars(node.expression).items()
+                    if isinstance(child, Expression)
+                }
+                data[key] = calculate(node, children)
+                for child_key in node.children:
+                    n_consumers[child_key] -= 1
+                    if n_consumers[child_key] == 0:
+                        data.pop(child_key, None)
+            else:
+                data[key] = load(node)
+            if record is not None:
+                elapsed = time.perf_counter() - start
+                seconds[key] = elapsed + sum(seconds.get(child, 0) for child in node.children)
+                if node.children:
+                    record(node, data[key], elapsed, seconds[key])
+
+        res = []
+        for key in self.roots:
+            res.append(data[key])
+            n_consumers[key] -= 1
+            if n_consumers[key] == 0:
+                del data[key]
+        return res
+
+    def evaluate(self, instrument: str, *args) -> List[pd.Series]:
+        """calculate the expressions of the instrument
+
+        The compiled nodes pass the numpy-native data to each other (see `ExpressionOps._load_array_internal`), and
+        only the data of the fields are converted to pd.Series. If the index of some data has gaps, which can't be
+        represented by `IndexedArray`, the instrument is calculated with pd.Series instead.
+
+        Returns
+        -------
+        List[pd.Series]
+            the data of the expressions in their extended ranges.
+        """
+        try:
+            return self._evaluate_arrays(instrument, *args)
+        except IndexGapError:
+            return self._evaluate_series(instrument, *args)
+
+    def _evaluate_arrays(self, instrument: str, *args) -> List[pd.Series]:
+        dtype = get_compute_dtype()
+
+        def _load(node):
+            series = node.expression.load(node.instrument or instrument, node.start_index, node.end_index, *args)
+            return IndexedArray.from_series(series) if node.compiled else series
+
+        def _calculate(node, children):
+            expression = _substitute(node.expression, children)
+            data = expression._load_array_internal(
+                node.instrument or instrument, node.start_index, node.end_index, *args
+            )
+            return cast_float(data, dtype)
+
+        res = self._evaluate(_load, _calculate, *self._hooks(instrument, *args))
+        return [data.to_series() if isinstance(data, IndexedArray) else data for data in res]
+
+    def _evaluate_series(self, instrument: str, *args) -> List[pd.Series]:
+        dtype = get_compute_dtype()
+
+        def _load(node):
+            return node.expression.load(node.instrument or instrument, node.start_index, node.end_index, *args)
+
+        def _calculate(node, children):
+            expression = _substitute(node.expression, children)
+            data = expression._load_internal(node.instrument or instrument, node.start_index, node.end_index, *args)
+            return cast_float(data, dtype)
+
+        # the data in the sub-expression cache are `IndexedArray`
+        res = self._evaluate(_load, _calculate, *self._hooks(instrument, *args))
+        return [data.to_series() if isinstance(data, IndexedArray) else data for data in res]
+
+    @staticmethod
+    def _hooks(instrument: str, *args) -> Tuple[Optional[Callable], Optional[Callable]]:
+        """the `fetch` and `record` of `_evaluate` for `qlib.data.cache.SubExpressionCache` and
+        `qlib.data.profiler.ExpressionProfiler`"""
+        from .cache import SE  # pylint: disable=C0415
+        from .profiler import PROFILER  # pylint: disable=C0415
+
+        caching, profiling = SE.enabled, PROFILER.enabled
+        if not caching and not profiling:
+            return None, None
+
+        def _fetch(node):
+            if not caching or not SE.is_candidate(node.expression, *args):
+                return None
+            return SE.fetch(
+                node.expression, node.instrument or instrument, node.start_index, node.end_index, *args, exact=False
+            )
+
+        def _record(node, data, self_seconds, seconds):
+            if profiling:
+                PROFILER.record(node.expression, seconds, self_seconds, len(data))
+            if caching and SE.is_candidate(node.expression, *args):
+                SE.record(
+                    node.expression,
+                    node.instrument or instrument,
+                    node.start_index,
+                    node.end_index,
+                    *args,
+                    data,
+                    seconds,
+                    uses=node.n_consumers,
+                )
+
+        return (_fetch if caching else None), _record
+
+    def evaluate_panel(self, instruments: List[str], load_panel: Callable, *args) -> List[PanelData]:
+        """calculate the expressions of all the instruments at once
+
+        The sub-expressions are calculated as pd.DataFrame (see `ExpressionOps._load_panel_internal`), so the
+        operators run once for all the instruments instead of once for each instrument. The values are the same as
+        `evaluate` for each instrument:
+
+        - the data out of the spans of the instruments are NaN, like the missing index of pd.Series;
+        - the first (last) rows of the spans of the rolling operators are calculated again in the spans only,
+          because the windows of them should not contain the data out of the spans;
+        - the instruments with gaps in their spans are marked in `PanelData.gapped`, whose data are not correct.
+
+        Parameters
+        ----------
+        instruments : List[str]
+            the instruments calculated.
+        load_panel : Callable
+            `load_panel(expression, instruments, start_index, end_index, *args) -> (values, spans)` loads the leaf
+            expressions (e.g. `Feature`), the values are np.ndarray with shape (end_index - start_index + 1,
+            len(instruments)) and the spans are np.ndarray with shape (len(instruments), 2).
+
+        Returns
+        -------
+        List[PanelData]
+            the panels of the expressions in their extended ranges.
+        """
+        if not all(self.nodes[key].compiled for key in self.roots):
+            raise ValueError("the expressions can't be calculated in the panel mode, see `is_compilable`")
+
+        dtype = get_compute_dtype()
+
+        def _load(node):
+            columns = _node_instruments(node, instruments)
+            values, spans = load_panel(node.expression, columns, node.start_index, node.end_index, *args)
+            values = cast_float(values, dtype)
+            frame = pd.DataFrame(values, index=pd.RangeIndex(node.start_index, node.end_index + 1), columns=columns)
+            return PanelData(frame, spans, np.zeros(len(columns), dtype=bool))
+
+        def _calculate(node, children):
+            columns = _node_instruments(node, instruments)
+            expression = _substitute(node.expression, {name: child.frame for name, child in children.items()})
+            frame = expression._load_panel_internal(columns, node.start_index, node.end_index, *args)
+            if _child_instrument(node.expression, None) is not None:
+                # the operators like `ChangeInstrument` share the data of another instrument with all the instruments
+                (child,) = children.values()
+                spans, gapped = np.repeat(child.spans, len(columns), axis=0), np.repeat(child.gapped, len(columns))
+            elif isinstance(node.expression, ops.If) and "condition" in children:
+                # the index of `If` is the index of the condition
+                spans, gapped = children["condition"].spans.copy(), children["condition"].gapped
+            else:
+                # the pd.Series are aligned to the union of their index
+                spans, gapped = _union_spans([child.spans for child in children.values()])
+                gapped |= np.any([child.gapped for child in children.values()], axis=0)
+            spans[:, 0] = np.maximum(spans[:, 0], node.start_index)
+            spans[:, 1] = np.minimum(spans[:, 1], node.end_index)
+            values = cast_float(frame.to_numpy(copy=True), dtype)
+            values = self._repair_edges(node, children, columns, values, spans, *args)
+            if values.dtype.kind in "fcO":
+                rows = np.arange(node.start_index, node.end_index + 1)[:, None]
+                values[(rows < spans[:, 0]) | (rows > spans[:, 1])] = np.nan
+            return PanelData(pd.DataFrame(values, index=frame.index, columns=frame.columns), spans, gapped)
+
+        return self._evaluate(_load, _calculate)
+
+    @staticmethod
+    def _repair_edges(
+        node: _Node, children: dict, columns: list, values: np.ndarray, spans: np.ndarray, *args
+    ) -> np.ndarray:
+        """calculate the first (last) rows of the spans of the rolling operators again in the spans"""
+        lft_etd, rght_etd = node.expression.get_extended_window_size()
+        child_etd = [getattr(node.expression, name).get_extended_window_size() for name in children]
+        head = lft_etd - max(etd[0] for etd in child_etd)
+        tail = rght_etd - max(etd[1] for etd in child_etd)
+        not_empty = spans[:, 0] <= spans[:, 1]
+        edges = []
+        if head > 0:
+            # the rows [first, first + head) are calculated by the data [first, first + head + tail)
+            cols = np.nonzero(not_empty & (spans[:, 0] > node.start_index))[0]
+            first, last = spans[cols, 0], spans[cols, 1]
+            seg_end, out_end = np.minimum(last, first + head - 1 + tail), np.minimum(last, first + head - 1)
+            edges.append((cols, first, seg_end, first, out_end))
+        if tail > 0:
+            # the rows (last - tail, last] are calculated by the data (last - tail - head, last]
+            cols = np.nonzero(not_empty & (spans[:, 1] < node.end_index))[0]
+            first, last = spans[cols, 0], spans[cols, 1]
+            seg_start, out_start = np.maximum(first, last - tail - head + 1), np.maximum(first, last - tail + 1)
+            edges.append((cols, seg_start, last, out_start, last))
+
+        for cols, seg_start, seg_end, out_start, out_end in edges:
+            if len(cols) == 0:
+                continue
+            # the segments of the instruments are aligned to the first row
+            rows = seg_start + np.arange((seg_end - seg_start).max() + 1)[:, None]
+            in_seg = rows <= seg_end
+            col_idx = np.broadcast_to(cols, rows.shape)
+            segments = {}
+            for name, child in children.items():
+                child_values = child.frame.to_numpy()
+                dtype = child_values.dtype if child_values.dtype.kind == "f" else np.float32
+                segment = np.full(rows.shape, np.nan, dtype=dtype)
+                segment[in_seg] = child_values[rows[in_seg] - child.frame.index[0], col_idx[in_seg]]
+                segments[name] = pd.DataFrame(segment, columns=[columns[i] for i in cols])
+            expression = _substitute(node.expression, segments)
+            res = expression._load_panel_internal(list(segments[name].columns), 0, len(rows) - 1, *args).to_numpy()
+            out = (rows >= out_start) & (rows <= out_end)
+            if values.dtype.kind not in "fcO":
+                values = values.astype(np.result_type(values.dtype, res.dtype))
+            values[rows[out] - node.start_index, col_idx[out]] = res[out]
+        return values
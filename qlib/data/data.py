@@ -9,10 +9,14 @@ import re
 import abc
 import copy
 import queue
-import bisect
+import pickle
+import threading
+import multiprocessing
 import numpy as np
 import pandas as pd
-from typing import List, Union, Optional
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Tuple, Union, Optional
+from concurrent.futures import ThreadPoolExecutor
 
 # For supporting multiprocessing in outer code, joblib is used
 from joblib import delayed
@@ -22,7 +26,19 @@ from ..config import C
 from .inst_processor import InstProcessor
 
 from ..log import get_module_logger
-from .cache import DiskDatasetCache
+from .cache import DiskDatasetCache, MemCacheLengthUnit
+from .base import Expression, Feature, PFeature, cast_float, get_compute_dtype, get_dataset_dtype
+from .compiler import (
+    CrossSectionalData,
+    ExpressionDAG,
+    _substitute,
+    contains_cross_sectional_data,
+    innermost_cross_sections,
+    is_compilable,
+    replace_expressions,
+)
+from .incremental import IncrementalEvaluator
+from .profiler import PROFILER, profiled_call
 from ..utils import (
     Wrapper,
     init_instance_by_config,
@@ -31,14 +47,17 @@ from ..utils import (
     parse_field,
     hash_args,
     normalize_cache_fields,
+    remove_fields_space,
     code_to_fname,
     time_to_slc_point,
-    read_period_data,
     get_period_list,
 )
-from ..utils.paral import ParallelExt
+from ..utils.paral import ParallelExt, read_ahead
 from .ops import Operators  # pylint: disable=W0611  # noqa: F401
 
+if TYPE_CHECKING:
+    from .pit import PITRevisions
+
 
 class ProviderBackendMixin:
     """
@@ -87,7 +106,7 @@ class CalendarProvider(abc.ABC):
         list
             calendar list
         """
-        _calendar, _calendar_index = self._get_calendar(freq, future)
+        _calendar, _ = self._get_calendar(freq, future)
         if start_time == "None":
             start_time = None
         if end_time == "None":
@@ -137,18 +156,19 @@ class CalendarProvider(abc.ABC):
         """
         start_time = pd.Timestamp(start_time)
         end_time = pd.Timestamp(end_time)
-        calendar, calendar_index = self._get_calendar(freq=freq, future=future)
-        if start_time not in calendar_index:
-            try:
-                start_time = calendar[bisect.bisect_left(calendar, start_time)]
-            except IndexError as index_e:
-                raise IndexError(
-                    "`start_time` uses a future date, if you want to get future trading days, you can use: `future=True`"
-                ) from index_e
-        start_index = calendar_index[start_time]
-        if end_time not in calendar_index:
-            end_time = calendar[bisect.bisect_right(calendar, end_time) - 1]
-        end_index = calendar_index[end_time]
+        calendar = self._get_datetime_index(freq=freq, future=future)
+        calendar_ns = calendar.asi8
+        start_index = int(np.searchsorted(calendar_ns, start_time.value, side="left"))
+        if start_index >= len(calendar):
+            raise IndexError(
+                "`start_time` uses a future date, if you want to get future trading days, you can use: `future=True`"
+            )
+        start_time = calendar[start_index]
+        end_index = int(np.searchsorted(calendar_ns, end_time.value, side="right")) - 1
+        if end_index < 0:
+            # `end_time` is earlier than the calendar; keep the behavior of indexing the calendar by -1
+            end_index += len(calendar)
+        end_time = calendar[end_index]
         return start_time, end_time, start_index, end_index
 
     def _get_calendar(self, freq, future):
@@ -163,17 +183,29 @@ class CalendarProvider(abc.ABC):
 
         Returns
         -------
-        list
-            list of timestamps.
-        dict
-            dict composed by timestamp as key and index as value for fast search.
+        np.ndarray
+            array of timestamps.
+        pd.DatetimeIndex
+            the calendar for fast search by `np.searchsorted`.
         """
         flag = f"{freq}_future_{future}"
-        if flag not in H["c"]:
-            _calendar = np.array(self.load_calendar(freq, future))
-            _calendar_index = {x: i for i, x in enumerate(_calendar)}  # for fast search
-            H["c"][flag] = _calendar, _calendar_index
-        return H["c"][flag]
+        _calendar = H["c"].get(flag)
+        if _calendar is None:
+            _calendar_index = self._get_datetime_index(freq, future)
+            _calendar = H["c"][flag] = _calendar_index.astype(object).values, _calendar_index
+        return _calendar
+
+    def _get_datetime_index(self, freq, future) -> pd.DatetimeIndex:
+        """Load calendar as `pd.DatetimeIndex` using memcache.
+
+        Creating the timestamps of a long calendar (e.g. 1min) is expensive, so `locate_index` searches the int64
+        values of the index instead and the array of timestamps is only created by `calendar`.
+        """
+        flag = f"{freq}_future_{future}_datetime_index"
+        _calendar_index = H["c"].get(flag)
+        if _calendar_index is None:
+            _calendar_index = H["c"][flag] = self.load_datetime_index(freq, future)
+        return _calendar_index
 
     def _uri(self, start_time, end_time, freq, future=False):
         """Get the uri of calendar generation task."""
@@ -195,6 +227,13 @@ class CalendarProvider(abc.ABC):
         """
         raise NotImplementedError("Subclass of CalendarProvider must implement `load_calendar` method")
 
+    def load_datetime_index(self, freq, future) -> pd.DatetimeIndex:
+        """Load original calendar as `pd.DatetimeIndex`.
+
+        Subclasses can override it to load the calendar without creating the timestamps one by one.
+        """
+        return pd.DatetimeIndex(self.load_calendar(freq, future))
+
 
 class InstrumentProvider(abc.ABC):
     """Instrument provider base class
@@ -334,6 +373,50 @@ class FeatureProvider(abc.ABC):
         """
         raise NotImplementedError("Subclass of FeatureProvider must implement `feature` method")
 
+    def features_many(self, instrument, fields, start_index, end_index, freq) -> Dict[str, pd.Series]:
+        """Get the data of multiple features of an instrument in one batch.
+
+        Parameters
+        ----------
+        instrument : str
+            a certain instrument.
+        fields : List[str]
+            the fields of features.
+        start_index : int
+            start of the calendar index range.
+        end_index : int
+            end of the calendar index range.
+        freq : str
+            time frequency, available: year/quarter/month/week/day.
+
+        Returns
+        -------
+        Dict[str, pd.Series]
+            field -> data of the feature, which is the same as the result of `feature`
+        """
+        return {field: self.feature(instrument, field, start_index, end_index, freq) for field in fields}
+
+    def feature_version(self, instrument, field, freq) -> Optional[int]:
+        """Get the version of a feature, which is changed whenever the data of the feature is rewritten.
+
+        It is used by the disk caches to invalidate the caches depending on the changed features.
+
+        Parameters
+        ----------
+        instrument : str
+            a certain instrument.
+        field : str
+            a certain field of feature.
+        freq : str
+            time frequency, available: year/quarter/month/week/day.
+
+        Returns
+        -------
+        Optional[int]
+            the version of the feature; None if it is unknown (default).
+        """
+        return None
+
 
 class PITProvider(abc.ABC):
     @abc.abstractmethod
@@ -379,6 +462,82 @@ class PITProvider(abc.ABC):
         """
         raise NotImplementedError(f"Please implement the `period_feature` method")
 
+    def period_revisions(self, instrument, field) -> "PITRevisions":
+        """
+        get the revision history of the field as an as-of table, so the values observed at all the dates are looked
+        up at once instead of calling `period_feature` for each date (see `qlib.data.pit.P`)
+
+        Raises
+        ------
+        FileNotFoundError
+            This exception will be raised if the queried data do not exist.
+        NotImplementedError
+            The provider doesn't support the revision histories, `period_feature` is used for each date instead.
+        """
+        raise NotImplementedError(f"Please implement the `period_revisions` method")
+
+
+class PanelProvider(abc.ABC):
+    """Panel provider class
+
+    Provide the cross-sectional panel (calendar x instrument) of raw features, so that the raw features of many
+    instruments can be loaded at once instead of instrument by instrument.
+    """
+
+    @abc.abstractmethod
+    def support(self, fields, freq="day", end_index=None) -> bool:
+        """Whether all the fields can be loaded from the panels
+
+        Parameters
+        ----------
+        fields : list
+            list of column names, only the raw features (e.g. "$close") can be loaded from the panels.
+        freq : str
+            time frequency.
+        end_index : int
+            the calendar index of the last queried row; the panels must cover it.
+        """
+        raise NotImplementedError("Subclass of PanelProvider must implement `support` method")
+
+    @abc.abstractmethod
+    def panel(self, instruments_d, fields, start_time, end_time, freq="day"):
+        """Get the raw features of the instruments from the panels.
+
+        Parameters
+        ----------
+        instruments_d : list or dict
+            list of instruments or dict of instruments and their time spans.
+        fields : list
+            list of column names of raw features.
+        start_time : str
+            start of the time range.
+        end_time : str
+            end of the time range.
+        freq : str
+            time frequency.
+
+        Returns
+        ----------
+        pd.DataFrame
+            a pandas dataframe with <instrument, datetime> index, which is the same as the result of
+            `DatasetProvider.dataset_processor`.
+        """
+        raise NotImplementedError("Subclass of PanelProvider must implement `panel` method")
+
+    def feature_panel(self, instruments, field, start_index, end_index, freq="day") -> Tuple[np.ndarray, np.ndarray]:
+        """Get a raw feature of the instruments from the panel in the range [start_index, end_index] of the calendar.
+
+        It is used to load the features in the panel mode of `qlib.data.compiler.ExpressionDAG`.
+
+        Returns
+        ----------
+        Tuple[np.ndarray, np.ndarray]
+            the values with shape (end_index - start_index + 1, len(instruments)), which are NaN if the instrument
+            does not exist; the [first, last] calendar index of each instrument in the range with shape
+            (len(instruments), 2), first > last if the instrument does not exist.
+        """
+        raise NotImplementedError("Subclass of PanelProvider must implement `feature_panel` method")
+
 
 class ExpressionProvider(abc.ABC):
     """Expression provider class
@@ -387,15 +546,29 @@ class ExpressionProvider(abc.ABC):
     """
 
     def __init__(self):
-        self.expression_instance_cache = {}
+        # the parsed expressions keyed by the fields without spaces, the least recently used ones are evicted
+        self.expression_instance_cache = MemCacheLengthUnit(size_limit=C.get("expression_instance_cache_size", 0))
+        # the keys of the loaded expressions holding the data of the cross-sectional operators
+        self._data_instance_keys = set()
 
     def get_expression_instance(self, field):
+        """Get the expression of the field, the fields are parsed only once.
+
+        Parameters
+        ----------
+        field : Union[str, Expression]
+            a field of feature. The `Expression` object is saved in the cache as the expression of `str(field)`.
+        """
+        if isinstance(field, Expression):
+            self.expression_instance_cache[remove_fields_space(str(field))] = field
+            return field
+        key = remove_fields_space(field)
         try:
-            if field in self.expression_instance_cache:
-                expression = self.expression_instance_cache[field]
+            if key in self.expression_instance_cache:
+                expression = self.expression_instance_cache[key]
             else:
                 expression = eval(parse_field(field))
-                self.expression_instance_cache[field] = expression
+                self.expression_instance_cache[key] = expression
         except NameError as e:
             get_module_logger("data").exception(
                 "ERROR: field [%s] contains invalid operator/variable [%s]" % (str(field), str(e).split()[1])
@@ -406,6 +579,43 @@ class ExpressionProvider(abc.ABC):
             raise
         return expression
 
+    def dump_expression_instances(self, fields) -> bytes:
+        """Parse the fields and pickle their expressions, which are loaded by `load_expression_instances` in the
+        other processes instead of parsing the fields again."""
+        expressions = {remove_fields_space(field): self.get_expression_instance(field) for field in fields}
+        return pickle.dumps(expressions, protocol=C.dump_protocol_version)
+
+    def load_expression_instances(self, data: bytes, fields=None):
+        """Save the expressions dumped by `dump_expression_instances` in the cache.
+
+        Parameters
+        ----------
+        data : bytes
+            the result of `dump_expression_instances`.
+        fields : list
+            the fields in `data`, nothing is loaded if all of them are in the cache already.
+        """
+        if fields is not None and all(remove_fields_space(field) in self.expression_instance_cache for field in fields):
+            return
+        try:
+            expressions = pickle.loads(data)
+        except Exception as e:
+            # e.g. the custom operators are not importable before `C.register`, the fields will be parsed
+            get_module_logger("data").debug(f"Loading expressions error: {str(e)}")
+            return
+        # the expressions holding the panels of the cross-sectional operators are only kept for the latest query
+        data_keys = {key for key, expression in expressions.items() if contains_cross_sectional_data(expression)}
+        self.drop_expression_instances(self._data_instance_keys - data_keys)
+        self._data_instance_keys = data_keys
+        for key, expression in expressions.items():
+            self.expression_instance_cache[key] = expression
+
+    def drop_expression_instances(self, fields):
+        """Remove the expressions of the fields from the cache, e.g. the ones which hold large data."""
+        for key in map(remove_fields_space, fields):
+            if key in self.expression_instance_cache:
+                self.expression_instance_cache.pop(key)
+
     @abc.abstractmethod
     def expression(self, instrument, field, start_time=None, end_time=None, freq="day") -> pd.Series:
         """Get Expression data.
@@ -442,6 +652,39 @@ class ExpressionProvider(abc.ABC):
         """
         raise NotImplementedError("Subclass of ExpressionProvider must implement `Expression` method")
 
+    def expressions(self, instrument, fields, start_time=None, end_time=None, freq="day") -> Dict[str, pd.Series]:
+        """Get the data of several expressions of an instrument.
+
+        The providers can calculate the expressions together (e.g. share the sub-expressions of the fields).
+        It calls `expression` for each field by default.
+
+        Returns
+        -------
+        Dict[str, pd.Series]
+            {field: data of the field}
+        """
+        return {field: self.expression(instrument, field, start_time, end_time, freq) for field in fields}
+
+    def prefetch(self, instrument, fields, start_time=None, end_time=None, freq="day"):
+        """Prefetch the data which will be used by the expressions of an instrument.
+
+        It is called before calculating the expressions of an instrument (e.g. in `DatasetProvider.inst_calculator`),
+        the providers can load the data in batches instead of one by one. It does nothing by default.
+        """
+
+    def load_leaf_features(self, instrument, fields, start_time=None, end_time=None, freq="day") -> dict:
+        """Load the leaf features which will be used by the expressions of an instrument.
+
+        It is used by the I/O prefetch threads of `DatasetProvider.dataset_processor`, the loaded features are passed
+        to `DatasetProvider.inst_calculator` and saved in the expression cache `H["f"]`.
+
+        Returns
+        -------
+        dict
+            {the cache key of `Expression.load`: the feature}; empty by default.
+        """
+        return {}
+
 
 class DatasetProvider(abc.ABC):
     """Dataset provider class
@@ -552,31 +795,76 @@ class DatasetProvider(abc.ABC):
 
         """
         normalize_column_names = normalize_cache_fields(column_names)
+        if any(innermost_cross_sections(ExpressionD.get_expression_instance(f)) for f in normalize_column_names):
+            return DatasetProvider.cross_sectional_processor(
+                instruments_d, column_names, start_time, end_time, freq, inst_processors
+            )
         # One process for one task, so that the memory will be freed quicker.
         workers = max(min(C.get_kernels(freq), len(instruments_d)), 1)
 
         # create iterator
         if isinstance(instruments_d, dict):
-            it = instruments_d.items()
+            it = list(instruments_d.items())
         else:
-            it = zip(instruments_d, [None] * len(instruments_d))
-
-        inst_l = []
-        task_l = []
-        for inst, spans in it:
-            inst_l.append(inst)
-            task_l.append(
-                delayed(DatasetProvider.inst_calculator)(
-                    inst, start_time, end_time, freq, normalize_column_names, spans, C, inst_processors
-                )
-            )
-
-        data = dict(
-            zip(
-                inst_l,
-                ParallelExt(n_jobs=workers, backend=C.joblib_backend, maxtasksperchild=C.maxtasksperchild)(task_l),
+            it = list(zip(instruments_d, [None] * len(instruments_d)))
+        inst_l = [inst for inst, _ in it]
+
+        # The fields are parsed before the processes are created, so the forked processes inherit the expressions.
+        # The other processes (e.g. spawned or managed by loky) load the pickled expressions instead of parsing.
+        shared = workers == 1 or C.joblib_backend == "threading"
+        forked = C.joblib_backend == "multiprocessing" and multiprocessing.get_start_method() == "fork"
+        if shared or forked:
+            expressions = None
+            for field in normalize_column_names:
+                ExpressionD.get_expression_instance(field)
+        else:
+            expressions = ExpressionD.dump_expression_instances(normalize_column_names)
+
+        # the profiles recorded by the workers are returned with the data, and merged into the main process
+        profiling = PROFILER.enabled
+
+        def _task(inst, spans, leaf_features=None):
+            args = (
+                inst,
+                start_time,
+                end_time,
+                freq,
+                normalize_column_names,
+                spans,
+                C,
+                inst_processors,
+                leaf_features,
+                expressions,
             )
-        )
+            if profiling:
+                return delayed(profiled_call)(DatasetProvider.inst_calculator, *args)
+            return delayed(DatasetProvider.inst_calculator)(*args)
+
+        parallel = ParallelExt(n_jobs=workers, backend=C.joblib_backend, maxtasksperchild=C.maxtasksperchild)
+        io_workers = C.get("io_prefetch_workers", 0)
+        if io_workers > 0 and len(it) > 1:
+            # The leaf features of the upcoming instruments are read by the threads while the instruments before them
+            # are calculated. The large arrays are passed to the processes by the memmapping of joblib.
+            def _read(inst, spans):
+                try:
+                    leaf_features = ExpressionD.load_leaf_features(
+                        inst, normalize_column_names, start_time, end_time, freq
+                    )
+                except Exception as e:
+                    get_module_logger("data").debug(f"Reading features error: instrument={inst}. error info: {str(e)}")
+                    leaf_features = None
+                return _task(inst, spans, leaf_features)
+
+            with ThreadPoolExecutor(max_workers=io_workers) as executor:
+                # the instruments are read ahead of the processes by at most `2 * (io_workers + workers)` tasks
+                res = parallel(read_ahead(executor, _read, it, 2 * (io_workers + workers)))
+        else:
+            res = parallel(_task(inst, spans) for inst, spans in it)
+        if profiling:
+            for _, profiles in res:
+                PROFILER.merge(profiles)
+            res = [df for df, _ in res]
+        data = dict(zip(inst_l, res))
 
         new_data = dict()
         for inst in sorted(data.keys()):
@@ -591,16 +879,198 @@ class DatasetProvider(abc.ABC):
             data = pd.DataFrame(
                 index=pd.MultiIndex.from_arrays([[], []], names=("instrument", "datetime")),
                 columns=column_names,
-                dtype=np.float32,
+                dtype=get_dataset_dtype(),
             )
 
         return data
 
     @staticmethod
-    def inst_calculator(inst, start_time, end_time, freq, column_names, spans=None, g_config=None, inst_processors=[]):
+    def cross_sectional_processor(instruments_d, column_names, start_time, end_time, freq, inst_processors=[]):
+        """
+        Calculate the fields with the cross-sectional operators (see `qlib.data.ops.CSOperator`), return the same
+        data set as `dataset_processor`.
+
+        The innermost cross-sectional operators are calculated first: their features are calculated instrument by
+        instrument by `dataset_processor` in the ranges required by the fields, and then the cross sections of all the
+        bars are calculated at once with the panels of the features. The operators are replaced with their data
+        (see `CrossSectionalData`) in the fields, which are calculated again until there are no cross-sectional
+        operators.
+        """
+        fields = remove_fields_space(column_names)
+        expressions = {field: ExpressionD.get_expression_instance(field) for field in dict.fromkeys(fields)}
+        _, _, start_index, end_index = Cal.locate_index(start_time, end_time, freq=freq, future=False)
+        calendar = Cal.calendar(freq=freq)
+
+        # the operators are calculated in the union of the ranges required by the fields
+        operators, start, end = {}, start_index, end_index
+        for expression in expressions.values():
+            lft_etd, rght_etd = expression.get_extended_window_size()
+            for key, operator in innermost_cross_sections(expression).items():
+                op_lft_etd, op_rght_etd = operator.get_extended_window_size()
+                start = min(start, max(0, start_index - int(lft_etd - op_lft_etd)))
+                end = max(end, min(len(calendar) - 1, end_index + int(rght_etd - op_rght_etd)))
+                operators[key] = operator
+        features = {}
+        for operator in operators.values():
+            for child in vars(operator).values():
+                # the features may contain the data of the operators calculated before, which can't be parsed
+                if isinstance(child, Expression):
+                    features[remove_fields_space(str(child))] = ExpressionD.get_expression_instance(child)
+        # the expressions holding the data are only kept in the cache of the expressions during the query, or the
+        # panels of all the queries would be kept alive by the cache
+        data_keys = [key for key, feature in features.items() if contains_cross_sectional_data(feature)]
+        try:
+            data = DatasetProvider.dataset_processor(
+                instruments_d, list(features), calendar[start], calendar[end], freq
+            )
+
+            inst_l = sorted(set(instruments_d))
+            datetime_index = pd.DatetimeIndex(calendar[start : end + 1])
+            index = pd.RangeIndex(start, end + 1)
+            # the instruments in their spans
+            exists = pd.Series(True, index=data.index).unstack("instrument") if len(data) > 0 else pd.DataFrame()
+            exists = exists.reindex(index=datetime_index, columns=inst_l).notna().set_axis(index)
+            panels = {
+                feature: data[feature]
+                .unstack("instrument")
+                .reindex(index=datetime_index, columns=inst_l)
+                .set_axis(index)
+                for feature in features
+            }
+            replacements = {}
+            for key, operator in operators.items():
+                children = {
+                    name: panels[remove_fields_space(str(child))]
+                    for name, child in vars(operator).items()
+                    if isinstance(child, Expression)
+                }
+                frame = _substitute(operator, children)._load_panel_internal(inst_l, start, end, freq)
+                frame = frame.astype(get_dataset_dtype())
+                name = f"{key}@{hash_args(key, instruments_d, start, end, freq)}"
+                replacements[key] = CrossSectionalData(name, {inst: frame[inst][exists[inst]] for inst in inst_l})
+
+            new_fields = {}
+            for field, expression in expressions.items():
+                new_expression = ExpressionD.get_expression_instance(replace_expressions(expression, replacements))
+                new_fields[field] = remove_fields_space(str(new_expression))
+                if contains_cross_sectional_data(new_expression):
+                    data_keys.append(new_fields[field])
+            data = DatasetProvider.dataset_processor(
+                instruments_d, list(dict.fromkeys(new_fields.values())), start_time, end_time, freq, inst_processors
+            )
+            data = data.loc[:, [new_fields[field] for field in fields]]
+            data.columns = [str(i) for i in column_names]
+        finally:
+            ExpressionD.drop_expression_instances(data_keys)
+        return data
+
+    @staticmethod
+    def panel_processor(instruments_d, column_names, start_time, end_time, freq):
+        """
+        Calculate the expressions of all the instruments at once, return the same data set as `dataset_processor`.
+
+        The fields are compiled into a DAG and calculated in the panel mode of `ExpressionDAG`, so the operators run
+        once for all the instruments. The fields which are not compilable (e.g. custom operators) and the instruments
+        not supported by the panel mode are calculated by `dataset_processor`.
+        """
+        fields = list(dict.fromkeys(normalize_cache_fields(column_names)))
+        expressions = {field: ExpressionD.get_expression_instance(field) for field in fields}
+        panel_fields = [field for field in fields if is_compilable(expressions[field])]
+        other_fields = [field for field in fields if field not in panel_fields]
+        inst_l = sorted(set(instruments_d))
+        _, _, start_index, end_index = Cal.locate_index(start_time, end_time, freq=freq, future=False)
+
+        data_l, gapped = [], np.zeros(len(inst_l), dtype=bool)
+        if len(panel_fields) > 0 and len(inst_l) > 0 and start_index <= end_index:
+            dag = ExpressionDAG([expressions[field] for field in panel_fields], start_index, end_index)
+            panels = dag.evaluate_panel(inst_l, DatasetProvider._load_panel, freq)
+            row_index = np.arange(start_index, end_index + 1)[:, None]
+            values = {}
+            valid = np.zeros((len(row_index), len(inst_l)), dtype=bool)
+            for field, panel in zip(panel_fields, panels):
+                frame = panel.frame.loc[start_index:end_index]
+                try:
+                    frame = frame.astype(get_dataset_dtype())
+                except (ValueError, TypeError):
+                    pass
+                values[field] = frame.to_numpy()
+                valid |= (row_index >= panel.spans[:, 0]) & (row_index <= panel.spans[:, 1])
+                gapped |= panel.gapped
+            # the index of the instruments with gaps can't be represented by the panels
+            valid[:, gapped] = False
+            datetime_index = pd.DatetimeIndex(Cal.calendar(freq=freq)[start_index : end_index + 1])
+            data_l.append(panel_to_dataset(instruments_d, inst_l, datetime_index, valid, values))
+
+        panel_inst_l = [inst for inst, _gapped in zip(inst_l, gapped) if not _gapped]
+        if len(other_fields) > 0 and len(panel_fields) > 0:
+            # the rows are the union of the rows of the fields, like `inst_calculator`
+            data = DatasetProvider.dataset_processor(
+                DatasetProvider._sub_instruments(instruments_d, panel_inst_l), other_fields, start_time, end_time, freq
+            )
+            data_l = [pd.concat(data_l + [data], axis=1, join="outer", sort=True)]
+        if gapped.any() or len(panel_fields) == 0:
+            gapped_inst_l = [inst for inst, _gapped in zip(inst_l, gapped) if _gapped] if panel_fields else inst_l
+            data_l.append(
+                DatasetProvider.dataset_processor(
+                    DatasetProvider._sub_instruments(instruments_d, gapped_inst_l), fields, start_time, end_time, freq
+                )
+            )
+
+        data_l = [data for data in data_l if len(data) > 0]
+        if len(data_l) == 0:
+            return pd.DataFrame(
+                index=pd.MultiIndex.from_arrays([[], []], names=("instrument", "datetime")),
+                columns=column_names,
+                dtype=get_dataset_dtype(),
+            )
+        data = pd.concat(data_l, sort=False).sort_index() if len(data_l) > 1 else data_l[0]
+        return DiskDatasetCache.cache_to_origin_data(data, column_names)
+
+    @staticmethod
+    def _sub_instruments(instruments_d, inst_l):
+        if isinstance(instruments_d, dict):
+            return {inst: instruments_d[inst] for inst in inst_l}
+        return inst_l
+
+    @staticmethod
+    def _load_panel(expression, instruments, start_index, end_index, freq) -> Tuple[np.ndarray, np.ndarray]:
+        """load the leaf expression of the instruments for `ExpressionDAG.evaluate_panel`"""
+        if (
+            getattr(PanelD, "_provider", None) is not None
+            and isinstance(expression, Feature)
+            and not isinstance(expression, PFeature)
+            and PanelD.support([str(expression)], freq, end_index)
+        ):
+            return PanelD.feature_panel(instruments, str(expression), start_index, end_index, freq)
+        series_l = [expression.load(inst, start_index, end_index, freq) for inst in instruments]
+        dtype = np.result_type(np.float32, *[series.dtype for series in series_l if not series.empty])
+        values = np.full((end_index - start_index + 1, len(instruments)), np.nan, dtype=dtype)
+        spans = np.zeros((len(instruments), 2), dtype=int)
+        spans[:, 1] = -1
+        for i, series in enumerate(series_l):
+            if not series.empty:
+                values[series.index.values.astype(int) - start_index, i] = series.values
+                spans[i] = series.index[0], series.index[-1]
+        return values, spans
+
+    @staticmethod
+    def inst_calculator(
+        inst,
+        start_time,
+        end_time,
+        freq,
+        column_names,
+        spans=None,
+        g_config=None,
+        inst_processors=[],
+        leaf_features=None,
+        expressions=None,
+    ):
         """
         Calculate the expressions for **one** instrument, return a df result.
         If the expression has been calculated before, load from cache.
+        The `leaf_features` loaded by `ExpressionProvider.load_leaf_features` are saved in the expression cache first.
+        The `expressions` dumped by `ExpressionProvider.dump_expression_instances` are used instead of parsing fields.
 
         return value: A data frame with index 'datetime' and other data columns.
 
@@ -609,10 +1079,20 @@ class DatasetProvider(abc.ABC):
         # NOTE: This place is compatible with windows, windows multi-process is spawn
         C.register_from_C(g_config)
 
-        obj = dict()
-        for field in column_names:
-            #  The client does not have expression provider, the data will be loaded from cache using static method.
-            obj[field] = ExpressionD.expression(inst, field, start_time, end_time, freq)
+        if expressions is not None:
+            ExpressionD.load_expression_instances(expressions, column_names)
+
+        for key, series in (leaf_features or {}).items():
+            H["f"][key] = series
+
+        try:
+            ExpressionD.prefetch(inst, column_names, start_time, end_time, freq)
+        except Exception as e:
+            # the expressions will load the features one by one
+            get_module_logger("data").debug(f"Prefetching features error: instrument={inst}. error info: {str(e)}")
+
+        #  The client does not have expression provider, the data will be loaded from cache using static method.
+        obj = ExpressionD.expressions(inst, column_names, start_time, end_time, freq)
 
         data = pd.DataFrame(obj)
         if not data.empty and not np.issubdtype(data.index.dtype, np.dtype("M")):
@@ -658,8 +1138,11 @@ class LocalCalendarProvider(CalendarProvider, ProviderBackendMixin):
         list
             list of timestamps
         """
+        return self.load_datetime_index(freq, future).to_list()
+
+    def load_datetime_index(self, freq, future) -> pd.DatetimeIndex:
         try:
-            backend_obj = self.backend_obj(freq=freq, future=future).data
+            datetime_index = self.backend_obj(freq=freq, future=future).datetime_index
         except ValueError:
             if future:
                 get_module_logger("data").warning(
@@ -668,11 +1151,11 @@ class LocalCalendarProvider(CalendarProvider, ProviderBackendMixin):
                 get_module_logger("data").warning(
                     "You can get future calendar by referring to the following document: https://github.com/microsoft/qlib/blob/main/scripts/data_collector/contrib/README.md"
                 )
-                backend_obj = self.backend_obj(freq=freq, future=False).data
+                datetime_index = self.backend_obj(freq=freq, future=False).datetime_index
             else:
                 raise
 
-        return [pd.Timestamp(x) for x in backend_obj]
+        return datetime_index
 
 
 class LocalInstrumentProvider(InstrumentProvider, ProviderBackendMixin):
@@ -690,9 +1173,8 @@ class LocalInstrumentProvider(InstrumentProvider, ProviderBackendMixin):
 
     def list_instruments(self, instruments, start_time=None, end_time=None, freq="day", as_list=False):
         market = instruments["market"]
-        if market in H["i"]:
-            _instruments = H["i"][market]
-        else:
+        _instruments = H["i"].get(market)
+        if _instruments is None:
             _instruments = self._load_instruments(market, freq=freq)
             H["i"][market] = _instruments
         # strip
@@ -740,10 +1222,153 @@ class LocalFeatureProvider(FeatureProvider, ProviderBackendMixin):
         instrument = code_to_fname(instrument)
         return self.backend_obj(instrument=instrument, field=field, freq=freq)[start_index : end_index + 1]
 
+    def feature_version(self, instrument, field, freq) -> Optional[int]:
+        field = str(field)[1:]
+        instrument = code_to_fname(instrument)
+        return self.backend_obj(instrument=instrument, field=field, freq=freq).version
+
+    def features_many(self, instrument, fields, start_index, end_index, freq) -> Dict[str, pd.Series]:
+        # all the fields are read by `FeatureStorage.read_many` and share one 2-D array
+        storage_fields = [str(field)[1:] for field in fields]
+        if len(storage_fields) == 0:
+            return {}
+        instrument = code_to_fname(instrument)
+        backend_obj = self.backend_obj(instrument=instrument, field=storage_fields[0], freq=freq)
+        data_start_index, values, spans = backend_obj.read_many(storage_fields, slice(start_index, end_index + 1))
+        res = {}
+        for field, field_values, (si, ei) in zip(fields, values, spans):
+            if si > ei:
+                res[field] = pd.Series(dtype=np.float32)
+            else:
+                res[field] = pd.Series(
+                    field_values[si - data_start_index : ei - data_start_index + 1],
+                    index=pd.RangeIndex(si, ei + 1),
+                    copy=False,
+                )
+        return res
+
+
+def panel_to_dataset(instruments_d, inst_l, datetime_index, valid, values: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """Convert the panels to the dataset with the same format as `DatasetProvider.dataset_processor`
+
+    Parameters
+    ----------
+    instruments_d : list or dict
+        list of instruments or dict of instruments and their time spans.
+    inst_l : list
+        the sorted instruments of the columns of the panels.
+    datetime_index : pd.DatetimeIndex
+        the datetime of the rows of the panels.
+    valid : np.ndarray
+        whether the rows of the instruments exist, with the same shape as the panels.
+    values : Dict[str, np.ndarray]
+        {field: the panel of the field}
+    """
+    if isinstance(instruments_d, dict):
+        valid = valid.copy()
+        for i, inst in enumerate(inst_l):
+            spans = instruments_d[inst]
+            if spans is None:
+                continue
+            mask = np.zeros(len(datetime_index), dtype=bool)
+            for begin, end in spans:
+                mask |= (datetime_index >= begin) & (datetime_index <= end)
+            valid[:, i] &= mask
+
+    inst_idx, row_idx = np.nonzero(valid.T)
+    index = pd.MultiIndex.from_arrays(
+        [np.array(inst_l, dtype=object)[inst_idx], datetime_index[row_idx]], names=["instrument", "datetime"]
+    )
+    return pd.DataFrame({field: data[row_idx, inst_idx] for field, data in values.items()}, index=index)
+
+
+class LocalPanelProvider(PanelProvider, ProviderBackendMixin):
+    """Local panel data provider class
+
+    Provide the raw features from the panels generated by `scripts/dump_panel.py`.
+
+    It is disabled by default and can be enabled by `qlib.init(..., panel_provider="LocalPanelProvider")`. Then
+    `LocalDatasetProvider` will load the datasets which only contain raw features (e.g.
+    `D.features(D.instruments("all"), ["$close", "$volume"])`) from the panels directly.
+    """
+
+    RAW_FEATURE_PATTERN = re.compile(r"^\$\w+$")
+
+    def __init__(self, backend={}):
+        super().__init__()
+        self.backend = backend
+
+    def support(self, fields, freq="day", end_index=None) -> bool:
+        fields = normalize_cache_fields(fields)
+        if len(fields) == 0 or not all(self.RAW_FEATURE_PATTERN.match(field) for field in fields):
+            return False
+        for field in fields:
+            backend_obj = self.backend_obj(field=field[1:], freq=freq)
+            try:
+                backend_obj.check()
+                if end_index is not None and len(backend_obj) <= end_index:
+                    # the panel is out of date
+                    return False
+            except ValueError:
+                return False
+        return True
+
+    def panel(self, instruments_d, fields, start_time, end_time, freq="day"):
+        column_names = fields
+        fields = list(dict.fromkeys(remove_fields_space(fields)))
+        _calendar = Cal.calendar(freq=freq)
+        _, _, start_index, end_index = Cal.locate_index(start_time, end_time, freq=freq, future=False)
+        inst_l = sorted(set(instruments_d))
+        if len(inst_l) == 0 or start_index > end_index:
+            return pd.DataFrame(
+                index=pd.MultiIndex.from_arrays([[], []], names=("instrument", "datetime")),
+                columns=column_names,
+                dtype=get_dataset_dtype(),
+            )
+        row_index = np.arange(start_index, end_index + 1)[:, None]
+
+        values = {}
+        valid = np.zeros((len(row_index), len(inst_l)), dtype=bool)
+        for field in fields:
+            values[field], spans = self.feature_panel(inst_l, field, start_index, end_index, freq)
+            # the rows of a feature are [start_index, end_index] of the instrument like `FeatureStorage`
+            valid |= (row_index >= spans[:, 0]) & (row_index <= spans[:, 1])
+
+        datetime_index = pd.DatetimeIndex(_calendar[start_index : end_index + 1])
+        data = panel_to_dataset(instruments_d, inst_l, datetime_index, valid, values)
+        return DiskDatasetCache.cache_to_origin_data(data, column_names)
+
+    def feature_panel(self, instruments, field, start_index, end_index, freq="day") -> Tuple[np.ndarray, np.ndarray]:
+        backend_obj = self.backend_obj(field=str(field)[1:], freq=freq)
+        columns = backend_obj.get_columns([code_to_fname(inst).lower() for inst in instruments])
+        exists = columns >= 0
+        spans = np.zeros((len(instruments), 2), dtype=int)
+        spans[:, 1] = -1
+        spans[exists] = backend_obj.spans[columns[exists]]
+        spans[:, 0] = np.maximum(spans[:, 0], start_index)
+        spans[:, 1] = np.minimum(spans[:, 1], end_index)
+        # NOTE: a contiguous read of the rows, and then select the columns in memory
+        rows = backend_obj[start_index : end_index + 1]
+        data = np.full((end_index - start_index + 1, len(instruments)), np.nan, dtype=np.float32)
+        data[:, exists] = rows[:, columns[exists]]
+        return data, spans
+
 
 class LocalPITProvider(PITProvider):
+    """Local PIT data provider class
+
+    The records of each (instrument, field) are parsed once into a `qlib.data.pit.PITRevisions`, which looks up the
+    value of a period observed at a date in O(log n). The parsed records are kept in a thread-safe cache bounded by
+    `C.pit_cache_size`, and they are parsed again once the `.data` file is changed (e.g. updated by
+    `scripts/dump_pit.py`).
+    """
+
     # TODO: Add PIT backend file storage
-    # NOTE: This class is not multi-threading-safe!!!!
+
+    def __init__(self):
+        # {path of the `.data` file: ((st_mtime_ns, st_size), PITRevisions)}
+        self._revisions_cache = MemCacheLengthUnit(size_limit=C.get("pit_cache_size", 0))
+        self._lock = threading.Lock()
 
     def period_feature(self, instrument, field, start_index, end_index, cur_time, period=None):
         if not isinstance(cur_time, pd.Timestamp):
@@ -753,53 +1378,15 @@ class LocalPITProvider(PITProvider):
 
         assert end_index <= 0  # PIT don't support querying future data
 
-        DATA_RECORDS = [
-            ("date", C.pit_record_type["date"]),
-            ("period", C.pit_record_type["period"]),
-            ("value", C.pit_record_type["value"]),
-            ("_next", C.pit_record_type["index"]),
-        ]
-        VALUE_DTYPE = C.pit_record_type["value"]
-
-        field = str(field).lower()[2:]
-        instrument = code_to_fname(instrument)
-
-        # {For acceleration
-        # start_index, end_index, cur_index = kwargs["info"]
-        # if cur_index == start_index:
-        #     if not hasattr(self, "all_fields"):
-        #         self.all_fields = []
-        #     self.all_fields.append(field)
-        #     if not hasattr(self, "period_index"):
-        #         self.period_index = {}
-        #     if field not in self.period_index:
-        #         self.period_index[field] = {}
-        # For acceleration}
-
-        if not field.endswith("_q") and not field.endswith("_a"):
-            raise ValueError("period field must ends with '_q' or '_a'")
-        quarterly = field.endswith("_q")
-        index_path = C.dpm.get_data_uri() / "financial" / instrument.lower() / f"{field}.index"
-        data_path = C.dpm.get_data_uri() / "financial" / instrument.lower() / f"{field}.data"
-        if not (index_path.exists() and data_path.exists()):
-            raise FileNotFoundError("No file is found.")
-        # NOTE: The most significant performance loss is here.
-        # Does the acceleration that makes the program complicated really matters?
-        # - It makes parameters of the interface complicate
-        # - It does not performance in the optimal way (places all the pieces together, we may achieve higher performance)
-        #    - If we design it carefully, we can go through for only once to get the historical evolution of the data.
-        # So I decide to deprecated previous implementation and keep the logic of the program simple
-        # Instead, I'll add a cache for the index file.
-        data = np.fromfile(data_path, dtype=DATA_RECORDS)
+        revisions = self.period_revisions(instrument, field)
 
         # find all revision periods before `cur_time`
         cur_time_int = int(cur_time.year) * 10000 + int(cur_time.month) * 100 + int(cur_time.day)
-        loc = np.searchsorted(data["date"], cur_time_int, side="right")
+        loc = revisions.locate(cur_time_int)
         if loc <= 0:
             return pd.Series(dtype=C.pit_record_type["value"])
-        last_period = data["period"][:loc].max()  # return the latest quarter
-        first_period = data["period"][:loc].min()
-        period_list = get_period_list(first_period, last_period, quarterly)
+        first_period, last_period = revisions.period_range(loc)  # the last one is the latest quarter
+        period_list = get_period_list(first_period, last_period, revisions.quarterly)
         if period is not None:
             # NOTE: `period` has higher priority than `start_index` & `end_index`
             if period not in period_list:
@@ -808,26 +1395,50 @@ class LocalPITProvider(PITProvider):
                 period_list = [period]
         else:
             period_list = period_list[max(0, len(period_list) + start_index - 1) : len(period_list) + end_index]
-        value = np.full((len(period_list),), np.nan, dtype=VALUE_DTYPE)
-        for i, p in enumerate(period_list):
-            # last_period_index = self.period_index[field].get(period)  # For acceleration
-            value[i], now_period_index = read_period_data(
-                index_path, data_path, p, cur_time_int, quarterly  # , last_period_index  # For acceleration
-            )
-            # self.period_index[field].update({period: now_period_index})  # For acceleration
+        value = revisions.values(np.array(period_list, dtype=np.int64), loc)
         # NOTE: the index is period_list; So it may result in unexpected values(e.g. nan)
         # when calculation between different features and only part of its financial indicator is published
-        series = pd.Series(value, index=period_list, dtype=VALUE_DTYPE)
+        return pd.Series(value, index=period_list, dtype=C.pit_record_type["value"])
+
+    def period_revisions(self, instrument, field) -> "PITRevisions":
+        from .pit import PITRevisions  # pylint: disable=C0415
+
+        _, data_path, quarterly = self._period_paths(code_to_fname(instrument), str(field).lower()[2:])
+        stat = data_path.stat()
+        signature = stat.st_mtime_ns, stat.st_size
+        key = str(data_path)
+        with self._lock:
+            cached = self._revisions_cache[key] if key in self._revisions_cache else None
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        revisions = PITRevisions(np.fromfile(data_path, dtype=self._records_dtype()), quarterly)
+        with self._lock:
+            self._revisions_cache[key] = signature, revisions
+        return revisions
+
+    def clear_cache(self):
+        with self._lock:
+            self._revisions_cache.clear()
 
-        # {For acceleration
-        # if cur_index == end_index:
-        #     self.all_fields.remove(field)
-        #     if not len(self.all_fields):
-        #         del self.all_fields
-        #         del self.period_index
-        # For acceleration}
+    @staticmethod
+    def _records_dtype() -> list:
+        return [
+            ("date", C.pit_record_type["date"]),
+            ("period", C.pit_record_type["period"]),
+            ("value", C.pit_record_type["value"]),
+            ("_next", C.pit_record_type["index"]),
+        ]
 
-        return series
+    @staticmethod
+    def _period_paths(instrument, field) -> Tuple[Path, Path, bool]:
+        """the paths of the index and the data of the field, and whether it is quarterly"""
+        if not field.endswith("_q") and not field.endswith("_a"):
+            raise ValueError("period field must ends with '_q' or '_a'")
+        index_path = C.dpm.get_data_uri() / "financial" / instrument.lower() / f"{field}.index"
+        data_path = C.dpm.get_data_uri() / "financial" / instrument.lower() / f"{field}.data"
+        if not (index_path.exists() and data_path.exists()):
+            raise FileNotFoundError("No file is found.")
+        return index_path, data_path, field.endswith("_q")
 
 
 class LocalExpressionProvider(ExpressionProvider):
@@ -839,6 +1450,7 @@ class LocalExpressionProvider(ExpressionProvider):
     def __init__(self, time2idx=True):
         super().__init__()
         self.time2idx = time2idx
+        self._compiled = None
 
     def expression(self, instrument, field, start_time=None, end_time=None, freq="day"):
         expression = self.get_expression_instance(field)
@@ -864,12 +1476,16 @@ class LocalExpressionProvider(ExpressionProvider):
                 f"error info: {str(e)}"
             )
             raise
+        return self._format_series(series, start_index, end_index)
+
+    @staticmethod
+    def _format_series(series, start_index, end_index) -> pd.Series:
         # Ensure that each column type is consistent
         # FIXME:
-        # 1) The stock data is currently float. If there is other types of data, this part needs to be re-implemented.
-        # 2) The precision should be configurable
+        # The stock data is currently float. If there is other types of data, this part needs to be re-implemented.
+        # NOTE: the precision is configured by `C.compute_dtype`, see `get_dataset_dtype`
         try:
-            series = series.astype(np.float32)
+            series = series.astype(get_dataset_dtype())
         except ValueError:
             pass
         except TypeError:
@@ -878,6 +1494,122 @@ class LocalExpressionProvider(ExpressionProvider):
             series = series.loc[start_index:end_index]
         return series
 
+    def compile(self, fields, start_index, end_index) -> ExpressionDAG:
+        """Compile the expressions of the fields into a DAG.
+
+        The DAG of the last fields and range is reused, because it is the same for all the instruments of a dataset.
+        """
+        key = tuple(fields), start_index, end_index
+        if self._compiled is None or self._compiled[0] != key:
+            self._compiled = key, ExpressionDAG(list(map(self.get_expression_instance, fields)), start_index, end_index)
+        return self._compiled[1]
+
+    def expressions(self, instrument, fields, start_time=None, end_time=None, freq="day") -> Dict[str, pd.Series]:
+        """Get the data of the expressions by the DAG compiled from the fields.
+
+        The sub-expressions shared by the fields are calculated only once. It is the same as calling `expression`
+        for each field if `C.compile_expressions` is disabled.
+        """
+        if not self.time2idx or not C.get("compile_expressions", True):
+            return super().expressions(instrument, fields, start_time, end_time, freq)
+        _, _, start_index, end_index = Cal.locate_index(
+            time_to_slc_point(start_time), time_to_slc_point(end_time), freq=freq, future=False
+        )
+        dag = self.compile(fields, start_index, end_index)
+        try:
+            data = dag.evaluate(instrument, freq)
+        except Exception as e:
+            get_module_logger("data").debug(
+                f"Loading expressions error: "
+                f"instrument={instrument}, fields={fields}, start_time={start_time}, end_time={end_time}, freq={freq}. "
+                f"error info: {str(e)}"
+            )
+            raise
+        return {field: self._format_series(series, start_index, end_index) for field, series in zip(fields, data)}
+
+    @staticmethod
+    def _get_leaf_features(expression, leaves: Optional[list] = None) -> List[Feature]:
+        """get the leaf features of the expression which are loaded for the same instrument"""
+        if leaves is None:
+            leaves = []
+        if isinstance(expression, PFeature):
+            return leaves
+        if isinstance(expression, Feature):
+            leaves.append(expression)
+            return leaves
+        if isinstance(getattr(expression, "instrument", None), str):
+            # the operators like `ChangeInstrument` load the features of another instrument
+            return leaves
+        for child in vars(expression).values():
+            if isinstance(child, Expression):
+                LocalExpressionProvider._get_leaf_features(child, leaves)
+        return leaves
+
+    def _leaf_queries(self, instrument, fields, start_time, end_time, freq) -> List[tuple]:
+        """the cache keys of `Expression.load` of the leaf features"""
+        if not self.time2idx:
+            return []
+        start_time = time_to_slc_point(start_time)
+        end_time = time_to_slc_point(end_time)
+        _, _, start_index, end_index = Cal.locate_index(start_time, end_time, freq=freq, future=False)
+        if C.get("compile_expressions", True):
+            # the leaf features are loaded in the ranges of the nodes of the DAG, see `expressions`
+            leaves = self.compile(fields, start_index, end_index).leaves()
+        else:
+            # the leaf features are loaded in the extended range of the root expression, see `expression`
+            leaves = []
+            for field in fields:
+                expression = self.get_expression_instance(field)
+                lft_etd, rght_etd = expression.get_extended_window_size()
+                leaves.append((expression, max(0, start_index - lft_etd), end_index + rght_etd))
+        queries = []
+        for expression, query_start, query_end in leaves:
+            if query_start > query_end:
+                continue
+            for feature in self._get_leaf_features(expression):
+                queries.append((str(feature), instrument, query_start, query_end, freq))
+        return list(dict.fromkeys(queries))
+
+    @staticmethod
+    def _read_leaf_features(instrument, queries: List[tuple], freq) -> Dict[tuple, pd.Series]:
+        # all the features are read once in the union of the ranges
+        features = list(dict.fromkeys(key[0] for key in queries))
+        dtype = get_compute_dtype()
+        union_start, union_end = min(key[2] for key in queries), max(key[3] for key in queries)
+        data = FeatureD.features_many(instrument, features, union_start, union_end, freq)
+        res = {}
+        for key in queries:
+            feature, _, query_start, query_end, _ = key
+            series = data[feature]
+            if not series.empty:
+                series = series.iloc[max(query_start - series.index[0], 0) : max(query_end - series.index[0] + 1, 0)]
+            if series.empty:
+                series = pd.Series(dtype=np.float32)
+            # the same as `Feature.load`
+            series = cast_float(series, dtype)
+            series.name = feature
+            res[key] = series
+        return res
+
+    def prefetch(self, instrument, fields, start_time=None, end_time=None, freq="day"):
+        """Load the leaf features of the expressions in one batch by `FeatureD.features_many`.
+
+        The loaded features are saved in the expression cache `H["f"]` with the same keys as `Expression.load`, so
+        calculating the expressions will not load the features one by one.
+        """
+        queries = self._leaf_queries(instrument, fields, start_time, end_time, freq)
+        queries = [key for key in queries if key not in H["f"]]
+        if len(queries) <= 1:
+            return
+        for key, series in self._read_leaf_features(instrument, queries, freq).items():
+            H["f"][key] = series
+
+    def load_leaf_features(self, instrument, fields, start_time=None, end_time=None, freq="day") -> dict:
+        queries = self._leaf_queries(instrument, fields, start_time, end_time, freq)
+        if len(queries) == 0:
+            return {}
+        return self._read_leaf_features(instrument, queries, freq)
+
 
 class LocalDatasetProvider(DatasetProvider):
     """Local dataset data provider class
@@ -920,12 +1652,27 @@ class LocalDatasetProvider(DatasetProvider):
                 )
             start_time = cal[0]
             end_time = cal[-1]
+            if len(inst_processors) == 0 and self.support_panel(column_names, freq, end_time):
+                # the raw features can be loaded from the panels without calculating instrument by instrument
+                return PanelD.panel(instruments_d, column_names, start_time, end_time, freq)
+            if len(inst_processors) == 0 and C.get("panel_evaluation", False):
+                # the expressions are calculated for all the instruments at once
+                return self.panel_processor(instruments_d, column_names, start_time, end_time, freq)
         data = self.dataset_processor(
             instruments_d, column_names, start_time, end_time, freq, inst_processors=inst_processors
         )
 
         return data
 
+    @staticmethod
+    def support_panel(column_names, freq="day", end_time=None) -> bool:
+        """Whether the columns can be loaded from the panels by `PanelD`"""
+        if getattr(PanelD, "_provider", None) is None:
+            return False
+        # the panels must cover the last queried calendar point
+        end_index = len(Cal.calendar(end_time=end_time, freq=freq)) - 1
+        return PanelD.support(column_names, freq, end_index)
+
     @staticmethod
     def multi_cache_walker(instruments, fields, start_time=None, end_time=None, freq="day"):
         """
@@ -1206,6 +1953,33 @@ class LocalProvider(BaseProvider):
         elif type == "feature":
             return DatasetD._uri(**kwargs)
 
+    def features(self, instruments, fields, *args, **kwargs):
+        # The `Expression` objects are saved in the cache of `ExpressionD` and replaced by their names, so the names
+        # are not parsed again. The names are the columns of the result.
+        fields = [
+            str(ExpressionD.get_expression_instance(field)) if isinstance(field, Expression) else field
+            for field in fields
+        ]
+        return super().features(instruments, fields, *args, **kwargs)
+
+    def features_incremental(self, instruments, fields, end_time=None, freq="day", state_dir=None):
+        """
+        Calculate the fields in the bars after the last calculation until `end_time` with the states of the
+        operators, which are checkpointed in `state_dir` (see `qlib.data.incremental.IncrementalEvaluator`).
+
+        Parameters
+        ----------
+        end_time : str
+            the last bar to calculate, the last bar of the calendar by default.
+        state_dir : Union[str, Path]
+            the directory of the checkpoints, `C.incremental_state_dir_name` in the data directory by default.
+        """
+        fields = [
+            str(ExpressionD.get_expression_instance(field)) if isinstance(field, Expression) else field
+            for field in fields
+        ]
+        return IncrementalEvaluator(freq, state_dir).evaluate(instruments, fields, end_time)
+
     def features_uri(self, instruments, fields, start_time, end_time, freq, disk_cache=1):
         """features_uri
 
@@ -1268,6 +2042,7 @@ if sys.version_info >= (3, 9):
     InstrumentProviderWrapper = Annotated[InstrumentProvider, Wrapper]
     FeatureProviderWrapper = Annotated[FeatureProvider, Wrapper]
     PITProviderWrapper = Annotated[PITProvider, Wrapper]
+    PanelProviderWrapper = Annotated[PanelProvider, Wrapper]
     ExpressionProviderWrapper = Annotated[ExpressionProvider, Wrapper]
     DatasetProviderWrapper = Annotated[DatasetProvider, Wrapper]
     BaseProviderWrapper = Annotated[BaseProvider, Wrapper]
@@ -1276,6 +2051,7 @@ else:
     InstrumentProviderWrapper = InstrumentProvider
     FeatureProviderWrapper = FeatureProvider
     PITProviderWrapper = PITProvider
+    PanelProviderWrapper = PanelProvider
     ExpressionProviderWrapper = ExpressionProvider
     DatasetProviderWrapper = DatasetProvider
     BaseProviderWrapper = BaseProvider
@@ -1284,6 +2060,7 @@ Cal: CalendarProviderWrapper = Wrapper()
 Inst: InstrumentProviderWrapper = Wrapper()
 FeatureD: FeatureProviderWrapper = Wrapper()
 PITD: PITProviderWrapper = Wrapper()
+PanelD: PanelProviderWrapper = Wrapper()
 ExpressionD: ExpressionProviderWrapper = Wrapper()
 DatasetD: DatasetProviderWrapper = Wrapper()
 D: BaseProviderWrapper = Wrapper()
@@ -1314,6 +2091,14 @@ def register_all_wrappers(C):
         register_wrapper(PITD, pit_provider, "qlib.data")
         logger.debug(f"registering PITD {C.pit_provider}")
 
+    if getattr(C, "panel_provider", None) is not None:
+        panel_provider = init_instance_by_config(C.panel_provider, module)
+        register_wrapper(PanelD, panel_provider, "qlib.data")
+        logger.debug(f"registering PanelD {C.panel_provider}")
+    else:
+        # NOTE: PanelD is optional, the provider registered by the previous `qlib.init` should be removed
+        PanelD.register(None)
+
     if getattr(C, "expression_provider", None) is not None:
         # This provider is unnecessary in client provider
         _eprovider = init_instance_by_config(C.expression_provider, module)
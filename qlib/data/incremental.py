@@ -0,0 +1,328 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Evaluate the expressions incrementally bar by bar.
+
+The online updates only need the values of the new bars, but `D.features` calculates every expression in its whole
+extended window again. `ExpressionStream` keeps the states of the operators of an expression for one instrument (see
+`ExpressionOps.init_state`), so the value of each new bar is calculated in O(1) for most of the operators instead of
+O(window). `IncrementalEvaluator` checkpoints the states of each instrument and field to disk, and calculates only the
+bars after the checkpoints (`D.features_incremental`).
+"""
+
+import os
+import pickle
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from . import ops
+from .base import Expression, ExpressionOps, ExpressionState, IndexedArray, get_dataset_dtype
+from .compiler import ExpressionDAG, _child_instrument, _substitute, is_compilable, is_window_op
+from ..config import C
+from ..log import get_module_logger
+from ..utils import code_to_fname
+
+
+class _BufferState(ExpressionState):
+    """The state of the window operators without their own states (e.g. `Rank`), which keeps the values of the
+    sub-expressions in the window and calculates the operator with them in O(window)"""
+
+    def __init__(self, expression: ExpressionOps, names: List[str], history: List[np.ndarray]):
+        lft_etd = expression.get_extended_window_size()[0]
+        lft_etd_children = max(getattr(expression, name).get_extended_window_size()[0] for name in names)
+        self.size = lft_etd - lft_etd_children + 1
+        self.expression = expression
+        self.names = names
+        self.buffers = [list(values[-self.size :]) for values in history]
+        self.dtypes = [values.dtype for values in history]
+
+    def step(self, *values):
+        children = {}
+        for name, buffer, value in zip(self.names, self.buffers, values):
+            buffer.append(value)
+            del buffer[: -self.size]
+            children[name] = buffer
+        # the values of the sub-expressions are aligned to the last bar
+        length = max(len(buffer) for buffer in children.values())
+        for (name, buffer), dtype in zip(children.items(), self.dtypes):
+            padded = np.full(length, np.nan, dtype=dtype if dtype.kind == "f" else np.float64)
+            padded[length - len(buffer) :] = buffer
+            children[name] = IndexedArray(0, padded)
+        data = _substitute(self.expression, children)._load_array_internal(None, 0, length - 1)
+        return data.values[-1] if len(data) > 0 and data.end_index == length - 1 else np.nan
+
+
+class ExpressionStream:
+    """The states of an expression for one instrument in the incremental evaluation
+
+    The operators of `qlib.data.ops` are calculated by their states. The window operators without their own states
+    keep the values of their sub-expressions in the window (see `_BufferState`). The others (e.g. `ChangeInstrument`,
+    the operators depending on the start of the range, or the custom operators) and the features are the inputs of the
+    stream, whose values are loaded for each bar.
+
+    Parameters
+    ----------
+    expression : Expression
+        the expression, which can't depend on the future data.
+    """
+
+    def __init__(self, expression: Expression):
+        if expression.get_extended_window_size()[1] > 0:
+            raise ValueError(f"{expression} depends on the future data, which can't be calculated incrementally")
+        self.expression = expression
+        # the calendar index of the last bar calculated
+        self.index = None
+        self.inputs: Dict[str, Expression] = {}
+        # (key, expression, names of the sub-expressions, keys of the sub-expressions, whether to buffer the values)
+        self.nodes = []
+        self.states: Dict[str, ExpressionState] = {}
+        self._expressions = {}
+        self.root = self._build(expression)
+
+    def _build(self, expression: Expression) -> str:
+        key = str(expression)
+        if key in self._expressions:
+            return key
+        self._expressions[key] = expression
+        children = {name: child for name, child in vars(expression).items() if isinstance(child, Expression)}
+        buffered = self._buffered(expression, len(children))
+        if buffered is None:
+            self.inputs[key] = expression
+        else:
+            # the nodes are sorted so that the sub-expressions are calculated first
+            child_keys = [self._build(child) for child in children.values()]
+            self.nodes.append((key, expression, list(children), child_keys, buffered))
+        return key
+
+    @staticmethod
+    def _buffered(expression: Expression, n_children: int) -> Optional[bool]:
+        """whether the operator is calculated with the buffered values, or None if it is an input"""
+        if not isinstance(expression, ExpressionOps) or type(expression).__module__ != ops.__name__:
+            return None
+        if n_children == 0 or _child_instrument(expression, None) is not None:
+            return None
+        try:
+            expression.init_state(*[np.array([]) for _ in range(n_children)])
+        except NotImplementedError:
+            return True if is_window_op(expression) else None
+        return False
+
+    def history_expressions(self) -> Dict[str, Expression]:
+        """the sub-expressions whose histories are required by `init_states`"""
+        return {key: self._expressions[key] for *_, child_keys, _ in self.nodes for key in child_keys}
+
+    def init_states(self, history: Dict[str, np.ndarray], index: int):
+        """initialize the states with the histories of the sub-expressions ending at the bar `index`"""
+        self.states = {}
+        for key, expression, names, child_keys, buffered in self.nodes:
+            history_l = [history.get(child_key, np.array([])) for child_key in child_keys]
+            if buffered:
+                self.states[key] = _BufferState(expression, names, history_l)
+            else:
+                self.states[key] = expression.init_state(*history_l)
+        self.index = index
+
+    def step(self, inputs: dict):
+        """calculate the next bar with the values of the inputs in the bar, and return the value of the expression
+
+        The inputs not existing in the bar are absent from `inputs`. The same as the index alignment of `pd.Series`,
+        an operator exists in a bar if any of its sub-expressions exists, and its state isn't updated otherwise.
+        None is returned if the expression doesn't exist in the bar.
+        """
+        values = dict(inputs)
+        for key, _, _, child_keys, _ in self.nodes:
+            if any(child_key in values for child_key in child_keys):
+                values[key] = self.states[key].step(*[values.get(child_key, np.nan) for child_key in child_keys])
+        self.index += 1
+        return values.get(self.root)
+
+
+def _to_history(series: pd.Series, index: int) -> np.ndarray:
+    """the values of the series ending at the bar `index`"""
+    series = series.loc[:index]
+    if not series.empty and series.index[-1] < index:
+        series = series.reindex(pd.RangeIndex(series.index[0], index + 1))
+    return series.values
+
+
+class IncrementalEvaluator:
+    """Calculate the fields of the instruments incrementally, which implements `D.features_incremental`
+
+    The states of each instrument and field are checkpointed in the file of the instrument in `state_dir`, and the
+    next evaluation only calculates the bars after the checkpoint. If the checkpoint doesn't exist or is outdated (e.g.
+    the calendar is changed), the states are initialized with the history before the last bar to calculate.
+
+    Parameters
+    ----------
+    freq : str
+        time frequency.
+    state_dir : Union[str, Path]
+        the directory of the checkpoints, `C.incremental_state_dir_name` in the data directory of `freq` by default.
+    """
+
+    def __init__(self, freq: str = "day", state_dir: Optional[Union[str, Path]] = None):
+        self.freq = freq
+        if state_dir is None:
+            state_dir = C.dpm.get_data_uri(freq).joinpath(C.incremental_state_dir_name)
+        self.state_dir = Path(state_dir).expanduser()
+        self.logger = get_module_logger("IncrementalEvaluator")
+
+    def _path(self, instrument: str) -> Path:
+        return self.state_dir.joinpath(f"{code_to_fname(instrument).lower()}.{self.freq}.pkl")
+
+    def _load_streams(self, instrument: str, fields: List[str], calendar, end_index: int):
+        """load the checkpointed streams of the fields, which are valid for the calendar and the bar `end_index`"""
+        path = self._path(instrument)
+        if not path.exists():
+            return {}
+        try:
+            with path.open("rb") as f:
+                checkpoints = pickle.load(f)
+        except Exception as e:
+            self.logger.warning(f"Loading the checkpoints of {instrument} error: {str(e)}")
+            return {}
+        streams = {}
+        for field in fields:
+            if field not in checkpoints:
+                continue
+            time, stream = checkpoints[field]
+            # the calendar may be changed since the checkpoint
+            if 0 <= stream.index <= end_index and stream.index < len(calendar) and calendar[stream.index] == time:
+                streams[field] = stream
+        return streams
+
+    def _save_streams(self, instrument: str, streams: Dict[str, ExpressionStream], calendar):
+        """checkpoint the streams with the other fields checkpointed before"""
+        path = self._path(instrument)
+        checkpoints = {}
+        if path.exists():
+            try:
+                with path.open("rb") as f:
+                    checkpoints = pickle.load(f)
+            except Exception:
+                pass
+        for field, stream in streams.items():
+            checkpoints[field] = (calendar[stream.index] if stream.index >= 0 else None, stream)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with tmp_path.open("wb") as f:
+            pickle.dump(checkpoints, f, protocol=C.dump_protocol_version)
+        os.replace(tmp_path, path)
+
+    def _init_streams(self, instrument: str, streams: List[ExpressionStream], index: int):
+        expressions = {}
+        for stream in streams:
+            expressions.update(stream.history_expressions())
+        history = {}
+        if len(expressions) > 0 and index >= 0:
+            # the states of the operators depending on the start of the range (e.g. `EMA`) need the whole history
+            start_index = 0
+            if all(is_compilable(stream.expression) for stream in streams):
+                lookback = max(stream.expression.get_extended_window_size()[0] for stream in streams)
+                start_index = max(0, index - int(lookback))
+            dag = ExpressionDAG(list(expressions.values()), start_index, index)
+            for key, series in zip(expressions, dag.evaluate(instrument, self.freq)):
+                history[key] = _to_history(series, index)
+        for stream in streams:
+            stream.init_states(history, index)
+
+    def _load_inputs(self, instrument: str, expressions: Dict[str, Expression], start_index: int, end_index: int):
+        """load the values of the inputs in the bars, and whether each input exists in the bars"""
+        index = pd.RangeIndex(start_index, end_index + 1)
+        inputs, exists = {}, {}
+        for key, expression in expressions.items():
+            # the inputs depending on the start of the range (e.g. `Mean($close, 0)`) are calculated from the first bar
+            load_start = 0
+            if is_compilable(expression):
+                load_start = max(0, start_index - int(expression.get_extended_window_size()[0]))
+            series = expression.load(instrument, load_start, end_index, self.freq)
+            inputs[key] = series.reindex(index).values
+            exists[key] = index.isin(series.index)
+        return inputs, exists
+
+    def _evaluate_instrument(self, instrument: str, spans, fields: List[str], calendar, end_index: int):
+        from .data import ExpressionD  # pylint: disable=C0415
+
+        unique_fields = list(dict.fromkeys(fields))
+        streams = self._load_streams(instrument, unique_fields, calendar, end_index)
+        new_streams = []
+        for field in unique_fields:
+            if field not in streams:
+                streams[field] = ExpressionStream(ExpressionD.get_expression_instance(field))
+                new_streams.append(streams[field])
+        if len(new_streams) > 0:
+            self._init_streams(instrument, new_streams, end_index - 1)
+
+        start_index = min(stream.index for stream in streams.values()) + 1
+        expressions = {}
+        for stream in streams.values():
+            expressions.update(stream.inputs)
+        inputs, exists = {}, {}
+        if start_index <= end_index:
+            inputs, exists = self._load_inputs(instrument, expressions, start_index, end_index)
+
+        length = max(0, end_index - start_index + 1)
+        values = np.full((length, len(unique_fields)), np.nan, dtype=object)
+        # the same as `D.features`, the bars in which none of the fields exists are excluded
+        mask = np.zeros(length, dtype=bool)
+        for i, field in enumerate(unique_fields):
+            stream = streams[field]
+            for index in range(stream.index + 1, end_index + 1):
+                offset = index - start_index
+                value = stream.step({key: inputs[key][offset] for key in stream.inputs if exists[key][offset]})
+                if value is not None:
+                    values[offset, i] = value
+                    mask[offset] = True
+        if length > 0:
+            self._save_streams(instrument, streams, calendar)
+        try:
+            values = values.astype(get_dataset_dtype())
+        except (ValueError, TypeError):
+            pass
+        index = pd.DatetimeIndex(calendar[start_index : end_index + 1][mask])
+        data = pd.DataFrame(values[mask], index=index, columns=unique_fields)
+        data = data[fields]
+        if spans is not None:
+            mask = np.zeros(len(data), dtype=bool)
+            for begin, end in spans:
+                mask |= (data.index >= begin) & (data.index <= end)
+            data = data[mask]
+        data.index.names = ["datetime"]
+        return data
+
+    def evaluate(self, instruments, fields: list, end_time=None) -> pd.DataFrame:
+        """Calculate the fields in the bars after the checkpoints until `end_time`, and checkpoint the states
+
+        The first evaluation of an instrument and a field calculates the bar of `end_time` only.
+
+        Returns
+        -------
+        pd.DataFrame
+            a pandas dataframe with <instrument, datetime> index, which is the same as the result of `D.features`.
+        """
+        from .data import Cal, DatasetProvider  # pylint: disable=C0415
+
+        column_names = DatasetProvider.get_column_names(fields)
+        instruments_d = DatasetProvider.get_instruments_d(instruments, self.freq)
+        calendar = Cal.calendar(freq=self.freq)
+        end_index = Cal.locate_index(calendar[0], end_time or calendar[-1], freq=self.freq)[3]
+        if isinstance(instruments_d, dict):
+            it = instruments_d.items()
+        else:
+            it = zip(instruments_d, [None] * len(instruments_d))
+
+        data = {}
+        for inst, spans in sorted(it):
+            df = self._evaluate_instrument(inst, spans, column_names, calendar, end_index)
+            if len(df) > 0:
+                data[inst] = df
+        if len(data) > 0:
+            return pd.concat(data, names=["instrument"], sort=False)
+        return pd.DataFrame(
+            index=pd.MultiIndex.from_arrays([[], []], names=("instrument", "datetime")),
+            columns=column_names,
+            dtype=get_dataset_dtype(),
+        )
@@ -8,15 +8,40 @@ from __future__ import print_function
 import numpy as np
 import pandas as pd
 
+from collections import deque
 from typing import Union, List, Type
-from scipy.stats import percentileofscore
-from .base import Expression, ExpressionOps, Feature, PFeature
+from .base import Expression, ExpressionOps, ExpressionState, Feature, PFeature, IndexedArray
 from ..log import get_module_logger
 from ..utils import get_callable_kwargs
+from ..utils.resam import RESAM_METHODS, get_bucket_starts, get_resam_bucket, resam_bucket_reduce
 
 try:
-    from ._libs.rolling import rolling_slope, rolling_rsquare, rolling_resi
-    from ._libs.expanding import expanding_slope, expanding_rsquare, expanding_resi
+    from ._libs.rolling import (
+        Slope as SlopeKernel,
+        Rsquare as RsquareKernel,
+        Resi as ResiKernel,
+        rolling_slope,
+        rolling_rsquare,
+        rolling_resi,
+        rolling_rank,
+        rolling_quantile,
+        rolling_mad,
+        rolling_wma,
+        rolling_idxmax,
+        rolling_idxmin,
+    )
+    from ._libs.expanding import (
+        expanding_slope,
+        expanding_rsquare,
+        expanding_resi,
+        expanding_rank,
+        expanding_quantile,
+        expanding_mad,
+        expanding_wma,
+        expanding_ema,
+        expanding_idxmax,
+        expanding_idxmin,
+    )
 except ImportError:
     print(
         "#### Do not import qlib package in the repository directory in case of importing qlib from . without compiling #####"
@@ -33,6 +58,325 @@ except ValueError:
 np.seterr(invalid="ignore")
 
 
+#################### Panel ####################
+# In the panel mode (see `qlib.data.compiler.ExpressionDAG.evaluate_panel`), the sub-expressions return pd.DataFrame
+# with the calendar index and the instrument columns, and the operators calculate all the instruments at once.
+
+
+def _broadcast_panel(df: pd.DataFrame, instruments) -> pd.DataFrame:
+    """share the only column of the panel with all the instruments"""
+    return pd.DataFrame(np.repeat(df.values, len(instruments), axis=1), index=df.index, columns=instruments)
+
+
+def _apply_columns(df: pd.DataFrame, func) -> pd.DataFrame:
+    """apply the 1-D kernel (e.g. `rolling_slope`) to each column of the panel"""
+    return pd.DataFrame({column: func(df[column].values) for column in df.columns}, index=df.index, columns=df.columns)
+
+
+#################### Numpy-native ####################
+# When calculated by `qlib.data.compiler.ExpressionDAG.evaluate`, the sub-expressions return `IndexedArray`, and the
+# operators align them by the offsets of their indexes. The cases in which pandas changes the dtypes or raises errors
+# are left to the pandas implementations (i.e. `_load_internal`) to keep the same results.
+
+
+# the numpy functions of the comparison operators
+_COMPARISONS = ("greater", "greater_equal", "less", "less_equal", "equal", "not_equal")
+
+
+def _load_operand(feature, instrument, start_index, end_index, *args):
+    if isinstance(feature, Expression):
+        return feature.load_array(instrument, start_index, end_index, *args)
+    return feature  # numeric value
+
+
+def _align_arrays(operands: list, pad: bool = True):
+    """align the operands (`IndexedArray` or numeric values) to the union of their indexes
+
+    It is the same as joining the indexes of pd.Series, the values out of the index of each operand are NaN.
+
+    Returns
+    -------
+    Optional[Tuple[int, list]]
+        the start index of the union and the aligned values of the operands, or None if it is not supported:
+
+        - the values are not float, whose dtypes would be changed by pandas;
+        - the union of the indexes has gaps;
+        - `pad` is False (e.g. comparing pd.Series requires the same indexes) and the indexes are different.
+    """
+    arrays = [data for data in operands if isinstance(data, IndexedArray)]
+    if any(data.values.dtype.kind != "f" for data in arrays):
+        return None
+    non_empty = sorted((data for data in arrays if len(data) > 0), key=lambda data: data.start_index)
+    if len(non_empty) == 0:
+        return 0, [data.values if isinstance(data, IndexedArray) else data for data in operands]
+    start_index, end_index = non_empty[0].start_index, max(data.end_index for data in non_empty)
+    length = end_index - start_index + 1
+    if all(data.start_index == start_index and len(data) == length for data in arrays):
+        return start_index, [data.values if isinstance(data, IndexedArray) else data for data in operands]
+    if not pad:
+        return None
+    covered = start_index - 1
+    for data in non_empty:
+        if data.start_index > covered + 1:
+            return None
+        covered = max(covered, data.end_index)
+    values = []
+    for data in operands:
+        if isinstance(data, IndexedArray):
+            padded = np.full(length, np.nan, dtype=data.values.dtype)
+            padded[data.start_index - start_index : data.start_index - start_index + len(data)] = data.values
+            data = padded
+        values.append(data)
+    return start_index, values
+
+
+def _apply_array(data: IndexedArray, func) -> IndexedArray:
+    """apply the 1-D kernel (e.g. `rolling_slope`) to the values"""
+    return IndexedArray(data.start_index, func(data.values))
+
+
+def _shift(values: np.ndarray, N: int) -> np.ndarray:
+    """the same as `pd.Series.shift` for float values"""
+    res = np.full_like(values, np.nan)
+    if 0 < N < len(values):
+        res[N:] = values[:-N]
+    elif -len(values) < N < 0:
+        res[:N] = values[-N:]
+    elif N == 0:
+        res[:] = values
+    return res
+
+
+#################### Incremental ####################
+# The states of the operators in the incremental evaluation (see `qlib.data.incremental`). `step` calculates the value
+# of the next bar in O(1) (amortized) by updating the statistics of the window with the values entering and leaving it,
+# which follows the algorithms of pandas (e.g. the Kahan summation and Welford's method), so the results are the same as
+# the pandas implementations up to the rounding errors.
+
+
+def _tail(history: np.ndarray, size: int) -> list:
+    """the last `size` values of the history, padded with NaN at the head"""
+    values = list(history[-size:]) if size > 0 else []
+    nan = history.dtype.type(np.nan) if history.dtype.kind == "f" else np.nan
+    return [nan] * (size - len(values)) + values
+
+
+def _sign(value):
+    return np.sign(np.float32(value))
+
+
+def _where(cond, left, right):
+    return np.where(cond, left, right)[()]
+
+
+class _ElementState(ExpressionState):
+    """The state of the element-wise operators, whose values only depend on the operands in the same bar"""
+
+    def __init__(self, func, operands: list):
+        self.func = func
+        # the sub-expressions are replaced by their values in each bar
+        self.operands = [None if isinstance(operand, Expression) else operand for operand in operands]
+
+    def step(self, *values):
+        values = iter(values)
+        return self.func(*[next(values) if operand is None else operand for operand in self.operands])
+
+
+class _RefState(ExpressionState):
+    """The state of `Ref` and `Delta`, which keeps the last N values"""
+
+    def __init__(self, history: np.ndarray, N: int, delta: bool = False):
+        self.values = deque(_tail(history, N), maxlen=N)
+        self.delta = delta
+
+    def step(self, value):
+        ref = self.values[0]
+        self.values.append(value)
+        return value - ref if self.delta else ref
+
+
+class _MomentState(ExpressionState):
+    """The state of the rolling `sum`, `mean`, `count`, `var` and `std`
+
+    The sum is updated by the Kahan summation and the variance by Welford's method as `roll_sum`, `roll_mean` and
+    `roll_var` of pandas, including the special cases of the windows with the same values.
+    """
+
+    def __init__(self, history: np.ndarray, N: int, func: str):
+        self.N = N
+        self.func = func
+        self.window = deque()
+        self.nobs, self.neg_ct, self.n_same, self.prev_value = 0, 0, 0, np.nan
+        self.sum_x, self.sum_add, self.sum_remove = 0.0, 0.0, 0.0
+        self.mean_x, self.ssqdm_x, self.var_add, self.var_remove = 0.0, 0.0, 0.0, 0.0
+        for value in _tail(history, N):
+            self.step(value)
+
+    def _add(self, val: float):
+        self.nobs += 1
+        self.neg_ct += np.signbit(val)
+        if val == self.prev_value:
+            self.n_same += 1
+        else:
+            self.n_same, self.prev_value = 1, val
+        y = val - self.sum_add
+        t = self.sum_x + y
+        self.sum_add = t - self.sum_x - y
+        self.sum_x = t
+        prev_mean = self.mean_x - self.var_add
+        y = val - self.var_add
+        t = y - self.mean_x
+        self.var_add = t + self.mean_x - y
+        self.mean_x += t / self.nobs
+        self.ssqdm_x += (val - prev_mean) * (val - self.mean_x)
+
+    def _remove(self, val: float):
+        self.nobs -= 1
+        self.neg_ct -= np.signbit(val)
+        y = -val - self.sum_remove
+        t = self.sum_x + y
+        self.sum_remove = t - self.sum_x - y
+        self.sum_x = t
+        if self.nobs:
+            prev_mean = self.mean_x - self.var_remove
+            y = val - self.var_remove
+            t = y - self.mean_x
+            self.var_remove = t + self.mean_x - y
+            self.mean_x -= t / self.nobs
+            self.ssqdm_x -= (val - prev_mean) * (val - self.mean_x)
+        else:
+            self.mean_x, self.ssqdm_x = 0.0, 0.0
+
+    def update(self, value):
+        """update the window with the next value"""
+        value = float(value)
+        self.window.append(value)
+        if len(self.window) > self.N:
+            val = self.window.popleft()
+            if val == val:
+                self._remove(val)
+        if value == value:
+            self._add(value)
+
+    def result(self) -> np.float64:
+        nobs, same = self.nobs, self.n_same >= self.nobs
+        if self.func == "count":
+            return np.float64(nobs)
+        if self.func in ("var", "std"):
+            if nobs < 2:
+                return np.float64(np.nan)
+            var = 0.0 if same else max(self.ssqdm_x / (nobs - 1), 0.0)
+            return np.float64(var if self.func == "var" else np.sqrt(var))
+        if nobs == 0:
+            return np.float64(np.nan)
+        if self.func == "sum":
+            return np.float64(self.prev_value * nobs if same else self.sum_x)
+        mean = self.prev_value if same else self.sum_x / nobs
+        if (self.neg_ct == 0 and mean < 0) or (self.neg_ct == nobs and mean > 0):
+            mean = 0.0
+        return np.float64(mean)
+
+    def step(self, value):
+        self.update(value)
+        return self.result()
+
+
+class _ExtremumState(ExpressionState):
+    """The state of the rolling `max` and `min`, which keeps the monotonic candidates in the window"""
+
+    def __init__(self, history: np.ndarray, N: int, func: str):
+        self.N = N
+        self.sign = 1.0 if func == "max" else -1.0
+        self.index = 0
+        self.candidates = deque()
+        for value in _tail(history, N):
+            self.step(value)
+
+    def step(self, value):
+        self.index += 1
+        if value == value:
+            key = float(value) * self.sign
+            while self.candidates and self.candidates[-1][1] <= key:
+                self.candidates.pop()
+            self.candidates.append((self.index, key))
+        while self.candidates and self.candidates[0][0] <= self.index - self.N:
+            self.candidates.popleft()
+        return np.float64(self.candidates[0][1] * self.sign if self.candidates else np.nan)
+
+
+class _KernelState(ExpressionState):
+    """The state of the operators implemented by the rolling classes of `qlib.data._libs.rolling`"""
+
+    def __init__(self, history: np.ndarray, N: int, kernel, mask_constant: bool = False):
+        self.kernel = kernel(N)
+        # `Rsquare` masks the windows in which the values are constant
+        self.std = _MomentState(history, N, "std") if mask_constant else None
+        for value in history[-N:]:
+            self.kernel.update(value)
+
+    def step(self, value):
+        res = np.float64(self.kernel.update(value))
+        if self.std is not None and np.isclose(self.std.step(value), 0, atol=2e-05):
+            return np.float64(np.nan)
+        return res
+
+
+class _EWMState(ExpressionState):
+    """The state of the exponentially weighted mean (the same as `pd.Series.ewm(alpha=alpha).mean()`)"""
+
+    def __init__(self, history: np.ndarray, alpha: float):
+        self.decay = 1 - alpha
+        self.weighted = np.nan
+        self.old_wt = 1.0
+        for value in history:
+            self.step(value)
+
+    def step(self, value):
+        value = float(value)
+        if self.weighted == self.weighted:
+            self.old_wt *= self.decay
+            if value == value:
+                if self.weighted != value:
+                    self.weighted = (self.old_wt * self.weighted + value) / (self.old_wt + 1.0)
+                self.old_wt += 1.0
+        elif value == value:
+            self.weighted = value
+        return np.float64(self.weighted)
+
+
+class _PairMomentState(ExpressionState):
+    """The state of the rolling `cov` and `corr`, which follow the formulas of pandas with the moments of the values
+    in the window where both the operands are valid"""
+
+    def __init__(self, history_left: np.ndarray, history_right: np.ndarray, N: int, func: str):
+        self.func = func
+        self.mean_xy, self.mean_x, self.mean_y = (_MomentState(np.array([]), N, "mean") for _ in range(3))
+        self.var_x, self.var_y = _MomentState(np.array([]), N, "var"), _MomentState(np.array([]), N, "var")
+        # `Corr` masks the windows in which the operands are constant
+        self.std_left, self.std_right = _MomentState(np.array([]), N, "std"), _MomentState(np.array([]), N, "std")
+        for left, right in zip(_tail(history_left, N), _tail(history_right, N)):
+            self.step(left, right)
+
+    def step(self, left, right):
+        left, right = float(left), float(right)
+        x, y = left + 0 * right, right + 0 * left
+        for state, value in [(self.mean_xy, x * y), (self.mean_x, x), (self.mean_y, y)]:
+            state.update(value)
+        count = np.float64(self.mean_xy.nobs)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            res = (self.mean_xy.result() - self.mean_x.result() * self.mean_y.result()) * (count / (count - 1))
+            if self.func == "cov":
+                return res
+            self.var_x.update(x)
+            self.var_y.update(y)
+            self.std_left.update(left)
+            self.std_right.update(right)
+            res = res / (self.var_x.result() * self.var_y.result()) ** 0.5
+        if np.isclose(self.std_left.result(), 0, atol=2e-05) or np.isclose(self.std_right.result(), 0, atol=2e-05):
+            return np.float64(np.nan)
+        return res
+
+
 #################### Element-Wise Operator ####################
 class ElemOperator(ExpressionOps):
     """Element-wise Operator
@@ -93,6 +437,13 @@ class ChangeInstrument(ElemOperator):
     def _load_internal(self, instrument, start_index, end_index, *args):
         return self.feature.load(instrument, start_index, end_index, *args)
 
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        # the feature is calculated for the new instrument only, and it is shared by all the instruments
+        return _broadcast_panel(self.feature.load(self.instrument, start_index, end_index, *args), instruments)
+
+    def _load_array_internal(self, instrument, start_index, end_index, *args):
+        return self.feature.load_array(instrument, start_index, end_index, *args)
+
 
 class NpElemOperator(ElemOperator):
     """Numpy Element-wise Operator
@@ -118,6 +469,15 @@ class NpElemOperator(ElemOperator):
         series = self.feature.load(instrument, start_index, end_index, *args)
         return getattr(np, self.func)(series)
 
+    def _load_array_internal(self, instrument, start_index, end_index, *args):
+        data = self.feature.load_array(instrument, start_index, end_index, *args)
+        if data.values.dtype == object:
+            return super()._load_array_internal(instrument, start_index, end_index, *args)
+        return IndexedArray(data.start_index, getattr(np, self.func)(data.values))
+
+    def init_state(self, history):
+        return _ElementState(getattr(np, self.func), [self.feature])
+
 
 class Abs(NpElemOperator):
     """Feature Absolute Value
@@ -163,6 +523,13 @@ class Sign(NpElemOperator):
         series = series.astype(np.float32)
         return getattr(np, self.func)(series)
 
+    def _load_array_internal(self, instrument, start_index, end_index, *args):
+        data = self.feature.load_array(instrument, start_index, end_index, *args)
+        return IndexedArray(data.start_index, getattr(np, self.func)(data.values.astype(np.float32)))
+
+    def init_state(self, history):
+        return _ElementState(_sign, [self.feature])
+
 
 class Log(NpElemOperator):
     """Feature Log
@@ -208,6 +575,16 @@ class Mask(NpElemOperator):
     def _load_internal(self, instrument, start_index, end_index, *args):
         return self.feature.load(self.instrument, start_index, end_index, *args)
 
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        return _broadcast_panel(self.feature.load(self.instrument, start_index, end_index, *args), instruments)
+
+    def _load_array_internal(self, instrument, start_index, end_index, *args):
+        return self.feature.load_array(self.instrument, start_index, end_index, *args)
+
+    def init_state(self, history):
+        # the feature is calculated for another instrument
+        return ExpressionOps.init_state(self, history)
+
 
 class Not(NpElemOperator):
     """Not Operator
@@ -334,6 +711,22 @@ class NpPairOperator(PairOperator):
                 get_module_logger("ops").debug(warning_info)
         return res
 
+    def _load_array_internal(self, instrument, start_index, end_index, *args):
+        if self.func in ("bitwise_and", "bitwise_or"):
+            # the logical operators of pandas handle the dtypes differently from numpy
+            return super()._load_array_internal(instrument, start_index, end_index, *args)
+        left = _load_operand(self.feature_left, instrument, start_index, end_index, *args)
+        right = _load_operand(self.feature_right, instrument, start_index, end_index, *args)
+        # the comparisons of pd.Series require the same indexes, and the other operators join the indexes
+        aligned = _align_arrays([left, right], pad=self.func not in _COMPARISONS)
+        if aligned is None:
+            return super()._load_array_internal(instrument, start_index, end_index, *args)
+        start_index, (values_left, values_right) = aligned
+        return IndexedArray(start_index, getattr(np, self.func)(values_left, values_right))
+
+    def init_state(self, *history):
+        return _ElementState(getattr(np, self.func), [self.feature_left, self.feature_right])
+
 
 class Power(NpPairOperator):
     """Power Operator
@@ -670,6 +1063,31 @@ class If(ExpressionOps):
         series = pd.Series(np.where(series_cond, series_left, series_right), index=series_cond.index)
         return series
 
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        df_cond = self.condition.load(instruments, start_index, end_index, *args)
+        df_left, df_right = self.feature_left, self.feature_right
+        if isinstance(df_left, (Expression,)):
+            df_left = df_left.load(instruments, start_index, end_index, *args)
+        if isinstance(df_right, (Expression,)):
+            df_right = df_right.load(instruments, start_index, end_index, *args)
+        return pd.DataFrame(np.where(df_cond, df_left, df_right), index=df_cond.index, columns=df_cond.columns)
+
+    def _load_array_internal(self, instrument, start_index, end_index, *args):
+        # the values are selected by their positions without aligning the indexes, which is the same as `np.where`
+        # on pd.Series
+        cond = self.condition.load_array(instrument, start_index, end_index, *args)
+        left, right = (
+            data.values if isinstance(data, IndexedArray) else data
+            for data in (
+                _load_operand(self.feature_left, instrument, start_index, end_index, *args),
+                _load_operand(self.feature_right, instrument, start_index, end_index, *args),
+            )
+        )
+        return IndexedArray(cond.start_index, np.where(cond.values, left, right))
+
+    def init_state(self, *history):
+        return _ElementState(_where, [self.condition, self.feature_left, self.feature_right])
+
     def get_longest_back_rolling(self):
         if isinstance(self.feature_left, (Expression,)):
             left_br = self.feature_left.get_longest_back_rolling()
@@ -754,6 +1172,17 @@ class Rolling(ExpressionOps):
         # series[isnull] = np.nan
         return series
 
+    def init_state(self, history):
+        # the operators calculated by the methods of pandas in `_load_internal`
+        if isinstance(self.N, float) and 0 < self.N < 1:
+            if self.func in ("sum", "mean", "count", "var", "std", "skew", "kurt", "max", "min", "median"):
+                return _EWMState(history, self.N)
+        elif self.N > 0 and self.func in ("sum", "mean", "count", "var", "std"):
+            return _MomentState(history, self.N, self.func)
+        elif self.N > 0 and self.func in ("max", "min"):
+            return _ExtremumState(history, self.N, self.func)
+        return super().init_state(history)
+
     def get_longest_back_rolling(self):
         if self.N == 0:
             return np.inf
@@ -808,6 +1237,17 @@ class Ref(Rolling):
             series = series.shift(self.N)  # copy
         return series
 
+    def _load_array_internal(self, instrument, start_index, end_index, *args):
+        data = self.feature.load_array(instrument, start_index, end_index, *args)
+        if self.N == 0 or data.values.dtype.kind != "f":
+            return super()._load_array_internal(instrument, start_index, end_index, *args)
+        return IndexedArray(data.start_index, _shift(data.values, self.N))
+
+    def init_state(self, history):
+        if self.N > 0:
+            return _RefState(history, self.N)
+        return super().init_state(history)
+
     def get_longest_back_rolling(self):
         if self.N == 0:
             return np.inf
@@ -990,11 +1430,21 @@ class IdxMax(Rolling):
     def _load_internal(self, instrument, start_index, end_index, *args):
         series = self.feature.load(instrument, start_index, end_index, *args)
         if self.N == 0:
-            series = series.expanding(min_periods=1).apply(lambda x: x.argmax() + 1, raw=True)
+            series = pd.Series(expanding_idxmax(series.values), index=series.index)
         else:
-            series = series.rolling(self.N, min_periods=1).apply(lambda x: x.argmax() + 1, raw=True)
+            series = pd.Series(rolling_idxmax(series.values, self.N), index=series.index)
         return series
 
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        df = self.feature.load(instruments, start_index, end_index, *args)
+        return _apply_columns(df, lambda values: rolling_idxmax(values, self.N))
+
+    def _load_array_internal(self, instrument, start_index, end_index, *args):
+        data = self.feature.load_array(instrument, start_index, end_index, *args)
+        if self.N == 0:
+            return _apply_array(data, expanding_idxmax)
+        return _apply_array(data, lambda values: rolling_idxmax(values, self.N))
+
 
 class Min(Rolling):
     """Rolling Min
@@ -1038,11 +1488,21 @@ class IdxMin(Rolling):
     def _load_internal(self, instrument, start_index, end_index, *args):
         series = self.feature.load(instrument, start_index, end_index, *args)
         if self.N == 0:
-            series = series.expanding(min_periods=1).apply(lambda x: x.argmin() + 1, raw=True)
+            series = pd.Series(expanding_idxmin(series.values), index=series.index)
         else:
-            series = series.rolling(self.N, min_periods=1).apply(lambda x: x.argmin() + 1, raw=True)
+            series = pd.Series(rolling_idxmin(series.values, self.N), index=series.index)
         return series
 
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        df = self.feature.load(instruments, start_index, end_index, *args)
+        return _apply_columns(df, lambda values: rolling_idxmin(values, self.N))
+
+    def _load_array_internal(self, instrument, start_index, end_index, *args):
+        data = self.feature.load_array(instrument, start_index, end_index, *args)
+        if self.N == 0:
+            return _apply_array(data, expanding_idxmin)
+        return _apply_array(data, lambda values: rolling_idxmin(values, self.N))
+
 
 class Quantile(Rolling):
     """Rolling Quantile
@@ -1070,11 +1530,21 @@ class Quantile(Rolling):
     def _load_internal(self, instrument, start_index, end_index, *args):
         series = self.feature.load(instrument, start_index, end_index, *args)
         if self.N == 0:
-            series = series.expanding(min_periods=1).quantile(self.qscore)
+            series = pd.Series(expanding_quantile(series.values, self.qscore), index=series.index)
         else:
-            series = series.rolling(self.N, min_periods=1).quantile(self.qscore)
+            series = pd.Series(rolling_quantile(series.values, self.N, self.qscore), index=series.index)
         return series
 
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        df = self.feature.load(instruments, start_index, end_index, *args)
+        return _apply_columns(df, lambda values: rolling_quantile(values, self.N, self.qscore))
+
+    def _load_array_internal(self, instrument, start_index, end_index, *args):
+        data = self.feature.load_array(instrument, start_index, end_index, *args)
+        if self.N == 0:
+            return _apply_array(data, lambda values: expanding_quantile(values, self.qscore))
+        return _apply_array(data, lambda values: rolling_quantile(values, self.N, self.qscore))
+
 
 class Med(Rolling):
     """Rolling Median
@@ -1117,18 +1587,22 @@ class Mad(Rolling):
 
     def _load_internal(self, instrument, start_index, end_index, *args):
         series = self.feature.load(instrument, start_index, end_index, *args)
-        # TODO: implement in Cython
-
-        def mad(x):
-            x1 = x[~np.isnan(x)]
-            return np.mean(np.abs(x1 - x1.mean()))
-
         if self.N == 0:
-            series = series.expanding(min_periods=1).apply(mad, raw=True)
+            series = pd.Series(expanding_mad(series.values), index=series.index)
         else:
-            series = series.rolling(self.N, min_periods=1).apply(mad, raw=True)
+            series = pd.Series(rolling_mad(series.values, self.N), index=series.index)
         return series
 
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        df = self.feature.load(instruments, start_index, end_index, *args)
+        return _apply_columns(df, lambda values: rolling_mad(values, self.N))
+
+    def _load_array_internal(self, instrument, start_index, end_index, *args):
+        data = self.feature.load_array(instrument, start_index, end_index, *args)
+        if self.N == 0:
+            return _apply_array(data, expanding_mad)
+        return _apply_array(data, lambda values: rolling_mad(values, self.N))
+
 
 class Rank(Rolling):
     """Rolling Rank (Percentile)
@@ -1149,23 +1623,23 @@ class Rank(Rolling):
     def __init__(self, feature, N):
         super(Rank, self).__init__(feature, N, "rank")
 
-    # for compatiblity of python 3.7, which doesn't support pandas 1.4.0+ which implements Rolling.rank
     def _load_internal(self, instrument, start_index, end_index, *args):
         series = self.feature.load(instrument, start_index, end_index, *args)
+        if self.N == 0:
+            series = pd.Series(expanding_rank(series.values), index=series.index)
+        else:
+            series = pd.Series(rolling_rank(series.values, self.N), index=series.index)
+        return series
 
-        rolling_or_expending = series.expanding(min_periods=1) if self.N == 0 else series.rolling(self.N, min_periods=1)
-        if hasattr(rolling_or_expending, "rank"):
-            return rolling_or_expending.rank(pct=True)
-
-        def rank(x):
-            if np.isnan(x[-1]):
-                return np.nan
-            x1 = x[~np.isnan(x)]
-            if x1.shape[0] == 0:
-                return np.nan
-            return percentileofscore(x1, x1[-1]) / 100
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        df = self.feature.load(instruments, start_index, end_index, *args)
+        return _apply_columns(df, lambda values: rolling_rank(values, self.N))
 
-        return rolling_or_expending.apply(rank, raw=True)
+    def _load_array_internal(self, instrument, start_index, end_index, *args):
+        data = self.feature.load_array(instrument, start_index, end_index, *args)
+        if self.N == 0:
+            return _apply_array(data, expanding_rank)
+        return _apply_array(data, lambda values: rolling_rank(values, self.N))
 
 
 class Count(Rolling):
@@ -1215,6 +1689,17 @@ class Delta(Rolling):
             series = series - series.shift(self.N)
         return series
 
+    def _load_array_internal(self, instrument, start_index, end_index, *args):
+        data = self.feature.load_array(instrument, start_index, end_index, *args)
+        if self.N == 0 or data.values.dtype.kind != "f":
+            return super()._load_array_internal(instrument, start_index, end_index, *args)
+        return IndexedArray(data.start_index, data.values - _shift(data.values, self.N))
+
+    def init_state(self, history):
+        if self.N > 0:
+            return _RefState(history, self.N, delta=True)
+        return super().init_state(history)
+
 
 # TODO:
 # support pair-wise rolling like `Slope(A, B, N)`
@@ -1253,6 +1738,21 @@ class Slope(Rolling):
             series = pd.Series(rolling_slope(series.values, self.N), index=series.index)
         return series
 
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        df = self.feature.load(instruments, start_index, end_index, *args)
+        return _apply_columns(df, lambda values: rolling_slope(values, self.N))
+
+    def _load_array_internal(self, instrument, start_index, end_index, *args):
+        data = self.feature.load_array(instrument, start_index, end_index, *args)
+        if self.N == 0:
+            return _apply_array(data, expanding_slope)
+        return _apply_array(data, lambda values: rolling_slope(values, self.N))
+
+    def init_state(self, history):
+        if self.N > 0:
+            return _KernelState(history, self.N, SlopeKernel)
+        return super().init_state(history)
+
 
 class Rsquare(Rolling):
     """Rolling R-value Square
@@ -1282,6 +1782,24 @@ class Rsquare(Rolling):
             series.loc[np.isclose(_series.rolling(self.N, min_periods=1).std(), 0, atol=2e-05)] = np.nan
         return series
 
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        df = self.feature.load(instruments, start_index, end_index, *args)
+        res = _apply_columns(df, lambda values: rolling_rsquare(values, self.N))
+        return res.mask(np.isclose(df.rolling(self.N, min_periods=1).std(), 0, atol=2e-05))
+
+    def _load_array_internal(self, instrument, start_index, end_index, *args):
+        data = self.feature.load_array(instrument, start_index, end_index, *args)
+        if self.N == 0:
+            return _apply_array(data, expanding_rsquare)
+        res = rolling_rsquare(data.values, self.N)
+        res[np.isclose(pd.Series(data.values).rolling(self.N, min_periods=1).std(), 0, atol=2e-05)] = np.nan
+        return IndexedArray(data.start_index, res)
+
+    def init_state(self, history):
+        if self.N > 0:
+            return _KernelState(history, self.N, RsquareKernel, mask_constant=True)
+        return super().init_state(history)
+
 
 class Resi(Rolling):
     """Rolling Regression Residuals
@@ -1310,6 +1828,21 @@ class Resi(Rolling):
             series = pd.Series(rolling_resi(series.values, self.N), index=series.index)
         return series
 
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        df = self.feature.load(instruments, start_index, end_index, *args)
+        return _apply_columns(df, lambda values: rolling_resi(values, self.N))
+
+    def _load_array_internal(self, instrument, start_index, end_index, *args):
+        data = self.feature.load_array(instrument, start_index, end_index, *args)
+        if self.N == 0:
+            return _apply_array(data, expanding_resi)
+        return _apply_array(data, lambda values: rolling_resi(values, self.N))
+
+    def init_state(self, history):
+        if self.N > 0:
+            return _KernelState(history, self.N, ResiKernel)
+        return super().init_state(history)
+
 
 class WMA(Rolling):
     """Rolling WMA
@@ -1332,19 +1865,22 @@ class WMA(Rolling):
 
     def _load_internal(self, instrument, start_index, end_index, *args):
         series = self.feature.load(instrument, start_index, end_index, *args)
-        # TODO: implement in Cython
-
-        def weighted_mean(x):
-            w = np.arange(len(x)) + 1
-            w = w / w.sum()
-            return np.nanmean(w * x)
-
         if self.N == 0:
-            series = series.expanding(min_periods=1).apply(weighted_mean, raw=True)
+            series = pd.Series(expanding_wma(series.values), index=series.index)
         else:
-            series = series.rolling(self.N, min_periods=1).apply(weighted_mean, raw=True)
+            series = pd.Series(rolling_wma(series.values, self.N), index=series.index)
         return series
 
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        df = self.feature.load(instruments, start_index, end_index, *args)
+        return _apply_columns(df, lambda values: rolling_wma(values, self.N))
+
+    def _load_array_internal(self, instrument, start_index, end_index, *args):
+        data = self.feature.load_array(instrument, start_index, end_index, *args)
+        if self.N == 0:
+            return _apply_array(data, expanding_wma)
+        return _apply_array(data, lambda values: rolling_wma(values, self.N))
+
 
 class EMA(Rolling):
     """Rolling Exponential Mean (EMA)
@@ -1367,21 +1903,21 @@ class EMA(Rolling):
 
     def _load_internal(self, instrument, start_index, end_index, *args):
         series = self.feature.load(instrument, start_index, end_index, *args)
-
-        def exp_weighted_mean(x):
-            a = 1 - 2 / (1 + len(x))
-            w = a ** np.arange(len(x))[::-1]
-            w /= w.sum()
-            return np.nansum(w * x)
-
         if self.N == 0:
-            series = series.expanding(min_periods=1).apply(exp_weighted_mean, raw=True)
+            series = pd.Series(expanding_ema(series.values), index=series.index)
         elif 0 < self.N < 1:
             series = series.ewm(alpha=self.N, min_periods=1).mean()
         else:
             series = series.ewm(span=self.N, min_periods=1).mean()
         return series
 
+    def init_state(self, history):
+        if 0 < self.N < 1:
+            return _EWMState(history, self.N)
+        if self.N > 0:
+            return _EWMState(history, 2 / (1 + self.N))
+        return super().init_state(history)
+
 
 #################### Pair-Wise Rolling ####################
 class PairRolling(ExpressionOps):
@@ -1432,6 +1968,27 @@ class PairRolling(ExpressionOps):
             series = getattr(series_left.rolling(self.N, min_periods=1), self.func)(series_right)
         return series
 
+    def _load_array_internal(self, instrument, start_index, end_index, *args):
+        left = _load_operand(self.feature_left, instrument, start_index, end_index, *args)
+        right = _load_operand(self.feature_right, instrument, start_index, end_index, *args)
+        aligned = None
+        if isinstance(left, IndexedArray) and isinstance(right, IndexedArray):
+            aligned = _align_arrays([left, right])
+        if aligned is None:
+            return super()._load_array_internal(instrument, start_index, end_index, *args)
+        start_index, (values_left, values_right) = aligned
+        series_left, series_right = pd.Series(values_left), pd.Series(values_right)
+        if self.N == 0:
+            series = getattr(series_left.expanding(min_periods=1), self.func)(series_right)
+        else:
+            series = getattr(series_left.rolling(self.N, min_periods=1), self.func)(series_right)
+        return IndexedArray(start_index, series.values)
+
+    def init_state(self, *history):
+        if self.N > 0 and len(history) == 2 and self.func in ("cov", "corr"):
+            return _PairMomentState(history[0], history[1], self.N, self.func)
+        return super().init_state(*history)
+
     def get_longest_back_rolling(self):
         if self.N == 0:
             return np.inf
@@ -1497,6 +2054,31 @@ class Corr(PairRolling):
         ] = np.nan
         return res
 
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        res: pd.DataFrame = super(Corr, self)._load_internal(instruments, start_index, end_index, *args)
+        df_left = self.feature_left.load(instruments, start_index, end_index, *args)
+        df_right = self.feature_right.load(instruments, start_index, end_index, *args)
+        return res.mask(
+            np.isclose(df_left.rolling(self.N, min_periods=1).std(), 0, atol=2e-05)
+            | np.isclose(df_right.rolling(self.N, min_periods=1).std(), 0, atol=2e-05)
+        )
+
+    def _load_array_internal(self, instrument, start_index, end_index, *args):
+        left = self.feature_left.load_array(instrument, start_index, end_index, *args)
+        right = self.feature_right.load_array(instrument, start_index, end_index, *args)
+        # the std of the features are masked by their positions, which requires the same indexes
+        aligned = _align_arrays([left, right], pad=False)
+        if self.N == 0 or aligned is None:
+            return IndexedArray.from_series(self._load_internal(instrument, start_index, end_index, *args))
+        start_index, (values_left, values_right) = aligned
+        series_left, series_right = pd.Series(values_left), pd.Series(values_right)
+        res = series_left.rolling(self.N, min_periods=1).corr(series_right).values
+        res[
+            np.isclose(series_left.rolling(self.N, min_periods=1).std(), 0, atol=2e-05)
+            | np.isclose(series_right.rolling(self.N, min_periods=1).std(), 0, atol=2e-05)
+        ] = np.nan
+        return IndexedArray(start_index, res)
+
 
 class Cov(PairRolling):
     """Rolling Covariance
@@ -1520,6 +2102,135 @@ class Cov(PairRolling):
         super(Cov, self).__init__(feature_left, feature_right, N, "cov")
 
 
+#################### Cross-Sectional Operator ####################
+class CSOperator(ElemOperator):
+    """Cross-Sectional Operator
+
+    The value of an instrument in a bar is calculated with the values of the feature of all the instruments queried
+    in the bar (i.e. the cross section), like the processors `CSRankNorm` and `CSZScoreNorm`. The instruments out of
+    their spans and the missing values are excluded from the cross sections. The features are calculated for each
+    instrument first, and then the cross sections of all the bars are calculated at once by
+    `DatasetProvider.cross_sectional_processor`, so the operator can't be loaded for a single instrument.
+
+    Parameters
+    ----------
+    feature : Expression
+        feature instance
+
+    Returns
+    ----------
+    Expression
+        feature operation output
+    """
+
+    def _load_internal(self, instrument, start_index, end_index, *args):
+        raise ValueError(f"{self} depends on the cross sections of the instruments, which is supported by `D.features`")
+
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        df = self.feature.load(instruments, start_index, end_index, *args)
+        return self._cross_section(df.astype(np.float64))
+
+    def _cross_section(self, df: pd.DataFrame) -> pd.DataFrame:
+        """calculate the panel with the calendar index and the instrument columns row by row"""
+        raise NotImplementedError("Subclass of CSOperator must implement `_cross_section` method")
+
+
+class CSRank(CSOperator):
+    """Cross-Sectional Rank
+
+    Parameters
+    ----------
+    feature : Expression
+        feature instance
+
+    Returns
+    ----------
+    Expression
+        a feature instance with the percentile of the instrument in the cross section
+    """
+
+    def _cross_section(self, df):
+        return df.rank(axis=1, pct=True)
+
+
+class CSZScore(CSOperator):
+    """Cross-Sectional ZScore
+
+    Parameters
+    ----------
+    feature : Expression
+        feature instance
+
+    Returns
+    ----------
+    Expression
+        a feature instance with the value normalized by the mean and the std of the cross section
+    """
+
+    def _cross_section(self, df):
+        return df.sub(df.mean(axis=1), axis=0).div(df.std(axis=1), axis=0)
+
+
+class CSDemean(CSOperator):
+    """Cross-Sectional Demean
+
+    Parameters
+    ----------
+    feature : Expression
+        feature instance
+
+    Returns
+    ----------
+    Expression
+        a feature instance with the value minus the mean of the cross section
+    """
+
+    def _cross_section(self, df):
+        return df.sub(df.mean(axis=1), axis=0)
+
+
+class CSNeutralize(CSOperator):
+    """Cross-Sectional Neutralization
+
+    Parameters
+    ----------
+    feature : Expression
+        feature instance
+    group : Expression
+        the group of the instruments (e.g. the industry)
+
+    Returns
+    ----------
+    Expression
+        a feature instance with the value minus the mean of the instruments in the same group in the cross section
+    """
+
+    def __init__(self, feature, group):
+        super(CSNeutralize, self).__init__(feature)
+        self.group = group
+
+    def __str__(self):
+        return "{}({},{})".format(type(self).__name__, self.feature, self.group)
+
+    def get_longest_back_rolling(self):
+        return max(self.feature.get_longest_back_rolling(), self.group.get_longest_back_rolling())
+
+    def get_extended_window_size(self):
+        ll, lr = self.feature.get_extended_window_size()
+        rl, rr = self.group.get_extended_window_size()
+        return max(ll, rl), max(lr, rr)
+
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        df = self.feature.load(instruments, start_index, end_index, *args).astype(np.float64)
+        group = self.group.load(instruments, start_index, end_index, *args).reindex_like(df)
+        values = df.to_numpy()
+        rows = np.broadcast_to(np.arange(len(df))[:, None], values.shape)
+        # the instruments without groups are excluded
+        stacked = pd.DataFrame({"value": values.ravel(), "row": rows.ravel(), "group": group.to_numpy().ravel()})
+        mean = stacked.groupby(["row", "group"])["value"].transform("mean").to_numpy()
+        return pd.DataFrame((values.ravel() - mean).reshape(values.shape), index=df.index, columns=df.columns)
+
+
 #################### Operator which only support data with time index ####################
 # Convention
 # - The name of the operators in this section will start with "T"
@@ -1529,9 +2240,12 @@ class TResample(ElemOperator):
     def __init__(self, feature, freq, func):
         """
         Resampling the data to target frequency.
-        The resample function of pandas is used.
+        The resample function of pandas is used for the data with datetime index.
+        The data indexed by the calendar are reduced by the cached bucket map between the calendars
+        (`get_resam_bucket`) instead.
 
         - the timestamp will be at the start of the time span after resample.
+        - for the data indexed by the calendar, the index will be the first loaded bar of the time span.
 
         Parameters
         ----------
@@ -1548,18 +2262,26 @@ class TResample(ElemOperator):
         self.func = func
 
     def __str__(self):
-        return "{}({},{})".format(type(self).__name__, self.feature, self.freq)
+        return "{}({},{},{})".format(type(self).__name__, self.feature, self.freq, self.func)
 
     def _load_internal(self, instrument, start_index, end_index, *args):
         series = self.feature.load(instrument, start_index, end_index, *args)
 
         if series.empty:
             return series
-        else:
+        elif isinstance(series.index, pd.DatetimeIndex):
             if self.func == "sum":
                 return getattr(series.resample(self.freq), self.func)(min_count=1)
             else:
                 return getattr(series.resample(self.freq), self.func)()
+        else:
+            starts = get_bucket_starts(get_resam_bucket(args[0], self.freq)[series.index.values])
+            labels = series.index.values[starts]
+            if self.func in RESAM_METHODS:
+                values = resam_bucket_reduce(series.values, starts, self.func, min_count=int(self.func == "sum"))
+                return pd.Series(values, index=labels)
+            groups = np.repeat(labels, np.diff(np.append(starts, len(series))))
+            return getattr(series.groupby(groups), self.func)()
 
 
 TOpsList = [TResample]
@@ -1611,6 +2333,10 @@ OpsList = [
     IdxMax,
     IdxMin,
     If,
+    CSRank,
+    CSZScore,
+    CSDemean,
+    CSNeutralize,
     Feature,
     PFeature,
 ] + [TResample]
@@ -13,27 +13,135 @@ The calculation of both <period_time, feature> and <observe_time, feature> data
 2) concatenate all th collasped data, we will get data with format <observe_time, feature>.
 Qlib will use the operator `P` to perform the collapse.
 """
+from typing import Dict, Tuple
+
 import numpy as np
 import pandas as pd
+from qlib.data.base import Expression, PFeature
 from qlib.data.ops import ElemOperator
 from qlib.log import get_module_logger
 from .data import Cal
 
 
+class PITRevisions:
+    """The revision history of a PIT field of an instrument as an as-of table
+
+    The records `[date, period, value, _next]` of the `.data` file are appended in the order of their dates and each
+    revision of a period is linked to the next one (see `scripts/dump_pit.py`). So the data observed at a date are the
+    first `locate(date)` records, and the value of a period observed with the first `loc` records is the value of the
+    last record of the period among them. The records are sorted by `(period, position)`, so the values of many
+    `(period, loc)` are looked up at once by `np.searchsorted` instead of walking the links in the files.
+    """
+
+    def __init__(self, records: np.ndarray, quarterly: bool):
+        self.quarterly = quarterly
+        self.dates = records["date"]
+        self.periods = records["period"]
+        positions = np.arange(len(records), dtype=np.int64)
+        order = np.lexsort((positions, self.periods))
+        self._keys = self.periods[order].astype(np.int64) * (len(records) + 1) + positions[order]
+        self._values = records["value"][order]
+        self._first_periods = np.minimum.accumulate(self.periods) if len(records) > 0 else self.periods
+        self._last_periods = np.maximum.accumulate(self.periods) if len(records) > 0 else self.periods
+
+    def __len__(self):
+        return len(self.dates)
+
+    def locate(self, dates: np.ndarray) -> np.ndarray:
+        """the number of the records observed at the dates (int, e.g. 20190102)"""
+        return np.searchsorted(self.dates, dates, side="right")
+
+    def period_range(self, loc: int) -> Tuple[int, int]:
+        """the first and the latest periods observed with the first `loc` (> 0) records"""
+        return int(self._first_periods[loc - 1]), int(self._last_periods[loc - 1])
+
+    def last_periods(self, locs: np.ndarray) -> np.ndarray:
+        """the latest periods observed with the first `locs` records, 0 if nothing is observed"""
+        locs = np.asarray(locs)
+        res = np.zeros(locs.shape, dtype=np.int64)
+        observed = locs > 0
+        res[observed] = self._last_periods[locs[observed] - 1]
+        return res
+
+    def values(self, periods: np.ndarray, locs: np.ndarray) -> np.ndarray:
+        """the values of the periods observed with the first `locs` records, NaN if the periods are not published"""
+        periods, locs = np.broadcast_arrays(np.asarray(periods, dtype=np.int64), np.asarray(locs, dtype=np.int64))
+        shape, periods, locs = periods.shape, periods.ravel(), locs.ravel()
+        # the last record of the period before `loc`
+        idx = np.searchsorted(self._keys, periods * (len(self) + 1) + locs, side="left") - 1
+        found = idx >= 0
+        found[found] = self._keys[idx[found]] // (len(self) + 1) == periods[found]
+        res = np.full(periods.shape, np.nan, dtype=self._values.dtype)
+        res[found] = self._values[idx[found]]
+        return res.reshape(shape)
+
+
 class P(ElemOperator):
     def _load_internal(self, instrument, start_index, end_index, freq):
+        # To load expression accurately, more historical data are required
+        start_ws, end_ws = self.feature.get_extended_window_size()
+        if end_ws > 0:
+            raise ValueError(
+                "PIT database does not support referring to future period (e.g. expressions like `Ref('$$roewa_q', -1)` are not supported"
+            )
+        try:
+            revisions = self._load_revisions(instrument)
+        except NotImplementedError:
+            return self._load_daily(instrument, start_index, end_index, freq)
+        except FileNotFoundError:
+            get_module_logger("base").warning(f"WARN: period data not found for {str(self)}")
+            return pd.Series(dtype="float32", name=str(self))
+        if len(revisions) == 0:
+            return self._load_daily(instrument, start_index, end_index, freq)
+
+        _calendar = Cal.calendar(freq=freq)
+        dates = pd.DatetimeIndex(_calendar[start_index : end_index + 1])
+        dates = (dates.year * 10000 + dates.month * 100 + dates.day).values
+        locs = np.stack([revision.locate(dates) for revision in revisions.values()])
+        if type(self) is P and isinstance(self.feature, PFeature):  # pylint: disable=C0123
+            # the value of the latest period observed at each date
+            (revision,) = revisions.values()
+            resample_data = revision.values(revision.last_periods(locs[0]), locs[0])
+        else:
+            # the values only change with the revisions observed, so the feature is calculated once for each of them
+            changed = np.ones(len(dates), dtype=bool)
+            changed[1:] = (locs[:, 1:] != locs[:, :-1]).any(axis=0)
+            starts = np.flatnonzero(changed)
+            values = np.empty(len(starts), dtype="float32")
+            for i, offset in enumerate(starts):
+                s = self._load_feature(instrument, -start_ws, 0, _calendar[start_index + offset])
+                values[i] = s.iloc[-1] if len(s) > 0 else np.nan
+            resample_data = np.repeat(values, np.diff(np.append(starts, len(dates))))
+
+        resample_series = pd.Series(
+            resample_data, index=pd.RangeIndex(start_index, end_index + 1), dtype="float32", name=str(self)
+        )
+        return resample_series
+
+    def _load_revisions(self, instrument) -> Dict[str, PITRevisions]:
+        """the revision histories of the PIT fields in the feature"""
+        from .data import PITD  # pylint: disable=C0415
+
+        revisions = {}
+        stack = [self.feature]
+        while stack:
+            expression = stack.pop()
+            if isinstance(expression, PFeature):
+                field = str(expression)
+                if field not in revisions:
+                    revisions[field] = PITD.period_revisions(instrument, field)
+            else:
+                stack.extend(child for child in vars(expression).values() if isinstance(child, Expression))
+        return revisions
+
+    def _load_daily(self, instrument, start_index, end_index, freq):
+        """calculate the feature at each date, for the providers without the revision histories"""
         _calendar = Cal.calendar(freq=freq)
         resample_data = np.empty(end_index - start_index + 1, dtype="float32")
+        start_ws, _ = self.feature.get_extended_window_size()
 
         for cur_index in range(start_index, end_index + 1):
             cur_time = _calendar[cur_index]
-            # To load expression accurately, more historical data are required
-            start_ws, end_ws = self.feature.get_extended_window_size()
-            if end_ws > 0:
-                raise ValueError(
-                    "PIT database does not support referring to future period (e.g. expressions like `Ref('$$roewa_q', -1)` are not supported"
-                )
-
             # The calculated value will always the last element, so the end_offset is zero.
             try:
                 s = self._load_feature(instrument, -start_ws, 0, cur_time)
@@ -1,7 +1,7 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-from .storage import CalendarStorage, InstrumentStorage, FeatureStorage, CalVT, InstVT, InstKT
+from .storage import CalendarStorage, InstrumentStorage, FeatureStorage, PanelStorage, CalVT, InstVT, InstKT
 
 
-__all__ = ["CalendarStorage", "InstrumentStorage", "FeatureStorage", "CalVT", "InstVT", "InstKT"]
+__all__ = ["CalendarStorage", "InstrumentStorage", "FeatureStorage", "PanelStorage", "CalVT", "InstVT", "InstKT"]
@@ -1,9 +1,17 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
+import os
+import sys
+import mmap
+import time
+import zlib
 import struct
+import threading
 from pathlib import Path
-from typing import Iterable, Union, Dict, Mapping, Tuple, List
+from functools import partial
+from collections import OrderedDict
+from typing import Callable, Iterable, Union, Dict, Mapping, Tuple, List
 
 import numpy as np
 import pandas as pd
@@ -13,7 +21,7 @@ from qlib.utils.resam import resam_calendar
 from qlib.config import C
 from qlib.data.cache import H
 from qlib.log import get_module_logger
-from qlib.data.storage import CalendarStorage, InstrumentStorage, FeatureStorage, CalVT, InstKT, InstVT
+from qlib.data.storage import CalendarStorage, InstrumentStorage, FeatureStorage, PanelStorage, CalVT, InstKT, InstVT
 
 logger = get_module_logger("file_storage")
 
@@ -46,10 +54,12 @@ class FileStorageMixin:
         if hasattr(self, _v):
             return getattr(self, _v)
         if len(self.provider_uri) == 1 and C.DEFAULT_FREQ in self.provider_uri:
-            freq_l = filter(
-                lambda _freq: not _freq.endswith("_future"),
-                map(lambda x: x.stem, self.dpm.get_data_uri(C.DEFAULT_FREQ).joinpath("calendars").glob("*.txt")),
-            )
+            calendar_dir = self.dpm.get_data_uri(C.DEFAULT_FREQ).joinpath("calendars")
+            # the calendars directory is globbed once in each process (until `qlib.init` clears the memory cache)
+            key = "support_freq" + str(calendar_dir)
+            freq_l = H["c"].get(key)
+            if freq_l is None:
+                freq_l = H["c"][key] = [x.stem for x in calendar_dir.glob("*.txt") if not x.stem.endswith("_future")]
         else:
             freq_l = self.provider_uri.keys()
         freq_l = [Freq(freq) for freq in freq_l]
@@ -74,6 +84,15 @@ class FileStorageMixin:
 
 
 class FileCalendarStorage(FileStorageMixin, CalendarStorage):
+    """FileCalendarStorage
+
+    The calendar is saved in `calendars/<freq>.txt`. If `calendars/<freq>.bin` (int64 nanoseconds, generated by
+    `scripts/dump_bin.py`) exists and is not older than the text file, it will be loaded instead of parsing the text,
+    and `data` returns a `pd.DatetimeIndex` instead of a list of strings.
+    """
+
+    BINARY_FILE_SUFFIX = ".bin"
+
     def __init__(self, freq: str, future: bool, provider_uri: dict = None, **kwargs):
         super(FileCalendarStorage, self).__init__(freq, future, **kwargs)
         self.future = future
@@ -119,23 +138,60 @@ class FileCalendarStorage(FileStorageMixin, CalendarStorage):
                     res.append(line)
             return res
 
+    def _read_binary_calendar(self) -> Union[pd.DatetimeIndex, None]:
+        """read the binary calendar
+
+        Returns
+        -------
+        pd.DatetimeIndex or None
+            None if the binary calendar does not exist or is older than the text calendar
+        """
+        try:
+            bin_mtime = self.binary_uri.stat().st_mtime_ns
+            txt_mtime = self.uri.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if bin_mtime < txt_mtime:
+            # the text calendar is modified by other tools after dumping the binary calendar
+            return None
+        return pd.DatetimeIndex(np.fromfile(str(self.binary_uri), dtype="<i8"))
+
+    @staticmethod
+    def write_binary_calendar(path: Union[str, Path], values: Iterable[CalVT]):
+        """write the calendar into `path` as int64 nanoseconds, which can be loaded without parsing the text
+
+        The calendar is written to a temporary file and then replaces `path`.
+        """
+        path = Path(path)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        pd.DatetimeIndex(list(values)).asi8.astype("<i8").tofile(str(tmp_path))
+        os.replace(str(tmp_path), str(path))
+
     def _write_calendar(self, values: Iterable[CalVT], mode: str = "wb"):
         with self.uri.open(mode=mode) as fp:
             np.savetxt(fp, values, fmt="%s", encoding="utf-8")
+        if self.binary_uri.exists():
+            # keep the binary calendar consistent with the text calendar
+            self.write_binary_calendar(self.binary_uri, self._read_calendar())
 
     @property
     def uri(self) -> Path:
         return self.dpm.get_data_uri(self._freq_file).joinpath(f"{self.storage_name}s", self.file_name)
 
+    @property
+    def binary_uri(self) -> Path:
+        """the binary calendar dumped together with the text calendar, e.g. `calendars/day.bin`"""
+        return self.uri.with_suffix(self.BINARY_FILE_SUFFIX)
+
     @property
     def data(self) -> List[CalVT]:
         self.check()
         # If cache is enabled, then return cache directly
         if self.enable_read_cache:
             key = "orig_file" + str(self.uri)
-            if key not in H["c"]:
-                H["c"][key] = self._read_calendar()
-            _calendar = H["c"][key]
+            _calendar = H["c"].get(key)
+            if _calendar is None:
+                _calendar = H["c"][key] = self._read_calendar()
         else:
             _calendar = self._read_calendar()
         if Freq(self._freq_file) != Freq(self.freq):
@@ -144,6 +200,22 @@ class FileCalendarStorage(FileStorageMixin, CalendarStorage):
             )
         return _calendar
 
+    @property
+    def datetime_index(self) -> pd.DatetimeIndex:
+        """the calendar as `pd.DatetimeIndex`, which is loaded from the binary calendar if it is available"""
+        self.check()
+        if Freq(self._freq_file) != Freq(self.freq):
+            return pd.DatetimeIndex(self.data)
+        key = "datetime_index" + str(self.uri)
+        _calendar = H["c"].get(key) if self.enable_read_cache else None
+        if _calendar is None:
+            _calendar = self._read_binary_calendar()
+            if _calendar is None:
+                _calendar = pd.DatetimeIndex(self._read_calendar())
+            if self.enable_read_cache:
+                H["c"][key] = _calendar
+        return _calendar
+
     def _get_storage_freq(self) -> List[str]:
         return sorted(set(map(lambda x: x.stem.split("_")[0], self.uri.parent.glob("*.txt"))))
 
@@ -283,14 +355,181 @@ class FileInstrumentStorage(FileStorageMixin, InstrumentStorage):
 
 
 class FileFeatureStorage(FileStorageMixin, FeatureStorage):
+    """FileFeatureStorage
+
+    The feature is saved in `features/<instrument>/<field>.<freq>.bin`: the start index followed by the values, all in
+    float32.
+
+    If the metadata index `features/_meta.<freq>.npy` (generated by `scripts/dump_bin.py`) exists, the start index and
+    the length of the indexed features are looked up in memory instead of reading the header and calling `stat` on
+    the files each time, which is expensive on network filesystems. The index is loaded once in each process and
+    reloaded after `qlib.init`, and the entry of each feature is checked against the mtime of its file only the first
+    time it is used. The features which are not in the index are read from the files.
+
+    The index is also the version manifest of the features: the revision of a feature is increased whenever its file
+    is rewritten, which is used by the disk caches to find the outdated caches (see `FeatureStorage.version`).
+
+    NOTE:
+        The index is a snapshot of the features. The features updated by `FileFeatureStorage.write` are updated in
+        the index. The files modified by other tools no longer match the mtime in the index, so they are read from
+        the files (and have no version) until the index is regenerated by
+        `python scripts/dump_bin.py dump_meta --qlib_dir <qlib_dir> --freq <freq>`.
+    """
+
+    META_FILE_NAME = "_meta.{freq}.npy"
+    META_DTYPE = [("start_index", "<i8"), ("length", "<i8"), ("mtime", "<i8"), ("revision", "<i8")]
+
     def __init__(self, instrument: str, field: str, freq: str, provider_uri: dict = None, **kwargs):
         super(FileFeatureStorage, self).__init__(instrument, field, freq, **kwargs)
         self._provider_uri = None if provider_uri is None else C.DataPathManager.format_provider_uri(provider_uri)
         self.file_name = f"{instrument.lower()}/{field.lower()}.{freq.lower()}.bin"
 
+    @classmethod
+    def build_meta(cls, features_dir: Union[str, Path], freq: str, meta: np.ndarray = None) -> np.ndarray:
+        """scan the `.bin` files of `freq` in `features_dir` and build the metadata index
+
+        Parameters
+        ----------
+        features_dir : Union[str, Path]
+            the features directory
+        freq : str
+            the freq of the features
+        meta : np.ndarray
+            the old index, the start indexes and the revisions of the files whose mtime and length are not changed
+            are reused without reading the files
+
+        Returns
+        -------
+        np.ndarray
+            the structured array sorted by (instrument, field)
+        """
+        suffix = f".{freq.lower()}.bin"
+        old_meta = {}
+        if meta is not None:
+            old_meta = {r[:2]: r[2:] for r in meta.tolist()}
+        revision = cls._next_revision(meta)
+        records = []
+        for inst_dir in sorted(Path(features_dir).iterdir()):
+            if not inst_dir.is_dir():
+                continue
+            for path in sorted(inst_dir.glob(f"*{suffix}")):
+                st = path.stat()
+                if st.st_size < 8:
+                    # the empty features are not indexed
+                    continue
+                key = inst_dir.name, path.name[: -len(suffix)]
+                length = st.st_size // 4 - 1
+                if key in old_meta and old_meta[key][1:3] == (length, st.st_mtime_ns):
+                    records.append((*key, *old_meta[key]))
+                    continue
+                with path.open("rb") as fp:
+                    start_index = int(np.frombuffer(fp.read(4), dtype="<f")[0])
+                records.append((*key, start_index, length, st.st_mtime_ns, revision))
+        return cls._to_meta(records)
+
+    @staticmethod
+    def _next_revision(meta: Union[np.ndarray, None]) -> int:
+        """the revision of the features modified now
+
+        The revisions are increasing in the whole index (the nanoseconds since the epoch unless the clock goes
+        backwards), so a removed and rewritten feature will not get its old revision again.
+        """
+        last_revision = 0 if meta is None or len(meta) == 0 else int(meta["revision"].max())
+        return max(time.time_ns(), last_revision + 1)
+
+    @classmethod
+    def _to_meta(cls, records: List[tuple]) -> np.ndarray:
+        inst_len = max([len(r[0]) for r in records], default=1)
+        field_len = max([len(r[1]) for r in records], default=1)
+        dtype = [("instrument", f"<U{inst_len}"), ("field", f"<U{field_len}")] + cls.META_DTYPE
+        return np.array(sorted(records, key=lambda r: (r[0], r[1])), dtype=dtype)
+
+    @classmethod
+    def write_meta(cls, path: Union[str, Path], meta: np.ndarray):
+        """write the metadata index into `path`, it replaces the old index atomically"""
+        path = Path(path)
+        tmp_path = path.with_name(f"{path.name}.tmp.npy")
+        np.save(str(tmp_path), meta, allow_pickle=False)
+        os.replace(str(tmp_path), str(path))
+        # the index loaded in this process is outdated
+        key = cls._meta_cache_key(path.expanduser().resolve())
+        if key in H["c"]:
+            H["c"].pop(key)
+
+    @staticmethod
+    def _meta_cache_key(path: Union[str, Path]) -> str:
+        # NOTE: the provider_uri is resolved by `qlib.init`, so `meta_uri` is not resolved again for each feature
+        return "feature_meta" + str(path)
+
+    @classmethod
+    def read_meta(cls, path: Union[str, Path]) -> Union[np.ndarray, None]:
+        """read the metadata index in `path`, None if it does not exist"""
+        try:
+            return np.load(str(path), allow_pickle=False)
+        except FileNotFoundError:
+            return None
+
+    @property
+    def meta_uri(self) -> Path:
+        return self.uri.parent.parent.joinpath(self.META_FILE_NAME.format(freq=self.freq.lower()))
+
+    def _meta(self) -> Union[Tuple[int, int, int], None]:
+        """get the (start_index, length, revision) of the feature from the metadata index, None if it is not indexed
+        or its file is modified after the index was generated"""
+        key = self._meta_cache_key(self.meta_uri)
+        # a missing index is cached as an empty dict, `H["c"].get` returns None for the keys not cached
+        meta = H["c"].get(key)
+        if meta is None:
+            meta = self.read_meta(self.meta_uri)
+            if meta is None:
+                meta = {}
+            else:
+                keys = zip(meta["instrument"].tolist(), meta["field"].tolist())
+                values = zip(*[meta[name].tolist() for name in ["start_index", "length", "revision", "mtime"]])
+                meta = dict(zip(keys, values))
+            H["c"][key] = meta
+        feature_key = self.instrument.lower(), self.field.lower()
+        entry = meta.get(feature_key)
+        if entry is None or len(entry) == 3:
+            return entry
+        # the mtime is checked once, the checked entries are saved without it (or as None if the file is modified)
+        try:
+            valid = self.uri.stat().st_mtime_ns == entry[3]
+        except FileNotFoundError:
+            valid = False
+        entry = meta[feature_key] = entry[:3] if valid else None
+        return entry
+
+    def _update_meta(self):
+        """update the entry of the feature in the metadata index after modifying the file"""
+        meta = self.read_meta(self.meta_uri)
+        if meta is None:
+            return
+        revision = self._next_revision(meta)
+        meta = meta[(meta["instrument"] != self.instrument.lower()) | (meta["field"] != self.field.lower())]
+        records = meta.tolist()
+        st = self.uri.stat()
+        if st.st_size >= 8:
+            with self.uri.open("rb") as fp:
+                start_index = int(np.frombuffer(fp.read(4), dtype="<f")[0])
+            key = self.instrument.lower(), self.field.lower()
+            records.append((*key, start_index, st.st_size // 4 - 1, st.st_mtime_ns, revision))
+        self.write_meta(self.meta_uri, self._to_meta(records))
+
+    @property
+    def version(self) -> Union[int, None]:
+        meta = self._meta()
+        return None if meta is None else meta[2]
+
+    def _field_storage(self, field: str) -> "FileFeatureStorage":
+        if field == self.field:
+            return self
+        return type(self)(self.instrument, field, self.freq, provider_uri=self._provider_uri, **self.kwargs)
+
     def clear(self):
         with self.uri.open("wb") as _:
             pass
+        self._update_meta()
 
     @property
     def data(self) -> pd.Series:
@@ -303,6 +542,10 @@ class FileFeatureStorage(FileStorageMixin, FeatureStorage):
                 "if you need to clear the FeatureStorage, please execute: FeatureStorage.clear"
             )
             return
+        self._write(data_array, index)
+        self._update_meta()
+
+    def _write(self, data_array: Union[List, np.ndarray], index: int = None) -> None:
         if not self.uri.exists():
             # write
             index = 0 if index is None else index
@@ -318,7 +561,7 @@ class FileFeatureStorage(FileStorageMixin, FeatureStorage):
                 # rewrite
                 with self.uri.open("rb+") as fp:
                     _old_data = np.fromfile(fp, dtype="<f")
-                    _old_index = _old_data[0]
+                    _old_index = int(_old_data[0])
                     _old_df = pd.DataFrame(
                         _old_data[1:], index=range(_old_index, _old_index + len(_old_data) - 1), columns=["old"]
                     )
@@ -326,10 +569,13 @@ class FileFeatureStorage(FileStorageMixin, FeatureStorage):
                     _new_df = pd.DataFrame(data_array, index=range(index, index + len(data_array)), columns=["new"])
                     _df = pd.concat([_old_df, _new_df], sort=False, axis=1)
                     _df = _df.reindex(range(_df.index.min(), _df.index.max() + 1))
-                    _df["new"].fillna(_df["old"]).values.astype("<f").tofile(fp)
+                    np.hstack([_df.index[0], _df["new"].fillna(_df["old"]).values]).astype("<f").tofile(fp)
 
     @property
     def start_index(self) -> Union[int, None]:
+        meta = self._meta()
+        if meta is not None:
+            return meta[0]
         if not self.uri.exists():
             return None
         with self.uri.open("rb") as fp:
@@ -338,13 +584,17 @@ class FileFeatureStorage(FileStorageMixin, FeatureStorage):
 
     @property
     def end_index(self) -> Union[int, None]:
+        meta = self._meta()
+        if meta is not None:
+            return meta[0] + meta[1] - 1
         if not self.uri.exists():
             return None
         # The next  data appending index point will be  `end_index + 1`
         return self.start_index + len(self) - 1
 
     def __getitem__(self, i: Union[int, slice]) -> Union[Tuple[int, float], pd.Series]:
-        if not self.uri.exists():
+        meta = self._meta()
+        if meta is None and not self.uri.exists():
             if isinstance(i, int):
                 return None, None
             elif isinstance(i, slice):
@@ -352,8 +602,11 @@ class FileFeatureStorage(FileStorageMixin, FeatureStorage):
             else:
                 raise TypeError(f"type(i) = {type(i)}")
 
-        storage_start_index = self.start_index
-        storage_end_index = self.end_index
+        if meta is None:
+            storage_start_index = self.start_index
+            storage_end_index = self.end_index
+        else:
+            storage_start_index, storage_end_index = meta[0], meta[0] + meta[1] - 1
         with self.uri.open("rb") as fp:
             if isinstance(i, int):
                 if storage_start_index > i:
@@ -374,6 +627,950 @@ class FileFeatureStorage(FileStorageMixin, FeatureStorage):
             else:
                 raise TypeError(f"type(i) = {type(i)}")
 
+    def check(self):
+        if self._meta() is None:
+            super(FileFeatureStorage, self).check()
+
     def __len__(self) -> int:
+        meta = self._meta()
+        if meta is not None:
+            return meta[1]
         self.check()
         return self.uri.stat().st_size // 4 - 1
+
+
+def _default_mmap_cache_size() -> int:
+    """The number of mapped files which can be kept open by `MmapFileCache`
+
+    Before python 3.13, every `mmap.mmap` object holds a duplicated file descriptor. So the size of the
+    cache is limited by the soft limit of open files of the process.
+    """
+    if sys.version_info >= (3, 13):
+        # `trackfd=False` is used, the mapped files do not occupy file descriptors
+        return 32768
+    try:
+        import resource  # pylint: disable=C0415
+
+        soft_limit, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft_limit == resource.RLIM_INFINITY:
+            soft_limit = 65536
+    except (ImportError, ValueError, OSError):
+        # e.g. `resource` is not available on Windows
+        soft_limit = 1024
+    return max(min(soft_limit // 2, 32768), 64)
+
+
+class MmapFileCache:
+    """Process-level LRU cache of memory-mapped `.bin` files
+
+    Each file is mapped once and shared by all `MmapFeatureStorage` instances of the process.
+    The size and mtime of the file are saved together with the mapping, and a file whose size or mtime
+    changed (e.g. updated by `scripts/dump_bin.py` after the daily dump) will be re-mapped.
+
+    NOTE:
+        - The returned arrays are read-only views of the mapping (zero-copy).
+        - The mapping of a file is released when the cache evicts it and no array refers to it.
+    """
+
+    def __init__(self, size_limit: int = None, check_interval: float = 0):
+        """
+        Parameters
+        ----------
+        size_limit : int
+            the max number of mapped files kept in the cache
+        check_interval : float
+            the interval (seconds) between two `stat` calls used to check whether the file is changed.
+            0 means checking the file on every access
+        """
+        self.size_limit = _default_mmap_cache_size() if size_limit is None else size_limit
+        self.check_interval = check_interval
+        self._od = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _mmap(path: Path) -> mmap.mmap:
+        with path.open("rb") as fp:
+            if sys.version_info >= (3, 13):
+                return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ, trackfd=False)
+            return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _map(self, path: Path, size: int) -> np.ndarray:
+        if size < 4:
+            return np.array([], dtype="<f")
+        return np.frombuffer(self._mmap(path), dtype="<f", count=size // 4)
+
+    def get(self, path: Path) -> Union[np.ndarray, None]:
+        """get the whole content (header included) of the `.bin` file
+
+        Returns
+        -------
+        np.ndarray or None
+            None if the file does not exist
+        """
+        key = str(path)
+        now = time.time()
+        with self._lock:
+            entry = self._od.get(key)
+            if entry is not None:
+                self._od.move_to_end(key)
+                if self.check_interval > 0 and now - entry["checked_at"] < self.check_interval:
+                    return entry["data"]
+        try:
+            st = os.stat(key)
+        except FileNotFoundError:
+            self.invalidate(path)
+            return None
+        if entry is not None and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime_ns:
+            entry["checked_at"] = now
+            return entry["data"]
+
+        data = self._map(path, st.st_size)
+        with self._lock:
+            self._od[key] = {"data": data, "size": st.st_size, "mtime": st.st_mtime_ns, "checked_at": now}
+            self._od.move_to_end(key)
+            while len(self._od) > self.size_limit:
+                # NOTE: the mapping can't be closed explicitly because the views may still be referenced
+                self._od.popitem(last=False)
+        return data
+
+    def invalidate(self, path: Union[Path, str] = None):
+        """drop the mapping of `path`; drop all the mappings if `path` is None"""
+        with self._lock:
+            if path is None:
+                self._od.clear()
+            else:
+                self._od.pop(str(path), None)
+
+    def __len__(self):
+        return len(self._od)
+
+
+class MmapFeatureStorage(FileFeatureStorage):
+    """FileFeatureStorage based on memory-mapped files
+
+    The `.bin` file is mapped only once in each process and the header/length of the file are derived from the
+    mapping. So slicing the storage does not open/seek/read the file and the returned series is a zero-copy view.
+
+    It shares the same data format with `FileFeatureStorage`, so it can be used by setting the backend of
+    `LocalFeatureProvider`:
+
+    .. code-block:: python
+
+        qlib.init(
+            provider_uri=provider_uri,
+            feature_provider={
+                "class": "LocalFeatureProvider",
+                "module_path": "qlib.data.data",
+                "kwargs": {
+                    "backend": {
+                        "class": "MmapFeatureStorage",
+                        "module_path": "qlib.data.storage.file_storage",
+                    }
+                },
+            },
+        )
+
+    NOTE:
+        Files should be replaced instead of rewritten in place (`scripts/dump_bin.py` writes a temporary file and
+        renames it) when they are updated. Truncating a file that is mapped by other processes may crash them.
+    """
+
+    _mmap_cache = MmapFileCache()
+
+    @classmethod
+    def set_cache_config(cls, size_limit: int = None, check_interval: float = None):
+        """reconfigure the process-level mapping cache"""
+        if size_limit is not None:
+            cls._mmap_cache.size_limit = size_limit
+        if check_interval is not None:
+            cls._mmap_cache.check_interval = check_interval
+
+    @classmethod
+    def clear_cache(cls):
+        cls._mmap_cache.invalidate()
+
+    def _mmap_data(self) -> Union[np.ndarray, None]:
+        return self._mmap_cache.get(self.uri)
+
+    def _load(self) -> Tuple[Union[int, None], Union[np.ndarray, None]]:
+        """get the start index and the values (header excluded) of the feature
+
+        Returns
+        -------
+        Tuple[int, np.ndarray]
+            (None, None) if the feature does not exist or is empty
+        """
+        data = self._mmap_data()
+        if data is None or len(data) == 0:
+            return None, None
+        return int(data[0]), data[1:]
+
+    def check(self):
+        if self._mmap_data() is None:
+            raise ValueError(f"{self.storage_name} not exists: {self.uri}")
+
+    def clear(self):
+        super(MmapFeatureStorage, self).clear()
+        self._mmap_cache.invalidate(self.uri)
+
+    def write(self, data_array: Union[List, np.ndarray], index: int = None) -> None:
+        super(MmapFeatureStorage, self).write(data_array, index)
+        self._mmap_cache.invalidate(self.uri)
+
+    @property
+    def start_index(self) -> Union[int, None]:
+        return self._load()[0]
+
+    @property
+    def end_index(self) -> Union[int, None]:
+        storage_start_index, values = self._load()
+        if storage_start_index is None:
+            return None
+        return storage_start_index + len(values) - 1
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[Tuple[int, float], pd.Series]:
+        storage_start_index, values = self._load()
+        if storage_start_index is None:
+            if isinstance(i, int):
+                return None, None
+            elif isinstance(i, slice):
+                return pd.Series(dtype=np.float32)
+            else:
+                raise TypeError(f"type(i) = {type(i)}")
+
+        storage_end_index = storage_start_index + len(values) - 1
+        if isinstance(i, int):
+            if storage_start_index > i:
+                raise IndexError(f"{i}: start index is {storage_start_index}")
+            return i, values[i - storage_start_index].item()
+        elif isinstance(i, slice):
+            start_index = storage_start_index if i.start is None else i.start
+            end_index = storage_end_index if i.stop is None else i.stop - 1
+            si = max(start_index, storage_start_index)
+            ei = min(end_index, storage_end_index)
+            if si > ei:
+                return pd.Series(dtype=np.float32)
+            return pd.Series(
+                values[si - storage_start_index : ei - storage_start_index + 1],
+                index=pd.RangeIndex(si, ei + 1),
+                copy=False,
+            )
+        else:
+            raise TypeError(f"type(i) = {type(i)}")
+
+    def __len__(self) -> int:
+        self.check()
+        values = self._load()[1]
+        return 0 if values is None else len(values)
+
+
+class BundleFileCache(MmapFileCache):
+    """Process-level LRU cache of memory-mapped feature bundles
+
+    The values of the cache are the parsed bundles, see `BundleFeatureStorage.parse_bundle`
+    """
+
+    def _map(self, path: Path, size: int) -> dict:
+        if size == 0:
+            return BundleFeatureStorage.parse_bundle(b"")
+        return BundleFeatureStorage.parse_bundle(self._mmap(path))
+
+
+class BundleFeatureStorage(MmapFeatureStorage):
+    """FeatureStorage which stores all the fields of an instrument in a single columnar file
+
+    The bundle of an instrument is saved in `features/<instrument>/<freq>.bundle`. All the fields share the same
+    start index and length, and the values of each field are saved in a contiguous block:
+
+    .. code-block:: text
+
+        | magic (8 bytes) | version (uint32) | n_fields (uint32) | start_index (int64) | n_rows (int64) |
+        | size of names (uint32) | field names, separated by "\\n" and padded to 4 bytes |
+        | values of field 0: n_rows * float32 | values of field 1 | ... |
+
+    So reading all the fields of an instrument only needs to open (and map) one file. The bundle is mapped once in
+    each process like `MmapFeatureStorage`.
+
+    The fields which are not included in the bundle will be loaded from the `<field>.<freq>.bin` files, so the bundle
+    can be mixed with the default format. The bundles can be generated by
+    `python scripts/dump_bin.py dump_all ... --feature_format bundle`.
+
+    .. code-block:: python
+
+        qlib.init(
+            provider_uri=provider_uri,
+            feature_provider={
+                "class": "LocalFeatureProvider",
+                "module_path": "qlib.data.data",
+                "kwargs": {
+                    "backend": {
+                        "class": "BundleFeatureStorage",
+                        "module_path": "qlib.data.storage.file_storage",
+                    }
+                },
+            },
+        )
+    """
+
+    BUNDLE_MAGIC = b"QLIBBNDL"
+    BUNDLE_VERSION = 1
+    BUNDLE_FILE_SUFFIX = ".bundle"
+    _BUNDLE_HEADER = struct.Struct("<8sIIqqI")
+
+    _bundle_cache = BundleFileCache()
+
+    @classmethod
+    def set_cache_config(cls, size_limit: int = None, check_interval: float = None):
+        super(BundleFeatureStorage, cls).set_cache_config(size_limit, check_interval)
+        if size_limit is not None:
+            cls._bundle_cache.size_limit = size_limit
+        if check_interval is not None:
+            cls._bundle_cache.check_interval = check_interval
+
+    @classmethod
+    def clear_cache(cls):
+        super(BundleFeatureStorage, cls).clear_cache()
+        cls._bundle_cache.invalidate()
+
+    @classmethod
+    def parse_bundle(cls, buffer) -> dict:
+        """parse the bundle in `buffer`
+
+        Returns
+        -------
+        dict
+            {"start_index": int, "n_rows": int, "fields": {<field>: np.ndarray}}, the arrays are zero-copy views
+            of `buffer`
+        """
+        if len(buffer) == 0:
+            return {"start_index": None, "n_rows": 0, "fields": {}}
+        magic, version, n_fields, start_index, n_rows, names_size = cls._BUNDLE_HEADER.unpack_from(buffer, 0)
+        if magic != cls.BUNDLE_MAGIC:
+            raise ValueError("invalid feature bundle: bad magic number")
+        if version != cls.BUNDLE_VERSION:
+            raise ValueError(f"unsupported feature bundle version: {version}")
+        offset = cls._BUNDLE_HEADER.size
+        names = bytes(buffer[offset : offset + names_size]).decode("utf-8")
+        names = names.split("\n") if n_fields > 0 else []
+        offset += (names_size + 3) // 4 * 4
+        fields = {}
+        for i, name in enumerate(names):
+            fields[name] = np.frombuffer(buffer, dtype="<f", count=n_rows, offset=offset + 4 * n_rows * i)
+        return {"start_index": start_index, "n_rows": n_rows, "fields": fields}
+
+    @classmethod
+    def read_bundle(cls, path: Union[str, Path]) -> dict:
+        """read the bundle in `path` into memory, the result is the same as `parse_bundle`"""
+        with Path(path).open("rb") as fp:
+            return cls.parse_bundle(fp.read())
+
+    @classmethod
+    def write_bundle(cls, path: Union[str, Path], start_index: int, data: Mapping[str, np.ndarray]):
+        """write the aligned fields into the bundle `path`
+
+        The bundle is written to a temporary file and then replaces `path`, so the readers which have mapped the old
+        bundle will not be affected.
+
+        Parameters
+        ----------
+        path : Union[str, Path]
+            the path of the bundle
+        start_index : int
+            the calendar index of the first row
+        data : Mapping[str, np.ndarray]
+            field -> values, all the values must have the same length
+        """
+        path = Path(path)
+        names = [str(name).lower() for name in data]
+        values = [np.asarray(v, dtype="<f") for v in data.values()]
+        n_rows = len(values[0]) if values else 0
+        if any(len(v) != n_rows for v in values):
+            raise ValueError("all the fields of a feature bundle must have the same length")
+        if any("\n" in name for name in names):
+            raise ValueError("the names of the fields must not contain line breaks")
+        names = "\n".join(names).encode("utf-8")
+        header = cls._BUNDLE_HEADER.pack(
+            cls.BUNDLE_MAGIC, cls.BUNDLE_VERSION, len(values), int(start_index), n_rows, len(names)
+        )
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        with tmp_path.open("wb") as fp:
+            fp.write(header)
+            fp.write(names.ljust((len(names) + 3) // 4 * 4, b"\0"))
+            for v in values:
+                v.tofile(fp)
+        os.replace(str(tmp_path), str(path))
+
+    @property
+    def bundle_uri(self) -> Path:
+        return self.uri.with_name(f"{self.freq.lower()}{self.BUNDLE_FILE_SUFFIX}")
+
+    def _bundle_data(self) -> Union[dict, None]:
+        return self._bundle_cache.get(self.bundle_uri)
+
+    def _load(self) -> Tuple[Union[int, None], Union[np.ndarray, None]]:
+        bundle = self._bundle_data()
+        if bundle is not None and self.field.lower() in bundle["fields"]:
+            if bundle["n_rows"] == 0:
+                return None, None
+            return bundle["start_index"], bundle["fields"][self.field.lower()]
+        # the field is not bundled
+        return super(BundleFeatureStorage, self)._load()
+
+    def check(self):
+        bundle = self._bundle_data()
+        if bundle is None or self.field.lower() not in bundle["fields"]:
+            super(BundleFeatureStorage, self).check()
+
+    @property
+    def version(self) -> Union[int, None]:
+        bundle = self._bundle_data()
+        if bundle is None or self.field.lower() not in bundle["fields"]:
+            return super(BundleFeatureStorage, self).version
+        # the bundles are not in the metadata index
+        return None
+
+    def read_many(self, fields: List[str], s: slice = slice(None)) -> Tuple[Union[int, None], np.ndarray, np.ndarray]:
+        bundle = self._bundle_data()
+        if bundle is None or any(field.lower() not in bundle["fields"] for field in fields):
+            # some fields are not bundled
+            return super(BundleFeatureStorage, self).read_many(fields, s)
+        spans = np.zeros((len(fields), 2), dtype=np.int64)
+        spans[:, 1] = -1
+        storage_start_index = bundle["start_index"]
+        storage_end_index = storage_start_index + bundle["n_rows"] - 1
+        si = storage_start_index if s.start is None else max(s.start, storage_start_index)
+        ei = storage_end_index if s.stop is None else min(s.stop - 1, storage_end_index)
+        if bundle["n_rows"] == 0 or si > ei:
+            return None, np.empty((len(fields), 0), dtype=np.float32), spans
+        spans[:] = si, ei
+        _slc = slice(si - storage_start_index, ei - storage_start_index + 1)
+        values = np.stack([bundle["fields"][field.lower()][_slc] for field in fields])
+        return si, values, spans
+
+    def _rewrite_bundle(self, field_data: Union[pd.Series, None]):
+        """replace the values of the field in the bundle, remove the field if `field_data` is None"""
+        bundle = self._bundle_data()
+        series = {}
+        if bundle is not None and bundle["n_rows"] > 0:
+            _index = pd.RangeIndex(bundle["start_index"], bundle["start_index"] + bundle["n_rows"])
+            series = {name: pd.Series(values, index=_index) for name, values in bundle["fields"].items()}
+        series.pop(self.field.lower(), None)
+        if field_data is not None:
+            series[self.field.lower()] = field_data
+        _df = pd.DataFrame(series, dtype=np.float32)
+        if _df.empty:
+            start_index = 0 if bundle is None or bundle["start_index"] is None else bundle["start_index"]
+        else:
+            start_index = _df.index.min()
+            _df = _df.reindex(pd.RangeIndex(start_index, _df.index.max() + 1))
+        self.write_bundle(self.bundle_uri, start_index, {name: _df[name].values for name in _df.columns})
+        self._bundle_cache.invalidate(self.bundle_uri)
+
+    def clear(self):
+        self._rewrite_bundle(None)
+
+    def write(self, data_array: Union[List, np.ndarray], index: int = None) -> None:
+        if len(data_array) == 0:
+            logger.info(
+                "len(data_array) == 0, write"
+                "if you need to clear the FeatureStorage, please execute: FeatureStorage.clear"
+            )
+            return
+        storage_start_index, values = self._load()
+        if index is None:
+            # append
+            index = 0 if storage_start_index is None else storage_start_index + len(values)
+        new_data = pd.Series(np.asarray(data_array, dtype=np.float32), index=range(index, index + len(data_array)))
+        if storage_start_index is not None:
+            old_data = pd.Series(values, index=range(storage_start_index, storage_start_index + len(values)))
+            new_data = new_data.combine_first(old_data)
+        self._rewrite_bundle(new_data)
+
+
+def _get_codec(name: str) -> Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    """get the (compress, decompress) functions of the codec `name`
+
+    `zlib` and `none` are always available, `zstd` and `lz4` need the optional packages `zstandard` and `lz4`.
+    """
+    if name == "none":
+        return bytes, bytes
+    if name == "zlib":
+        return partial(zlib.compress, level=6), zlib.decompress
+    if name == "zstd":
+        try:
+            import zstandard  # pylint: disable=C0415
+        except ImportError as e:
+            raise ImportError("please install `zstandard` to use the zstd codec: pip install zstandard") from e
+        return zstandard.ZstdCompressor(level=3).compress, zstandard.ZstdDecompressor().decompress
+    if name == "lz4":
+        try:
+            import lz4.frame  # pylint: disable=C0415
+        except ImportError as e:
+            raise ImportError("please install `lz4` to use the lz4 codec: pip install lz4") from e
+        return lz4.frame.compress, lz4.frame.decompress
+    raise ValueError(f"unsupported codec: {name}")
+
+
+def _default_codec() -> str:
+    """the best available codec: zstd > lz4 > zlib"""
+    for name in ["zstd", "lz4"]:
+        try:
+            _get_codec(name)
+            return name
+        except ImportError:
+            continue
+    return "zlib"
+
+
+class CompressedFileCache(MmapFileCache):
+    """Process-level LRU cache of the memory-mapped compressed features
+
+    The values of the cache are the parsed headers and block indexes, see `CompressedFeatureStorage.parse_compressed`
+    """
+
+    def _map(self, path: Path, size: int) -> dict:
+        if size == 0:
+            return CompressedFeatureStorage.parse_compressed(b"")
+        return CompressedFeatureStorage.parse_compressed(self._mmap(path))
+
+
+class CompressedFeatureStorage(MmapFeatureStorage):
+    """FeatureStorage which saves the values of a feature in compressed blocks
+
+    The feature is saved in `features/<instrument>/<field>.<freq>.cbin`. The values are split into blocks of
+    `block_size` rows, and each block is compressed separately:
+
+    .. code-block:: text
+
+        | magic (8 bytes) | version (uint32) | codec (8 bytes) | block_size (uint32) | shuffle (uint32) |
+        | start_index (int64) | n_rows (int64) |
+        | block offsets: (n_blocks + 1) * uint64 |
+        | compressed block 0 | compressed block 1 | ... |
+
+    When `shuffle` is set, the bytes of the float32 values in a block are regrouped by their position (all the first
+    bytes, then all the second bytes, ...) before compression, which makes the exponents and the high bytes of the
+    mantissas of the close values adjacent and improves the compression ratio of market data a lot.
+
+    Reading a slice only decompresses the blocks overlapping it, and the header and the block index are mapped once
+    in each process like `MmapFeatureStorage`. It's useful for the high frequency data whose `.bin` files are too large
+    to be kept in the page cache.
+
+    The features which are not compressed will be loaded from the `.bin` files. The compressed features can be
+    generated by `python scripts/dump_bin.py dump_all ... --feature_format compressed`.
+
+    .. code-block:: python
+
+        qlib.init(
+            provider_uri=provider_uri,
+            feature_provider={
+                "class": "LocalFeatureProvider",
+                "module_path": "qlib.data.data",
+                "kwargs": {
+                    "backend": {
+                        "class": "CompressedFeatureStorage",
+                        "module_path": "qlib.data.storage.file_storage",
+                    }
+                },
+            },
+        )
+    """
+
+    COMPRESSED_MAGIC = b"QLIBCBIN"
+    COMPRESSED_VERSION = 1
+    COMPRESSED_FILE_SUFFIX = ".cbin"
+    DEFAULT_BLOCK_SIZE = 4096
+    _COMPRESSED_HEADER = struct.Struct("<8sI8sIIqq")
+
+    _compressed_cache = CompressedFileCache()
+
+    def __init__(
+        self,
+        instrument: str,
+        field: str,
+        freq: str,
+        provider_uri: dict = None,
+        codec: str = None,
+        block_size: int = None,
+        **kwargs,
+    ):
+        """
+        Parameters
+        ----------
+        codec : str
+            the codec used by `write`, one of "zstd", "lz4", "zlib" and "none"; default the best available one
+        block_size : int
+            the number of rows in a block used by `write`
+        """
+        super(CompressedFeatureStorage, self).__init__(instrument, field, freq, provider_uri=provider_uri, **kwargs)
+        self.codec = codec
+        self.block_size = block_size
+
+    @classmethod
+    def set_cache_config(cls, size_limit: int = None, check_interval: float = None):
+        super(CompressedFeatureStorage, cls).set_cache_config(size_limit, check_interval)
+        if size_limit is not None:
+            cls._compressed_cache.size_limit = size_limit
+        if check_interval is not None:
+            cls._compressed_cache.check_interval = check_interval
+
+    @classmethod
+    def clear_cache(cls):
+        super(CompressedFeatureStorage, cls).clear_cache()
+        cls._compressed_cache.invalidate()
+
+    @classmethod
+    def parse_compressed(cls, buffer) -> dict:
+        """parse the header and the block index of the compressed feature in `buffer`
+
+        Returns
+        -------
+        dict
+            {"start_index": int, "n_rows": int, "codec": str, "block_size": int, "shuffle": bool,
+            "offsets": np.ndarray, "blocks": memoryview}, the blocks are not decompressed
+        """
+        if len(buffer) == 0:
+            return {"start_index": None, "n_rows": 0}
+        magic, version, codec, block_size, shuffle, start_index, n_rows = cls._COMPRESSED_HEADER.unpack_from(buffer, 0)
+        if magic != cls.COMPRESSED_MAGIC:
+            raise ValueError("invalid compressed feature: bad magic number")
+        if version != cls.COMPRESSED_VERSION:
+            raise ValueError(f"unsupported compressed feature version: {version}")
+        n_blocks = (n_rows + block_size - 1) // block_size
+        offset = cls._COMPRESSED_HEADER.size
+        offsets = np.frombuffer(buffer, dtype="<u8", count=n_blocks + 1, offset=offset)
+        return {
+            "start_index": start_index,
+            "n_rows": n_rows,
+            "codec": codec.rstrip(b"\0").decode("ascii"),
+            "block_size": block_size,
+            "shuffle": bool(shuffle),
+            "offsets": offsets,
+            "blocks": memoryview(buffer)[offset + offsets.nbytes :],
+        }
+
+    @classmethod
+    def decompress(cls, compressed: dict, start: int = 0, stop: int = None) -> np.ndarray:
+        """decompress the rows [start, stop) (positions, not calendar indexes) of the parsed feature
+
+        Only the blocks overlapping the rows are decompressed.
+        """
+        n_rows = compressed["n_rows"]
+        stop = n_rows if stop is None else min(stop, n_rows)
+        start = max(start, 0)
+        if start >= stop:
+            return np.array([], dtype="<f")
+        _, decompress = _get_codec(compressed["codec"])
+        block_size, offsets, blocks = compressed["block_size"], compressed["offsets"], compressed["blocks"]
+        first_block, last_block = start // block_size, (stop - 1) // block_size
+        values = []
+        for b in range(first_block, last_block + 1):
+            raw = np.frombuffer(decompress(blocks[offsets[b] : offsets[b + 1]]), dtype=np.uint8)
+            if compressed["shuffle"]:
+                raw = raw.reshape(4, -1).T.copy()
+            values.append(raw.view("<f").ravel())
+        values = values[0] if len(values) == 1 else np.concatenate(values)
+        offset = first_block * block_size
+        return values[start - offset : stop - offset]
+
+    @classmethod
+    def read_compressed(cls, path: Union[str, Path]) -> Tuple[Union[int, None], np.ndarray]:
+        """read the whole compressed feature in `path`
+
+        Returns
+        -------
+        Tuple[int, np.ndarray]
+            (start_index, values), start_index is None if the feature is empty
+        """
+        with Path(path).open("rb") as fp:
+            compressed = cls.parse_compressed(fp.read())
+        if compressed["n_rows"] == 0:
+            return None, np.array([], dtype="<f")
+        return compressed["start_index"], cls.decompress(compressed)
+
+    @classmethod
+    def write_compressed(
+        cls,
+        path: Union[str, Path],
+        start_index: int,
+        values: np.ndarray,
+        codec: str = None,
+        block_size: int = None,
+        shuffle: bool = True,
+    ):
+        """compress the values and write them into `path`
+
+        The feature is written to a temporary file and then replaces `path`, so the readers which have mapped the old
+        file will not be affected.
+
+        Parameters
+        ----------
+        path : Union[str, Path]
+            the path of the compressed feature
+        start_index : int
+            the calendar index of the first value
+        values : np.ndarray
+            the values of the feature
+        codec : str
+            one of "zstd", "lz4", "zlib" and "none"; default the best available one
+        block_size : int
+            the number of rows in a block, default `DEFAULT_BLOCK_SIZE`
+        shuffle : bool
+            regroup the bytes of the values before compression
+        """
+        path = Path(path)
+        codec = _default_codec() if codec is None else codec
+        block_size = cls.DEFAULT_BLOCK_SIZE if block_size is None else int(block_size)
+        if block_size <= 0:
+            raise ValueError("block_size must be positive")
+        compress, _ = _get_codec(codec)
+        values = np.ascontiguousarray(values, dtype="<f")
+        blocks = []
+        for i in range(0, len(values), block_size):
+            raw = values[i : i + block_size].view(np.uint8)
+            if shuffle:
+                raw = raw.reshape(-1, 4).T
+            blocks.append(compress(np.ascontiguousarray(raw).tobytes()))
+        offsets = np.zeros(len(blocks) + 1, dtype="<u8")
+        offsets[1:] = np.cumsum([len(block) for block in blocks])
+        header = cls._COMPRESSED_HEADER.pack(
+            cls.COMPRESSED_MAGIC,
+            cls.COMPRESSED_VERSION,
+            codec.encode("ascii"),
+            block_size,
+            int(shuffle),
+            int(start_index),
+            len(values),
+        )
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        with tmp_path.open("wb") as fp:
+            fp.write(header)
+            offsets.tofile(fp)
+            for block in blocks:
+                fp.write(block)
+        os.replace(str(tmp_path), str(path))
+
+    @property
+    def compressed_uri(self) -> Path:
+        return self.uri.with_suffix(self.COMPRESSED_FILE_SUFFIX)
+
+    def _compressed_data(self) -> Union[dict, None]:
+        return self._compressed_cache.get(self.compressed_uri)
+
+    def _load(self) -> Tuple[Union[int, None], Union[np.ndarray, None]]:
+        compressed = self._compressed_data()
+        if compressed is None:
+            # the feature is not compressed
+            return super(CompressedFeatureStorage, self)._load()
+        if compressed["n_rows"] == 0:
+            return None, None
+        return compressed["start_index"], self.decompress(compressed)
+
+    def check(self):
+        if self._compressed_data() is None:
+            super(CompressedFeatureStorage, self).check()
+
+    @property
+    def version(self) -> Union[int, None]:
+        if self._compressed_data() is None:
+            return super(CompressedFeatureStorage, self).version
+        # the compressed files are not in the metadata index
+        return None
+
+    def clear(self):
+        self.write_compressed(self.compressed_uri, 0, [], self.codec, self.block_size)
+        self._compressed_cache.invalidate(self.compressed_uri)
+
+    def write(self, data_array: Union[List, np.ndarray], index: int = None) -> None:
+        if len(data_array) == 0:
+            logger.info(
+                "len(data_array) == 0, write"
+                "if you need to clear the FeatureStorage, please execute: FeatureStorage.clear"
+            )
+            return
+        storage_start_index, values = self._load()
+        if index is None:
+            # append
+            index = 0 if storage_start_index is None else storage_start_index + len(values)
+        new_data = pd.Series(np.asarray(data_array, dtype=np.float32), index=range(index, index + len(data_array)))
+        if storage_start_index is not None:
+            old_data = pd.Series(values, index=range(storage_start_index, storage_start_index + len(values)))
+            new_data = new_data.combine_first(old_data)
+        new_data = new_data.reindex(pd.RangeIndex(new_data.index.min(), new_data.index.max() + 1))
+        self.write_compressed(self.compressed_uri, new_data.index[0], new_data.values, self.codec, self.block_size)
+        self._compressed_cache.invalidate(self.compressed_uri)
+
+    @property
+    def start_index(self) -> Union[int, None]:
+        compressed = self._compressed_data()
+        if compressed is None:
+            return super(CompressedFeatureStorage, self).start_index
+        return compressed["start_index"] if compressed["n_rows"] > 0 else None
+
+    @property
+    def end_index(self) -> Union[int, None]:
+        compressed = self._compressed_data()
+        if compressed is None:
+            return super(CompressedFeatureStorage, self).end_index
+        return compressed["start_index"] + compressed["n_rows"] - 1 if compressed["n_rows"] > 0 else None
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[Tuple[int, float], pd.Series]:
+        compressed = self._compressed_data()
+        if compressed is None:
+            return super(CompressedFeatureStorage, self).__getitem__(i)
+        if compressed["n_rows"] == 0:
+            if isinstance(i, int):
+                return None, None
+            elif isinstance(i, slice):
+                return pd.Series(dtype=np.float32)
+            else:
+                raise TypeError(f"type(i) = {type(i)}")
+
+        storage_start_index = compressed["start_index"]
+        storage_end_index = storage_start_index + compressed["n_rows"] - 1
+        if isinstance(i, int):
+            if storage_start_index > i:
+                raise IndexError(f"{i}: start index is {storage_start_index}")
+            pos = i - storage_start_index
+            return i, self.decompress(compressed, pos, pos + 1)[0].item()
+        elif isinstance(i, slice):
+            start_index = storage_start_index if i.start is None else i.start
+            end_index = storage_end_index if i.stop is None else i.stop - 1
+            si = max(start_index, storage_start_index)
+            ei = min(end_index, storage_end_index)
+            if si > ei:
+                return pd.Series(dtype=np.float32)
+            values = self.decompress(compressed, si - storage_start_index, ei - storage_start_index + 1)
+            return pd.Series(values, index=pd.RangeIndex(si, ei + 1), copy=False)
+        else:
+            raise TypeError(f"type(i) = {type(i)}")
+
+    def __len__(self) -> int:
+        self.check()
+        compressed = self._compressed_data()
+        if compressed is None:
+            return super(CompressedFeatureStorage, self).__len__()
+        return compressed["n_rows"]
+
+
+class PanelFileCache(MmapFileCache):
+    """Process-level LRU cache of the memory-mapped panels (`.npy` files) of `FilePanelStorage`"""
+
+    def _map(self, path: Path, size: int) -> np.ndarray:
+        return np.load(str(path), mmap_mode="r")
+
+
+class PanelIndexCache(MmapFileCache):
+    """Process-level LRU cache of the column index (`.index.npy` files) of `FilePanelStorage`"""
+
+    def _map(self, path: Path, size: int) -> dict:
+        index = np.load(str(path))
+        instruments = index["instrument"].tolist()
+        return {
+            "instruments": instruments,
+            "spans": np.stack([index["start_index"], index["end_index"]], axis=1),
+            "columns": {inst: i for i, inst in enumerate(instruments)},
+        }
+
+
+class FilePanelStorage(FileStorageMixin, PanelStorage):
+    """PanelStorage based on `.npy` files
+
+    The panel of a field is saved in `panels/<field>.<freq>.npy` (float32, calendar x instrument, C order) and the
+    instruments/spans of the columns are saved in `panels/<field>.<freq>.index.npy`. The i-th row of the panel is
+    the data of the i-th calendar point, so reading a time range of all the instruments is a contiguous read of the
+    memory-mapped file.
+
+    The panels can be generated from the features by `python scripts/dump_panel.py dump --qlib_dir <qlib_dir>`.
+
+    NOTE:
+        The panels are not updated by `scripts/dump_bin.py`, please regenerate them after updating the features.
+    """
+
+    _panel_cache = PanelFileCache(size_limit=256)
+    _index_cache = PanelIndexCache(size_limit=256)
+
+    def __init__(self, field: str, freq: str, provider_uri: dict = None, **kwargs):
+        super(FilePanelStorage, self).__init__(field, freq, **kwargs)
+        self._provider_uri = None if provider_uri is None else C.DataPathManager.format_provider_uri(provider_uri)
+        self.file_name = f"{field.lower()}.{freq.lower()}.npy"
+
+    @classmethod
+    def clear_cache(cls):
+        cls._panel_cache.invalidate()
+        cls._index_cache.invalidate()
+
+    @property
+    def index_uri(self) -> Path:
+        return self.uri.with_name(f"{self.field.lower()}.{self.freq.lower()}.index.npy")
+
+    def _index(self) -> dict:
+        index = self._index_cache.get(self.index_uri)
+        if index is None:
+            raise ValueError(f"{self.storage_name} not exists: {self.index_uri}")
+        return index
+
+    def check(self):
+        super(FilePanelStorage, self).check()
+        if not self.index_uri.exists():
+            raise ValueError(f"{self.storage_name} not exists: {self.index_uri}")
+
+    @property
+    def data(self) -> np.ndarray:
+        data = self._panel_cache.get(self.uri)
+        if data is None:
+            raise ValueError(f"{self.storage_name} not exists: {self.uri}")
+        return data
+
+    @property
+    def instruments(self) -> List[InstKT]:
+        return self._index()["instruments"]
+
+    @property
+    def spans(self) -> np.ndarray:
+        return self._index()["spans"]
+
+    def get_columns(self, instruments: Iterable[InstKT]) -> np.ndarray:
+        """get the column numbers of the instruments, -1 if the instrument is not in the panel"""
+        columns = self._index()["columns"]
+        return np.array([columns.get(inst, -1) for inst in instruments], dtype=int)
+
+    def clear(self):
+        for path in [self.uri, self.index_uri]:
+            if path.exists():
+                path.unlink()
+            self._panel_cache.invalidate(path)
+            self._index_cache.invalidate(path)
+
+    def write(self, data_array: np.ndarray, instruments: List[InstKT], spans: np.ndarray) -> None:
+        data_array = np.asarray(data_array, dtype="<f")
+        spans = np.asarray(spans, dtype="<i8").reshape(-1, 2)
+        if data_array.ndim != 2 or data_array.shape[1] != len(instruments) or len(spans) != len(instruments):
+            raise ValueError("the shape of data_array/spans does not match the instruments")
+        self.uri.parent.mkdir(parents=True, exist_ok=True)
+        index = np.empty(
+            len(instruments),
+            dtype=[
+                ("instrument", f"U{max(map(len, instruments), default=1)}"),
+                ("start_index", "<i8"),
+                ("end_index", "<i8"),
+            ],
+        )
+        index["instrument"] = instruments
+        index["start_index"], index["end_index"] = spans[:, 0], spans[:, 1]
+        # NOTE: write to temporary files and replace the old ones, so the readers which have mapped the old files
+        # will not be affected
+        for path, arr in [(self.uri, np.ascontiguousarray(data_array)), (self.index_uri, index)]:
+            tmp_path = path.with_name(f"{path.name}.tmp")
+            with tmp_path.open("wb") as fp:
+                np.save(fp, arr)
+            os.replace(str(tmp_path), str(path))
+            self._panel_cache.invalidate(path)
+            self._index_cache.invalidate(path)
+
+    def __getitem__(self, i: Union[int, slice]) -> np.ndarray:
+        if not isinstance(i, (int, slice)):
+            raise TypeError(f"type(i) = {type(i)}")
+        return self.data[i]
+
+    def __len__(self) -> int:
+        return len(self.data)
@@ -0,0 +1,338 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+Parquet based storage
+
+The data are saved in a few large Parquet files instead of many small files, which is friendly to network
+filesystems and can be shared with other tools (e.g. pandas, Spark, DuckDB) without conversion.
+
+.. code-block:: text
+
+    <provider_uri>
+        calendars/<freq>.parquet            # column: datetime
+        calendars/<freq>_future.parquet
+        instruments/<market>.parquet        # columns: instrument, start_datetime, end_datetime
+        features/<freq>.parquet             # columns: instrument, index, <field 1>, <field 2>, ...
+
+The features of all the instruments are saved in one table sorted by (instrument, index), where `index` is the
+calendar index of the row. So the statistics of the row groups can be used to read only the row groups which
+contain the instrument and the calendar range, and only the queried field is read from them.
+
+The files can be converted from the default `.bin` format by `python scripts/dump_parquet.py dump --qlib_dir ...`.
+They can be used by setting the backends of the providers:
+
+.. code-block:: python
+
+    qlib.init(
+        provider_uri=provider_uri,
+        calendar_provider={
+            "class": "LocalCalendarProvider",
+            "module_path": "qlib.data.data",
+            "kwargs": {
+                "backend": {"class": "ParquetCalendarStorage", "module_path": "qlib.data.storage.parquet_storage"}
+            },
+        },
+        instrument_provider={
+            "class": "LocalInstrumentProvider",
+            "module_path": "qlib.data.data",
+            "kwargs": {
+                "backend": {"class": "ParquetInstrumentStorage", "module_path": "qlib.data.storage.parquet_storage"}
+            },
+        },
+        feature_provider={
+            "class": "LocalFeatureProvider",
+            "module_path": "qlib.data.data",
+            "kwargs": {
+                "backend": {"class": "ParquetFeatureStorage", "module_path": "qlib.data.storage.parquet_storage"}
+            },
+        },
+    )
+
+NOTE: The Parquet storages are read-only, please regenerate the files after updating the data.
+"""
+
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from qlib.config import C
+from qlib.data.cache import H
+from qlib.utils.time import Freq
+from qlib.data.storage import CalendarStorage, InstrumentStorage, FeatureStorage, CalVT, InstKT, InstVT
+from qlib.data.storage.file_storage import FileStorageMixin, MmapFileCache
+
+
+class ParquetFileCache(MmapFileCache):
+    """Process-level LRU cache of the opened Parquet files and the statistics of their row groups"""
+
+    STATS_COLUMNS = ("instrument", "index")
+
+    def _map(self, path: Path, size: int) -> dict:
+        pq_file = pq.ParquetFile(str(path))
+        metadata = pq_file.metadata
+        names = [metadata.schema.column(i).name for i in range(metadata.num_columns)]
+        stats = {}
+        for col in self.STATS_COLUMNS:
+            if col not in names:
+                continue
+            col_idx = names.index(col)
+            _min, _max = [], []
+            for rg in range(metadata.num_row_groups):
+                _stats = metadata.row_group(rg).column(col_idx).statistics
+                if _stats is not None and _stats.has_min_max:
+                    _min.append(_stats.min)
+                    _max.append(_stats.max)
+                else:
+                    # the row group can't be pruned without statistics
+                    _min.append(None)
+                    _max.append(None)
+            stats[col] = (np.array(_min, dtype=object), np.array(_max, dtype=object))
+        return {"file": pq_file, "columns": names, "stats": stats}
+
+
+class ParquetStorageMixin(FileStorageMixin):
+    """ParquetStorageMixin, applicable to ParquetXXXStorage"""
+
+    _parquet_cache = ParquetFileCache(size_limit=256)
+
+    @property
+    def support_freq(self) -> List[str]:
+        _v = "_support_freq"
+        if hasattr(self, _v):
+            return getattr(self, _v)
+        if len(self.provider_uri) == 1 and C.DEFAULT_FREQ in self.provider_uri:
+            calendar_dir = self.dpm.get_data_uri(C.DEFAULT_FREQ).joinpath("calendars")
+            key = "support_freq_parquet" + str(calendar_dir)
+            freq_l = H["c"].get(key)
+            if freq_l is None:
+                stems = {x.stem for suffix in ["*.parquet", "*.txt"] for x in calendar_dir.glob(suffix)}
+                freq_l = H["c"][key] = sorted(filter(lambda _freq: not _freq.endswith("_future"), stems))
+        else:
+            freq_l = self.provider_uri.keys()
+        freq_l = [Freq(freq) for freq in freq_l]
+        setattr(self, _v, freq_l)
+        return freq_l
+
+    @classmethod
+    def clear_cache(cls):
+        cls._parquet_cache.invalidate()
+
+    def _parquet_file(self) -> dict:
+        pq_file = self._parquet_cache.get(self.uri)
+        if pq_file is None:
+            raise ValueError(f"{self.storage_name} not exists: {self.uri}")
+        return pq_file
+
+    def _read_only(self, *args, **kwargs):
+        raise NotImplementedError(f"{self.__class__.__name__} is read-only")
+
+    clear = _read_only
+
+
+class ParquetCalendarStorage(ParquetStorageMixin, CalendarStorage):
+    DATETIME_FIELD = "datetime"
+
+    def __init__(self, freq: str, future: bool, provider_uri: dict = None, **kwargs):
+        super(ParquetCalendarStorage, self).__init__(freq, future, **kwargs)
+        self.future = future
+        self._provider_uri = None if provider_uri is None else C.DataPathManager.format_provider_uri(provider_uri)
+
+    @property
+    def file_name(self) -> str:
+        return f"{self.freq.lower()}_future.parquet" if self.future else f"{self.freq.lower()}.parquet"
+
+    @property
+    def data(self) -> List[CalVT]:
+        key = "orig_file" + str(self.uri)
+        _calendar = H["c"].get(key)
+        if _calendar is None:
+            table = self._parquet_file()["file"].read(columns=[self.DATETIME_FIELD])
+            _calendar = pd.DatetimeIndex(table.column(self.DATETIME_FIELD).to_pandas())
+            _format = "%Y-%m-%d" if Freq(self.freq) == Freq("day") else "%Y-%m-%d %H:%M:%S"
+            _calendar = H["c"][key] = _calendar.strftime(_format).tolist()
+        return _calendar
+
+    def index(self, value: CalVT) -> int:
+        return self.data.index(value)
+
+    extend = insert = remove = ParquetStorageMixin._read_only
+    __setitem__ = __delitem__ = ParquetStorageMixin._read_only
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[CalVT, List[CalVT]]:
+        return self.data[i]
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+class ParquetInstrumentStorage(ParquetStorageMixin, InstrumentStorage):
+    INSTRUMENT_START_FIELD = "start_datetime"
+    INSTRUMENT_END_FIELD = "end_datetime"
+    SYMBOL_FIELD_NAME = "instrument"
+
+    def __init__(self, market: str, freq: str, provider_uri: dict = None, **kwargs):
+        super(ParquetInstrumentStorage, self).__init__(market, freq, **kwargs)
+        self._provider_uri = None if provider_uri is None else C.DataPathManager.format_provider_uri(provider_uri)
+        self.file_name = f"{market.lower()}.parquet"
+
+    @property
+    def data(self) -> Dict[InstKT, InstVT]:
+        df = (
+            self._parquet_file()["file"]
+            .read(columns=[self.SYMBOL_FIELD_NAME, self.INSTRUMENT_START_FIELD, self.INSTRUMENT_END_FIELD])
+            .to_pandas()
+        )
+        _instruments = dict()
+        for row in df.itertuples(index=False):
+            _instruments.setdefault(row[0], []).append((pd.Timestamp(row[1]), pd.Timestamp(row[2])))
+        return _instruments
+
+    __setitem__ = __delitem__ = update = ParquetStorageMixin._read_only
+
+    def __getitem__(self, k: InstKT) -> InstVT:
+        return self.data[k]
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+class ParquetFeatureStorage(ParquetStorageMixin, FeatureStorage):
+    SYMBOL_FIELD_NAME = "instrument"
+    INDEX_FIELD_NAME = "index"
+
+    def __init__(self, instrument: str, field: str, freq: str, provider_uri: dict = None, **kwargs):
+        super(ParquetFeatureStorage, self).__init__(instrument, field, freq, **kwargs)
+        self._provider_uri = None if provider_uri is None else C.DataPathManager.format_provider_uri(provider_uri)
+        self.file_name = f"{freq.lower()}.parquet"
+
+    def _select_row_groups(self, pq_file: dict, start_index: int = None, end_index: int = None) -> List[int]:
+        """select the row groups which may contain the instrument in [start_index, end_index] by their statistics"""
+        n_groups = pq_file["file"].metadata.num_row_groups
+        selected = np.ones(n_groups, dtype=bool)
+        inst = self.instrument.lower()
+        for col, lower, upper in [
+            (self.SYMBOL_FIELD_NAME, inst, inst),
+            (self.INDEX_FIELD_NAME, start_index, end_index),
+        ]:
+            if col not in pq_file["stats"]:
+                continue
+            _min, _max = pq_file["stats"][col]
+            for rg in np.flatnonzero(selected):
+                if _min[rg] is None:
+                    continue
+                if (upper is not None and _min[rg] > upper) or (lower is not None and _max[rg] < lower):
+                    selected[rg] = False
+        return np.flatnonzero(selected).tolist()
+
+    def _read_fields(
+        self, fields: List[str], start_index: int = None, end_index: int = None
+    ) -> Tuple[np.ndarray, List[Union[np.ndarray, None]]]:
+        """read the index and the values of the fields in [start_index, end_index]
+
+        The values of a field are None if the field is not in the file
+        """
+        pq_file = self._parquet_cache.get(self.uri)
+        fields = [field.lower() for field in fields]
+        empty = np.array([], dtype=int), [None] * len(fields)
+        if pq_file is None:
+            return empty
+        columns = list(dict.fromkeys(field for field in fields if field in pq_file["columns"]))
+        if len(columns) == 0:
+            return empty
+        row_groups = self._select_row_groups(pq_file, start_index, end_index)
+        if len(row_groups) == 0:
+            return np.array([], dtype=int), [np.array([], dtype=np.float32) if f in columns else None for f in fields]
+        inst = self.instrument.lower()
+        _min, _max = pq_file["stats"].get(self.SYMBOL_FIELD_NAME, ([None], [None]))
+        # the symbol column is unnecessary if all the selected row groups only contain the instrument
+        single_inst = all(_min[rg] == inst and _max[rg] == inst for rg in row_groups)
+        columns = [self.INDEX_FIELD_NAME] + columns
+        if not single_inst:
+            columns.append(self.SYMBOL_FIELD_NAME)
+        table = pq_file["file"].read_row_groups(row_groups, columns=columns)
+        index = table.column(self.INDEX_FIELD_NAME).to_numpy()
+        mask = np.ones(len(index), dtype=bool)
+        if not single_inst:
+            mask &= table.column(self.SYMBOL_FIELD_NAME).to_numpy(zero_copy_only=False) == inst
+        if start_index is not None:
+            mask &= index >= start_index
+        if end_index is not None:
+            mask &= index <= end_index
+        values = {}
+        for field in fields:
+            if field in columns and field not in values:
+                values[field] = table.column(field).to_numpy(zero_copy_only=False).astype(np.float32)[mask]
+        return index[mask], [values.get(field) for field in fields]
+
+    def _read(self, start_index: int = None, end_index: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """read the (index, values) of the feature in [start_index, end_index]"""
+        index, (values,) = self._read_fields([self.field], start_index, end_index)
+        if values is None:
+            return np.array([], dtype=int), np.array([], dtype=np.float32)
+        return index, values
+
+    @staticmethod
+    def _to_series(index: np.ndarray, values: np.ndarray) -> pd.Series:
+        if len(index) == 0:
+            return pd.Series(dtype=np.float32)
+        series = pd.Series(values, index=index)
+        # the rows of a feature are continuous like `FileFeatureStorage`
+        if len(index) != index[-1] - index[0] + 1:
+            series = series.sort_index().reindex(pd.RangeIndex(index.min(), index.max() + 1))
+        else:
+            series.index = pd.RangeIndex(index[0], index[-1] + 1)
+        return series
+
+    def read_many(self, fields: List[str], s: slice = slice(None)) -> Tuple[Union[int, None], np.ndarray, np.ndarray]:
+        # all the fields are read from the same row groups
+        end_index = None if s.stop is None else s.stop - 1
+        index, values_list = self._read_fields(fields, s.start, end_index)
+        return self.stack_series(
+            [
+                pd.Series(dtype=np.float32) if values is None else self._to_series(index, values)
+                for values in values_list
+            ]
+        )
+
+    @property
+    def data(self) -> pd.Series:
+        return self[:]
+
+    @property
+    def start_index(self) -> Union[int, None]:
+        index, _ = self._read()
+        return int(index.min()) if len(index) > 0 else None
+
+    @property
+    def end_index(self) -> Union[int, None]:
+        index, _ = self._read()
+        return int(index.max()) if len(index) > 0 else None
+
+    write = rebase = rewrite = ParquetStorageMixin._read_only
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[Tuple[int, float], pd.Series]:
+        if isinstance(i, int):
+            index, values = self._read(i, i)
+            if len(index) == 0:
+                storage_start_index = self.start_index
+                if storage_start_index is None:
+                    return None, None
+                if storage_start_index > i:
+                    raise IndexError(f"{i}: start index is {storage_start_index}")
+                return i, np.nan
+            return i, values[0].item()
+        elif isinstance(i, slice):
+            start_index = i.start
+            end_index = None if i.stop is None else i.stop - 1
+            return self._to_series(*self._read(start_index, end_index))
+        else:
+            raise TypeError(f"type(i) = {type(i)}")
+
+    def __len__(self) -> int:
+        self.check()
+        index, _ = self._read()
+        return 0 if len(index) == 0 else int(index.max() - index.min() + 1)
@@ -102,6 +102,14 @@ class CalendarStorage(BaseStorage):
         """
         raise NotImplementedError("Subclass of CalendarStorage must implement `data` method")
 
+    @property
+    def datetime_index(self) -> pd.DatetimeIndex:
+        """get all data as `pd.DatetimeIndex`
+
+        Subclasses can override it to load the calendar without parsing `data`.
+        """
+        return pd.DatetimeIndex(self.data)
+
     def clear(self) -> None:
         raise NotImplementedError("Subclass of CalendarStorage must implement `clear` method")
 
@@ -293,6 +301,19 @@ class FeatureStorage(BaseStorage):
         """
         raise NotImplementedError("Subclass of FeatureStorage must implement `end_index` method")
 
+    @property
+    def version(self) -> Union[int, None]:
+        """get FeatureStorage version
+
+        Notes
+        -----
+        The version is changed whenever the data is rewritten, the disk caches depending on the data are outdated if
+        its version is changed.
+
+        If the version is unknown, return None (default)
+        """
+        return None
+
     def clear(self) -> None:
         raise NotImplementedError("Subclass of FeatureStorage must implement `clear` method")
 
@@ -482,6 +503,52 @@ class FeatureStorage(BaseStorage):
             "Subclass of FeatureStorage must implement `__getitem__(i: int)`/`__getitem__(s: slice)` method"
         )
 
+    def _field_storage(self, field: str) -> "FeatureStorage":
+        """the storage of another field of the same instrument"""
+        if field == self.field:
+            return self
+        return type(self)(instrument=self.instrument, field=field, freq=self.freq, **self.kwargs)
+
+    @staticmethod
+    def stack_series(series_list: List[pd.Series]) -> Tuple[Union[int, None], np.ndarray, np.ndarray]:
+        """stack the series read from the FeatureStorages into the result of `read_many`"""
+        spans = np.zeros((len(series_list), 2), dtype=np.int64)
+        spans[:, 1] = -1
+        series_list = [(i, series) for i, series in enumerate(series_list) if not series.empty]
+        if len(series_list) == 0:
+            return None, np.empty((len(spans), 0), dtype=np.float32), spans
+        start_index = min(series.index[0] for _, series in series_list)
+        end_index = max(series.index[-1] for _, series in series_list)
+        values = np.full((len(spans), end_index - start_index + 1), np.nan, dtype=np.float32)
+        for i, series in series_list:
+            spans[i] = series.index[0], series.index[-1]
+            values[i, spans[i, 0] - start_index : spans[i, 1] - start_index + 1] = series.values
+        return start_index, values, spans
+
+    def read_many(self, fields: List[str], s: slice = slice(None)) -> Tuple[Union[int, None], np.ndarray, np.ndarray]:
+        """read multiple fields of the instrument in one batch
+
+        The default implementation reads the fields one by one, the subclasses which save the fields of an instrument
+        together (e.g. `BundleFeatureStorage`) can read them at once.
+
+        Parameters
+        ----------
+        fields : List[str]
+            the fields of the instrument, `self.field` is not necessarily included
+        s : slice
+            the calendar index range like `__getitem__`
+
+        Returns
+        -------
+        Tuple[int, np.ndarray, np.ndarray]
+            - start_index: the calendar index of the first column of `values`, None if all the fields are empty
+            - values: a 2-D float32 array with the shape (len(fields), n), values[i] is the data of fields[i], the
+              indexes out of the range of the field are filled with nan
+            - spans: the [start, end] calendar index of each field with the shape (len(fields), 2), which are the
+              same as the index of `self[s]` of the field; end < start if the field is empty
+        """
+        return self.stack_series([self._field_storage(field)[s] for field in fields])
+
     def __len__(self) -> int:
         """
 
@@ -492,3 +559,99 @@ class FeatureStorage(BaseStorage):
 
         """
         raise NotImplementedError("Subclass of FeatureStorage must implement `__len__`  method")
+
+
+class PanelStorage(BaseStorage):
+    """Storage of the cross-sectional panel of a field
+
+    The panel is a 2-D array: the i-th row is the data of all the instruments at the i-th calendar point and the
+    j-th column is the data of `self.instruments[j]`. So the data of all the instruments in a time range can be
+    read at once.
+    """
+
+    def __init__(self, field: str, freq: str, **kwargs):
+        self.field = field
+        self.freq = freq
+        self.kwargs = kwargs
+
+    @property
+    def data(self) -> np.ndarray:
+        """get all data
+
+        Raises
+        ------
+        ValueError
+            If the data(storage) does not exist, raise ValueError
+        """
+        raise NotImplementedError("Subclass of PanelStorage must implement `data` method")
+
+    @property
+    def instruments(self) -> List[InstKT]:
+        """the instruments of the columns
+
+        Raises
+        ------
+        ValueError
+            If the data(storage) does not exist, raise ValueError
+        """
+        raise NotImplementedError("Subclass of PanelStorage must implement `instruments` method")
+
+    @property
+    def spans(self) -> np.ndarray:
+        """the calendar index range of each instrument
+
+        Returns
+        -------
+        np.ndarray
+            shape (len(self.instruments), 2), [start_index, end_index] of each column (both sides are closed).
+            It is the same as `FeatureStorage.start_index` and `FeatureStorage.end_index` of the instrument.
+            `end_index < start_index` if the instrument has no data.
+
+        Raises
+        ------
+        ValueError
+            If the data(storage) does not exist, raise ValueError
+        """
+        raise NotImplementedError("Subclass of PanelStorage must implement `spans` method")
+
+    def write(self, data_array: np.ndarray, instruments: List[InstKT], spans: np.ndarray) -> None:
+        """overwrite the panel
+
+        Parameters
+        ----------
+        data_array : np.ndarray
+            shape (<the length of calendar>, len(instruments))
+        instruments : List[InstKT]
+            the instruments of the columns
+        spans : np.ndarray
+            shape (len(instruments), 2), please refer to `PanelStorage.spans`
+        """
+        raise NotImplementedError("Subclass of PanelStorage must implement `write` method")
+
+    def __getitem__(self, i: Union[int, slice]) -> np.ndarray:
+        """x.__getitem__(y) <==> x[y]
+
+        Returns
+        -------
+        np.ndarray
+            the row(s) of the panel
+
+        Raises
+        ------
+        ValueError
+            If the data(storage) does not exist, raise ValueError
+        """
+        raise NotImplementedError(
+            "Subclass of PanelStorage must implement `__getitem__(i: int)`/`__getitem__(s: slice)` method"
+        )
+
+    def __len__(self) -> int:
+        """the number of rows
+
+        Raises
+        ------
+        ValueError
+            If the data(storage) does not exist, raise ValueError
+
+        """
+        raise NotImplementedError("Subclass of PanelStorage must implement `__len__`  method")
@@ -1,10 +1,12 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
+import itertools
 import threading
+from collections import deque
 from functools import partial
 from threading import Thread
-from typing import Callable, Text, Union
+from typing import Callable, Iterable, Iterator, Text, Union
 
 import joblib
 from joblib import Parallel, delayed
@@ -295,6 +297,43 @@ def complex_parallel(paral: Parallel, complex_iter):
     return complex_iter
 
 
+def read_ahead(executor: concurrent.futures.Executor, func: Callable, args_iter: Iterable, depth: int) -> Iterator:
+    """read_ahead.
+    Yield `func(*args)` for each `args` in `args_iter` in order, while the next `depth` calls are running in `executor`
+
+    It is designed for overlapping the reading of the upcoming tasks and the calculation of the current ones, e.g. the
+    returned iterator can be passed to `Parallel`, which consumes it lazily.
+
+    >>> from concurrent.futures import ThreadPoolExecutor
+    >>> with ThreadPoolExecutor(2) as executor:
+    ...     list(read_ahead(executor, pow, [(2, 1), (2, 2), (2, 3)], 2))
+    [2, 4, 8]
+
+    Parameters
+    ----------
+    executor : concurrent.futures.Executor
+        the executor running `func`
+    func : Callable
+        the function
+    args_iter : Iterable
+        the arguments of each call
+    depth : int
+        the max number of the calls running ahead of the consumer
+
+    Returns
+    -------
+    Iterator
+        the results of the calls
+    """
+    args_iter = iter(args_iter)
+    futures = deque(executor.submit(func, *args) for args in itertools.islice(args_iter, max(depth, 1)))
+    while futures:
+        res = futures.popleft().result()
+        for args in itertools.islice(args_iter, 1):
+            futures.append(executor.submit(func, *args))
+        yield res
+
+
 class call_in_subproc:
     """
     When we repeatedly run functions, it is hard to avoid memory leakage.
@@ -52,23 +52,109 @@ def resam_calendar(
 
     # else, convert the raw calendar into day calendar, and divide the whole calendar into several bars evenly
     else:
-        _calendar_day = np.unique(list(map(lambda x: pd.Timestamp(x.year, x.month, x.day, 0, 0, 0), calendar_raw)))
+        _calendar_day = pd.DatetimeIndex(np.unique(pd.DatetimeIndex(calendar_raw).normalize()))
         if freq_sam.base == Freq.NORM_FREQ_DAY:
-            return _calendar_day[:: freq_sam.count]
+            return _calendar_day.to_numpy(dtype=object)[:: freq_sam.count]
 
         elif freq_sam.base == Freq.NORM_FREQ_WEEK:
-            _day_in_week = np.array(list(map(lambda x: x.dayofweek, _calendar_day)))
-            _calendar_week = _calendar_day[np.ediff1d(_day_in_week, to_begin=-1) < 0]
+            _day_in_week = np.asarray(_calendar_day.dayofweek)
+            _calendar_week = _calendar_day.to_numpy(dtype=object)[np.ediff1d(_day_in_week, to_begin=-1) < 0]
             return _calendar_week[:: freq_sam.count]
 
         elif freq_sam.base == Freq.NORM_FREQ_MONTH:
-            _day_in_month = np.array(list(map(lambda x: x.day, _calendar_day)))
-            _calendar_month = _calendar_day[np.ediff1d(_day_in_month, to_begin=-1) < 0]
+            _day_in_month = np.asarray(_calendar_day.day)
+            _calendar_month = _calendar_day.to_numpy(dtype=object)[np.ediff1d(_day_in_month, to_begin=-1) < 0]
             return _calendar_month[:: freq_sam.count]
         else:
             raise ValueError("sampling freq must be xmin, xd, xw, xm")
 
 
+def get_resam_bucket(freq_raw: Union[str, Freq], freq_sam: Union[str, Freq]) -> np.ndarray:
+    """
+    Get the bucket map between the calendars of two frequencies, it is calculated once and cached.
+
+    Parameters
+    ----------
+    freq_raw : Union[str, Freq]
+        Frequency of the raw calendar
+    freq_sam : Union[str, Freq]
+        Sample frequency, it should not be higher than `freq_raw`
+
+    Returns
+    -------
+    np.ndarray
+        The index of the bar in the calendar of `freq_sam` which each bar in the calendar of `freq_raw` belongs to,
+        -1 for the bars before the sampled calendar.
+    """
+    from ..data.cache import H  # pylint: disable=C0415
+    from ..data.data import Cal  # pylint: disable=C0415
+
+    freq_raw, freq_sam = Freq(freq_raw), Freq(freq_sam)
+    if Freq.get_min_delta(freq_raw, freq_sam) > 0:
+        raise ValueError("raw freq must be higher than sampling freq")
+    flag = f"{freq_raw}_{freq_sam}_bucket"
+    bucket = H["c"].get(flag)
+    if bucket is None:
+        calendar_raw = pd.DatetimeIndex(Cal.calendar(freq=str(freq_raw))).values
+        calendar_sam = pd.DatetimeIndex(Cal.calendar(freq=str(freq_sam))).values
+        bucket = H["c"][flag] = np.searchsorted(calendar_sam, calendar_raw, side="right") - 1
+    return bucket
+
+
+RESAM_METHODS = ("sum", "mean", "count", "max", "min", "first", "last")
+
+
+def get_bucket_starts(buckets: np.ndarray) -> np.ndarray:
+    """get the positions where the contiguous buckets start"""
+    return np.flatnonzero(np.ediff1d(buckets, to_begin=1) != 0)
+
+
+def resam_bucket_reduce(values: np.ndarray, starts: np.ndarray, method: str, min_count: int = 0) -> np.ndarray:
+    """
+    Reduce the values of the contiguous buckets, the NaN values are skipped like the methods of pandas.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        1D or 2D data, the buckets are along the first axis
+    starts : np.ndarray
+        the positions where the buckets start, it should not be empty
+    method : str
+        one of `RESAM_METHODS`
+    min_count : int
+        the bucket sums with fewer valid values than `min_count` are NaN
+
+    Returns
+    -------
+    np.ndarray
+        the reduced values of the buckets
+    """
+    if values.dtype.kind != "f":
+        values = values.astype(np.float64)
+    valid = ~np.isnan(values)
+    if method in ("sum", "mean", "count"):
+        count = np.add.reduceat(valid.astype(np.int64), starts, axis=0)
+        if method == "count":
+            return count
+        total = np.add.reduceat(np.where(valid, values, 0), starts, axis=0)
+        if method == "sum":
+            return np.where(count >= min_count, total, np.nan).astype(values.dtype, copy=False)
+        with np.errstate(invalid="ignore"):
+            return total / count.astype(values.dtype)
+    elif method in ("max", "min"):
+        return (np.fmax if method == "max" else np.fmin).reduceat(values, starts, axis=0)
+    elif method in ("first", "last"):
+        positions = np.arange(len(values)).reshape((-1,) + (1,) * (values.ndim - 1))
+        if method == "last":
+            located = np.maximum.reduceat(np.where(valid, positions, -1), starts, axis=0)
+        else:
+            located = np.minimum.reduceat(np.where(valid, positions, len(values)), starts, axis=0)
+        found = (located >= 0) & (located < len(values))
+        result = np.take_along_axis(values, np.where(found, located, 0), axis=0)
+        return np.where(found, result, np.nan).astype(values.dtype, copy=False)
+    raise ValueError(f"method should be one of {RESAM_METHODS}, not {method}")
+
+
 def get_higher_eq_freq_feature(instruments, fields, start_time=None, end_time=None, freq="day", disk_cache=1):
     """get the feature with higher or equal frequency than `freq`.
     Returns
@@ -191,6 +277,9 @@ def resam_ts_data(
 
     if feature.empty:
         return None
+    kernel = _resam_kernel(feature, method, method_kwargs)
+    if kernel is not None:
+        return _resam_ts_data_by_kernel(feature, kernel)
     if isinstance(feature.index, pd.MultiIndex):
         if callable(method):
             method_func = method
@@ -206,6 +295,40 @@ def resam_ts_data(
     return feature
 
 
+def _resam_kernel(feature: Union[pd.DataFrame, pd.Series], method, method_kwargs: dict) -> Union[str, None]:
+    """get the method of `resam_bucket_reduce` which is the same as `method`, None if there isn't one"""
+    if method_kwargs or feature.values.dtype.kind != "f":
+        return None
+    if method is ts_data_last or method is ts_data_first:
+        return "last" if method is ts_data_last else "first"
+    if isinstance(method, str) and method in RESAM_METHODS:
+        return method
+    return None
+
+
+def _resam_ts_data_by_kernel(feature: Union[pd.DataFrame, pd.Series], kernel: str):
+    """reduce the data of each instrument (or all the data) with the numpy kernel `kernel`"""
+    values = feature.values
+    if isinstance(feature.index, pd.MultiIndex):
+        from ..data.dataset.utils import get_level_index  # pylint: disable=C0415
+
+        level = get_level_index(feature, level="instrument")
+        codes = feature.index.codes[level]
+        if (np.diff(codes) < 0).any():
+            order = np.argsort(codes, kind="stable")
+            codes, values = codes[order], values[order]
+        starts = get_bucket_starts(codes)
+        index = feature.index.levels[level][codes[starts]]
+        result = resam_bucket_reduce(values, starts, kernel)
+        if isinstance(feature, pd.DataFrame):
+            return pd.DataFrame(result, index=index, columns=feature.columns)
+        return pd.Series(result, index=index, name=feature.name)
+    result = resam_bucket_reduce(values, np.zeros(1, dtype=int), kernel)[0]
+    if isinstance(feature, pd.DataFrame):
+        return pd.Series(result, index=feature.columns)
+    return result
+
+
 def get_valid_value(series, last=True):
     """get the first/last not nan value of pd.Series with single level index
     Parameters
@@ -0,0 +1,110 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Compare the Cython kernels of the rolling operators (`qlib/data/_libs`) with the pandas implementations they replace.
+
+Usage:
+
+    python scripts/benchmark_rolling_ops.py --length 5000 --window 20 --repeat 3
+
+NOTE: the extension modules must be compiled first (e.g. `python setup.py build_ext --inplace`).
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+
+import fire
+import numpy as np
+import pandas as pd
+
+from qlib.data._libs.rolling import (
+    rolling_rank,
+    rolling_quantile,
+    rolling_mad,
+    rolling_wma,
+    rolling_idxmax,
+    rolling_idxmin,
+)
+from qlib.data._libs.expanding import expanding_ema
+
+
+def _mad(x):
+    x1 = x[~np.isnan(x)]
+    return np.mean(np.abs(x1 - x1.mean()))
+
+
+def _weighted_mean(x):
+    w = np.arange(len(x)) + 1
+    w = w / w.sum()
+    return np.nanmean(w * x)
+
+
+def _exp_weighted_mean(x):
+    a = 1 - 2 / (1 + len(x))
+    w = a ** np.arange(len(x))[::-1]
+    w /= w.sum()
+    return np.nansum(w * x)
+
+
+def _timeit(func, repeat: int) -> float:
+    costs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        costs.append(time.perf_counter() - start)
+    return min(costs)
+
+
+def main(length: int = 5000, window: int = 20, repeat: int = 3, seed: int = 0):
+    """
+    Parameters
+    ----------
+    length : int
+        the length of the series
+    window : int
+        the rolling window size
+    repeat : int
+        the best of `repeat` runs is reported
+    seed : int
+        the random seed of the series
+    """
+    rng = np.random.RandomState(seed)
+    values = (100 * np.exp(np.cumsum(rng.randn(length) * 0.02))).astype(np.float32)
+    values[rng.rand(length) < 0.01] = np.nan
+    series = pd.Series(values)
+    rolling = series.rolling(window, min_periods=1)
+    # the expanding EMA is quadratic in the pandas implementation, so a shorter series is used
+    expanding = series.iloc[: min(length, 1000)].expanding(min_periods=1)
+
+    cases = {
+        f"Rank(N={window})": (lambda: rolling.rank(pct=True), lambda: rolling_rank(values, window)),
+        f"Quantile(N={window})": (lambda: rolling.quantile(0.8), lambda: rolling_quantile(values, window, 0.8)),
+        f"Mad(N={window})": (lambda: rolling.apply(_mad, raw=True), lambda: rolling_mad(values, window)),
+        f"WMA(N={window})": (lambda: rolling.apply(_weighted_mean, raw=True), lambda: rolling_wma(values, window)),
+        f"IdxMax(N={window})": (
+            lambda: rolling.apply(lambda x: x.argmax() + 1, raw=True),
+            lambda: rolling_idxmax(values, window),
+        ),
+        f"IdxMin(N={window})": (
+            lambda: rolling.apply(lambda x: x.argmin() + 1, raw=True),
+            lambda: rolling_idxmin(values, window),
+        ),
+        "EMA(N=0)": (
+            lambda: expanding.apply(_exp_weighted_mean, raw=True),
+            lambda: expanding_ema(values[: min(length, 1000)]),
+        ),
+    }
+    rows = []
+    for name, (old, new) in cases.items():
+        np.testing.assert_allclose(old().values, new(), rtol=1e-9, err_msg=name)
+        old_cost, new_cost = _timeit(old, repeat), _timeit(new, repeat)
+        rows.append((name, old_cost * 1e3, new_cost * 1e3, old_cost / new_cost))
+    print(pd.DataFrame(rows, columns=["operator", "pandas (ms)", "cython (ms)", "speedup"]).to_string(index=False))
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
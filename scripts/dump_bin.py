@@ -19,6 +19,12 @@ import pandas as pd
 from tqdm import tqdm
 from loguru import logger
 from qlib.utils import fname_to_code, code_to_fname
+from qlib.data.storage.file_storage import (
+    BundleFeatureStorage,
+    CompressedFeatureStorage,
+    FileCalendarStorage,
+    FileFeatureStorage,
+)
 
 
 def read_as_df(file_path: Union[str, Path], **kwargs) -> pd.DataFrame:
@@ -69,6 +75,10 @@ class DumpDataBase:
     UPDATE_MODE = "update"
     ALL_MODE = "all"
 
+    BIN_FORMAT = "bin"
+    BUNDLE_FORMAT = "bundle"
+    COMPRESSED_FORMAT = "compressed"
+
     def __init__(
         self,
         data_path: str,
@@ -82,6 +92,7 @@ class DumpDataBase:
         exclude_fields: str = "",
         include_fields: str = "",
         limit_nums: int = None,
+        feature_format: str = "bin",
     ):
         """
 
@@ -109,6 +120,13 @@ class DumpDataBase:
             fields not dumped
         limit_nums: int
             Use when debugging, default None
+        feature_format: str, default "bin"
+            the format of the features:
+                - "bin": one `<field>.<freq>.bin` file for each field of an instrument
+                - "bundle": all the fields of an instrument are saved in one `<freq>.bundle` file,
+                  which can be read by `qlib.data.storage.file_storage.BundleFeatureStorage`
+                - "compressed": one `<field>.<freq>.cbin` file of compressed blocks for each field of an instrument,
+                  which can be read by `qlib.data.storage.file_storage.CompressedFeatureStorage`
         """
         data_path = Path(data_path).expanduser()
         if isinstance(exclude_fields, str):
@@ -132,6 +150,10 @@ class DumpDataBase:
 
         self.works = max_workers
         self.date_field_name = date_field_name
+        _formats = (self.BIN_FORMAT, self.BUNDLE_FORMAT, self.COMPRESSED_FORMAT)
+        if feature_format not in _formats:
+            raise ValueError(f"feature_format should be one of {_formats}")
+        self.feature_format = feature_format
 
         self._calendars_dir = self.qlib_dir.joinpath(self.CALENDARS_DIR_NAME)
         self._features_dir = self.qlib_dir.joinpath(self.FEATURES_DIR_NAME)
@@ -214,6 +236,18 @@ class DumpDataBase:
         calendars_path = str(self._calendars_dir.joinpath(f"{self.freq}.txt").expanduser().resolve())
         result_calendars_list = [self._format_datetime(x) for x in calendars_data]
         np.savetxt(calendars_path, result_calendars_list, fmt="%s", encoding="utf-8")
+        # the binary calendar can be loaded without parsing the text, it's dumped after the text calendar
+        FileCalendarStorage.write_binary_calendar(
+            self._calendars_dir.joinpath(f"{self.freq}{FileCalendarStorage.BINARY_FILE_SUFFIX}"), result_calendars_list
+        )
+
+    def save_feature_meta(self):
+        # the metadata index is only used by the `.bin` files
+        if self.feature_format != self.BIN_FORMAT:
+            return
+        logger.info("start dump feature meta......")
+        DumpFeatureMeta(self.qlib_dir, self.freq).dump()
+        logger.info("end of feature meta dump.\n")
 
     def save_instruments(self, instruments_data: Union[list, pd.DataFrame]):
         self._instruments_dir.mkdir(parents=True, exist_ok=True)
@@ -260,6 +294,12 @@ class DumpDataBase:
             return
         # used when creating a bin file
         date_index = self.get_datetime_index(_df, calendar_list)
+        if self.feature_format == self.BUNDLE_FORMAT:
+            self._data_to_bundle(_df, date_index, features_dir)
+            return
+        if self.feature_format == self.COMPRESSED_FORMAT:
+            self._data_to_compressed(_df, date_index, features_dir)
+            return
         for field in self.get_dump_fields(_df.columns):
             bin_path = features_dir.joinpath(f"{field.lower()}.{self.freq}{self.DUMP_FILE_SUFFIX}")
             if field not in _df.columns:
@@ -270,7 +310,46 @@ class DumpDataBase:
                     np.array(_df[field]).astype("<f").tofile(fp)
             else:
                 # append; self._mode == self.ALL_MODE or not bin_path.exists()
-                np.hstack([date_index, _df[field]]).astype("<f").tofile(str(bin_path.resolve()))
+                # NOTE: write to a temporary file and replace the old one, the readers that have mapped the old
+                # file into memory (e.g. MmapFeatureStorage) will not be affected by truncating it
+                tmp_path = bin_path.with_name(f"{bin_path.name}.tmp")
+                np.hstack([date_index, _df[field]]).astype("<f").tofile(str(tmp_path.resolve()))
+                os.replace(str(tmp_path.resolve()), str(bin_path.resolve()))
+
+    def _data_to_bundle(self, df: pd.DataFrame, date_index: int, features_dir: Path):
+        bundle_path = features_dir.joinpath(f"{self.freq}{BundleFeatureStorage.BUNDLE_FILE_SUFFIX}")
+        data = {field.lower(): df[field].values for field in self.get_dump_fields(df.columns) if field in df.columns}
+        if bundle_path.exists() and self._mode == self.UPDATE_MODE:
+            # update: append the new rows to the bundle, the fields missing on either side are filled with nan
+            bundle = BundleFeatureStorage.read_bundle(bundle_path)
+            old_data, old_rows = bundle["fields"], bundle["n_rows"]
+            if bundle["start_index"] is not None:
+                date_index = bundle["start_index"]
+            data = {
+                field: np.hstack(
+                    [old_data.get(field, np.full(old_rows, np.nan)), data.get(field, np.full(len(df), np.nan))]
+                )
+                for field in list(old_data) + [field for field in data if field not in old_data]
+            }
+        BundleFeatureStorage.write_bundle(bundle_path, date_index, data)
+
+    def _data_to_compressed(self, df: pd.DataFrame, date_index: int, features_dir: Path):
+        for field in self.get_dump_fields(df.columns):
+            if field not in df.columns:
+                continue
+            compressed_path = features_dir.joinpath(
+                f"{field.lower()}.{self.freq}{CompressedFeatureStorage.COMPRESSED_FILE_SUFFIX}"
+            )
+            values = np.array(df[field]).astype("<f")
+            start_index = date_index
+            if compressed_path.exists() and self._mode == self.UPDATE_MODE:
+                # update: the blocks are compressed separately, but the last block may be partial, so the whole
+                # feature is rewritten
+                old_start_index, old_values = CompressedFeatureStorage.read_compressed(compressed_path)
+                if old_start_index is not None:
+                    start_index = old_start_index
+                    values = np.hstack([old_values, values])
+            CompressedFeatureStorage.write_compressed(compressed_path, start_index, values)
 
     def _dump_bin(self, file_or_data: [Path, pd.DataFrame], calendar_list: List[pd.Timestamp]):
         if not calendar_list:
@@ -355,6 +434,7 @@ class DumpDataAll(DumpDataBase):
         self._dump_calendars()
         self._dump_instruments()
         self._dump_features()
+        self.save_feature_meta()
 
 
 class DumpDataFix(DumpDataAll):
@@ -391,6 +471,7 @@ class DumpDataFix(DumpDataAll):
         )  # type: dict
         self._dump_instruments()
         self._dump_features()
+        self.save_feature_meta()
 
 
 class DumpDataUpdate(DumpDataBase):
@@ -407,6 +488,7 @@ class DumpDataUpdate(DumpDataBase):
         exclude_fields: str = "",
         include_fields: str = "",
         limit_nums: int = None,
+        feature_format: str = "bin",
     ):
         """
 
@@ -434,6 +516,13 @@ class DumpDataUpdate(DumpDataBase):
             fields not dumped
         limit_nums: int
             Use when debugging, default None
+        feature_format: str, default "bin"
+            the format of the features:
+                - "bin": one `<field>.<freq>.bin` file for each field of an instrument
+                - "bundle": all the fields of an instrument are saved in one `<freq>.bundle` file,
+                  which can be read by `qlib.data.storage.file_storage.BundleFeatureStorage`
+                - "compressed": one `<field>.<freq>.cbin` file of compressed blocks for each field of an instrument,
+                  which can be read by `qlib.data.storage.file_storage.CompressedFeatureStorage`
         """
         super().__init__(
             data_path,
@@ -446,6 +535,7 @@ class DumpDataUpdate(DumpDataBase):
             symbol_field_name,
             exclude_fields,
             include_fields,
+            feature_format=feature_format,
         )
         self._mode = self.UPDATE_MODE
         self._old_calendar_list = self._read_calendars(self._calendars_dir.joinpath(f"{self.freq}.txt"))
@@ -540,7 +630,44 @@ class DumpDataUpdate(DumpDataBase):
         df = pd.DataFrame.from_dict(self._update_instruments, orient="index")
         df.index.names = [self.symbol_field_name]
         self.save_instruments(df.reset_index())
+        self.save_feature_meta()
+
+
+class DumpFeatureMeta:
+    def __init__(self, qlib_dir: str, freq: str = "day"):
+        """regenerate the metadata index `features/_meta.<freq>.npy` of the `.bin` features
+
+        The index is generated by `dump_all`, `dump_fix` and `dump_update`, please regenerate it after modifying the
+        `.bin` files by other tools. The revisions of the modified features are increased, so the disk caches
+        depending on them will be regenerated.
+
+        Parameters
+        ----------
+        qlib_dir: str
+            qlib(dump) data director
+        freq: str, default "day"
+            transaction frequency
+        """
+        self.qlib_dir = Path(qlib_dir).expanduser()
+        self.freq = freq
+
+    def dump(self):
+        features_dir = self.qlib_dir.joinpath(DumpDataBase.FEATURES_DIR_NAME)
+        meta_path = features_dir.joinpath(FileFeatureStorage.META_FILE_NAME.format(freq=self.freq.lower()))
+        # the start indexes of the unchanged files are reused from the old index
+        meta = FileFeatureStorage.build_meta(features_dir, self.freq, FileFeatureStorage.read_meta(meta_path))
+        FileFeatureStorage.write_meta(meta_path, meta)
+
+    def __call__(self, *args, **kwargs):
+        self.dump()
 
 
 if __name__ == "__main__":
-    fire.Fire({"dump_all": DumpDataAll, "dump_fix": DumpDataFix, "dump_update": DumpDataUpdate})
+    fire.Fire(
+        {
+            "dump_all": DumpDataAll,
+            "dump_fix": DumpDataFix,
+            "dump_update": DumpDataUpdate,
+            "dump_meta": DumpFeatureMeta,
+        }
+    )
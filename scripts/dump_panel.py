@@ -0,0 +1,122 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Convert the features of all the instruments into the cross-sectional panels (one file per field) which can be loaded
+by `qlib.data.data.LocalPanelProvider`.
+
+Usage:
+
+    python scripts/dump_panel.py dump --qlib_dir ~/.qlib/qlib_data/cn_data --include_fields open,close,high,low,volume,factor
+
+NOTE: the panels are not updated by `scripts/dump_bin.py`, please rerun this script after updating the features.
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pathlib import Path
+from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+import fire
+import numpy as np
+from tqdm import tqdm
+from loguru import logger
+
+import qlib
+from qlib.data import D
+from qlib.data.storage.file_storage import BundleFeatureStorage, FilePanelStorage
+
+
+class DumpPanel:
+    FEATURES_DIR_NAME = "features"
+    DUMP_FILE_SUFFIX = ".bin"
+
+    def __init__(
+        self,
+        qlib_dir: str,
+        freq: str = "day",
+        include_fields: str = "",
+        exclude_fields: str = "",
+        max_workers: int = 16,
+    ):
+        """
+
+        Parameters
+        ----------
+        qlib_dir: str
+            qlib data directory
+        freq: str, default "day"
+            data frequency
+        include_fields: str
+            the fields to dump, separated by ","; default all the fields found in the features directory
+        exclude_fields: str
+            the fields not dumped, separated by ","
+        max_workers: int
+            number of threads to read the features
+        """
+        self.qlib_dir = Path(qlib_dir).expanduser().resolve()
+        self.freq = freq
+        if isinstance(exclude_fields, str):
+            exclude_fields = exclude_fields.split(",")
+        if isinstance(include_fields, str):
+            include_fields = include_fields.split(",")
+        self._exclude_fields = tuple(filter(lambda x: len(x) > 0, map(str.strip, exclude_fields)))
+        self._include_fields = tuple(filter(lambda x: len(x) > 0, map(str.strip, include_fields)))
+        self.works = max_workers
+        self._features_dir = self.qlib_dir.joinpath(self.FEATURES_DIR_NAME)
+        qlib.init(provider_uri=str(self.qlib_dir), expression_cache=None, dataset_cache=None)
+
+    def get_instruments(self):
+        return sorted(p.name for p in self._features_dir.iterdir() if p.is_dir())
+
+    def get_dump_fields(self, instruments):
+        if self._include_fields:
+            return [field.lower() for field in self._include_fields]
+        fields = set()
+        suffix = f".{self.freq}{self.DUMP_FILE_SUFFIX}"
+        for inst in instruments:
+            inst_dir = self._features_dir.joinpath(inst)
+            fields |= {p.name[: -len(suffix)] for p in inst_dir.glob(f"*{suffix}")}
+            bundle_path = inst_dir.joinpath(f"{self.freq}{BundleFeatureStorage.BUNDLE_FILE_SUFFIX}")
+            if bundle_path.exists():
+                fields |= set(BundleFeatureStorage.read_bundle(bundle_path)["fields"])
+        return sorted(fields - {field.lower() for field in self._exclude_fields})
+
+    def _read_feature(self, inst: str, field: str) -> Tuple[int, np.ndarray]:
+        # NOTE: BundleFeatureStorage reads the `.bin` files if the bundle does not exist
+        storage = BundleFeatureStorage(instrument=inst, field=field, freq=self.freq)
+        start_index, end_index = storage.start_index, storage.end_index
+        if start_index is None:
+            return 0, np.array([], dtype=np.float32)
+        return start_index, storage[start_index : end_index + 1].values
+
+    def dump_field(self, field: str, instruments: list, n_rows: int):
+        data = np.full((n_rows, len(instruments)), np.nan, dtype=np.float32)
+        spans = np.zeros((len(instruments), 2), dtype=np.int64)
+        spans[:, 1] = -1
+        with ThreadPoolExecutor(max_workers=self.works) as executor:
+            for i, (start_index, values) in enumerate(
+                executor.map(lambda inst: self._read_feature(inst, field), instruments)
+            ):
+                values = values[: max(n_rows - start_index, 0)]
+                if len(values) == 0:
+                    continue
+                data[start_index : start_index + len(values), i] = values
+                spans[i] = start_index, start_index + len(values) - 1
+        FilePanelStorage(field=field, freq=self.freq).write(data, instruments, spans)
+
+    def dump(self):
+        instruments = self.get_instruments()
+        fields = self.get_dump_fields(instruments)
+        n_rows = len(D.calendar(freq=self.freq))
+        logger.info(f"start dump panels: {len(fields)} fields, {len(instruments)} instruments, {n_rows} rows......")
+        for field in tqdm(fields):
+            self.dump_field(field, instruments, n_rows)
+        logger.info("end of panels dump.\n")
+
+
+if __name__ == "__main__":
+    fire.Fire(DumpPanel)
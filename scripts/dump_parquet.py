@@ -0,0 +1,167 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Convert the calendars, instruments and features of a qlib data directory into Parquet files which can be read by
+`qlib.data.storage.parquet_storage`.
+
+Usage:
+
+    python scripts/dump_parquet.py dump --qlib_dir ~/.qlib/qlib_data/cn_data --include_fields open,close,high,low,volume,factor
+
+NOTE: the Parquet files are not updated by `scripts/dump_bin.py`, please rerun this script after updating the data.
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concurrent.futures import ThreadPoolExecutor
+
+import fire
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from tqdm import tqdm
+from loguru import logger
+
+from qlib.data import D
+from qlib.data.storage.file_storage import FileInstrumentStorage
+from qlib.data.storage.parquet_storage import (
+    ParquetCalendarStorage,
+    ParquetInstrumentStorage,
+    ParquetFeatureStorage,
+)
+from dump_panel import DumpPanel
+
+
+class DumpParquet(DumpPanel):
+    CALENDARS_DIR_NAME = "calendars"
+    INSTRUMENTS_DIR_NAME = "instruments"
+
+    def __init__(
+        self,
+        qlib_dir: str,
+        freq: str = "day",
+        include_fields: str = "",
+        exclude_fields: str = "",
+        max_workers: int = 16,
+        row_group_size: int = 100000,
+        compression: str = "zstd",
+    ):
+        """
+
+        Parameters
+        ----------
+        qlib_dir: str
+            qlib data directory, the Parquet files are saved in it
+        freq: str, default "day"
+            data frequency
+        include_fields: str
+            the fields to dump, separated by ","; default all the fields found in the features directory
+        exclude_fields: str
+            the fields not dumped, separated by ","
+        max_workers: int
+            number of threads to read the features
+        row_group_size: int
+            the max number of rows in a row group. The smaller row groups make the reads of an instrument more
+            precise, and the larger ones make the files smaller and the full scans faster.
+        compression: str
+            the compression codec of the Parquet files
+        """
+        super().__init__(qlib_dir, freq, include_fields, exclude_fields, max_workers)
+        self.row_group_size = row_group_size
+        self.compression = compression
+
+    def dump_calendars(self):
+        calendars_dir = self.qlib_dir.joinpath(self.CALENDARS_DIR_NAME)
+        for future in [False, True]:
+            try:
+                calendar = D.calendar(freq=self.freq, future=future)
+            except ValueError:
+                continue
+            if future and not calendars_dir.joinpath(f"{self.freq}_future.txt").exists():
+                continue
+            table = pa.table({ParquetCalendarStorage.DATETIME_FIELD: pd.DatetimeIndex(calendar)})
+            file_name = f"{self.freq}_future.parquet" if future else f"{self.freq}.parquet"
+            pq.write_table(table, str(calendars_dir.joinpath(file_name)), compression=self.compression)
+
+    def dump_instruments(self):
+        instruments_dir = self.qlib_dir.joinpath(self.INSTRUMENTS_DIR_NAME)
+        for market_path in sorted(instruments_dir.glob("*.txt")):
+            market = market_path.stem
+            inst_l, start_l, end_l = [], [], []
+            for inst, spans in FileInstrumentStorage(market=market, freq=self.freq).data.items():
+                for start, end in spans:
+                    inst_l.append(inst)
+                    start_l.append(pd.Timestamp(start))
+                    end_l.append(pd.Timestamp(end))
+            table = pa.table(
+                {
+                    ParquetInstrumentStorage.SYMBOL_FIELD_NAME: pa.array(inst_l, type=pa.string()),
+                    ParquetInstrumentStorage.INSTRUMENT_START_FIELD: pa.array(start_l, type=pa.timestamp("ns")),
+                    ParquetInstrumentStorage.INSTRUMENT_END_FIELD: pa.array(end_l, type=pa.timestamp("ns")),
+                }
+            )
+            pq.write_table(table, str(instruments_dir.joinpath(f"{market}.parquet")), compression=self.compression)
+
+    def _read_instrument(self, inst: str, fields: list) -> pd.DataFrame:
+        series = {}
+        for field in fields:
+            start_index, values = self._read_feature(inst, field)
+            if len(values) > 0:
+                series[field] = pd.Series(values, index=pd.RangeIndex(start_index, start_index + len(values)))
+        df = pd.DataFrame(series, columns=fields, dtype=np.float32)
+        if not df.empty:
+            df = df.reindex(pd.RangeIndex(df.index.min(), df.index.max() + 1))
+        df.index.name = ParquetFeatureStorage.INDEX_FIELD_NAME
+        df = df.reset_index()
+        df[ParquetFeatureStorage.INDEX_FIELD_NAME] = df[ParquetFeatureStorage.INDEX_FIELD_NAME].astype(np.int32)
+        df.insert(0, ParquetFeatureStorage.SYMBOL_FIELD_NAME, inst.lower())
+        return df
+
+    def dump_features(self):
+        instruments = self.get_instruments()
+        fields = self.get_dump_fields(instruments)
+        schema = pa.schema(
+            [
+                (ParquetFeatureStorage.SYMBOL_FIELD_NAME, pa.string()),
+                (ParquetFeatureStorage.INDEX_FIELD_NAME, pa.int32()),
+            ]
+            + [(field, pa.float32()) for field in fields]
+        )
+        features_path = self.qlib_dir.joinpath(self.FEATURES_DIR_NAME, f"{self.freq}.parquet")
+        tmp_path = features_path.with_name(f"{features_path.name}.tmp")
+        # NOTE: the rows are sorted by (instrument, index), so the statistics of the row groups can be used to prune
+        # the reads of an instrument
+        with pq.ParquetWriter(str(tmp_path), schema, compression=self.compression) as writer:
+            with ThreadPoolExecutor(max_workers=self.works) as executor:
+                buffer, n_rows = [], 0
+                for df in tqdm(
+                    executor.map(lambda inst: self._read_instrument(inst, fields), instruments), total=len(instruments)
+                ):
+                    buffer.append(df)
+                    n_rows += len(df)
+                    if n_rows >= self.row_group_size:
+                        self._write_rows(writer, schema, buffer)
+                        buffer, n_rows = [], 0
+                self._write_rows(writer, schema, buffer)
+        os.replace(str(tmp_path), str(features_path))
+
+    def _write_rows(self, writer: pq.ParquetWriter, schema: pa.Schema, buffer: list):
+        if len(buffer) == 0:
+            return
+        table = pa.Table.from_pandas(pd.concat(buffer, ignore_index=True), schema=schema, preserve_index=False)
+        writer.write_table(table, row_group_size=self.row_group_size)
+
+    def dump(self):
+        logger.info("start dump parquet......")
+        self.dump_calendars()
+        self.dump_instruments()
+        self.dump_features()
+        logger.info("end of parquet dump.\n")
+
+
+if __name__ == "__main__":
+    fire.Fire(DumpParquet)
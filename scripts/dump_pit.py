@@ -209,12 +209,7 @@ class DumpPitData:
                     f.write(struct.pack(self.PERIOD_DTYPE, start_year))
                 first_year = start_year
 
-            # if data already exists, continue to the next field
-            if start_year > end_year:
-                logger.warning(f"{symbol}-{field} data already exists, continue to the next field")
-                continue
-
-            # dump index filled with NA
+            # dump index filled with NA for the new years, the revisions of the existing years are appended below
             with open(index_file, "ab") as fi:
                 for year in range(start_year, end_year + 1):
                     if interval == self.INTERVAL_quarterly:
@@ -236,6 +231,8 @@ class DumpPitData:
                     pass
 
             with open(data_file, "rb+") as fd, open(index_file, "rb+") as fi:
+                # the new records are appended to the existing ones
+                fd.seek(0, 2)
                 # update index if needed
                 for i, row in df_sub.iterrows():
                     # get index
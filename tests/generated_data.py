@@ -0,0 +1,87 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+The base class of the tests running on the data generated into a temporary directory.
+"""
+
+import sys
+import shutil
+import unittest
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+import qlib
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.joinpath("scripts")))
+from dump_bin import DumpDataAll
+
+
+class TestGeneratedData(unittest.TestCase):
+    """Generate the csv files of the instruments, dump them into `qlib_dir` and init qlib with `qlib_dir`
+
+    - `generate_data` writes the random `fields` of `n_instruments` instruments starting and ending on different
+      dates into `source_dir` by default, and `nan_ratio` of their close are missing; subclasses can override it to
+      generate other data.
+    - `dump_data` dumps `source_dir` into `qlib_dir`, it can be overridden to process the dumped data (or dump them
+      in other formats by `dump_bin`) before qlib is initialized.
+    - `data_dir` (e.g. `Path(__file__).parent.joinpath("test_xxx_data")`) is removed after the tests.
+    """
+
+    data_dir: Path
+    fields: List[str] = ["open", "close", "volume"]
+    start_time = "2020-01-01"
+    end_time = "2020-06-30"
+    n_instruments = 3
+    nan_ratio = 0.0
+    freq = "day"
+    _setup_kwargs = {}
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.source_dir = cls.data_dir.joinpath("source")
+        cls.qlib_dir = cls.data_dir.joinpath("qlib")
+        cls.source_dir.mkdir(parents=True, exist_ok=True)
+        cls.generate_data()
+        cls.dump_data()
+        cls.init_qlib()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(str(cls.data_dir.resolve()))
+
+    @classmethod
+    def generate_data(cls):
+        dates = pd.bdate_range(cls.start_time, cls.end_time)
+        rng = np.random.RandomState(0)
+        for i in range(cls.n_instruments):
+            df = pd.DataFrame({"date": dates[i * 10 : len(dates) - i * 5], "symbol": f"SH60000{i}"})
+            for field in cls.fields:
+                df[field] = rng.rand(len(df))
+            if cls.nan_ratio > 0:
+                df.loc[rng.rand(len(df)) < cls.nan_ratio, "close"] = np.nan
+            df.to_csv(cls.source_dir.joinpath(f"sh60000{i}.csv"), index=False)
+
+    @classmethod
+    def dump_data(cls):
+        cls.dump_bin(cls.qlib_dir)
+
+    @classmethod
+    def dump_bin(cls, qlib_dir: Path, **kwargs):
+        """dump `source_dir` into `qlib_dir`, the kwargs are passed to `DumpDataAll`"""
+        DumpDataAll(
+            data_path=cls.source_dir,
+            qlib_dir=qlib_dir,
+            freq=cls.freq,
+            include_fields=",".join(cls.fields),
+            max_workers=1,
+            **kwargs,
+        ).dump()
+
+    @classmethod
+    def init_qlib(cls, **kwargs):
+        """init qlib with `qlib_dir`, the kwargs override `_setup_kwargs`"""
+        default_kwargs = {"provider_uri": str(cls.qlib_dir.resolve()), "expression_cache": None, "dataset_cache": None}
+        qlib.init(**{**default_kwargs, "kernels": 1, **cls._setup_kwargs, **kwargs})
@@ -0,0 +1,70 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from qlib.data import D
+from qlib.data.data import ExpressionD, LocalExpressionProvider
+from qlib.data.ops import Operators
+from qlib.data.base import Feature
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from generated_data import TestGeneratedData
+
+EXPRESSIONS = ["$close", "Mean($close, 5)/$close", "Corr($close, $open, 10)", "Ref($open, 1) > $close"]
+
+
+class TestExpressionInstanceCache(TestGeneratedData):
+    data_dir = Path(__file__).parent.joinpath("test_expression_instance_cache_data")
+    fields = ["open", "close"]
+    end_time = "2020-03-31"
+    n_instruments = 2
+
+    def test_lru(self):
+        provider = LocalExpressionProvider()
+        provider.expression_instance_cache.set_limit_size(2)
+        expression = provider.get_expression_instance("Mean($close, 5)")
+        # the fields are normalized
+        self.assertIs(provider.get_expression_instance("Mean($close,5)"), expression)
+        provider.get_expression_instance("$open")
+        provider.get_expression_instance("Mean($close, 5)")
+        provider.get_expression_instance("$close")
+        self.assertEqual(list(provider.expression_instance_cache.od), ["Mean($close,5)", "$close"])
+
+    def test_dump_and_load(self):
+        data = ExpressionD.dump_expression_instances(EXPRESSIONS)
+        provider = LocalExpressionProvider()
+        with mock.patch("qlib.data.data.parse_field", side_effect=AssertionError("parsed")):
+            provider.load_expression_instances(data, EXPRESSIONS)
+            for field in EXPRESSIONS:
+                expected = ExpressionD.get_expression_instance(field)
+                self.assertEqual(str(provider.get_expression_instance(field)), str(expected))
+            # nothing is loaded if the fields are in the cache
+            with mock.patch("qlib.data.data.pickle.loads", side_effect=AssertionError("loaded")):
+                provider.load_expression_instances(data, EXPRESSIONS)
+        # the fields are parsed if the expressions can't be loaded
+        provider = LocalExpressionProvider()
+        provider.load_expression_instances(b"invalid", EXPRESSIONS)
+        self.assertEqual(len(provider.expression_instance_cache), 0)
+
+    def test_features_with_expressions(self):
+        expected = D.features(D.instruments("all"), EXPRESSIONS)
+        expressions = [
+            Feature("close"),
+            Operators.Div(Operators.Mean(Feature("close"), 5), Feature("close")),
+            Operators.Corr(Feature("close"), Feature("open"), 10),
+            Operators.Gt(Operators.Ref(Feature("open"), 1), Feature("close")),
+        ]
+        with mock.patch("qlib.data.data.parse_field", side_effect=AssertionError("parsed")):
+            df = D.features(D.instruments("all"), expressions)
+        self.assertEqual(list(df.columns), [str(expression) for expression in expressions])
+        np.testing.assert_array_equal(df.values, expected.values)
+
+
+if __name__ == "__main__":
+    unittest.main()
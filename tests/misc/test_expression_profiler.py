@@ -0,0 +1,93 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import shutil
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from qlib.config import C
+from qlib.data import D
+from qlib.data.cache import H, SE
+from qlib.data.profiler import PROFILER, explain, operator_cost, profile
+from qlib.data.data import ExpressionD
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from generated_data import TestGeneratedData
+
+EXPRESSIONS = [
+    "Corr($close, Log($volume+1), 10)",
+    "Corr($close, Log($volume+1), 10)/$close",
+    "Mean($close, 5)/$close",
+    "EMA($close, 10)",
+]
+
+
+class TestExpressionProfiler(TestGeneratedData):
+    data_dir = Path(__file__).parent.joinpath("test_expression_profiler_data")
+
+    def setUp(self) -> None:
+        H["f"].clear()
+
+    def _check_profiles(self, df: pd.DataFrame, expected: pd.DataFrame):
+        n_instruments = len(expected.index.unique("instrument"))
+        # the shared sub-expressions are calculated once for each instrument
+        for key in ["Corr($close,Log(Add($volume,1)),10)", "Div(Mean($close,5),$close)", "EMA($close,10)"]:
+            self.assertEqual(df.loc[key, "calls"], n_instruments)
+        self.assertEqual(df.loc["EMA($close,10)", "rows"], expected["EMA($close, 10)"].notna().sum())
+        self.assertEqual(df.loc["EMA($close,10)", "mem_misses"], n_instruments)
+        self.assertEqual(tuple(df.loc["Mean($close,5)", ["lft_etd", "rght_etd"]]), (4, 0))
+        self.assertTrue((df["self_seconds"] <= df["seconds"] + 1e-9).all())
+
+    def test_profile(self):
+        with profile() as profiler:
+            expected = D.features(D.instruments("all"), EXPRESSIONS)
+        self.assertFalse(C["profile_expressions"])
+        self._check_profiles(profiler.to_frame(), expected)
+        # the features are prefetched into `H["f"]`
+        self.assertGreater(profiler.to_frame().loc["$close", "mem_hits"], 0)
+
+        # the profiles of the workers are merged into the main process
+        H["f"].clear()
+        C["kernels"] = 2
+        try:
+            with profile() as profiler:
+                D.features(D.instruments("all"), EXPRESSIONS)
+        finally:
+            C["kernels"] = 1
+        self._check_profiles(profiler.to_frame(), expected)
+
+    def test_disk_cache(self):
+        C["subexpression_cache_size_limit"] = 1 << 30
+        C["subexpression_cache_min_cost"] = 0
+        try:
+            with profile() as profiler:
+                for _ in range(2):
+                    H["f"].clear()
+                    D.features(["SH600000"], EXPRESSIONS)
+        finally:
+            C["subexpression_cache_size_limit"] = 0
+            SE.clear()
+            shutil.rmtree(str(SE.get_cache_dir("day")), ignore_errors=True)
+        df = profiler.to_frame()
+        self.assertEqual(tuple(df.loc["Corr($close,Log(Add($volume,1)),10)", ["disk_misses", "disk_hits"]]), (1, 1))
+        self.assertEqual(df.loc["Corr($close,Log(Add($volume,1)),10)", "calls"], 1)
+
+    def test_explain(self):
+        plan = explain(EXPRESSIONS[:3], "2020-03-02", "2020-03-31").splitlines()
+        n_rows = len(D.calendar("2020-03-02", "2020-03-31")) + 9
+        self.assertEqual(plan[0], f"{EXPRESSIONS[0]}  [rows={n_rows} lookback=9 lookahead=0 cost={n_rows * 34}]")
+        self.assertEqual(plan[1], f"Corr(10)  lookback=9  cost={n_rows * 30}")
+        # the sub-expressions calculated before are not counted again
+        self.assertIn("├── Corr(10)  lookback=9  (shared)", plan)
+        corr = ExpressionD.get_expression_instance(EXPRESSIONS[0])
+        self.assertEqual(operator_cost(corr), 30)
+
+        PROFILER.reset()
+        self.assertTrue(all("time=" not in line for line in explain(EXPRESSIONS, profiler=PROFILER).splitlines()))
+
+
+if __name__ == "__main__":
+    unittest.main()
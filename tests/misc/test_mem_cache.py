@@ -0,0 +1,122 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import time
+import pickle
+import unittest
+from pathlib import Path
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from qlib.config import C
+from qlib.data import D
+from qlib.data.base import IndexedArray
+from qlib.data.cache import H, MemCacheBytesUnit, MemCacheLengthUnit, get_nbytes
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from generated_data import TestGeneratedData
+
+
+class TestMemCache(TestGeneratedData):
+    data_dir = Path(__file__).parent.joinpath("test_mem_cache_data")
+    fields = ["open", "close"]
+    end_time = "2020-12-31"
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.init_qlib()
+        super().tearDownClass()
+
+    def test_nbytes(self):
+        series = pd.Series(np.zeros(1000, dtype=np.float32))
+        self.assertEqual(get_nbytes(np.zeros(1000)), 8000)
+        self.assertGreaterEqual(get_nbytes(series), 4000)
+        self.assertGreaterEqual(get_nbytes((series, time.time())), 4000)
+        self.assertGreaterEqual(get_nbytes(pd.DataFrame({"a": np.zeros(1000), "b": np.zeros(1000)})), 16000)
+        # the values of the data passed between the compiled operators
+        self.assertGreaterEqual(get_nbytes(IndexedArray(10, np.zeros(1000))), 8000)
+
+        cache = MemCacheBytesUnit(size_limit=10000)
+        for key in range(3):
+            cache[key] = np.zeros(500)
+        # the least recently used items are evicted by the bytes of the data
+        self.assertEqual(list(cache.od), [1, 2])
+        self.assertEqual(cache.total_size, 8000)
+        cache[1] = np.zeros(100)
+        self.assertEqual(cache.total_size, 4800)
+        self.assertEqual(cache.stats()["evictions"], 1)
+        # the item just set is kept even if it exceeds the limit
+        cache["large"] = np.zeros(2000)
+        self.assertEqual(list(cache.od), ["large"])
+        self.assertEqual(cache.get("large").size, 2000)
+
+    def test_stats(self):
+        cache = MemCacheLengthUnit(size_limit=2)
+        cache["a"] = 1
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.get("b", 0), 0)
+        with self.assertRaises(KeyError):
+            cache["b"]  # pylint: disable=W0104
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["items"]), (1, 3, 1))
+        self.assertEqual(stats["hit_rate"], 0.25)
+        cache.reset_stats()
+        self.assertEqual(cache.stats()["misses"], 0)
+
+        # the expired items are missing
+        cache = MemCacheLengthUnit(expire=10)
+        cache["a"] = 1
+        with mock.patch("qlib.data.cache.time.time", return_value=time.time() + 11):
+            self.assertNotIn("a", cache)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_threads(self):
+        cache = MemCacheLengthUnit(size_limit=50)
+
+        def _update(i):
+            for j in range(200):
+                cache[(i, j % 80)] = j
+                cache.get((i, (j * 7) % 80))
+                if (i, j % 5) in cache:
+                    cache.pop((i, j % 5))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(_update, range(16)))
+        self.assertEqual(cache.total_size, len(cache))
+        self.assertLessEqual(len(cache), 50)
+        # the cache without the lock can be pickled
+        self.assertEqual(pickle.loads(pickle.dumps(cache)).od, cache.od)
+
+    def test_config(self):
+        self.init_qlib(mem_cache_size_limit=1 << 20, mem_cache_limit_type="bytes", mem_cache_ttl=60)
+        try:
+            self.assertIsInstance(H["f"], MemCacheBytesUnit)
+            self.assertEqual((H["f"].size_limit, H["f"].expire), (1 << 20, 60))
+            D.features(D.instruments("all"), ["$close", "Mean($close, 5)"])
+            stats = H.stats()
+            self.assertEqual(list(stats.index), ["c", "i", "f"])
+            self.assertGreater(stats.loc["f", "items"], 0)
+            self.assertEqual(stats.loc["f", "total_size"], sum(map(get_nbytes, H["f"].od.values())))
+        finally:
+            self.init_qlib()
+        self.assertIsInstance(H["f"], MemCacheLengthUnit)
+        self.assertEqual(H["f"].size_limit, C.mem_cache_size_limit)
+
+    def test_small_limit(self):
+        expected = D.features(D.instruments("all"), ["$close", "Mean($close, 5)"])
+        # the calendars and the features larger than the limit are still loaded
+        self.init_qlib(mem_cache_size_limit=10000, mem_cache_limit_type="bytes")
+        try:
+            pd.testing.assert_frame_equal(D.features(D.instruments("all"), ["$close", "Mean($close, 5)"]), expected)
+        finally:
+            self.init_qlib()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import shutil
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from qlib.config import C
+from qlib.data import D
+from qlib.data import ops
+from qlib.data.cache import H, SE, CacheUtils
+from qlib.data.data import ExpressionD
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from generated_data import TestGeneratedData
+
+EXPRESSIONS = [
+    "Corr($close, Log($volume+1), 10)",
+    "Corr($close, Log($volume+1), 10)/$close",
+    "Rsquare($close, 10)/$open",
+    "Rsquare($close, 10)-$open",
+    "$close+1",
+    "Mean($open, 5)",
+]
+CACHED = ["Corr($close,Log(Add($volume,1)),10)", "Rsquare($close,10)"]
+
+
+class TestSubExpressionCache(TestGeneratedData):
+    data_dir = Path(__file__).parent.joinpath("test_subexpression_cache_data")
+    end_time = "2020-12-31"
+    nan_ratio = 0.05
+
+    def setUp(self) -> None:
+        H["f"].clear()
+        SE.clear()
+        shutil.rmtree(str(SE.get_cache_dir("day")), ignore_errors=True)
+        # the sub-expressions used twice for each instrument are cached no matter how cheap they are
+        C["subexpression_cache_size_limit"] = 1 << 30
+        C["subexpression_cache_min_uses"] = 2
+        C["subexpression_cache_min_cost"] = 0
+
+    def tearDown(self) -> None:
+        C["subexpression_cache_size_limit"] = 0
+        SE.clear()
+
+    @staticmethod
+    def _cached_fields() -> list:
+        return sorted({pd.read_pickle(path)["info"]["field"] for path in SE.get_cache_dir("day").glob("*/*.meta")})
+
+    @staticmethod
+    def _features(*args, **kwargs) -> pd.DataFrame:
+        H["f"].clear()
+        return D.features(D.instruments("all"), EXPRESSIONS, *args, **kwargs)
+
+    def test_same_values(self):
+        C["subexpression_cache_size_limit"] = 0
+        expected = self._features()
+        expected_range = self._features("2020-03-01", "2020-06-30")
+        C["subexpression_cache_size_limit"] = 1 << 30
+
+        pd.testing.assert_frame_equal(self._features(), expected)
+        self.assertEqual(self._cached_fields(), CACHED)
+        # the sub-expressions are loaded from the cache instead of being calculated
+        with mock.patch.object(ops.PairRolling, "_load_array_internal", side_effect=AssertionError("calculated")):
+            with mock.patch.object(ops.Rsquare, "_load_array_internal", side_effect=AssertionError("calculated")):
+                pd.testing.assert_frame_equal(self._features(), expected)
+                pd.testing.assert_frame_equal(self._features("2020-03-01", "2020-06-30"), expected_range)
+
+    def test_load(self):
+        C["subexpression_cache_min_uses"] = 1
+        calendar = D.calendar()
+        # the values of `EMA` depend on the first rows of its sub-expression calculated in the range
+        expression = ExpressionD.get_expression_instance("EMA(Corr($close, $open, 10), 5)")
+        for start_index, end_index in [(0, len(calendar) - 1), (50, 150), (100, 150), (50, 150)]:
+            H["f"].clear()
+            series = expression.load("SH600000", start_index, end_index, "day")
+            C["subexpression_cache_size_limit"] = 0
+            H["f"].clear()
+            expected = expression.load("SH600000", start_index, end_index, "day")
+            C["subexpression_cache_size_limit"] = 1 << 30
+            pd.testing.assert_series_equal(series, expected)
+        self.assertEqual(self._cached_fields(), ["Corr($close,$open,10)"])
+
+    def test_admission(self):
+        corr = ExpressionD.get_expression_instance("Corr($close, $open, 10)")
+        add = ExpressionD.get_expression_instance("$close + $open")
+        C["subexpression_cache_min_cost"] = 1e-6
+        for instrument in ["SH600000", "SH600001"]:
+            for _ in range(2):
+                SE.record(corr, instrument, 0, 99, "day", pd.Series(np.ones(100)), 1e-3)
+                SE.record(add, instrument, 0, 99, "day", pd.Series(np.ones(100)), 1e-5)
+        self.assertTrue(SE.is_admitted(corr, "day"))
+        # the cheap operators are not cached even if they are used frequently
+        self.assertFalse(SE.is_admitted(add, "day"))
+        self.assertEqual(self._cached_fields(), ["Corr($close,$open,10)"])
+        # not shared by several consumers
+        SE.record(corr, "SH600002", 0, 99, "day", pd.Series(np.ones(100)), 1e-3)
+        SE.record(corr, "SH600003", 0, 99, "day", pd.Series(np.ones(100)), 1e-3)
+        self.assertFalse(SE.is_admitted(corr, "day"))
+
+    def test_eviction(self):
+        self._features()
+        paths = [path.with_suffix("") for path in SE.get_cache_dir("day").glob("*/*.meta")]
+        size = sum(path.stat().st_size for path in paths)
+        # the caches visited frequently are kept
+        visited = [path for path in paths if path.parent.name == "sh600001"]
+        for path in visited:
+            for _ in range(100):
+                CacheUtils.visit(path)
+        C["subexpression_cache_size_limit"] = size // 2
+        corr = ExpressionD.get_expression_instance("Corr($close, $open, 10)")
+        for _ in range(2):
+            SE.record(corr, "SH600002", 0, 99, "day", pd.Series(np.ones(100, dtype=np.float32)), 1e-3)
+        paths = [path.with_suffix("") for path in SE.get_cache_dir("day").glob("*/*.meta")]
+        self.assertLessEqual(sum(path.stat().st_size for path in paths), size // 2)
+        self.assertTrue(all(path.exists() for path in visited))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from qlib.config import C
+from qlib.data import D
+from qlib.data.cache import H
+from qlib.data.data import ExpressionD
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from generated_data import TestGeneratedData
+
+EXPRESSIONS = [
+    "Mean(Std($close, 5), 10)/Std($close, 20)",
+    "Corr($close, Log($volume+1), 10)",
+    "EMA($close, 10)",
+    "Sum($close>Ref($close, 1), 20)",
+    "$close/Ref($close, 1)",
+]
+
+
+class TestComputeDtype(TestGeneratedData):
+    data_dir = Path(__file__).parent.joinpath("test_compute_dtype_data")
+    end_time = "2020-12-31"
+
+    @classmethod
+    def generate_data(cls):
+        dates = pd.bdate_range(cls.start_time, cls.end_time)
+        rng = np.random.RandomState(0)
+        for i in range(cls.n_instruments):
+            df = pd.DataFrame({"date": dates[i * 10 : len(dates) - i * 5], "symbol": f"SH60000{i}"})
+            for field in cls.fields:
+                df[field] = rng.rand(len(df)) + 1
+            df.to_csv(cls.source_dir.joinpath(f"sh60000{i}.csv"), index=False)
+
+    def setUp(self) -> None:
+        H["f"].clear()
+
+    def tearDown(self) -> None:
+        C["compute_dtype"] = None
+
+    @staticmethod
+    def _features(**kwargs) -> pd.DataFrame:
+        H["f"].clear()
+        return D.features(D.instruments("all"), EXPRESSIONS, **kwargs)
+
+    def test_operators(self):
+        rolling = ExpressionD.get_expression_instance("Mean(Std($close, 5), 10)")
+        feature = ExpressionD.get_expression_instance("$close")
+        compare = ExpressionD.get_expression_instance("$close > $open")
+        self.assertEqual(rolling.load("SH600000", 50, 150, "day").dtype, np.float64)
+        for dtype in ["float32", "float64"]:
+            C["compute_dtype"] = dtype
+            H["f"].clear()
+            self.assertEqual(rolling.load("SH600000", 50, 150, "day").dtype, np.dtype(dtype))
+            self.assertEqual(feature.load("SH600000", 50, 150, "day").dtype, np.dtype(dtype))
+            # the data which are not float are kept
+            self.assertEqual(compare.load("SH600000", 50, 150, "day").dtype, bool)
+
+        C["compute_dtype"] = "float16"
+        H["f"].clear()
+        with self.assertRaises(ValueError):
+            rolling.load("SH600000", 50, 150, "day")
+
+    def test_features(self):
+        ranges = [(None, None), ("2020-03-01", "2020-06-30")]
+        # `EMA` depends on the start of the range, so the ranges are compared one by one
+        expected = [self._features(start_time=start_time, end_time=end_time) for start_time, end_time in ranges]
+        self.assertTrue(all((df.dtypes == np.float32).all() for df in expected))
+        for dtype in ["float32", "float64"]:
+            C["compute_dtype"] = dtype
+            for (start_time, end_time), expected_df in zip(ranges, expected):
+                df = self._features(start_time=start_time, end_time=end_time)
+                self.assertTrue((df.dtypes == dtype).all())
+                # the intermediate data (e.g. `Log`) are not rounded to float32 in float64
+                pd.testing.assert_frame_equal(df, expected_df, check_dtype=False, rtol=1e-5, atol=1e-5)
+            # the panels calculated at once are the same
+            C["panel_evaluation"] = True
+            try:
+                pd.testing.assert_frame_equal(self._features(start_time=start_time, end_time=end_time), df)
+            finally:
+                C["panel_evaluation"] = False
+
+
+if __name__ == "__main__":
+    unittest.main()
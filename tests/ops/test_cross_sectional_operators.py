@@ -0,0 +1,129 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from qlib.config import C
+from qlib.data import D
+from qlib.data.cache import H
+from qlib.data.compiler import CrossSectionalData, contains_cross_sectional_data
+from qlib.data.data import ExpressionD, LocalExpressionProvider
+from qlib.data.ops import Mean
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from generated_data import TestGeneratedData
+
+EXPRESSIONS = [
+    "CSRank(Corr($close, $volume, 10))",
+    "CSZScore($close)",
+    "CSDemean($close)/2",
+    "CSNeutralize($close, $industry)",
+    "Mean(CSRank($close), 5)",
+    "CSRank(CSDemean($open) + $close)",
+    "$close",
+]
+
+
+class TestCrossSectionalOperators(TestGeneratedData):
+    data_dir = Path(__file__).parent.joinpath("test_cross_sectional_operators_data")
+    fields = ["open", "close", "volume", "industry"]
+    n_instruments = 6
+
+    @classmethod
+    def generate_data(cls):
+        dates = pd.bdate_range(cls.start_time, cls.end_time)
+        rng = np.random.RandomState(0)
+        for i in range(cls.n_instruments):
+            df = pd.DataFrame({"date": dates[i * 10 : len(dates) - i * 5], "symbol": f"SH60000{i}"})
+            for field in cls.fields:
+                df[field] = rng.rand(len(df))
+            df["industry"] = i % 2
+            df.loc[rng.rand(len(df)) < 0.05, "close"] = np.nan
+            df.to_csv(cls.source_dir.joinpath(f"sh60000{i}.csv"), index=False)
+
+    def setUp(self) -> None:
+        H["f"].clear()
+
+    @staticmethod
+    def _expected(instruments, start_time, end_time) -> pd.DataFrame:
+        # the same as the processors calculating the cross sections of the loaded data
+        fields = ["$open", "$close", "$volume", "$industry", "Corr($close, $volume, 10)"]
+        df = D.features(instruments, fields).astype(np.float64)
+        close, by_datetime = df["$close"], df.groupby("datetime")
+        demean = close - by_datetime["$close"].transform("mean")
+        rank = by_datetime["$close"].rank(pct=True)
+        expected = {
+            EXPRESSIONS[0]: by_datetime["Corr($close, $volume, 10)"].rank(pct=True),
+            EXPRESSIONS[1]: demean / by_datetime["$close"].transform("std"),
+            EXPRESSIONS[2]: demean / 2,
+            EXPRESSIONS[3]: close - close.groupby(["datetime", df["$industry"]]).transform("mean"),
+            EXPRESSIONS[4]: rank.groupby("instrument").transform(lambda s: s.rolling(5, min_periods=1).mean()),
+            EXPRESSIONS[5]: (df["$open"] - by_datetime["$open"].transform("mean") + close)
+            .groupby("datetime")
+            .rank(pct=True),
+            EXPRESSIONS[6]: close,
+        }
+        return pd.DataFrame(expected).loc[pd.IndexSlice[:, start_time:end_time], :].astype(np.float32)
+
+    def test_same_values(self):
+        spans = [
+            (pd.Timestamp("2020-01-01"), pd.Timestamp("2020-03-31")),
+            (pd.Timestamp("2020-05-01"), pd.Timestamp("2020-06-30")),
+        ]
+        for instruments, start_time, end_time in [
+            (D.instruments("all"), None, None),
+            (D.instruments("all"), "2020-03-01", "2020-05-31"),
+            (["SH600001", "SH600002", "SH600004"], "2020-03-01", None),
+            ({"SH600001": [spans[0]], "SH600002": spans, "SH600003": [spans[1]]}, None, None),
+        ]:
+            df = D.features(instruments, EXPRESSIONS, start_time, end_time)
+            expected = self._expected(instruments, start_time, end_time)
+            pd.testing.assert_frame_equal(df, expected, rtol=1e-5, atol=1e-6, check_freq=False)
+
+    def test_panel_evaluation(self):
+        expected = D.features(D.instruments("all"), EXPRESSIONS, "2020-03-01", "2020-05-31")
+        C["panel_evaluation"] = True
+        try:
+            df = D.features(D.instruments("all"), EXPRESSIONS, "2020-03-01", "2020-05-31")
+        finally:
+            C["panel_evaluation"] = False
+        pd.testing.assert_frame_equal(df, expected)
+
+    def test_instance_cache(self):
+        # the expressions holding the data of the cross sections are not kept after the queries
+        for kernels in [1, 2]:
+            C["kernels"] = kernels
+            try:
+                for start_time in ["2020-03-01", "2020-03-02"]:
+                    D.features(D.instruments("all"), EXPRESSIONS, start_time, "2020-05-31")
+            finally:
+                C["kernels"] = 1
+            self.assertFalse([key for key in ExpressionD.expression_instance_cache.od if "@" in key])
+
+    def test_worker_instance_cache(self):
+        # the processes loading the pickled expressions only keep the cross sections of the latest query
+        provider = LocalExpressionProvider()
+        fields = []
+        for i in range(3):
+            data = CrossSectionalData(f"CSRank($close)@{i}", {"SH600000": pd.Series([0.5], index=[10])})
+            fields.append(str(ExpressionD.get_expression_instance(Mean(data, 5))))
+            provider.load_expression_instances(ExpressionD.dump_expression_instances(["$close", fields[-1]]))
+        ExpressionD.drop_expression_instances(fields)
+        cache = provider.expression_instance_cache.od
+        data_keys = [key for key, expression in cache.items() if contains_cross_sectional_data(expression)]
+        self.assertEqual(data_keys, fields[-1:])
+        self.assertIn("$close", cache)
+
+    def test_single_instrument(self):
+        # the cross sections can't be calculated for a single instrument
+        with self.assertRaises(ValueError):
+            ExpressionD.get_expression_instance("CSRank($close)").load("SH600000", 0, 10, "day")
+
+
+if __name__ == "__main__":
+    unittest.main()
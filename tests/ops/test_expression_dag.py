@@ -0,0 +1,146 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import unittest
+from collections import Counter
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from qlib.config import C
+from qlib.data import D
+from qlib.data.base import Feature, IndexedArray, IndexGapError
+from qlib.data.cache import H, ExpressionCache
+from qlib.data.compiler import ExpressionDAG, is_compilable
+from qlib.data.data import ExpressionD
+from qlib.data.ops import Operators
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from generated_data import TestGeneratedData
+
+EXPRESSIONS = [
+    "$close",
+    "Mean($close, 5)/$close",
+    "Std($close, 5)/$close",
+    "(Mean($close, 5) - Ref($close, 1))/Std($close, 5)",
+    "Corr($close, Log($volume+1), 10)",
+    "Ref($close, -2)/$close",
+    "Max($open, 5)/Mean($close, 5)",
+    "If($close > Ref($close, 1), Rank($close, 10), Quantile($open, 10, 0.2))",
+    "ChangeInstrument('SH600001', Mean($close, 5))/Mean($close, 5)",
+    "EMA($close, 10)/Mean($close, 5)",
+    "Mean($close, 0)",
+]
+
+
+class CountingExpressionCache(ExpressionCache):
+    """the expression cache which counts the loaded fields"""
+
+    fields = Counter()
+
+    def _expression(self, instrument, field, start_time, end_time, freq):
+        self.fields[field] += 1
+        return self.provider.expression(instrument, field, start_time, end_time, freq)
+
+
+class TestExpressionDAG(TestGeneratedData):
+    data_dir = Path(__file__).parent.joinpath("test_expression_dag_data")
+
+    def setUp(self) -> None:
+        H["f"].clear()
+
+    def _features(self, compile_expressions: bool) -> pd.DataFrame:
+        H["f"].clear()
+        C["compile_expressions"] = compile_expressions
+        try:
+            return D.features(D.instruments("all"), EXPRESSIONS, "2020-02-01", "2020-05-31")
+        finally:
+            C["compile_expressions"] = True
+
+    def test_same_values(self):
+        expected = self._features(False)
+        provider = ExpressionD._provider
+        not_compiled = mock.patch.object(provider, "expression", side_effect=AssertionError("not compiled"))
+        # the compiled nodes are calculated with numpy arrays
+        not_native = mock.patch.object(ExpressionDAG, "_evaluate_series", side_effect=AssertionError("not native"))
+        with not_compiled, not_native:
+            df = self._features(True)
+        pd.testing.assert_frame_equal(df, expected)
+
+    def test_expression_cache(self):
+        expected = self._features(True)
+        self.init_qlib(expression_cache={"class": "CountingExpressionCache", "module_path": __name__})
+        try:
+            # the fields are loaded by the expression cache instead of the compiled DAG
+            for compile_expressions in [True, False]:
+                CountingExpressionCache.fields.clear()
+                pd.testing.assert_frame_equal(self._features(compile_expressions), expected)
+                self.assertEqual(list(CountingExpressionCache.fields.values()), [3] * len(EXPRESSIONS))
+        finally:
+            self.init_qlib()
+
+    def test_evaluate_once(self):
+        expressions = list(map(ExpressionD.get_expression_instance, EXPRESSIONS))
+        dag = ExpressionDAG(expressions, 30, 60)
+        # the fields depending on the start of the range are not compiled
+        self.assertEqual(
+            [str(expression) for expression in expressions if not is_compilable(expression)],
+            ["Div(EMA($close,10),Mean($close,5))", "Mean($close,0)"],
+        )
+        # the sub-expressions are shared by the fields and calculated in the union of their ranges
+        node = dag.nodes[("Mean($close,5)", None)]
+        self.assertEqual(node.n_consumers, 4)
+        self.assertEqual((node.start_index, node.end_index), (30 - 4, 60))
+        self.assertEqual((dag.nodes[("$close", None)].start_index, dag.nodes[("$close", None)].end_index), (21, 62))
+        self.assertIn(("$close", "SH600001"), dag.nodes)
+
+        counter = Counter()
+        load_internal = Operators.Mean._load_internal
+
+        def _count(expression, *args):
+            counter[str(expression)] += 1
+            return load_internal(expression, *args)
+
+        with mock.patch.object(Operators.Mean, "_load_internal", autospec=True, side_effect=_count):
+            res = dag.evaluate("SH600000", "day")
+        # `Mean($close,5)` is calculated once for SH600000 and SH600001, and once more by the field not compiled
+        self.assertEqual(counter, Counter({"Mean($close,5)": 3, "Mean($close,0)": 1}))
+        self.assertEqual(len(res), len(EXPRESSIONS))
+        for expression, series in zip(expressions, res):
+            lft_etd, rght_etd = expression.get_extended_window_size()
+            expected = expression.load("SH600000", max(0, 30 - lft_etd), 60 + rght_etd, "day")
+            np.testing.assert_allclose(series.loc[30:60].values, expected.loc[30:60].values, rtol=1e-6)
+
+        # the leaves loaded for the instrument calculated
+        leaves = {(str(expression), start, end) for expression, start, end in dag.leaves()}
+        self.assertIn(("$close", 21, 62), leaves)
+        self.assertIn(("Div(EMA($close,10),Mean($close,5))", 21, 60), leaves)
+        for expression, *_ in dag.leaves():
+            self.assertTrue(isinstance(expression, Feature) or not is_compilable(expression))
+
+    def test_indexed_array(self):
+        series = pd.Series(np.arange(5, dtype=np.float32), index=np.arange(10, 15))
+        data = IndexedArray.from_series(series)
+        self.assertEqual((data.start_index, data.end_index), (10, 14))
+        pd.testing.assert_series_equal(data.to_series(), series, check_index_type=False)
+        for start, end in [(11, 12), (0, 12), (13, 20), (20, 30), (0, 5)]:
+            pd.testing.assert_series_equal(
+                data.slice(start, end).to_series(), series.loc[start:end], check_index_type=False
+            )
+        with self.assertRaises(IndexGapError):
+            IndexedArray.from_series(series.iloc[[0, 1, 3]])
+
+        # the instrument is calculated with pd.Series if the index of some data has gaps
+        dag = ExpressionDAG(list(map(ExpressionD.get_expression_instance, EXPRESSIONS)), 30, 60)
+        expected = dag.evaluate("SH600001", "day")
+        with mock.patch.object(ExpressionDAG, "_evaluate_arrays", side_effect=IndexGapError):
+            res = dag.evaluate("SH600001", "day")
+        for series, expected_series in zip(res, expected):
+            pd.testing.assert_series_equal(series, expected_series, check_index_type=False, check_names=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from qlib.data import D
+from qlib.data.cache import H
+from qlib.contrib.ops.high_freq import DayCumsum, DayFirst, DayLast, SessionVWAP, TimeOfDay, _day_cumsum
+from qlib.utils.time import get_min_cal
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from generated_data import TestGeneratedData
+
+EXPRESSIONS = [
+    "DayCumsum($volume, '9:45', '14:45')",
+    "DayLast($close)",
+    "DayFirst($close)",
+    "SessionVWAP($close, $volume)",
+    "TimeOfDay($close)",
+    "$close",
+    "$volume",
+]
+
+
+def _expected(df: pd.DataFrame) -> pd.DataFrame:
+    """the operators calculated by grouping the bars by their days"""
+    close, volume = df["$close"].astype(np.float64), df["$volume"].astype(np.float64)
+    days = [df.index.get_level_values("instrument"), df.index.get_level_values("datetime").date]
+    calendar = pd.Series(get_min_cal(), index=get_min_cal())
+    time_index = pd.Series(df.index.get_level_values("datetime").time, index=df.index).map(
+        pd.Series(np.arange(len(calendar)), index=calendar.index)
+    )
+    cum_volume = volume.mask(time_index < 15, 0).groupby(days).cumsum().mask(time_index > 225, 0)
+    valid = close.notna() & volume.notna()
+    vwap = (close * volume).where(valid, 0).groupby(days).cumsum() / volume.where(valid, 0).groupby(days).cumsum()
+    expected = {
+        EXPRESSIONS[0]: cum_volume,
+        EXPRESSIONS[1]: close.groupby(days).transform("last"),
+        EXPRESSIONS[2]: close.groupby(days).transform("first"),
+        EXPRESSIONS[3]: vwap.replace([np.inf, -np.inf], np.nan),
+        EXPRESSIONS[4]: time_index.astype(np.float64),
+        EXPRESSIONS[5]: close,
+        EXPRESSIONS[6]: volume,
+    }
+    return pd.DataFrame(expected).astype(np.float32)
+
+
+class TestHighFreqOps(TestGeneratedData):
+    data_dir = Path(__file__).parent.joinpath("test_high_freq_ops_data")
+    fields = ["close", "volume"]
+    freq = "1min"
+    _setup_kwargs = {"custom_ops": [DayCumsum, DayLast, DayFirst, SessionVWAP, TimeOfDay]}
+
+    @classmethod
+    def generate_data(cls):
+        days = pd.bdate_range("2020-01-06", "2020-01-10")
+        minutes = [pd.Timestamp.combine(day, t) for day in days for t in get_min_cal()]
+        rng = np.random.RandomState(0)
+        for i in range(2):
+            df = pd.DataFrame({"date": minutes[i * 300 :], "symbol": f"SH60000{i}"})
+            df["close"] = rng.rand(len(df)) + 10
+            df["volume"] = rng.randint(0, 100, len(df)).astype(float)
+            # the missing bars and the days without any volume
+            df.loc[rng.rand(len(df)) < 0.05, "close"] = np.nan
+            df.loc[rng.rand(len(df)) < 0.05, "volume"] = np.nan
+            df.loc[df["date"].dt.date == days[-1].date(), "volume"] = 0
+            df.to_csv(cls.source_dir.joinpath(f"sh60000{i}.csv"), index=False)
+
+    def setUp(self) -> None:
+        H["f"].clear()
+
+    def test_same_values(self):
+        # the days may be partially loaded
+        for start_time, end_time in [(None, None), ("2020-01-07 10:15:00", "2020-01-09 13:30:00")]:
+            df = D.features(D.instruments("all"), EXPRESSIONS, start_time, end_time, freq="1min")
+            pd.testing.assert_frame_equal(df, _expected(df), rtol=1e-6)
+        self.assertTrue(df[EXPRESSIONS[3]].notna().any())
+        # the bars before the start of `DayCumsum` are exactly 0
+        self.assertTrue((df.loc[df[EXPRESSIONS[4]] < 15, EXPRESSIONS[0]] == 0).all())
+
+    def test_many_days(self):
+        rng = np.random.RandomState(0)
+        n_days, n_bars = 2000, 240
+        values = rng.randint(0, 10**6, n_days * n_bars).astype(float)
+        values[rng.rand(len(values)) < 0.05] = np.nan
+        time_index = np.tile(np.arange(n_bars), n_days)
+        values[time_index < 15] = 0
+        res = _day_cumsum(values, np.arange(0, len(values), n_bars))
+        # the rounding errors don't accumulate across the days
+        self.assertTrue((res[time_index < 15] == 0).all())
+        expected = pd.Series(values).groupby(np.arange(len(values)) // n_bars).cumsum().values
+        np.testing.assert_array_equal(res, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
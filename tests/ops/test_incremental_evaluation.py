@@ -0,0 +1,129 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import pickle
+import shutil
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from qlib.data import D
+from qlib.data.cache import H
+from qlib.data.compiler import ExpressionDAG
+from qlib.data.data import ExpressionD
+from qlib.data.incremental import ExpressionStream, IncrementalEvaluator
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from generated_data import TestGeneratedData
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent.joinpath("scripts")))
+from dump_bin import DumpFeatureMeta
+
+DATA_DIR = Path(__file__).parent.joinpath("test_incremental_evaluation_data")
+STATE_DIR = DATA_DIR.joinpath("states")
+EXPRESSIONS = [
+    "$close",
+    "Mean($close, 5)/$close",
+    "Std($close, 20)/$close",
+    "(Mean($close, 5) - Ref($close, 1))/Std($close, 5)",
+    "Max($open, 5)/Min($close, 10)",
+    "Sum($close > 0.5, 5)",
+    "Delta($close, 3)",
+    "Slope($close, 10)",
+    "Rsquare($close, 10)",
+    "Resi($close, 10)",
+    "EMA($close, 10)/$close",
+    "Mean($close, 0.3)",
+    "Corr($open, Log($volume+1), 10)",
+    "Cov($close, $open, 10)",
+    "If($close > Ref($close, 1), Rank($close, 10), Quantile($close, 10, 0.2))",
+    "IdxMax($close, 5)",
+    "WMA($close, 10)",
+    "Mean($vwap, 5)/$close",
+    "ChangeInstrument('SH600001', Mean($close, 5))/Mean($close, 5)",
+    "Mean($close, 0)",
+]
+
+
+class TestIncrementalEvaluation(TestGeneratedData):
+    data_dir = DATA_DIR
+    fields = ["open", "close", "volume", "vwap"]
+    nan_ratio = 0.05
+
+    @classmethod
+    def dump_data(cls):
+        super().dump_data()
+        # the close of SH600001 ends earlier than its other features
+        path = cls.qlib_dir.joinpath("features", "sh600001", "close.day.bin")
+        np.fromfile(path, dtype="<f")[:-3].astype("<f").tofile(path)
+        DumpFeatureMeta(cls.qlib_dir).dump()
+
+    def setUp(self) -> None:
+        H["f"].clear()
+        shutil.rmtree(str(STATE_DIR), ignore_errors=True)
+
+    @staticmethod
+    def _expected(instruments, fields, start_time, end_time) -> pd.DataFrame:
+        # the incremental evaluation has the values calculated with the whole history
+        df = D.features(instruments, fields, end_time=end_time)
+        return df.loc[pd.IndexSlice[:, start_time:], :]
+
+    def test_same_values(self):
+        calendar = D.calendar()
+        instruments = D.instruments("all")
+        expected = self._expected(instruments, EXPRESSIONS, calendar[-12], calendar[-1])
+        # the first evaluation calculates the last bar only, and the next ones calculate the bars after the checkpoints
+        res = [D.features_incremental(instruments, EXPRESSIONS, calendar[-12], state_dir=STATE_DIR)]
+        for end_time in [calendar[-11], calendar[-10], calendar[-10], calendar[-6], calendar[-1]]:
+            res.append(D.features_incremental(instruments, EXPRESSIONS, end_time, state_dir=STATE_DIR))
+        self.assertEqual([len(df) for df in res], [3, 3, 2, 0, 8, 5])
+        df = pd.concat([df for df in res if len(df) > 0]).sort_index()
+        pd.testing.assert_frame_equal(df, expected, rtol=1e-5)
+
+    def test_checkpoint(self):
+        calendar = D.calendar()
+        instruments = D.instruments("all")
+        D.features_incremental(instruments, EXPRESSIONS, calendar[-4], state_dir=STATE_DIR)
+        # the states are loaded from the checkpoints instead of the history
+        with mock.patch.object(ExpressionDAG, "evaluate", side_effect=AssertionError("initialized")):
+            df = IncrementalEvaluator(state_dir=STATE_DIR).evaluate(instruments, EXPRESSIONS, calendar[-2])
+        expected = self._expected(instruments, EXPRESSIONS, calendar[-3], calendar[-2])
+        pd.testing.assert_frame_equal(df, expected, rtol=1e-5)
+
+        # the new fields are initialized with the others loaded from the checkpoints
+        fields = EXPRESSIONS[:2] + ["Mean($open, 10)"]
+        df = D.features_incremental(instruments, fields, calendar[-1], state_dir=STATE_DIR)
+        pd.testing.assert_frame_equal(df, self._expected(instruments, fields, calendar[-1], calendar[-1]), rtol=1e-5)
+        # the outdated checkpoints are ignored
+        df = D.features_incremental(instruments, EXPRESSIONS, calendar[-5], state_dir=STATE_DIR)
+        expected = self._expected(instruments, EXPRESSIONS, calendar[-5], calendar[-5])
+        pd.testing.assert_frame_equal(df, expected, rtol=1e-5)
+
+    def test_stream(self):
+        calendar = D.calendar()
+        index = len(calendar) - 30
+        for field in EXPRESSIONS:
+            expression = ExpressionD.get_expression_instance(field)
+            stream = ExpressionStream(expression)
+            IncrementalEvaluator()._init_streams("SH600000", [stream], index)
+            # the states can be pickled
+            stream = pickle.loads(pickle.dumps(stream))
+            expected = expression.load("SH600000", 0, len(calendar) - 1, "day")
+            for i in range(index + 1, len(calendar)):
+                inputs = {}
+                for key, input_expression in stream.inputs.items():
+                    series = input_expression.load("SH600000", 0, i, "day")
+                    if i in series.index:
+                        inputs[key] = series.loc[i]
+                value = stream.step(inputs)
+                np.testing.assert_allclose(value, expected.get(i, np.nan), rtol=1e-5, err_msg=f"{field} {i}")
+        with self.assertRaises(ValueError):
+            ExpressionStream(ExpressionD.get_expression_instance("Ref($close, -2)"))
+
+
+if __name__ == "__main__":
+    unittest.main()
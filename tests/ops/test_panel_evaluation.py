@@ -0,0 +1,93 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from qlib.config import C
+from qlib.data import D
+from qlib.data.cache import H
+from qlib.data.data import DatasetProvider
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from generated_data import TestGeneratedData
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent.joinpath("scripts")))
+from dump_bin import DumpFeatureMeta
+
+EXPRESSIONS = [
+    "$close",
+    "Mean($close, 5)/$close",
+    "Std($close, 5)/$close",
+    "Ref($close, -2)/$close",
+    "Slope($close, 10)",
+    "Rsquare($close, 10)",
+    "Resi($close, 10)",
+    "Corr($close, Log($volume+1), 10)",
+    "Rank($close, 10)",
+    "IdxMax($close, 5)",
+    "Quantile($open, 10, 0.2)",
+    "If($close > Ref($close, 1), $open, $close)",
+    "Sum($close > $open, 5)",
+    "Mean($vwap, 5)/$close",
+    "$vwap/Ref($close, 1)",
+    "ChangeInstrument('SH600001', Mean($close, 5))/Mean($close, 5)",
+]
+
+
+class TestPanelEvaluation(TestGeneratedData):
+    data_dir = Path(__file__).parent.joinpath("test_panel_evaluation_data")
+    fields = ["open", "close", "volume", "vwap"]
+    n_instruments = 4
+
+    @classmethod
+    def dump_data(cls):
+        super().dump_data()
+        # the vwap of SH600002 starts later than its other features
+        path = cls.qlib_dir.joinpath("features", "sh600002", "vwap.day.bin")
+        raw = np.fromfile(path, dtype="<f")
+        np.hstack([[raw[0] + 30], raw[31:]]).astype("<f").tofile(path)
+        DumpFeatureMeta(cls.qlib_dir).dump()
+
+    def setUp(self) -> None:
+        H["c"].clear()
+        H["f"].clear()
+
+    def _features(self, panel_evaluation: bool, instruments, fields, start_time=None, end_time=None) -> pd.DataFrame:
+        H["f"].clear()
+        C["panel_evaluation"] = panel_evaluation
+        try:
+            return D.features(instruments, fields, start_time, end_time)
+        finally:
+            C["panel_evaluation"] = False
+
+    def test_same_values(self):
+        spans = [(pd.Timestamp("2020-02-01"), pd.Timestamp("2020-03-01")), (pd.Timestamp("2020-05-01"), None)]
+        for instruments, start_time, end_time in [
+            (D.instruments("all"), None, None),
+            (D.instruments("all"), "2020-02-01", "2020-05-31"),
+            (["SH600001", "SH600002", "SH600009"], "2020-03-01", None),
+            ({"SH600001": [spans[0], (spans[1][0], pd.Timestamp("2020-06-30"))], "SH600002": [spans[0]]}, None, None),
+        ]:
+            expected = self._features(False, instruments, EXPRESSIONS, start_time, end_time)
+            df = self._features(True, instruments, EXPRESSIONS, start_time, end_time)
+            pd.testing.assert_frame_equal(df, expected, rtol=1e-5)
+
+    def test_panel_used(self):
+        fields = ["Mean($close, 5)/$close", "Corr($close, $open, 10)", "EMA($close, 10)"]
+        expected = self._features(False, D.instruments("all"), fields)
+        with mock.patch.object(DatasetProvider, "inst_calculator", side_effect=AssertionError("not in panel")):
+            df = self._features(True, D.instruments("all"), fields[:2])
+        pd.testing.assert_frame_equal(df, expected[fields[:2]], rtol=1e-5)
+        # the fields not compilable are calculated instrument by instrument
+        df = self._features(True, D.instruments("all"), fields)
+        pd.testing.assert_frame_equal(df, expected, rtol=1e-5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from qlib.data import D
+from qlib.data.cache import H
+from qlib.data.data import ExpressionD
+from qlib.utils.resam import get_resam_bucket, resam_calendar, resam_ts_data, ts_data_first, ts_data_last
+from qlib.utils.time import get_min_cal
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from generated_data import TestGeneratedData
+
+METHODS = ["sum", "mean", "count", "max", "min", "first", "last"]
+
+
+class TestResam(TestGeneratedData):
+    data_dir = Path(__file__).parent.joinpath("test_resam_data")
+    fields = ["close", "volume"]
+    freq = "1min"
+
+    @classmethod
+    def generate_data(cls):
+        days = pd.bdate_range("2020-01-27", "2020-02-07")
+        minutes = [pd.Timestamp.combine(day, t) for day in days for t in get_min_cal()]
+        rng = np.random.RandomState(0)
+        for i in range(cls.n_instruments):
+            df = pd.DataFrame({"date": minutes[i * 250 :], "symbol": f"SH60000{i}"})
+            for field in cls.fields:
+                df[field] = rng.rand(len(df))
+                df.loc[rng.rand(len(df)) < 0.3, field] = np.nan
+            # the time spans without any valid value
+            df.loc[df["date"].dt.strftime("%H:%M").between("10:00", "10:09"), "close"] = np.nan
+            df.to_csv(cls.source_dir.joinpath(f"sh60000{i}.csv"), index=False)
+
+    def setUp(self) -> None:
+        H["f"].clear()
+
+    def test_resam_calendar(self):
+        calendar = D.calendar(freq="1min")
+        calendar_day = np.unique([pd.Timestamp(x.year, x.month, x.day) for x in calendar])
+        np.testing.assert_array_equal(resam_calendar(calendar, "1min", "day"), calendar_day)
+        np.testing.assert_array_equal(resam_calendar(calendar, "1min", "2d"), calendar_day[::2])
+        np.testing.assert_array_equal(resam_calendar(calendar, "1min", "week"), calendar_day[[0, 5]])
+        np.testing.assert_array_equal(resam_calendar(calendar, "1min", "month"), calendar_day[[0, 5]])
+
+    def test_bucket(self):
+        calendar = pd.DatetimeIndex(D.calendar(freq="1min"))
+        np.testing.assert_array_equal(get_resam_bucket("1min", "1d"), np.repeat(np.arange(10), 240))
+        bucket = get_resam_bucket("1min", "5min")
+        calendar_5min = pd.DatetimeIndex(D.calendar(freq="5min"))
+        self.assertTrue((calendar_5min[bucket] == calendar.floor("5min")).all())
+        # the bucket map is calculated once
+        with mock.patch("qlib.data.data.Cal.calendar", side_effect=AssertionError("calculated")):
+            self.assertIs(get_resam_bucket("1min", "5min"), bucket)
+        with self.assertRaises(ValueError):
+            get_resam_bucket("day", "1min")
+
+    def test_tresample(self):
+        calendar = pd.DatetimeIndex(D.calendar(freq="1min"))
+        for instrument in ["SH600000", "SH600002"]:
+            close = D.features([instrument], ["$close"], freq="1min").loc[instrument, "$close"]
+            for freq, rule in [("5min", "5min"), ("1d", "1d")]:
+                groups = close.groupby(close.index.floor(rule))
+                labels = pd.Series(close.index, index=close.index).groupby(close.index.floor(rule)).first()
+                for method in METHODS + ["std"]:
+                    field = f"TResample($close, '{freq}', '{method}')"
+                    series = ExpressionD.get_expression_instance(field).load(instrument, 0, len(calendar) - 1, "1min")
+                    series = pd.Series(series.values, index=calendar[series.index])
+                    expected = groups.sum(min_count=1) if method == "sum" else getattr(groups, method)()
+                    expected.index = pd.DatetimeIndex(labels.values)
+                    pd.testing.assert_series_equal(series, expected, check_dtype=False, check_names=False, rtol=1e-5)
+
+    def test_resam_ts_data(self):
+        df = D.features(D.instruments("all"), ["$close", "$volume"], freq="1min")
+        ranges = [(None, None), ("2020-01-29 10:00:00", "2020-01-29 10:09:00"), ("2020-02-03", "2020-02-04 14:00:00")]
+        for start_time, end_time in ranges:
+            sliced = df.loc(axis=0)[(slice(None), slice(start_time, end_time))]
+            for method in METHODS + [ts_data_last, ts_data_first]:
+                if callable(method):
+                    expected = sliced.groupby(level="instrument", group_keys=False).apply(method)
+                else:
+                    expected = getattr(sliced.groupby(level="instrument", group_keys=False), method)()
+                result = resam_ts_data(df, start_time, end_time, method=method)
+                pd.testing.assert_frame_equal(result, expected, check_dtype=False, rtol=1e-5)
+                result = resam_ts_data(df["$close"], start_time, end_time, method=method)
+                pd.testing.assert_series_equal(result, expected["$close"], check_dtype=False, rtol=1e-5)
+
+                series = df.loc["SH600001", "$volume"]
+                result = resam_ts_data(series, start_time, end_time, method=method)
+                sliced_series = series.loc[start_time:end_time]
+                if method in ["first", "last"]:
+                    expected = (ts_data_first if method == "first" else ts_data_last)(sliced_series)
+                else:
+                    expected = method(sliced_series) if callable(method) else getattr(sliced_series, method)()
+                np.testing.assert_allclose(result, expected, rtol=1e-5)
+                self.assertIsInstance(result, np.number)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from qlib.data._libs.rolling import (
+    rolling_rank,
+    rolling_quantile,
+    rolling_mad,
+    rolling_wma,
+    rolling_idxmax,
+    rolling_idxmin,
+)
+from qlib.data._libs.expanding import (
+    expanding_rank,
+    expanding_quantile,
+    expanding_mad,
+    expanding_wma,
+    expanding_ema,
+    expanding_idxmax,
+    expanding_idxmin,
+)
+
+
+def _mad(x):
+    x1 = x[~np.isnan(x)]
+    return np.mean(np.abs(x1 - x1.mean()))
+
+
+def _weighted_mean(x):
+    w = np.arange(len(x)) + 1
+    w = w / w.sum()
+    return np.nanmean(w * x)
+
+
+def _exp_weighted_mean(x):
+    a = 1 - 2 / (1 + len(x))
+    w = a ** np.arange(len(x))[::-1]
+    w /= w.sum()
+    return np.nansum(w * x)
+
+
+class TestRollingKernels(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.RandomState(0)
+        # the ties and the NaNs (including the leading ones) are handled the same as pandas
+        self.values = rng.randint(0, 8, 300).astype(np.float32)
+        self.values[rng.rand(300) < 0.15] = np.nan
+        self.values[:3] = np.nan
+
+    def _check(self, expected: pd.Series, res: np.ndarray):
+        self.assertEqual(res.dtype, np.float64)
+        np.testing.assert_allclose(res, expected.values, rtol=1e-12)
+
+    def test_rolling(self):
+        series = pd.Series(self.values)
+        for N in [1, 2, 5, 20, 500]:
+            rolling = series.rolling(N, min_periods=1)
+            self._check(rolling.rank(pct=True), rolling_rank(self.values, N))
+            self._check(rolling.quantile(0.2), rolling_quantile(self.values, N, 0.2))
+            self._check(rolling.quantile(1), rolling_quantile(self.values, N, 1))
+            self._check(rolling.apply(_mad, raw=True), rolling_mad(self.values, N))
+            self._check(rolling.apply(_weighted_mean, raw=True), rolling_wma(self.values, N))
+            self._check(rolling.apply(lambda x: x.argmax() + 1, raw=True), rolling_idxmax(self.values, N))
+            self._check(rolling.apply(lambda x: x.argmin() + 1, raw=True), rolling_idxmin(self.values, N))
+
+    def test_expanding(self):
+        series = pd.Series(self.values)
+        expanding = series.expanding(min_periods=1)
+        self._check(expanding.rank(pct=True), expanding_rank(self.values))
+        self._check(expanding.quantile(0.2), expanding_quantile(self.values, 0.2))
+        self._check(expanding.apply(_mad, raw=True), expanding_mad(self.values))
+        self._check(expanding.apply(_weighted_mean, raw=True), expanding_wma(self.values))
+        self._check(expanding.apply(_exp_weighted_mean, raw=True), expanding_ema(self.values))
+        self._check(expanding.apply(lambda x: x.argmax() + 1, raw=True), expanding_idxmax(self.values))
+        self._check(expanding.apply(lambda x: x.argmin() + 1, raw=True), expanding_idxmin(self.values))
+
+    def test_empty(self):
+        for res in [rolling_rank(np.array([]), 5), rolling_wma(np.array([]), 5), expanding_ema(np.array([]))]:
+            self.assertEqual(len(res), 0)
+        np.testing.assert_array_equal(rolling_idxmax(np.full(3, np.nan), 2), np.full(3, np.nan))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import os
+import sys
+import bisect
+import unittest
+from unittest import mock
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from qlib.data import D
+from qlib.data.data import Cal
+from qlib.data.cache import H
+from qlib.data.storage.file_storage import FileCalendarStorage
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from generated_data import TestGeneratedData
+
+DATA_DIR = Path(__file__).parent.joinpath("test_binary_calendar_data")
+
+
+class TestBinaryCalendar(TestGeneratedData):
+    data_dir = DATA_DIR
+    fields = ["close"]
+
+    @classmethod
+    def generate_data(cls):
+        dates = pd.bdate_range(cls.start_time, cls.end_time)
+        for i in range(cls.n_instruments):
+            df = pd.DataFrame({"date": dates[i * 10 :], "symbol": f"SH60000{i}"})
+            df["close"] = np.arange(len(df))
+            df.to_csv(cls.source_dir.joinpath(f"sh60000{i}.csv"), index=False)
+
+    def setUp(self) -> None:
+        H["c"].clear()
+
+    def test_0_dump(self):
+        storage = FileCalendarStorage(freq="day", future=False)
+        self.assertTrue(storage.binary_uri.exists())
+        text_calendar = pd.DatetimeIndex(storage._read_calendar())
+        binary_calendar = storage._read_binary_calendar()
+        self.assertIsNotNone(binary_calendar)
+        pd.testing.assert_index_equal(binary_calendar, text_calendar)
+        # `data` keeps returning the text calendar, the binary calendar is loaded by `datetime_index`
+        self.assertEqual(storage.data, storage._read_calendar())
+        with mock.patch.object(FileCalendarStorage, "_read_calendar", side_effect=AssertionError("parsed")):
+            pd.testing.assert_index_equal(storage.datetime_index, text_calendar)
+        calendar = D.calendar()
+        self.assertIsInstance(calendar[0], pd.Timestamp)
+        np.testing.assert_array_equal(calendar, text_calendar.to_list())
+
+    def test_1_locate_index(self):
+        calendar = list(D.calendar())
+        points = [
+            calendar[0],
+            calendar[-1],
+            calendar[10],
+            pd.Timestamp("2019-12-01"),
+            pd.Timestamp("2020-01-04"),
+            pd.Timestamp("2020-03-15 12:00:00"),
+        ]
+        for start_time in points:
+            for end_time in points:
+                _, _, start_index, end_index = Cal.locate_index(start_time, end_time, freq="day")
+                self.assertEqual(start_index, bisect.bisect_left(calendar, start_time))
+                self.assertEqual(end_index, (bisect.bisect_right(calendar, end_time) - 1) % len(calendar))
+        with self.assertRaises(IndexError):
+            Cal.locate_index("2021-01-01", "2021-02-01", freq="day")
+
+    def test_2_fallback(self):
+        storage = FileCalendarStorage(freq="day", future=False)
+        # the binary calendar is older than the text calendar
+        txt_mtime = storage.uri.stat().st_mtime_ns
+        os.utime(storage.binary_uri, ns=(txt_mtime - 10**9, txt_mtime - 10**9))
+        self.assertIsNone(storage._read_binary_calendar())
+        self.assertEqual(len(D.calendar()), len(storage._read_calendar()))
+
+        # the binary calendar is updated together with the text calendar
+        storage.extend(["2020-07-01"])
+        self.assertEqual(storage._read_binary_calendar()[-1], pd.Timestamp("2020-07-01"))
+        H["c"].clear()
+        self.assertEqual(D.calendar()[-1], pd.Timestamp("2020-07-01"))
+        self.assertEqual(len(storage._read_binary_calendar()), len(storage._read_calendar()))
+
+
+if __name__ == "__main__":
+    unittest.main()
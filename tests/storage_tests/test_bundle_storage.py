@@ -0,0 +1,117 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from qlib.data.storage.file_storage import FileFeatureStorage, BundleFeatureStorage
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from generated_data import TestGeneratedData
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent.joinpath("scripts")))
+from dump_bin import DumpDataUpdate
+
+DATA_DIR = Path(__file__).parent.joinpath("test_bundle_storage_data")
+UPDATE_DIR = DATA_DIR.joinpath("update")
+BIN_DIR = DATA_DIR.joinpath("bin")
+BUNDLE_DIR = DATA_DIR.joinpath("bundle")
+
+
+class TestBundleFeatureStorage(TestGeneratedData):
+    data_dir = DATA_DIR
+    end_time = "2020-03-31"
+    _setup_kwargs = {"provider_uri": str(BUNDLE_DIR.resolve())}
+
+    @classmethod
+    def generate_data(cls):
+        UPDATE_DIR.mkdir(parents=True, exist_ok=True)
+        dates = pd.bdate_range(cls.start_time, cls.end_time)
+        rng = np.random.RandomState(42)
+        for i, (start, end) in enumerate([(0, 60), (5, 65), (10, 40)]):
+            df = pd.DataFrame({"date": dates[start:end], "symbol": f"SH60000{i}"})
+            for field in cls.fields:
+                df[field] = rng.rand(len(df))
+            df.loc[df.sample(frac=0.1, random_state=i).index, "close"] = np.nan
+            df.iloc[:-5].to_csv(cls.source_dir.joinpath(f"sh60000{i}.csv"), index=False)
+            df.iloc[-5:].to_csv(UPDATE_DIR.joinpath(f"sh60000{i}.csv"), index=False)
+
+    @classmethod
+    def dump_data(cls):
+        cls.dump_bin(BIN_DIR)
+        cls.dump_bin(BUNDLE_DIR, feature_format="bundle")
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        BundleFeatureStorage.clear_cache()
+        super().tearDownClass()
+
+    def _assert_same_as_bin(self):
+        for i in range(3):
+            for field in self.fields:
+                bin_storage = FileFeatureStorage(f"sh60000{i}", field, "day", provider_uri=str(BIN_DIR.resolve()))
+                bundle_storage = BundleFeatureStorage(
+                    f"sh60000{i}", field, "day", provider_uri=str(BUNDLE_DIR.resolve())
+                )
+                self.assertEqual(bundle_storage.start_index, bin_storage.start_index)
+                self.assertEqual(bundle_storage.end_index, bin_storage.end_index)
+                np.testing.assert_equal(bundle_storage[bin_storage.end_index], bin_storage[bin_storage.end_index])
+                pd.testing.assert_series_equal(bundle_storage[:], bin_storage[:], check_index_type=False)
+                pd.testing.assert_series_equal(bundle_storage[10:30], bin_storage[10:30], check_index_type=False)
+
+    def test_0_dump_all(self):
+        self.assertEqual(len(list(BUNDLE_DIR.joinpath("features", "sh600000").iterdir())), 1)
+        self._assert_same_as_bin()
+
+    def test_1_dump_update(self):
+        for qlib_dir, feature_format in [(BIN_DIR, "bin"), (BUNDLE_DIR, "bundle")]:
+            DumpDataUpdate(
+                data_path=UPDATE_DIR,
+                qlib_dir=qlib_dir,
+                include_fields=",".join(self.fields),
+                max_workers=1,
+                feature_format=feature_format,
+            ).dump()
+        close = BundleFeatureStorage("sh600000", "close", "day", provider_uri=str(BUNDLE_DIR.resolve()))
+        self.assertEqual(len(close), 60)
+        self._assert_same_as_bin()
+
+    def test_2_write(self):
+        kwargs = dict(instrument="sh600009", freq="day", provider_uri=str(BUNDLE_DIR.resolve()))
+        BUNDLE_DIR.joinpath("features", "sh600009").mkdir(parents=True, exist_ok=True)
+        close = BundleFeatureStorage(field="close", **kwargs)
+        close.write(np.arange(5), index=3)
+        close.write([5, 6])
+        close.write([np.nan, 10], index=5)
+        np.testing.assert_array_equal(close.data.values, [0, 1, 2, 10, 4, 5, 6])
+        self.assertEqual(close.start_index, 3)
+
+        volume = BundleFeatureStorage(field="volume", **kwargs)
+        self.assertTrue(volume.data.empty)
+        with self.assertRaises(ValueError):
+            volume.check()
+        volume.write([1, 2], index=0)
+        # all the fields are aligned in the bundle
+        np.testing.assert_array_equal(close[:].index, range(0, 10))
+        self.assertEqual(len(volume), 10)
+        bundle = BundleFeatureStorage.read_bundle(close.bundle_uri)
+        self.assertEqual(list(bundle["fields"]), ["close", "volume"])
+
+        close.clear()
+        self.assertEqual(list(BundleFeatureStorage.read_bundle(close.bundle_uri)["fields"]), ["volume"])
+        self.assertIsNone(close.start_index)
+
+    def test_3_fallback(self):
+        # the fields which are not bundled are read from the `.bin` files
+        FileFeatureStorage("sh600000", "vwap", "day", provider_uri=str(BUNDLE_DIR.resolve())).write([1, 2], index=7)
+        vwap = BundleFeatureStorage("sh600000", "vwap", "day", provider_uri=str(BUNDLE_DIR.resolve()))
+        self.assertEqual(vwap.start_index, 7)
+        np.testing.assert_array_equal(vwap[:].values, [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
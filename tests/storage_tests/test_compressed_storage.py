@@ -0,0 +1,139 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from qlib.data.storage.file_storage import FileFeatureStorage, CompressedFeatureStorage
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from generated_data import TestGeneratedData
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent.joinpath("scripts")))
+from dump_bin import DumpDataUpdate
+
+DATA_DIR = Path(__file__).parent.joinpath("test_compressed_storage_data")
+UPDATE_DIR = DATA_DIR.joinpath("update")
+BIN_DIR = DATA_DIR.joinpath("bin")
+COMPRESSED_DIR = DATA_DIR.joinpath("compressed")
+
+
+class TestCompressedFeatureStorage(TestGeneratedData):
+    data_dir = DATA_DIR
+    end_time = "2020-03-31"
+    _setup_kwargs = {"provider_uri": str(COMPRESSED_DIR.resolve())}
+
+    @classmethod
+    def generate_data(cls):
+        UPDATE_DIR.mkdir(parents=True, exist_ok=True)
+        dates = pd.bdate_range(cls.start_time, cls.end_time)
+        rng = np.random.RandomState(42)
+        for i, (start, end) in enumerate([(0, 60), (5, 65), (10, 40)]):
+            df = pd.DataFrame({"date": dates[start:end], "symbol": f"SH60000{i}"})
+            for field in cls.fields:
+                df[field] = rng.rand(len(df))
+            df.loc[df.sample(frac=0.1, random_state=i).index, "close"] = np.nan
+            df.iloc[:-5].to_csv(cls.source_dir.joinpath(f"sh60000{i}.csv"), index=False)
+            df.iloc[-5:].to_csv(UPDATE_DIR.joinpath(f"sh60000{i}.csv"), index=False)
+
+    @classmethod
+    def dump_data(cls):
+        cls.dump_bin(BIN_DIR)
+        cls.dump_bin(COMPRESSED_DIR, feature_format="compressed")
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        CompressedFeatureStorage.clear_cache()
+        super().tearDownClass()
+
+    def _assert_same_as_bin(self):
+        for i in range(3):
+            for field in self.fields:
+                bin_storage = FileFeatureStorage(f"sh60000{i}", field, "day", provider_uri=str(BIN_DIR.resolve()))
+                compressed_storage = CompressedFeatureStorage(
+                    f"sh60000{i}", field, "day", provider_uri=str(COMPRESSED_DIR.resolve())
+                )
+                self.assertEqual(compressed_storage.start_index, bin_storage.start_index)
+                self.assertEqual(compressed_storage.end_index, bin_storage.end_index)
+                self.assertEqual(len(compressed_storage), len(bin_storage))
+                np.testing.assert_equal(
+                    compressed_storage[bin_storage.end_index], bin_storage[bin_storage.end_index]
+                )
+                pd.testing.assert_series_equal(compressed_storage[:], bin_storage[:], check_index_type=False)
+                pd.testing.assert_series_equal(compressed_storage[10:30], bin_storage[10:30], check_index_type=False)
+
+    def test_0_dump_all(self):
+        self.assertEqual(
+            sorted(p.name for p in COMPRESSED_DIR.joinpath("features", "sh600000").iterdir()),
+            [f"{field}.day.cbin" for field in sorted(self.fields)],
+        )
+        self._assert_same_as_bin()
+
+    def test_1_dump_update(self):
+        for qlib_dir, feature_format in [(BIN_DIR, "bin"), (COMPRESSED_DIR, "compressed")]:
+            DumpDataUpdate(
+                data_path=UPDATE_DIR,
+                qlib_dir=qlib_dir,
+                include_fields=",".join(self.fields),
+                max_workers=1,
+                feature_format=feature_format,
+            ).dump()
+        close = CompressedFeatureStorage("sh600000", "close", "day", provider_uri=str(COMPRESSED_DIR.resolve()))
+        self.assertEqual(len(close), 60)
+        self._assert_same_as_bin()
+
+    def test_2_blocks(self):
+        path = COMPRESSED_DIR.joinpath("blocks.cbin")
+        values = np.round(np.cumsum(np.random.RandomState(0).randn(10000)), 2).astype(np.float32)
+        values[100:200] = np.nan
+        for codec in ["zlib", "none"]:
+            for shuffle in [True, False]:
+                CompressedFeatureStorage.write_compressed(
+                    path, 7, values, codec=codec, block_size=1000, shuffle=shuffle
+                )
+                start_index, _values = CompressedFeatureStorage.read_compressed(path)
+                self.assertEqual(start_index, 7)
+                np.testing.assert_array_equal(_values, values)
+        with path.open("rb") as fp:
+            compressed = CompressedFeatureStorage.parse_compressed(fp.read())
+        self.assertEqual(len(compressed["offsets"]), 11)
+        # the slices across the boundaries of the blocks
+        for start, stop in [(0, 1), (999, 1001), (1500, 3500), (9999, 10000), (9000, 20000)]:
+            np.testing.assert_array_equal(
+                CompressedFeatureStorage.decompress(compressed, start, stop), values[start:stop]
+            )
+        # shuffled float32 data are smaller than the raw values
+        CompressedFeatureStorage.write_compressed(path, 7, values, codec="zlib")
+        self.assertLess(path.stat().st_size, values.nbytes * 0.8)
+
+    def test_3_write(self):
+        kwargs = dict(instrument="sh600009", freq="day", provider_uri=str(COMPRESSED_DIR.resolve()), block_size=2)
+        COMPRESSED_DIR.joinpath("features", "sh600009").mkdir(parents=True, exist_ok=True)
+        close = CompressedFeatureStorage(field="close", **kwargs)
+        with self.assertRaises(ValueError):
+            close.check()
+        close.write(np.arange(5), index=3)
+        close.write([5, 6])
+        close.write([np.nan, 10], index=5)
+        np.testing.assert_array_equal(close.data.values, [0, 1, 2, 10, 4, 5, 6])
+        self.assertEqual(close.start_index, 3)
+        self.assertEqual(close[6], (6, 10))
+
+        close.clear()
+        self.assertIsNone(close.start_index)
+        self.assertTrue(close.data.empty)
+
+    def test_4_fallback(self):
+        # the features which are not compressed are read from the `.bin` files
+        FileFeatureStorage("sh600000", "vwap", "day", provider_uri=str(COMPRESSED_DIR.resolve())).write([1, 2], index=7)
+        vwap = CompressedFeatureStorage("sh600000", "vwap", "day", provider_uri=str(COMPRESSED_DIR.resolve()))
+        self.assertEqual(vwap.start_index, 7)
+        np.testing.assert_array_equal(vwap[:].values, [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import unittest
+import contextlib
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from qlib.data.cache import H, CacheUtils, DiskExpressionCache
+from qlib.data.data import ExpressionD
+from qlib.data.storage.file_storage import FileFeatureStorage
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from generated_data import TestGeneratedData
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent.joinpath("scripts")))
+from dump_bin import DumpFeatureMeta
+
+DATA_DIR = Path(__file__).parent.joinpath("test_data_version_data")
+QLIB_DIR = DATA_DIR.joinpath("qlib")
+META_PATH = QLIB_DIR.joinpath("features", "_meta.day.npy")
+
+
+class TestDataVersion(TestGeneratedData):
+    data_dir = DATA_DIR
+    fields = ["open", "close"]
+    n_instruments = 2
+
+    def setUp(self) -> None:
+        H["c"].clear()
+        H["f"].clear()
+
+    @staticmethod
+    def _revisions() -> dict:
+        meta = FileFeatureStorage.read_meta(META_PATH)
+        return {(inst, field): revision for inst, field, *_, revision in meta.tolist()}
+
+    def test_revision(self):
+        revisions = self._revisions()
+        # the revisions of the unchanged features are not changed by regenerating the index
+        DumpFeatureMeta(QLIB_DIR).dump()
+        self.assertEqual(self._revisions(), revisions)
+
+        storage = FileFeatureStorage("sh600000", "open", "day")
+        self.assertEqual(storage.version, revisions[("sh600000", "open")])
+        storage.write([1.0], storage.end_index + 1)
+        new_revisions = self._revisions()
+        self.assertGreater(new_revisions.pop(("sh600000", "open")), max(revisions.values()))
+        revisions.pop(("sh600000", "open"))
+        self.assertEqual(new_revisions, revisions)
+        self.assertEqual(storage.version, self._revisions()[("sh600000", "open")])
+
+        # the features rewritten by other tools get new revisions after regenerating the index
+        revisions = self._revisions()
+        storage = FileFeatureStorage("sh600001", "close", "day")
+        np.hstack([[storage.start_index], storage.data.values[:-1]]).astype("<f").tofile(storage.uri)
+        DumpFeatureMeta(QLIB_DIR).dump()
+        self.assertGreater(self._revisions()[("sh600001", "close")], max(revisions.values()))
+
+    def test_rewrite(self):
+        # the values rewritten inside the range keep the start index in the header
+        storage = FileFeatureStorage("sh600000", "close", "day")
+        start_index, expected = storage.start_index, storage.data.values.copy()
+        storage.write([100.0, 200.0], start_index + 2)
+        expected[2:4] = [100.0, 200.0]
+        data = np.fromfile(storage.uri, dtype="<f")
+        self.assertEqual(data[0], start_index)
+        np.testing.assert_array_equal(data[1:], expected)
+        # the rewritten feature starting earlier gets the new start index
+        storage.write([1.0], start_index - 1)
+        data = np.fromfile(storage.uri, dtype="<f")
+        self.assertEqual(data[0], start_index - 1)
+        np.testing.assert_array_equal(data[1:], np.hstack([[1.0], expected]).astype("<f"))
+        self.assertEqual((storage.start_index, len(storage)), (start_index - 1, len(expected) + 1))
+
+    def test_data_version(self):
+        get_version = DiskExpressionCache.get_data_version
+        version = get_version(["SH600000"], ["Mean($close, 5)"], "day")
+        self.assertIsNotNone(version)
+        self.assertEqual(get_version(["SH600000"], ["$close * 2"], "day"), version)
+        self.assertNotEqual(get_version(["SH600001"], ["$close * 2"], "day"), version)
+        # the features of other instruments are included
+        self.assertNotEqual(get_version(["SH600000"], ["$close + ChangeInstrument('SH600001', $open)"], "day"), version)
+
+        other = get_version(["SH600001"], ["$open"], "day")
+        FileFeatureStorage("sh600000", "close", "day").write([1.0])
+        self.assertNotEqual(get_version(["SH600000"], ["Mean($close, 5)"], "day"), version)
+        self.assertEqual(get_version(["SH600001"], ["$open"], "day"), other)
+
+    def test_expression_cache(self):
+        field = "Mean($open, 3)"
+        with mock.patch("qlib.data.cache.get_redis_connection"), mock.patch.object(
+            CacheUtils, "writer_lock", return_value=contextlib.nullcontext()
+        ):
+            cache = DiskExpressionCache(ExpressionD._provider)
+            expected = cache.expression("SH600001", field, "2020-01-01", "2020-06-30", "day")
+            cache_files = list(cache.get_cache_dir("day").joinpath("sh600001").iterdir())
+            self.assertEqual(len(cache_files), 2)
+            with mock.patch.object(cache.provider, "expression", side_effect=AssertionError("the cache is not used")):
+                cached = cache.expression("SH600001", field, "2020-01-01", "2020-06-30", "day")
+            np.testing.assert_allclose(cached.values, expected.values, rtol=1e-6)
+            # the cache is regenerated after the data is rewritten
+            storage = FileFeatureStorage("sh600001", "open", "day")
+            storage.write([100.0] * 3, storage.start_index)
+            H["f"].clear()
+            series = cache.expression("SH600001", field, "2020-01-01", "2020-06-30", "day")
+        # only the means depending on the rewritten values are changed
+        self.assertTrue((series.iloc[:3] > 1).all())
+        np.testing.assert_allclose(series.iloc[5:].values, expected.iloc[5:].values, rtol=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
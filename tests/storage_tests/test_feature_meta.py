@@ -0,0 +1,111 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import shutil
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from qlib.data import D
+from qlib.data.cache import H
+from qlib.data.storage.file_storage import FileFeatureStorage
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from generated_data import TestGeneratedData
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent.joinpath("scripts")))
+from dump_bin import DumpFeatureMeta
+
+DATA_DIR = Path(__file__).parent.joinpath("test_feature_meta_data")
+QLIB_DIR = DATA_DIR.joinpath("qlib")
+META_PATH = QLIB_DIR.joinpath("features", "_meta.day.npy")
+
+
+class TestFeatureMeta(TestGeneratedData):
+    data_dir = DATA_DIR
+
+    def setUp(self) -> None:
+        H["c"].clear()
+
+    def test_dump_meta(self):
+        meta = FileFeatureStorage.read_meta(META_PATH)
+        self.assertEqual(len(meta), 3 * len(self.fields))
+        for inst, field, start_index, length, *_ in meta.tolist():
+            path = QLIB_DIR.joinpath("features", inst, f"{field}.day.bin")
+            values = np.fromfile(path, dtype="<f")
+            self.assertEqual(start_index, int(values[0]))
+            self.assertEqual(length, len(values) - 1)
+        # the start indexes are reused if the files are not modified
+        with mock.patch.object(Path, "open", side_effect=AssertionError("the files should not be read")):
+            rebuilt = FileFeatureStorage.build_meta(QLIB_DIR.joinpath("features"), "day", meta)
+        np.testing.assert_array_equal(rebuilt, meta)
+        DumpFeatureMeta(QLIB_DIR).dump()
+        np.testing.assert_array_equal(FileFeatureStorage.read_meta(META_PATH), meta)
+
+    def test_read_with_meta(self):
+        storage = FileFeatureStorage("sh600001", "close", "day")
+        raw = np.fromfile(storage.uri, dtype="<f")
+        # the entry is checked against the mtime of the file once, then the start index and the length are read from
+        # the index without touching the files
+        self.assertEqual(storage.start_index, int(raw[0]))
+        no_open = mock.patch.object(Path, "open", side_effect=AssertionError("the files should not be read"))
+        no_stat = mock.patch.object(Path, "stat", side_effect=AssertionError("the files should not be stat"))
+        with no_open, no_stat:
+            self.assertEqual(storage.start_index, int(raw[0]))
+            self.assertEqual(storage.end_index, int(raw[0]) + len(raw) - 2)
+            self.assertEqual(len(storage), len(raw) - 1)
+            storage.check()
+        np.testing.assert_array_equal(storage.data.values, raw[1:])
+        self.assertEqual(storage[int(raw[0]) + 3], (int(raw[0]) + 3, raw[4]))
+        self.assertTrue(FileFeatureStorage("sh600001", "not_exists", "day")[:].empty)
+
+        df = D.features(["sh600000", "sh600001", "sh600002"], ["$close", "Mean($open, 5)"], freq="day")
+        H["c"].clear()
+        shutil.move(str(META_PATH), str(META_PATH) + ".bak")
+        try:
+            pd.testing.assert_frame_equal(
+                df, D.features(["sh600000", "sh600001", "sh600002"], ["$close", "Mean($open, 5)"], freq="day")
+            )
+        finally:
+            shutil.move(str(META_PATH) + ".bak", str(META_PATH))
+
+    def test_modified_file(self):
+        # the features modified by other tools after the index was generated are read from the files
+        storage = FileFeatureStorage("sh600000", "open", "day")
+        start_index, values = storage.start_index, storage.data.values
+        self.assertIsNotNone(storage.version)
+        np.hstack([[start_index + 1], values[:-2]]).astype("<f").tofile(storage.uri)
+        H["c"].clear()
+        self.assertEqual((storage.start_index, len(storage)), (start_index + 1, len(values) - 2))
+        np.testing.assert_array_equal(storage.data.values, values[:-2])
+        self.assertIsNone(storage.version)
+        # the regenerated index is used again
+        DumpFeatureMeta(QLIB_DIR).dump()
+        with mock.patch.object(Path, "open", side_effect=AssertionError("the files should not be read")):
+            self.assertEqual((storage.start_index, len(storage)), (start_index + 1, len(values) - 2))
+        self.assertIsNotNone(storage.version)
+
+    def test_write_updates_meta(self):
+        storage = FileFeatureStorage("sh600002", "vwap", "day")
+        storage.write([1, 2, 3], 20)
+        self.assertEqual((storage.start_index, len(storage)), (20, 3))
+        storage.write([4], 25)
+        self.assertEqual((storage.start_index, storage.end_index, len(storage)), (20, 25, 6))
+        np.testing.assert_array_equal(storage.data.values, [1, 2, 3, np.nan, np.nan, 4])
+        meta = FileFeatureStorage.read_meta(META_PATH)
+        self.assertEqual(
+            meta[(meta["instrument"] == "sh600002") & (meta["field"] == "vwap")][["start_index", "length"]].tolist(),
+            [(20, 6)],
+        )
+        storage.clear()
+        meta = FileFeatureStorage.read_meta(META_PATH)
+        self.assertNotIn("vwap", meta["field"].tolist())
+        storage.uri.unlink()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import shutil
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+import qlib
+from qlib.data.storage.file_storage import FileFeatureStorage, MmapFeatureStorage
+
+DATA_DIR = Path(__file__).parent.joinpath("test_mmap_storage_data")
+
+
+class TestMmapFeatureStorage(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        DATA_DIR.joinpath("calendars").mkdir(parents=True, exist_ok=True)
+        DATA_DIR.joinpath("features", "sh600000").mkdir(parents=True, exist_ok=True)
+        DATA_DIR.joinpath("calendars", "day.txt").write_text("2020-01-01\n")
+        cls.provider_uri = str(DATA_DIR.resolve())
+        qlib.init(provider_uri=cls.provider_uri, expression_cache=None, dataset_cache=None)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        MmapFeatureStorage.clear_cache()
+        shutil.rmtree(str(DATA_DIR.resolve()))
+
+    def _storages(self, field):
+        kwargs = dict(instrument="sh600000", field=field, freq="day", provider_uri=self.provider_uri)
+        return FileFeatureStorage(**kwargs), MmapFeatureStorage(**kwargs)
+
+    def test_read(self):
+        file_storage, mmap_storage = self._storages("close")
+        file_storage.write(np.arange(10, dtype=np.float32), index=5)
+
+        self.assertEqual(mmap_storage.start_index, file_storage.start_index)
+        self.assertEqual(mmap_storage.end_index, file_storage.end_index)
+        self.assertEqual(len(mmap_storage), len(file_storage))
+        self.assertEqual(mmap_storage[7], file_storage[7])
+        with self.assertRaises(IndexError):
+            mmap_storage[0]  # pylint: disable=W0104
+        for s in [slice(None), slice(0, 8), slice(7, 12), slice(12, 100), slice(20, 30)]:
+            np.testing.assert_array_equal(mmap_storage[s].values, file_storage[s].values)
+            np.testing.assert_array_equal(mmap_storage[s].index, file_storage[s].index)
+
+    def test_invalidation(self):
+        file_storage, mmap_storage = self._storages("open")
+        file_storage.write(np.arange(3, dtype=np.float32), index=0)
+        self.assertEqual(mmap_storage.end_index, 2)
+
+        # the file is updated by other writers (e.g. dump_bin.py)
+        file_storage.write([3, 4], index=3)
+        self.assertEqual(mmap_storage.end_index, 4)
+        np.testing.assert_array_equal(mmap_storage[:].values, np.arange(5))
+
+        mmap_storage.write([5], index=5)
+        self.assertEqual(len(mmap_storage), 6)
+
+    def test_not_exists(self):
+        mmap_storage = MmapFeatureStorage(
+            instrument="sh600001", field="close", freq="day", provider_uri=self.provider_uri
+        )
+        self.assertIsNone(mmap_storage.start_index)
+        self.assertEqual(mmap_storage[0], (None, None))
+        self.assertTrue(mmap_storage[:].empty)
+        with self.assertRaises(ValueError):
+            len(mmap_storage)
+
+
+if __name__ == "__main__":
+    unittest.main()
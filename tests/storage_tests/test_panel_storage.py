@@ -0,0 +1,100 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from qlib.data import D
+from qlib.data.data import DatasetD, DatasetProvider, LocalDatasetProvider
+from qlib.backtest.exchange import Exchange
+from qlib.data.storage.file_storage import FilePanelStorage
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from generated_data import TestGeneratedData
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent.joinpath("scripts")))
+from dump_panel import DumpPanel
+
+
+class TestPanelStorage(TestGeneratedData):
+    data_dir = Path(__file__).parent.joinpath("test_panel_storage_data")
+    fields = ["open", "close", "volume", "factor", "change"]
+    _setup_kwargs = {"panel_provider": "LocalPanelProvider"}
+
+    @classmethod
+    def generate_data(cls):
+        dates = pd.bdate_range(cls.start_time, cls.end_time)
+        rng = np.random.RandomState(0)
+        for i, (start, end) in enumerate([(0, 120), (10, 130), (30, 80), (50, 130)]):
+            df = pd.DataFrame({"date": dates[start:end], "symbol": f"SH60000{i}"})
+            for field in cls.fields:
+                df[field] = rng.rand(len(df))
+            df.loc[df.sample(frac=0.1, random_state=i).index, "close"] = np.nan
+            df.to_csv(cls.source_dir.joinpath(f"sh60000{i}.csv"), index=False)
+
+    @classmethod
+    def dump_data(cls):
+        super().dump_data()
+        DumpPanel(qlib_dir=cls.qlib_dir, max_workers=1).dump()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        FilePanelStorage.clear_cache()
+        super().tearDownClass()
+
+    def test_storage(self):
+        storage = FilePanelStorage(field="close", freq="day")
+        self.assertEqual(storage.instruments, ["sh600000", "sh600001", "sh600002", "sh600003"])
+        self.assertEqual(len(storage), len(D.calendar()))
+        np.testing.assert_array_equal(storage.spans, [[0, 119], [10, 129], [30, 79], [50, 129]])
+        np.testing.assert_array_equal(storage.get_columns(["sh600002", "sh600009"]), [2, -1])
+        values = D.features(["SH600002"], ["$close"], disk_cache=0)["$close"].values
+        np.testing.assert_array_equal(storage[30:80][:, 2], values)
+
+    def test_support(self):
+        self.assertTrue(LocalDatasetProvider.support_panel(["$close", "$open"]))
+        self.assertFalse(LocalDatasetProvider.support_panel(["$close", "$vwap"]))
+        self.assertFalse(LocalDatasetProvider.support_panel(["$close", "Ref($close, 1)"]))
+
+    def test_features(self):
+        spans = [(pd.Timestamp("2020-02-01"), pd.Timestamp("2020-03-01")), (pd.Timestamp("2020-05-01"), None)]
+        for instruments, fields, start_time, end_time in [
+            (D.instruments("all"), ["$close", "$open", "$volume"], None, None),
+            (D.instruments("all"), ["$close", "$close"], "2020-03-01", "2020-04-30"),
+            (["SH600002", "SH600003", "SH600009"], ["$ close", "$factor"], "2020-04-01", None),
+            (
+                {"SH600001": [(spans[0][0], spans[0][1]), (spans[1][0], pd.Timestamp("2020-06-30"))]},
+                ["$open"],
+                None,
+                None,
+            ),
+        ]:
+            df = D.features(instruments, fields, start_time, end_time)
+            cal = D.calendar(start_time, end_time)
+            expected = DatasetD.dataset_processor(
+                DatasetD.get_instruments_d(instruments, "day"), fields, cal[0], cal[-1], "day"
+            )
+            pd.testing.assert_frame_equal(df, expected)
+
+    def test_exchange(self):
+        kwargs = dict(freq="day", start_time="2020-02-01", end_time="2020-05-31", codes="all", deal_price="$close")
+        with mock.patch.object(DatasetProvider, "dataset_processor", side_effect=AssertionError):
+            # the quote is loaded from the panels without calculating instrument by instrument
+            exchange = Exchange(**kwargs)
+        # load the quote without panels
+        self.init_qlib(panel_provider=None)
+        try:
+            self.assertFalse(LocalDatasetProvider.support_panel(["$close"]))
+            expected = Exchange(**kwargs)
+        finally:
+            self.init_qlib()
+        pd.testing.assert_frame_equal(exchange.quote_df, expected.quote_df)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import shutil
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+import qlib
+from qlib.data import D
+from qlib.data.storage.file_storage import FileCalendarStorage, FileInstrumentStorage, FileFeatureStorage
+from qlib.data.storage.parquet_storage import (
+    ParquetCalendarStorage,
+    ParquetInstrumentStorage,
+    ParquetFeatureStorage,
+)
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from generated_data import TestGeneratedData
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent.joinpath("scripts")))
+from dump_parquet import DumpParquet
+
+DATA_DIR = Path(__file__).parent.joinpath("test_parquet_storage_data")
+BIN_DIR = DATA_DIR.joinpath("bin")
+PARQUET_DIR = DATA_DIR.joinpath("parquet")
+INSTRUMENTS = [f"SH60000{i}" for i in range(5)]
+
+
+def _backend(name):
+    return {"backend": {"class": name, "module_path": "qlib.data.storage.parquet_storage"}}
+
+
+class TestParquetStorage(TestGeneratedData):
+    data_dir = DATA_DIR
+    _setup_kwargs = {
+        "provider_uri": str(PARQUET_DIR.resolve()),
+        "calendar_provider": {
+            "class": "LocalCalendarProvider",
+            "module_path": "qlib.data.data",
+            "kwargs": _backend("ParquetCalendarStorage"),
+        },
+        "instrument_provider": {
+            "class": "LocalInstrumentProvider",
+            "module_path": "qlib.data.data",
+            "kwargs": _backend("ParquetInstrumentStorage"),
+        },
+        "feature_provider": {
+            "class": "LocalFeatureProvider",
+            "module_path": "qlib.data.data",
+            "kwargs": _backend("ParquetFeatureStorage"),
+        },
+    }
+
+    @classmethod
+    def generate_data(cls):
+        dates = pd.bdate_range(cls.start_time, "2020-12-31")
+        rng = np.random.RandomState(0)
+        for i, inst in enumerate(INSTRUMENTS):
+            df = pd.DataFrame({"date": dates[i * 20 : 200 + i * 10], "symbol": inst})
+            for field in cls.fields:
+                df[field] = rng.rand(len(df))
+            df.loc[df.sample(frac=0.1, random_state=i).index, "close"] = np.nan
+            df.to_csv(cls.source_dir.joinpath(f"{inst.lower()}.csv"), index=False)
+
+    @classmethod
+    def dump_data(cls):
+        cls.dump_bin(BIN_DIR)
+        shutil.copytree(str(BIN_DIR), str(PARQUET_DIR))
+        DumpParquet(qlib_dir=PARQUET_DIR, max_workers=1, row_group_size=100).dump()
+        # only the Parquet files are kept
+        for path in PARQUET_DIR.glob("*/*"):
+            if path.suffix != ".parquet":
+                shutil.rmtree(str(path)) if path.is_dir() else path.unlink()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        ParquetFeatureStorage.clear_cache()
+        super().tearDownClass()
+
+    def test_calendar_instrument(self):
+        bin_uri = str(BIN_DIR.resolve())
+        pd.testing.assert_index_equal(
+            pd.DatetimeIndex(ParquetCalendarStorage(freq="day", future=False).data),
+            pd.DatetimeIndex(FileCalendarStorage(freq="day", future=False, provider_uri=bin_uri).data),
+        )
+        self.assertEqual(
+            ParquetInstrumentStorage(market="all", freq="day").data,
+            FileInstrumentStorage(market="all", freq="day", provider_uri=bin_uri).data,
+        )
+
+    def test_feature(self):
+        for inst in INSTRUMENTS:
+            for field in self.fields + ["vwap"]:
+                pq_storage = ParquetFeatureStorage(instrument=inst, field=field, freq="day")
+                file_storage = FileFeatureStorage(
+                    instrument=inst, field=field, freq="day", provider_uri=str(BIN_DIR.resolve())
+                )
+                self.assertEqual(pq_storage.start_index, file_storage.start_index)
+                self.assertEqual(pq_storage.end_index, file_storage.end_index)
+                for s in [slice(None), slice(50, 120), slice(0, 30), slice(230, 300)]:
+                    pd.testing.assert_series_equal(pq_storage[s], file_storage[s], check_index_type=False)
+
+    def test_read_many(self):
+        fields = self.fields + ["vwap"]
+        for inst in INSTRUMENTS:
+            for s in [slice(None), slice(50, 120), slice(230, 300)]:
+                pq_res = ParquetFeatureStorage(instrument=inst, field="close", freq="day").read_many(fields, s)
+                file_storage = FileFeatureStorage(
+                    instrument=inst, field="close", freq="day", provider_uri=str(BIN_DIR.resolve())
+                )
+                for actual, expected in zip(pq_res, file_storage.read_many(fields, s)):
+                    np.testing.assert_array_equal(actual, expected)
+
+    def test_pruning(self):
+        pq_file = pq.ParquetFile(str(PARQUET_DIR.joinpath("features", "day.parquet")))
+        self.assertGreater(pq_file.metadata.num_row_groups, len(INSTRUMENTS))
+        storage = ParquetFeatureStorage(instrument="SH600002", field="close", freq="day")
+        calls = []
+        _read_row_groups = pq.ParquetFile.read_row_groups
+
+        def _record(self, row_groups, columns=None, **kwargs):
+            calls.append((list(row_groups), list(columns)))
+            return _read_row_groups(self, row_groups, columns=columns, **kwargs)
+
+        with mock.patch.object(pq.ParquetFile, "read_row_groups", _record):
+            storage[60:80]
+        (row_groups, columns), *_ = calls
+        # only the row group containing the rows and the queried field are read
+        self.assertEqual(len(row_groups), 1)
+        self.assertNotIn("open", columns)
+        self.assertIn("close", columns)
+
+    def test_features(self):
+        fields = ["$close", "Mean($close, 5)", "Ref($open, 1)"]
+        df = D.features(D.instruments("all"), fields, "2020-03-01", "2020-10-01")
+        qlib.init(provider_uri=str(BIN_DIR.resolve()), expression_cache=None, dataset_cache=None, kernels=1)
+        try:
+            expected = D.features(D.instruments("all"), fields, "2020-03-01", "2020-10-01")
+        finally:
+            self.init_qlib()
+        pd.testing.assert_frame_equal(df, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import unittest
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from qlib.config import C
+from qlib.data import D
+from qlib.data.cache import H
+from qlib.data.data import FeatureD, LocalFeatureProvider
+from qlib.data.storage.file_storage import FileFeatureStorage, MmapFeatureStorage, BundleFeatureStorage
+from qlib.utils.paral import read_ahead
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from generated_data import TestGeneratedData
+
+DATA_DIR = Path(__file__).parent.joinpath("test_read_many_data")
+BIN_DIR = DATA_DIR.joinpath("bin")
+BUNDLE_DIR = DATA_DIR.joinpath("bundle")
+
+
+class TestReadMany(TestGeneratedData):
+    data_dir = DATA_DIR
+    _setup_kwargs = {"provider_uri": str(BIN_DIR.resolve())}
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        # the fields with different ranges
+        FileFeatureStorage("sh600000", "vwap", "day", provider_uri=str(BIN_DIR.resolve())).write([1, 2, np.nan], 30)
+
+    @classmethod
+    def dump_data(cls):
+        cls.dump_bin(BIN_DIR)
+        cls.dump_bin(BUNDLE_DIR, feature_format="bundle")
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        BundleFeatureStorage.clear_cache()
+        super().tearDownClass()
+
+    def _assert_read_many(self, storage, fields, s):
+        start_index, values, spans = storage.read_many(fields, s)
+        self.assertEqual(values.shape[0], len(fields))
+        for field, field_values, (si, ei) in zip(fields, values, spans):
+            expected = storage._field_storage(field)[s]
+            if expected.empty:
+                self.assertLess(ei, si)
+                continue
+            self.assertEqual((si, ei), (expected.index[0], expected.index[-1]))
+            np.testing.assert_array_equal(field_values[si - start_index : ei - start_index + 1], expected.values)
+
+    def test_storage(self):
+        for storage_cls, qlib_dir in [
+            (FileFeatureStorage, BIN_DIR),
+            (MmapFeatureStorage, BIN_DIR),
+            (BundleFeatureStorage, BUNDLE_DIR),
+        ]:
+            storage = storage_cls("sh600000", "close", "day", provider_uri=str(qlib_dir.resolve()))
+            for fields in [self.fields, ["close", "vwap", "not_exist"], ["not_exist"]]:
+                for s in [slice(None), slice(20, 40), slice(0, 5), slice(200, 300)]:
+                    self._assert_read_many(storage, fields, s)
+        # the bundled fields are read from the bundle at once
+        storage = BundleFeatureStorage("sh600001", "close", "day", provider_uri=str(BUNDLE_DIR.resolve()))
+        with mock.patch.object(BundleFeatureStorage, "_field_storage") as field_storage:
+            start_index, values, spans = storage.read_many(self.fields, slice(20, 40))
+            field_storage.assert_not_called()
+        self.assertEqual(start_index, 20)
+        np.testing.assert_array_equal(spans, [[20, 39]] * len(self.fields))
+
+    def test_features_many(self):
+        fields = ["$close", "$vwap", "$open"]
+        res = FeatureD.features_many("SH600000", fields, 25, 60, "day")
+        self.assertEqual(list(res), fields)
+        for field in fields:
+            pd.testing.assert_series_equal(res[field], FeatureD.feature("SH600000", field, 25, 60, "day"))
+
+    def test_prefetch(self):
+        H["f"].clear()
+        fields = ["$close", "Mean($close, 5)", "$open / Ref($close, 1)", "ChangeInstrument('SH600001', $volume)"]
+        with mock.patch.object(
+            LocalFeatureProvider, "feature", side_effect=LocalFeatureProvider.feature, autospec=True
+        ) as feature:
+            df = D.features(["SH600000"], fields, "2020-02-01", "2020-05-01")
+        # only the feature of the other instrument is loaded separately
+        self.assertEqual([call.args[1:3] for call in feature.call_args_list], [("SH600001", "$volume")])
+        H["f"].clear()
+        with mock.patch.object(LocalFeatureProvider, "features_many", side_effect=NotImplementedError):
+            expected = D.features(["SH600000"], fields, "2020-02-01", "2020-05-01")
+        pd.testing.assert_frame_equal(df, expected)
+
+    def test_io_prefetch(self):
+        fields = ["$close", "Mean($close, 5)", "$open / Ref($close, 1)"]
+        instruments = ["SH600000", "SH600001", "SH600002"]
+        H["f"].clear()
+        expected = D.features(instruments, fields, "2020-02-01", "2020-05-01")
+        H["f"].clear()
+        threads = []
+        features_many = LocalFeatureProvider.features_many
+
+        def _features_many(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return features_many(*args, **kwargs)
+
+        C["io_prefetch_workers"] = 2
+        try:
+            with mock.patch.object(LocalFeatureProvider, "features_many", side_effect=_features_many, autospec=True):
+                df = D.features(instruments, fields, "2020-02-01", "2020-05-01")
+        finally:
+            C["io_prefetch_workers"] = 0
+        pd.testing.assert_frame_equal(df, expected)
+        # the features of all the instruments are read by the prefetch threads
+        self.assertEqual(len(threads), len(instruments))
+        self.assertNotIn(threading.main_thread(), threads)
+
+    def test_read_ahead(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            res = read_ahead(executor, lambda x: x * 2, [(i,) for i in range(10)], 3)
+            self.assertEqual(list(res), [i * 2 for i in range(10)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from qlib.config import C
+from qlib.data import D
+from qlib.data.cache import H
+from qlib.data.data import PITD, ExpressionD, LocalPITProvider
+from qlib.utils import read_period_data
+
+from generated_data import TestGeneratedData
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.joinpath("scripts")))
+from dump_pit import DumpPitData
+
+DATA_DIR = Path(__file__).parent.joinpath("test_pit_asof_data")
+PIT_SOURCE_DIR = DATA_DIR.joinpath("pit_source")
+PIT_UPDATE_DIR = DATA_DIR.joinpath("pit_update")
+EXPRESSIONS = [
+    "P($$roe_q)",
+    "P($$roe_q / $$eps_q)",
+    "P(Mean($$roe_q, 4))",
+    "P(Ref($$roe_q, 1))",
+    "P(($$roe_q - Ref($$roe_q, 4)) / Ref($$roe_q, 4))",
+    "PRef($$roe_q, 201804)",
+]
+
+
+def _pit_records(rng: np.random.RandomState, field: str) -> pd.DataFrame:
+    """the reports of the quarters and their revisions, some quarters are never reported"""
+    rows = []
+    for period in [year * 100 + q for year in range(2017, 2021) for q in range(1, 5)]:
+        if rng.rand() < 0.1:
+            continue
+        end = pd.Timestamp(year=period // 100, month=period % 100 * 3, day=1) + pd.offsets.MonthEnd()
+        date = end + pd.Timedelta(days=int(rng.randint(10, 60)))
+        for _ in range(rng.randint(1, 4)):
+            rows.append((date.strftime("%Y-%m-%d"), period, rng.rand(), field))
+            date += pd.Timedelta(days=int(rng.randint(0, 90)))
+    return pd.DataFrame(rows, columns=["date", "period", "value", "field"])
+
+
+class TestPITAsOf(TestGeneratedData):
+    data_dir = DATA_DIR
+    fields = ["close"]
+
+    @classmethod
+    def generate_data(cls):
+        PIT_SOURCE_DIR.mkdir(parents=True, exist_ok=True)
+        dates = pd.bdate_range("2018-01-01", "2020-12-31")
+        rng = np.random.RandomState(0)
+        for i, fields in enumerate([["roe", "eps"], ["roe"]]):
+            symbol = f"sh60000{i}"
+            pd.DataFrame({"date": dates, "symbol": symbol.upper(), "close": rng.rand(len(dates))}).to_csv(
+                cls.source_dir.joinpath(f"{symbol}.csv"), index=False
+            )
+            df = pd.concat([_pit_records(rng, field) for field in fields])
+            df.to_csv(PIT_SOURCE_DIR.joinpath(f"{symbol}.csv"), index=False)
+
+    @classmethod
+    def dump_data(cls):
+        super().dump_data()
+        DumpPitData(csv_path=PIT_SOURCE_DIR, qlib_dir=cls.qlib_dir, max_workers=1).dump(interval="quarterly")
+
+    def setUp(self) -> None:
+        H["f"].clear()
+
+    def test_same_values(self):
+        calendar = D.calendar()
+        for field in EXPRESSIONS:
+            expression = ExpressionD.get_expression_instance(field)
+            for start_index, end_index in [(0, len(calendar) - 1), (100, 400)]:
+                with mock.patch.object(
+                    LocalPITProvider, "period_feature", autospec=True, side_effect=LocalPITProvider.period_feature
+                ) as period_feature:
+                    series = expression._load_internal("SH600000", start_index, end_index, "day")
+                H["f"].clear()
+                expected = expression._load_daily("SH600000", start_index, end_index, "day")
+                pd.testing.assert_series_equal(series, expected)
+                self.assertTrue(series.notna().any(), field)
+                # the feature is calculated once for each revision instead of each date
+                self.assertLess(period_feature.call_count, (end_index - start_index + 1) // 5)
+        # the latest period is looked up from the revisions directly
+        with mock.patch.object(LocalPITProvider, "period_feature", side_effect=AssertionError("called")):
+            H["f"].clear()
+            ExpressionD.get_expression_instance("P($$roe_q)").load("SH600000", 0, len(calendar) - 1, "day")
+
+    def test_missing_data(self):
+        df = D.features(["SH600000", "SH600001"], ["P($$roe_q)", "P($$eps_q)", "$close"])
+        self.assertTrue(df.loc["SH600000", "P($$eps_q)"].notna().any())
+        self.assertTrue(df.loc["SH600001", "P($$eps_q)"].isna().all())
+        self.assertTrue(df.loc["SH600001", "P($$roe_q)"].notna().any())
+
+    def test_revisions(self):
+        revisions = LocalPITProvider().period_revisions("SH600000", "$$roe_q")
+        index_path = self.qlib_dir.joinpath("financial", "sh600000", "roe_q.index")
+        data_path = self.qlib_dir.joinpath("financial", "sh600000", "roe_q.data")
+        for date in [20170101, 20180215, 20190430, 20190501, 20200831, 20211231]:
+            (loc,) = revisions.locate(np.array([date]))
+            for period in [201704, 201801, 201804, 201902, 202003]:
+                expected, _ = read_period_data(index_path, data_path, period, date, True)
+                np.testing.assert_array_equal(revisions.values(period, loc), expected)
+
+    def test_cache(self):
+        provider = LocalPITProvider()
+        revisions = provider.period_revisions("SH600000", "$$roe_q")
+        with mock.patch.object(np, "fromfile", side_effect=AssertionError("read")):
+            self.assertIs(provider.period_revisions("SH600000", "$$roe_q"), revisions)
+            self.assertEqual(provider.period_feature("SH600000", "$$roe_q", -3, 0, pd.Timestamp("2020-06-30")).size, 4)
+
+        # the least recently used records are evicted
+        C["pit_cache_size"] = 1
+        try:
+            provider = LocalPITProvider()
+        finally:
+            C["pit_cache_size"] = 1000
+        dates = pd.bdate_range("2017-06-01", "2020-12-31", freq="7D")
+        fields = [("SH600000", "$$roe_q"), ("SH600000", "$$eps_q"), ("SH600001", "$$roe_q")]
+
+        def _query(args):
+            (instrument, field), date = args
+            return provider.period_feature(instrument, field, -3, 0, date)
+
+        queries = [(key, date) for date in dates for key in fields]
+        expected = [_query(args) for args in queries]
+        provider.clear_cache()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for series, expected_series in zip(executor.map(_query, queries), expected):
+                pd.testing.assert_series_equal(series, expected_series)
+        self.assertEqual(len(provider._revisions_cache), 1)
+
+    def test_update(self):
+        revisions = PITD.period_revisions("SH600001", "$$roe_q")
+        last_date = pd.Timestamp(str(revisions.dates[-1]))
+        rows = [
+            ((last_date + pd.Timedelta(days=10)).strftime("%Y-%m-%d"), 202004, 123.0, "roe"),
+            ((last_date + pd.Timedelta(days=20)).strftime("%Y-%m-%d"), 202101, 456.0, "roe"),
+        ]
+        PIT_UPDATE_DIR.mkdir(parents=True, exist_ok=True)
+        pd.DataFrame(rows, columns=["date", "period", "value", "field"]).to_csv(
+            PIT_UPDATE_DIR.joinpath("sh600001.csv"), index=False
+        )
+        DumpPitData(csv_path=PIT_UPDATE_DIR, qlib_dir=self.qlib_dir, max_workers=1).dump(interval="quarterly")
+
+        # the records updated are parsed again
+        updated = PITD.period_revisions("SH600001", "$$roe_q")
+        self.assertEqual(len(updated), len(revisions) + 2)
+        np.testing.assert_array_equal(updated.values([202004, 202101], len(updated)), [123.0, 456.0])
+        index_path = self.qlib_dir.joinpath("financial", "sh600001", "roe_q.index")
+        data_path = self.qlib_dir.joinpath("financial", "sh600001", "roe_q.data")
+        for period in sorted(set(updated.periods.tolist())):
+            expected, _ = read_period_data(index_path, data_path, period, 20991231, True)
+            self.assertEqual(updated.values(period, len(updated)), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()